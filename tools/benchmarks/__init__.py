@@ -0,0 +1 @@
+"""ダウンローダーのベンチマーク"""
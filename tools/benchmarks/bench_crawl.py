@@ -0,0 +1,190 @@
+"""
+クローラーのベンチマーク
+
+ローカルの再生サーバー(benchmarks.replay_server)に対して SeijishikinDownloader を実行し、
+同時実行数などの設定ごとにページの処理量(ページ/秒)、PDFの転送量(MB/秒)、
+リクエストの所要時間の分布(p50/p95/p99)を比較します。実際のサイトにはアクセスしません。
+
+リクエスト間隔の制御はクローラー自体の性能を計測するため既定では無効にします
+(--min-interval で実際のサイトと同じ間隔を設定できます)。
+
+使用方法:
+    python -m benchmarks.bench_crawl [--concurrency 1 4 8] [--pipeline] [--latency 0.05] [--throttle-rate 0.05]
+    python -m benchmarks.bench_crawl --root saved_site/www.soumu.go.jp
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from benchmarks.replay_server import ReplayServer, add_site_arguments, site_from_arguments
+from downloader.downloader import SeijishikinDownloader
+from downloader.main import parse_arguments
+
+# 所要時間の分布として表示するパーセンタイル
+PERCENTILES: tuple[int, ...] = (50, 95, 99)
+
+
+@dataclass
+class CrawlResult:
+    """1回のクロールの計測結果"""
+
+    label: str
+    seconds: float
+    pages: int
+    pdfs: int
+    pdf_bytes: int
+    # 種類(page, pdf)ごとのリクエストの所要時間(秒)
+    latencies: dict[str, list[float]]
+    # 429/500応答と通信エラーの数
+    errors: int
+
+    @property
+    def pages_per_second(self) -> float:
+        """ページの処理量(ページ/秒)"""
+        return self.pages / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """PDFの転送量(MB/秒)"""
+        return self.pdf_bytes / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+
+
+def percentile(values: list[float], percent: int) -> float:
+    """
+    パーセンタイルを計算
+
+    Args:
+        values: 値のリスト
+        percent: パーセント(1〜99)
+
+    Returns:
+        float: パーセンタイル(値がない場合は0)
+
+    """
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def run_crawl(base_url: str, options: list[str], *, min_interval: float, label: str) -> CrawlResult:
+    """
+    再生サーバーに対して1回クロールして計測
+
+    Args:
+        base_url: 再生サーバーのトップページのURL
+        options: downloader.main に渡す追加の引数
+        min_interval: 同一ホストへのリクエスト間隔(秒)
+        label: 結果の表示名
+
+    Returns:
+        CrawlResult: 計測結果
+
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_path = Path(tmp) / "metrics.jsonl"
+        args = parse_arguments(
+            [
+                "-o",
+                str(Path(tmp) / "out"),
+                "--base-url",
+                base_url,
+                "--metrics",
+                str(metrics_path),
+                "--no-progress",
+                *options,
+            ]
+        )
+        downloader = SeijishikinDownloader(args)
+        # 最小待機時間の制約はローカルのサーバーには不要なため、スケジューラの間隔を直接設定する
+        downloader.scheduler.min_interval = min_interval
+        downloader.scheduler.latency_factor = 0.0 if min_interval == 0 else downloader.scheduler.latency_factor
+
+        started = time.perf_counter()
+        # ログ以外の出力は計測結果の表示の妨げになるため破棄する
+        with Path(os.devnull).open("w") as devnull, contextlib.redirect_stderr(devnull):
+            try:
+                downloader.download_all()
+            finally:
+                downloader.export_metrics()
+        seconds = time.perf_counter() - started
+
+        latencies: dict[str, list[float]] = {"page": [], "pdf": []}
+        pages = pdfs = pdf_bytes = errors = 0
+        for line in metrics_path.read_text(encoding="utf-8").splitlines():
+            record = json.loads(line)
+            if record["type"] != "request" or record["component"] not in latencies:
+                continue
+            latencies[record["component"]].append(record["total"])
+            if record["status"] is None or record["status"] >= 400:
+                errors += 1
+            elif record["component"] == "page":
+                pages += 1
+            else:
+                pdfs += 1
+                pdf_bytes += record["bytes"]
+    return CrawlResult(label, seconds, pages, pdfs, pdf_bytes, latencies, errors)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    parser = argparse.ArgumentParser(description="ローカルの再生サーバーに対するクロールの処理量を比較します。")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="比較する同時実行数")
+    parser.add_argument("--pipeline", action="store_true", help="--pipeline を指定した場合も計測")
+    parser.add_argument("--stream-links", action="store_true", help="--stream-links を指定した場合も計測")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="同一ホストへのリクエスト間隔(秒)")
+    add_site_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # ダウンローダーのログは計測結果の表示の妨げになるため、エラーのみ表示する
+    logging.basicConfig(level=logging.ERROR)
+
+    runs: list[tuple[str, list[str]]] = []
+    for concurrency in args.concurrency:
+        runs.append((f"concurrency={concurrency}", ["--concurrency", str(concurrency)]))
+        if args.pipeline:
+            runs.append((f"pipeline concurrency={concurrency}", ["--pipeline", "--concurrency", str(concurrency)]))
+        if args.stream_links:
+            runs.append(
+                (f"stream-links concurrency={concurrency}", ["--stream-links", "--concurrency", str(concurrency)])
+            )
+
+    site, faults = site_from_arguments(args)
+    header = f"{'run':<32} {'sec':>7} {'pages/s':>8} {'MB/s':>7} {'pages':>6} {'pdfs':>5} {'errors':>6}"
+    header += "".join(f" {f'page p{p}':>10}" for p in PERCENTILES) + "".join(f" {f'pdf p{p}':>9}" for p in PERCENTILES)
+    print(header)
+    for label, options in runs:
+        # 障害の発生順を揃えるため、実行ごとにサーバーを起動し直す
+        with ReplayServer(site, faults) as server:
+            result = run_crawl(server.base_url, options, min_interval=args.min_interval, label=label)
+        row = (
+            f"{result.label:<32} {result.seconds:>7.2f} {result.pages_per_second:>8.1f} "
+            f"{result.megabytes_per_second:>7.1f} {result.pages:>6} {result.pdfs:>5} {result.errors:>6}"
+        )
+        row += "".join(f" {percentile(result.latencies['page'], p) * 1000:>8.1f}ms" for p in PERCENTILES)
+        row += "".join(f" {percentile(result.latencies['pdf'], p) * 1000:>7.1f}ms" for p in PERCENTILES)
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+HTMLパーサーのベンチマーク
+
+PageParser の各バックエンド(html.parser, lxml, fast)で報告書一覧ページからPDFリンクを
+抽出する時間とメモリ使用量を比較します。
+
+使用方法:
+    python -m benchmarks.bench_html_parser [HTMLファイル ...] [-r 回数]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from unittest.mock import Mock
+
+from downloader.page_parser import PARSER_BACKENDS, PageParser
+
+REPORT_LIST_URL = "https://www.soumu.go.jp/senkyo/seiji_s/seijishikin/reports/SS20241129/SL/index.html"
+
+
+def make_report_list_html(count: int) -> str:
+    """
+    ベンチマーク用の大きな報告書一覧ページを生成
+
+    Args:
+        count: PDFリンクの件数
+
+    Returns:
+        str: HTML文字列
+
+    """
+    rows = "\n".join(
+        f'<tr><td class="name"><a href="{i // 100:03d}_{i:04d}.pdf">政党支部{i}総支部<span>(PDF)</span></a></td>'
+        f"<td>令和5年分</td><td>{i * 37 % 1000}KB</td></tr>"
+        for i in range(count)
+    )
+    return f"<html><head><title>政党支部</title></head><body><h2>政党支部</h2><table>{rows}</table></body></html>"
+
+
+def available_backends() -> list[str]:
+    """
+    利用可能なバックエンドを取得
+
+    Returns:
+        list[str]: バックエンド名のリスト
+
+    """
+    return [b for b in PARSER_BACKENDS if b != "lxml" or importlib.util.find_spec("lxml") is not None]
+
+
+def bench(backend: str, html: str, repeat: int) -> tuple[float, float, int]:
+    """
+    1つのバックエンドを計測
+
+    Args:
+        backend: バックエンド名
+        html: HTML文字列
+        repeat: 繰り返し回数
+
+    Returns:
+        tuple[float, float, int]: (中央値の秒数, ピークメモリのMiB, 抽出したリンク数)
+
+    """
+    parser = PageParser(session=Mock(), delay=0, parser_backend=backend)
+    timings: list[float] = []
+    links = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        links = parser.extract_pdf_links(html, REPORT_LIST_URL)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parser.extract_pdf_links(html, REPORT_LIST_URL)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / (1024 * 1024), len(links)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    parser = argparse.ArgumentParser(description="HTMLパーサーのバックエンドを比較します。")
+    parser.add_argument("files", nargs="*", help="保存したHTMLファイル(Shift_JISまたはUTF-8)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="繰り返し回数")
+    parser.add_argument("--links", type=int, default=5000, help="ファイル未指定時に生成するリンク数")
+    args = parser.parse_args(argv)
+
+    pages: list[tuple[str, str]] = []
+    for file in args.files:
+        data = Path(file).read_bytes()
+        try:
+            text = data.decode("shift_jis")
+        except UnicodeDecodeError:
+            text = data.decode("utf-8", errors="replace")
+        pages.append((file, text))
+    if not pages:
+        pages.append((f"synthetic({args.links} links)", make_report_list_html(args.links)))
+
+    print(f"{'page':<40} {'backend':<12} {'median ms':>10} {'peak MiB':>9} {'links':>7}")
+    for name, html in pages:
+        for backend in available_backends():
+            seconds, peak, count = bench(backend, html, args.repeat)
+            print(f"{name[-40:]:<40} {backend:<12} {seconds * 1000:>10.1f} {peak:>9.1f} {count:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
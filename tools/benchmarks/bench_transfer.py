@@ -0,0 +1,145 @@
+"""
+本文の転送方法のベンチマーク
+
+ローカルのHTTPサーバーから大きな本文を受信し、SHA-256の計算と書き込み(/dev/null)を含めた転送速度を、
+iter_content(8KiB / 1MiB)と transport.iter_into(1MiBの再利用バッファ)で比較します。
+
+使用方法:
+    python -m benchmarks.bench_transfer [--size MiB] [-r 回数]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from downloader.transport import COPY_BUFFER_SIZE, create_session, iter_into
+
+# 比較する転送方法(名前と、レスポンスから受信したデータを順に返す関数)
+Method = Callable[[requests.Response], Iterable[bytes | memoryview]]
+METHODS: dict[str, Method] = {
+    "iter_content(8KiB)": lambda response: response.iter_content(chunk_size=8192),
+    "iter_content(1MiB)": lambda response: response.iter_content(chunk_size=COPY_BUFFER_SIZE),
+    "iter_into(1MiB)": lambda response: iter_into(response, bytearray(COPY_BUFFER_SIZE)),
+}
+
+
+def make_handler(body: bytes) -> type[BaseHTTPRequestHandler]:
+    """
+    本文を返すハンドラを作成
+
+    Args:
+        body: 返す本文
+
+    Returns:
+        type[BaseHTTPRequestHandler]: ハンドラのクラス
+
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return Handler
+
+
+def serve(body: bytes) -> Iterator[str]:
+    """
+    本文を返すローカルのHTTPサーバーを起動
+
+    Args:
+        body: 返す本文
+
+    Yields:
+        str: サーバーのURL
+
+    """
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(body))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/body.pdf"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def bench(session: requests.Session, url: str, method: Method, repeat: int) -> float:
+    """
+    1つの転送方法を計測
+
+    Args:
+        session: セッション
+        url: 本文のURL
+        method: 転送方法
+        repeat: 繰り返し回数
+
+    Returns:
+        float: 転送速度の中央値(MB/秒)
+
+    """
+    rates: list[float] = []
+    with Path(os.devnull).open("wb") as sink:
+        for _ in range(repeat):
+            digest = hashlib.sha256()
+            received = 0
+            started = time.perf_counter()
+            with session.get(url, stream=True) as response:
+                for chunk in method(response):
+                    digest.update(chunk)
+                    sink.write(chunk)
+                    received += len(chunk)
+            rates.append(received / (time.perf_counter() - started) / 1e6)
+    return statistics.median(rates)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    parser = argparse.ArgumentParser(description="本文の転送方法を比較します。")
+    parser.add_argument("--size", type=int, default=200, help="本文の大きさ(MiB)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="繰り返し回数")
+    args = parser.parse_args(argv)
+
+    body = os.urandom(args.size * 1024 * 1024)
+    session = create_session()
+    server = serve(body)
+    url = next(server)
+    try:
+        print(f"{'method':<20} {'median MB/s':>12}")
+        for name, method in METHODS.items():
+            print(f"{name:<20} {bench(session, url, method, args.repeat):>12.0f}")
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
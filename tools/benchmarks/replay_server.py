@@ -0,0 +1,500 @@
+"""
+総務省サイトのローカル再生サーバー
+
+トップページ、公表年ごとのページ、報告書一覧ページ、PDFを返すローカルのHTTPサーバーを提供します。
+保存したサイトのコピー(URLのパスと同じ構成のディレクトリ)か、構成を指定して生成した
+合成サイトを返し、応答の遅延、帯域の制限、500エラー、429応答を設定できます。
+実際のサイトにアクセスせずに、クローラーの処理量を計測・検証するために使用します。
+
+使用方法:
+    python -m benchmarks.replay_server [--root DIR] [--port 8000] [--latency 0.05] [--throttle-rate 0.1]
+    python -m downloader.main --base-url http://127.0.0.1:8000/senkyo/seiji_s/seijishikin/ -o /tmp/out
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import unquote, urlparse
+
+from downloader.config import BASE_URL
+
+# サイトのトップページのパス
+SITE_PATH = urlparse(BASE_URL).path
+
+# 報告書一覧ページの種類(団体種別のコードと名前)
+REPORT_CATEGORIES: tuple[tuple[str, str, int], ...] = (
+    ("SF", "政党本部・政治資金団体", 0),
+    ("SL", "政党支部", 1),
+    ("SC", "国会議員関係政治団体", 100),
+    ("SS", "資金管理団体", 200),
+    ("SO", "その他の政治団体", 300),
+)
+
+# 本文を送信する単位(帯域の制限に使用)
+SEND_CHUNK_SIZE = 64 * 1024
+
+# 拡張子ごとのContent-Type
+CONTENT_TYPES: dict[str, str] = {
+    ".html": "text/html; charset=Shift_JIS",
+    ".pdf": "application/pdf",
+    ".txt": "text/plain",
+}
+
+# robots.txtがない場合に返す内容
+DEFAULT_ROBOTS = b"User-agent: *\nAllow: /\n"
+
+
+class ReplaySite(Protocol):
+    """再生するサイトのプロトコル"""
+
+    def get(self, path: str) -> bytes | None:
+        """パスに対応する本文を取得する(存在しない場合はNone)"""
+        ...
+
+
+@dataclass
+class SiteSpec:
+    """合成サイトの構成"""
+
+    # 公表年の数(令和5年分から遡る)
+    years: int = 2
+    # 公表年ごとの報告書一覧ページの数
+    report_lists: int = 5
+    # 報告書一覧ページごとのPDFの数
+    pdfs: int = 20
+    # PDFの大きさ(バイト)
+    pdf_size: int = 256 * 1024
+
+
+@dataclass
+class FaultSpec:
+    """応答の遅延と障害の設定"""
+
+    # 応答ヘッダを返すまでの遅延(秒)
+    latency: float = 0.0
+    # 遅延に加える一様乱数の幅(秒)
+    jitter: float = 0.0
+    # 接続ごとの帯域(バイト/秒、0の場合は制限なし)
+    bandwidth: float = 0.0
+    # 500エラーを返す割合
+    error_rate: float = 0.0
+    # 429応答を返す割合
+    throttle_rate: float = 0.0
+    # 429応答のRetry-After(秒)
+    retry_after: int = 0
+    # 乱数のシード(同じ設定で同じ障害を再現する)
+    seed: int = 0
+
+
+class SyntheticSite:
+    """構成を指定して生成する合成サイト"""
+
+    def __init__(self, spec: SiteSpec | None = None) -> None:
+        """
+        初期化(ページを生成)
+
+        Args:
+            spec: サイトの構成
+
+        """
+        self.spec = spec or SiteSpec()
+        self.pages: dict[str, bytes] = {}
+        self.pdf_paths: set[str] = set()
+        self._padding = b"0" * max(self.spec.pdf_size - 64, 0)
+        self._build()
+
+    @property
+    def pdf_count(self) -> int:
+        """PDFの数"""
+        return len(self.pdf_paths)
+
+    @property
+    def page_count(self) -> int:
+        """HTMLページの数"""
+        return len(self.pages)
+
+    def _build(self) -> None:
+        """トップページ、公表年ごとのページ、報告書一覧ページを生成"""
+        year_links: list[str] = []
+        for year_index in range(self.spec.years):
+            year = 5 - year_index
+            year_path = f"{SITE_PATH}reports/SS{2019 + year}1129/"
+            year_links.append(f'<li><a href="{year_path}">令和{year}年分 定期公表</a></li>')
+
+            report_links: list[str] = []
+            for list_index in range(self.spec.report_lists):
+                code, name, category_id = REPORT_CATEGORIES[list_index % len(REPORT_CATEGORIES)]
+                filename = "index.html" if list_index < len(REPORT_CATEGORIES) else f"list{list_index}.html"
+                list_path = f"{year_path}{code}/{filename}"
+                report_links.append(f'<li><a href="{list_path}">{name}</a></li>')
+
+                rows: list[str] = []
+                # 同じ種類の2つ目以降の報告書一覧ページはコード値をずらす
+                category_id += list_index // len(REPORT_CATEGORIES)
+                for pdf_index in range(self.spec.pdfs):
+                    pdf_path = f"{year_path}{code}/{category_id:03d}_{pdf_index:04d}.pdf"
+                    self.pdf_paths.add(pdf_path)
+                    rows.append(f'<tr><td><a href="{pdf_path}">{name}{list_index}-{pdf_index}</a></td></tr>')
+                self.pages[list_path] = _html(name, f"<h2>{name}</h2><table>{''.join(rows)}</table>")
+
+            self.pages[year_path] = _html(f"令和{year}年分", f"<ul>{''.join(report_links)}</ul>")
+        self.pages[SITE_PATH] = _html("政治資金収支報告書", f"<ul>{''.join(year_links)}</ul>")
+
+    def get(self, path: str) -> bytes | None:
+        """
+        パスに対応する本文を取得
+
+        Args:
+            path: URLのパス
+
+        Returns:
+            bytes | None: 本文、存在しない場合はNone
+
+        """
+        if path in self.pdf_paths:
+            # PDFごとに内容が異なるよう、パスをヘッダの後に埋め込む
+            return b"%PDF-1.4\n%" + path.encode() + b"\n" + self._padding + b"\n%%EOF\n"
+        return self.pages.get(path)
+
+
+class RecordedSite:
+    """保存したサイトのコピー(URLのパスと同じ構成のディレクトリ)"""
+
+    def __init__(self, root: str | Path) -> None:
+        """
+        初期化
+
+        Args:
+            root: サイトのコピーを保存したディレクトリ(例: wget -x で保存したホスト名のディレクトリ)
+
+        """
+        self.root = Path(root).resolve()
+
+    def get(self, path: str) -> bytes | None:
+        """
+        パスに対応するファイルの内容を取得(ディレクトリの場合は index.html)
+
+        Args:
+            path: URLのパス
+
+        Returns:
+            bytes | None: ファイルの内容、存在しない場合はNone
+
+        """
+        file_path = (self.root / path.lstrip("/")).resolve()
+        if file_path.is_dir():
+            file_path = file_path / "index.html"
+        # ディレクトリの外のファイルは返さない
+        if not file_path.is_relative_to(self.root) or not file_path.is_file():
+            return None
+        return file_path.read_bytes()
+
+
+class ReplayServer:
+    """サイトを再生するローカルのHTTPサーバー"""
+
+    def __init__(
+        self,
+        site: ReplaySite,
+        faults: FaultSpec | None = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            site: 再生するサイト
+            faults: 応答の遅延と障害の設定
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート(0の場合は空いているポート)
+
+        """
+        self.site = site
+        self.faults = faults or FaultSpec()
+        self.random = random.Random(self.faults.seed)
+        # ステータスコードごとの応答数
+        self.statuses: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """トップページのURL"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{SITE_PATH}"
+
+    def start(self) -> ReplayServer:
+        """
+        別スレッドで待ち受けを開始
+
+        Returns:
+            ReplayServer: このサーバー
+
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """現在のスレッドで待ち受ける(中断されるまで戻らない)"""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        """待ち受けを終了"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> ReplayServer:
+        """コンテキストマネージャーの開始(待ち受けを開始)"""
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        """コンテキストマネージャーの終了(待ち受けを終了)"""
+        self.stop()
+
+    def draw_fault(self) -> HTTPStatus | None:
+        """
+        障害を発生させるかどうかを決める
+
+        Returns:
+            HTTPStatus | None: 返すエラーのステータスコード、障害を発生させない場合はNone
+
+        """
+        with self._lock:
+            value = self.random.random()
+        if value < self.faults.throttle_rate:
+            return HTTPStatus.TOO_MANY_REQUESTS
+        if value < self.faults.throttle_rate + self.faults.error_rate:
+            return HTTPStatus.INTERNAL_SERVER_ERROR
+        return None
+
+    def delay(self) -> float:
+        """
+        応答ヘッダを返すまでの遅延を決める
+
+        Returns:
+            float: 遅延(秒)
+
+        """
+        if not self.faults.jitter:
+            return self.faults.latency
+        with self._lock:
+            return self.faults.latency + self.random.uniform(0, self.faults.jitter)
+
+    def count(self, status: int) -> None:
+        """
+        応答を集計
+
+        Args:
+            status: ステータスコード
+
+        """
+        with self._lock:
+            self.statuses[status] += 1
+
+
+def _html(title: str, body: str) -> bytes:
+    """
+    Shift_JISでエンコードしたHTMLを生成
+
+    Args:
+        title: タイトル
+        body: body要素の内容
+
+    Returns:
+        bytes: HTML
+
+    """
+    return f"<html><head><title>{title}</title></head><body>{body}</body></html>".encode("shift_jis")
+
+
+def _handler_for(server: ReplayServer) -> type[BaseHTTPRequestHandler]:
+    """
+    サーバーの設定を参照するリクエストハンドラのクラスを作成
+
+    Args:
+        server: 再生サーバー
+
+    Returns:
+        type[BaseHTTPRequestHandler]: リクエストハンドラのクラス
+
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        """再生サーバーのリクエストハンドラ"""
+
+        # キープアライブで接続を再利用できるようにする
+        protocol_version = "HTTP/1.1"
+        # ヘッダと本文を別々に送信しても遅延確認応答を待たないようにする
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:
+            self._respond(send_body=True)
+
+        def do_HEAD(self) -> None:
+            self._respond(send_body=False)
+
+        def _respond(self, *, send_body: bool) -> None:
+            delay = server.delay()
+            if delay > 0:
+                time.sleep(delay)
+
+            path = unquote(urlparse(self.path).path)
+            fault = server.draw_fault()
+            if fault is not None:
+                headers = (
+                    {"Retry-After": str(server.faults.retry_after)} if fault == HTTPStatus.TOO_MANY_REQUESTS else {}
+                )
+                self._send(fault, fault.phrase.encode(), headers, send_body=send_body)
+                return
+
+            body = server.site.get(path)
+            if body is None and path == "/robots.txt":
+                body = DEFAULT_ROBOTS
+            if body is None:
+                self._send(HTTPStatus.NOT_FOUND, b"Not Found", {}, send_body=send_body)
+                return
+
+            headers = {"Content-Type": CONTENT_TYPES.get(Path(path).suffix, CONTENT_TYPES[".html"])}
+            headers["Accept-Ranges"] = "bytes"
+            match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if match:
+                start = int(match.group(1))
+                if start >= len(body):
+                    headers["Content-Range"] = f"bytes */{len(body)}"
+                    self._send(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, b"", headers, send_body=send_body)
+                    return
+                headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+                self._send(HTTPStatus.PARTIAL_CONTENT, body[start:], headers, send_body=send_body)
+                return
+            self._send(HTTPStatus.OK, body, headers, send_body=send_body)
+
+        def _send(self, status: HTTPStatus, body: bytes, headers: dict[str, str], *, send_body: bool) -> None:
+            server.count(status)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not send_body:
+                return
+            bandwidth = server.faults.bandwidth
+            if not bandwidth:
+                self.wfile.write(body)
+                return
+            view = memoryview(body)
+            for offset in range(0, len(body), SEND_CHUNK_SIZE):
+                chunk = view[offset : offset + SEND_CHUNK_SIZE]
+                self.wfile.write(chunk)
+                time.sleep(len(chunk) / bandwidth)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return Handler
+
+
+def add_site_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    サイトの構成と障害の設定の引数を追加(ベンチマークと共通)
+
+    Args:
+        parser: 引数パーサー
+
+    """
+    parser.add_argument("--root", help="保存したサイトのコピーのディレクトリ(未指定の場合は合成サイト)")
+    parser.add_argument("--years", type=int, default=SiteSpec.years, help="合成サイトの公表年の数")
+    parser.add_argument(
+        "--report-lists", type=int, default=SiteSpec.report_lists, help="合成サイトの公表年ごとの報告書一覧ページの数"
+    )
+    parser.add_argument("--pdfs", type=int, default=SiteSpec.pdfs, help="合成サイトの報告書一覧ページごとのPDFの数")
+    parser.add_argument("--pdf-size", type=int, default=SiteSpec.pdf_size, help="合成サイトのPDFの大きさ(バイト)")
+    parser.add_argument("--latency", type=float, default=0.0, help="応答ヘッダを返すまでの遅延(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延に加える一様乱数の幅(秒)")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="接続ごとの帯域(バイト/秒、0の場合は制限なし)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500エラーを返す割合")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429応答を返す割合")
+    parser.add_argument("--retry-after", type=int, default=0, help="429応答のRetry-After(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+
+
+def site_from_arguments(args: argparse.Namespace) -> tuple[ReplaySite, FaultSpec]:
+    """
+    引数から再生するサイトと障害の設定を作成
+
+    Args:
+        args: add_site_arguments() で追加した引数
+
+    Returns:
+        tuple[ReplaySite, FaultSpec]: サイトと障害の設定
+
+    """
+    site: ReplaySite = (
+        RecordedSite(args.root)
+        if args.root
+        else SyntheticSite(
+            SiteSpec(years=args.years, report_lists=args.report_lists, pdfs=args.pdfs, pdf_size=args.pdf_size)
+        )
+    )
+    faults = FaultSpec(
+        latency=args.latency,
+        jitter=args.jitter,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    return site, faults
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    parser = argparse.ArgumentParser(
+        description="総務省サイトのコピーまたは合成サイトを返すローカルのHTTPサーバーを起動します。"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=8000, help="待ち受けるポート")
+    add_site_arguments(parser)
+    args = parser.parse_args(argv)
+
+    site, faults = site_from_arguments(args)
+    server = ReplayServer(site, faults, host=args.host, port=args.port)
+    print(f"再生サーバーを起動しました: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
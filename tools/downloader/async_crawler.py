@@ -0,0 +1,188 @@
+"""
+非同期クロールエンジンモジュール
+
+年度ページ、報告書一覧ページ、PDFの取得を asyncio で並行して実行するクラスを提供します。
+HTTP通信は既存の PageParser / PDFDownloader (requests ベース) をスレッドプール上で実行し、
+ホストごとのリクエスト間隔は PolitenessScheduler が一元的に保証します。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, TypeVar
+
+from .page_parser import PdfLink, ReportListPageLink, YearPageLink
+
+# 型チェック用のインポート
+if TYPE_CHECKING:
+    from .downloader import SeijishikinDownloader
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncCrawlEngine:
+    """非同期クロールエンジン"""
+
+    def __init__(self, downloader: SeijishikinDownloader, concurrency: int) -> None:
+        """
+        初期化
+
+        Args:
+            downloader: 処理を委譲するダウンローダー
+            concurrency: 同時に実行する処理数
+
+        """
+        self.downloader = downloader
+        self.concurrency = max(1, concurrency)
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        # 受信中の報告書一覧ページの同時実行数(PDFの処理とは別に制限し、PDFの処理の枠を占有しない)
+        self._page_semaphore: asyncio.Semaphore | None = None
+
+    def run(self, links: list[YearPageLink | ReportListPageLink]) -> None:
+        """
+        リンクを並行して処理(同期的に呼び出し可能なエントリポイント)
+
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
+
+        """
+        asyncio.run(self.crawl(links))
+
+    async def crawl(self, links: list[YearPageLink | ReportListPageLink]) -> None:
+        """
+        リンクを並行して処理
+
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
+
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._page_semaphore = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix="crawler",
+        ) as executor:
+            self._executor = executor
+            try:
+                await asyncio.gather(*(self._process_link(link) for link in links))
+            finally:
+                self._executor = None
+
+    async def _run_blocking(self, func: Callable[..., T], *args: object) -> T:
+        """
+        ブロッキング処理を同時実行数の範囲内でスレッドプール上で実行
+
+        Args:
+            func: 実行する関数
+            *args: 関数の引数
+
+        Returns:
+            T: 関数の戻り値
+
+        """
+        if self._semaphore is None or self._executor is None:
+            msg = "クロールが開始されていません"
+            raise RuntimeError(msg)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _process_link(self, link: YearPageLink | ReportListPageLink) -> None:
+        """
+        年度ページまたは報告書一覧ページのリンクを処理
+
+        Args:
+            link: 処理するリンク
+
+        """
+        if isinstance(link, ReportListPageLink):
+            logger.info("報告書一覧 %s の処理を開始します: %s", link.year, link.url)
+            await self._process_report_list_page(link)
+        elif isinstance(link, YearPageLink):
+            logger.info("年度 %s の処理を開始します: %s", link.year, link.url)
+            report_list_links = await self._run_blocking(
+                self.downloader.parse_year_page,
+                link,
+            )
+            await asyncio.gather(
+                *(self._process_report_list_page(report_list_link) for report_list_link in report_list_links)
+            )
+        else:
+            error_message = f"想定外のリンクタイプ: {type(link)}"
+            raise TypeError(error_message)
+
+    async def _process_report_list_page(self, report_list_link: ReportListPageLink) -> None:
+        """
+        報告書一覧ページを処理
+
+        Args:
+            report_list_link: 報告書一覧ページのリンク
+
+        """
+        if self.downloader.stream_links:
+            await self._process_report_list_page_streaming(report_list_link)
+            return
+
+        pdf_links = await self._run_blocking(
+            self.downloader.parse_report_list_page,
+            report_list_link,
+        )
+        await asyncio.gather(*(self._process_pdf_link(pdf_link, report_list_link.year) for pdf_link in pdf_links))
+        await self._run_blocking(self.downloader.complete_report_list_page, report_list_link, pdf_links)
+
+    async def _process_report_list_page_streaming(self, report_list_link: ReportListPageLink) -> None:
+        """
+        報告書一覧ページを受信しながら処理
+
+        ページの受信は PDF の処理とは別の枠のスレッドで行い、PDFリンクが見つかるたびに
+        イベントループへPDFの処理を投入するため、ページの受信完了を待たずにダウンロードが始まります。
+        受信中のページが PDF の処理の同時実行数の枠を占有することはありません。
+
+        Args:
+            report_list_link: 報告書一覧ページのリンク
+
+        """
+        if self._page_semaphore is None:
+            msg = "クロールが開始されていません"
+            raise RuntimeError(msg)
+
+        loop = asyncio.get_running_loop()
+        futures: list[concurrent.futures.Future[None]] = []
+
+        def consume() -> list[PdfLink]:
+            pdf_links: list[PdfLink] = []
+            for pdf_link in self.downloader.iter_report_list_page(report_list_link):
+                pdf_links.append(pdf_link)
+                futures.append(
+                    asyncio.run_coroutine_threadsafe(self._process_pdf_link(pdf_link, report_list_link.year), loop),
+                )
+            return pdf_links
+
+        async with self._page_semaphore:
+            pdf_links = await asyncio.to_thread(consume)
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        await self._run_blocking(self.downloader.complete_report_list_page, report_list_link, pdf_links)
+
+    async def _process_pdf_link(self, pdf_link: PdfLink, year: str) -> None:
+        """
+        PDFリンクを処理
+
+        Args:
+            pdf_link: PDFリンク
+            year: 公表年
+
+        """
+        if not isinstance(pdf_link, PdfLink):
+            msg = f"想定外のリンク: {pdf_link.url}"
+            raise ValueError(msg)
+
+        await self._run_blocking(self.downloader.process_pdf_link, pdf_link, year)
@@ -0,0 +1,320 @@
+"""
+カタログモジュール
+
+クロールで見つかったPDFの一覧(URL、団体名、団体種別、公表年、報告書一覧ページと、
+HEADリクエストで取得したサイズ・ETag・Last-Modified、分かる場合は内容のハッシュ値)を
+列指向のファイル(gzip圧縮CSVまたはParquet)に書き出し、前回のカタログとの差分を
+1回のハッシュ結合で求めるクラスとCLIを提供します。
+
+使用方法:
+    python -m downloader.main -y R5 --catalog catalog/R5.csv.gz
+    python -m downloader.catalog diff catalog/previous.csv.gz catalog/R5.csv.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+# 型チェック用のインポート
+if TYPE_CHECKING:
+    from .page_parser import PdfLink
+    from .pdf_downloader import RemotePdf
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# カタログのキーと属性の列
+KEY_COLUMN = "url"
+ATTRIBUTE_COLUMNS: tuple[str, ...] = ("organization", "category", "year", "report_list_url")
+# 内容の変更を検出する列(同じURLのPDFが置き換えられた場合に変わる)
+CONTENT_COLUMNS: tuple[str, ...] = ("size", "etag", "last_modified", "sha256")
+VALUE_COLUMNS: tuple[str, ...] = (*ATTRIBUTE_COLUMNS, *CONTENT_COLUMNS)
+CATALOG_COLUMNS: tuple[str, ...] = (KEY_COLUMN, *VALUE_COLUMNS)
+
+PARQUET_SUFFIX = ".parquet"
+
+
+@dataclass
+class CatalogEntry:
+    """カタログの1行"""
+
+    url: str
+    organization: str
+    category: str
+    year: str
+    report_list_url: str
+    size: int | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    sha256: str | None = None
+
+    @classmethod
+    def from_pdf_link(
+        cls,
+        pdf_link: PdfLink,
+        year: str,
+        *,
+        remote: RemotePdf | None = None,
+        sha256: str | None = None,
+    ) -> CatalogEntry:
+        """
+        PDFリンクからカタログの行を生成
+
+        Args:
+            pdf_link: PDFリンク
+            year: 公表年
+            remote: HEADリクエストで取得したサイズと検証子
+            sha256: 内容のハッシュ値(分かる場合)
+
+        Returns:
+            CatalogEntry: カタログの行
+
+        """
+        return cls(
+            url=pdf_link.url,
+            organization=pdf_link.text,
+            category=pdf_link.category_name(),
+            year=year,
+            report_list_url=pdf_link.report_list_url,
+            size=remote.size if remote else None,
+            etag=remote.etag if remote else None,
+            last_modified=remote.last_modified if remote else None,
+            sha256=sha256,
+        )
+
+
+@dataclass
+class CatalogDiff:
+    """カタログの差分"""
+
+    added: pd.DataFrame
+    removed: pd.DataFrame
+    changed: pd.DataFrame
+
+    def summary(self) -> dict[str, int]:
+        """件数の要約"""
+        return {"added": len(self.added), "removed": len(self.removed), "changed": len(self.changed)}
+
+
+class Catalog:
+    """クロールで見つかったPDFの一覧"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        # 同じPDFが複数の報告書一覧ページからリンクされている場合は最初の1件のみ記録する
+        self._entries: dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """登録されているPDFの件数"""
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        """URLが登録されているかどうか"""
+        with self._lock:
+            return url in self._entries
+
+    def add(self, entry: CatalogEntry) -> None:
+        """
+        PDFを登録
+
+        Args:
+            entry: カタログの行
+
+        """
+        with self._lock:
+            self._entries.setdefault(entry.url, entry)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        DataFrameに変換
+
+        Returns:
+            pd.DataFrame: URL順に並べたカタログ
+
+        """
+        with self._lock:
+            rows = [asdict(entry) for entry in self._entries.values()]
+        # 欠損値を含む数値の列が浮動小数点数にならないよう、文字列に変換してから列を作る
+        rows = [{key: None if value is None else str(value) for key, value in row.items()} for row in rows]
+        frame = pd.DataFrame(rows, columns=list(CATALOG_COLUMNS), dtype="string")
+        return frame.sort_values(KEY_COLUMN, ignore_index=True)
+
+    def save(self, path: str | Path) -> Path:
+        """
+        カタログをファイルに書き出す
+
+        拡張子が .parquet の場合はParquet(pyarrow または fastparquet が必要)、
+        それ以外はCSV(.gz などの拡張子に応じて圧縮)で書き出します。
+
+        Args:
+            path: 出力先のパス
+
+        Returns:
+            Path: 出力先のパス
+
+        """
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        write_catalog(self.to_frame(), output)
+        logger.info("カタログを書き出しました: %d件 (%s)", len(self), output)
+        return output
+
+
+def write_catalog(frame: pd.DataFrame, path: str | Path) -> None:
+    """
+    カタログをファイルに書き出す
+
+    Args:
+        frame: カタログ
+        path: 出力先のパス(拡張子で形式を判断)
+
+    """
+    output = Path(path)
+    if output.suffix == PARQUET_SUFFIX:
+        frame.to_parquet(output, index=False)
+    else:
+        frame.to_csv(output, index=False)
+
+
+def load_catalog(path: str | Path) -> pd.DataFrame:
+    """
+    カタログを読み込む
+
+    Args:
+        path: カタログのパス(拡張子で形式を判断)
+
+    Returns:
+        pd.DataFrame: カタログ(全ての列を文字列として読み込む。内容の列がない以前のカタログは空欄とする)
+
+    """
+    source = Path(path)
+    if source.suffix == PARQUET_SUFFIX:
+        frame = pd.read_parquet(source)
+    else:
+        frame = pd.read_csv(source, dtype="string", keep_default_na=False)
+    return frame.reindex(columns=list(CATALOG_COLUMNS), fill_value="").astype("string")
+
+
+def diff_catalogs(previous: pd.DataFrame, current: pd.DataFrame) -> CatalogDiff:
+    """
+    2つのカタログの差分を求める
+
+    URLをキーとした1回の外部結合(ハッシュ結合)で、追加・削除・属性か内容が変わったPDFを求めます。
+    内容の列(サイズ、ETag、Last-Modified、ハッシュ値)は両方のカタログに値がある場合のみ比較します。
+
+    Args:
+        previous: 前回のカタログ
+        current: 今回のカタログ
+
+    Returns:
+        CatalogDiff: 差分
+
+    """
+    merged = previous.merge(
+        current,
+        on=KEY_COLUMN,
+        how="outer",
+        suffixes=("_previous", ""),
+        indicator=True,
+    )
+
+    added = merged.loc[merged["_merge"] == "right_only", list(CATALOG_COLUMNS)]
+
+    removed = merged.loc[merged["_merge"] == "left_only", [KEY_COLUMN, *(f"{c}_previous" for c in VALUE_COLUMNS)]]
+    removed = removed.rename(columns={f"{c}_previous": c for c in VALUE_COLUMNS})
+
+    both = merged[merged["_merge"] == "both"]
+    changed_mask = pd.Series(data=False, index=both.index)
+    for column in VALUE_COLUMNS:
+        current_values = both[column].fillna("")
+        previous_values = both[f"{column}_previous"].fillna("")
+        differs = current_values != previous_values
+        if column in CONTENT_COLUMNS:
+            differs &= (current_values != "") & (previous_values != "")
+        changed_mask |= differs
+    changed = both.loc[changed_mask, [*CATALOG_COLUMNS, *(f"{c}_previous" for c in VALUE_COLUMNS)]]
+
+    return CatalogDiff(
+        added=added.reset_index(drop=True),
+        removed=removed.reset_index(drop=True),
+        changed=changed.reset_index(drop=True),
+    )
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析する
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        argparse.Namespace: 解析された引数
+
+    """
+    parser = argparse.ArgumentParser(
+        description="政治資金収支報告書のカタログを比較します。",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="前回のカタログとの差分を求める")
+    diff_parser.add_argument("previous", help="前回のカタログ(.csv, .csv.gz, .parquet)")
+    diff_parser.add_argument("current", help="今回のカタログ(.csv, .csv.gz, .parquet)")
+    diff_parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="added / removed / changed のカタログを書き出すディレクトリ",
+    )
+    diff_parser.add_argument(
+        "--format",
+        choices=["csv.gz", "parquet"],
+        default="csv.gz",
+        help="--output-dir に書き出す形式",
+    )
+    diff_parser.add_argument("--json", action="store_true", help="件数をJSONで出力")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    args = parse_arguments(argv)
+
+    diff = diff_catalogs(load_catalog(args.previous), load_catalog(args.current))
+
+    if args.output_dir:
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for name, frame in (("added", diff.added), ("removed", diff.removed), ("changed", diff.changed)):
+            write_catalog(frame, output_dir / f"{name}.{args.format}")
+
+    summary = diff.summary()
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"追加: {summary['added']}件, 削除: {summary['removed']}件, 変更: {summary['changed']}件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+コンテンツアドレス型ストアモジュール
+
+PDFの内容をSHA-256ハッシュ値をキーとして一度だけ保存し、
+人が読めるファイル名はハードリンクとマニフェストで対応付けるクラスを提供します。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = ".blobs"
+MANIFEST_FILE = "manifest.jsonl"
+
+
+def sha256_file(path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    ファイルのSHA-256ハッシュ値を計算
+
+    Args:
+        path: ファイルパス
+        chunk_size: 読み込み単位(バイト)
+
+    Returns:
+        str: SHA-256ハッシュ値(16進数)
+
+    """
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """コンテンツアドレス型ストア"""
+
+    def __init__(self, root: str | Path) -> None:
+        """
+        初期化
+
+        Args:
+            root: ストアのルートディレクトリ
+
+        """
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_FILE
+        self._lock = threading.Lock()
+        self._by_filename: dict[str, str] = {}
+        self._by_url: dict[str, str] = {}
+        # 取得元URLごとの検証子(ETag と Last-Modified、条件付きリクエストで内容が変わっていないことの確認に使用)
+        self._validators: dict[str, dict[str, str]] = {}
+        self._load_manifest()
+
+    def _load_manifest(self) -> None:
+        """マニフェストを読み込む(同じファイル名は後の行が優先)"""
+        if not self.manifest_path.exists():
+            return
+        with self.manifest_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("マニフェストの不正な行を無視します: %s", line.strip())
+                    continue
+                self._by_filename[entry["filename"]] = entry["sha256"]
+                if entry.get("url"):
+                    self._by_url[entry["url"]] = entry["sha256"]
+                    self._validators[entry["url"]] = _validator_entry(entry.get("etag"), entry.get("last_modified"))
+
+    def blob_path(self, digest: str) -> Path:
+        """
+        ハッシュ値に対応する実体ファイルのパスを取得
+
+        Args:
+            digest: SHA-256ハッシュ値
+
+        Returns:
+            Path: 実体ファイルのパス
+
+        """
+        return self.root / digest[:2] / f"{digest}.pdf"
+
+    def contains(self, digest: str) -> bool:
+        """
+        ハッシュ値に対応する実体ファイルが存在するかどうかを確認
+
+        Args:
+            digest: SHA-256ハッシュ値
+
+        Returns:
+            bool: 存在する場合はTrue
+
+        """
+        return self.blob_path(digest).exists()
+
+    def digest_for_filename(self, filename: str) -> str | None:
+        """
+        ファイル名に対応するハッシュ値を取得
+
+        Args:
+            filename: 人が読めるファイル名
+
+        Returns:
+            str | None: ハッシュ値、記録がない場合はNone
+
+        """
+        return self._by_filename.get(filename)
+
+    def digest_for_url(self, url: str) -> str | None:
+        """
+        取得元URLに対応するハッシュ値を取得(実体が存在する場合のみ)
+
+        Args:
+            url: 取得元URL
+
+        Returns:
+            str | None: ハッシュ値、記録がないか実体が存在しない場合はNone
+
+        """
+        digest = self._by_url.get(url)
+        return digest if digest and self.contains(digest) else None
+
+    def conditional_headers_for_url(self, url: str) -> dict[str, str]:
+        """
+        取得元URLの内容が変わっていないことを確認する条件付きリクエストのヘッダを取得
+
+        Args:
+            url: 取得元URL
+
+        Returns:
+            dict[str, str]: If-None-Match / If-Modified-Since ヘッダ(検証子の記録がない場合は空)
+
+        """
+        validators = self._validators.get(url, {})
+        headers: dict[str, str] = {}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def adopt(
+        self,
+        file_path: str | Path,
+        digest: str,
+        *,
+        filename: str,
+        url: str | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> bool:
+        """
+        ダウンロードしたファイルをストアに取り込み、元のパスを実体へのリンクに置き換える
+
+        Args:
+            file_path: ダウンロードしたファイルのパス
+            digest: ファイルのSHA-256ハッシュ値
+            filename: マニフェストに記録するファイル名
+            url: 取得元URL
+            etag: 取得時の ETag ヘッダ
+            last_modified: 取得時の Last-Modified ヘッダ
+
+        Returns:
+            bool: 同じ内容の実体が既に存在した(重複していた)場合はTrue
+
+        """
+        path = Path(file_path)
+        blob = self.blob_path(digest)
+        with self._lock:
+            duplicate = blob.exists()
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            if duplicate:
+                path.unlink()
+            else:
+                os.replace(path, blob)
+            self._link(blob, path)
+            self._append_manifest(filename, digest, url, _validator_entry(etag, last_modified))
+        return duplicate
+
+    def link(self, digest: str, file_path: str | Path, *, filename: str, url: str | None = None) -> None:
+        """
+        既存の実体を指定したパスにリンクする(取得元URLの検証子は引き継ぐ)
+
+        Args:
+            digest: SHA-256ハッシュ値
+            file_path: リンクを作成するパス
+            filename: マニフェストに記録するファイル名
+            url: 取得元URL
+
+        """
+        path = Path(file_path)
+        with self._lock:
+            if path.exists():
+                path.unlink()
+            self._link(self.blob_path(digest), path)
+            self._append_manifest(filename, digest, url, self._validators.get(url, {}) if url else {})
+
+    def _link(self, blob: Path, path: Path) -> None:
+        """
+        実体ファイルへのハードリンクを作成(作成できない場合はコピー)
+
+        Args:
+            blob: 実体ファイルのパス
+            path: リンクを作成するパス
+
+        """
+        try:
+            os.link(blob, path)
+        except OSError:
+            logger.warning("ハードリンクを作成できないためコピーします: %s", path)
+            shutil.copy2(blob, path)
+
+    def _append_manifest(
+        self,
+        filename: str,
+        digest: str,
+        url: str | None,
+        validators: dict[str, str] | None = None,
+    ) -> None:
+        """
+        マニフェストに1行追記
+
+        Args:
+            filename: ファイル名
+            digest: SHA-256ハッシュ値
+            url: 取得元URL
+            validators: 取得元URLの検証子(etag / last_modified)
+
+        """
+        entry = {"filename": filename, "sha256": digest, "url": url, **(validators or {})}
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.manifest_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._by_filename[filename] = digest
+        if url:
+            self._by_url[url] = digest
+            self._validators[url] = dict(validators or {})
+
+
+def _validator_entry(etag: str | None, last_modified: str | None) -> dict[str, str]:
+    """
+    マニフェストに記録する検証子を作成
+
+    Args:
+        etag: ETag ヘッダ
+        last_modified: Last-Modified ヘッダ
+
+    Returns:
+        dict[str, str]: 値のある検証子のみを含む辞書
+
+    """
+    validators = {"etag": etag, "last_modified": last_modified}
+    return {key: value for key, value in validators.items() if value}
@@ -0,0 +1,334 @@
+"""
+コーパス索引モジュール
+
+ダウンロードしたPDFのメタデータ(団体名、団体種別、公表年、URL、サイズ、ハッシュ値)を
+SQLiteの索引に蓄積し、ディレクトリを走査せずに検索できるようにするクラスとCLIを提供します。
+
+使用方法:
+    python -m downloader.corpus_index search -n 民主党 -c 政党支部 -y R5
+    python -m downloader.corpus_index import downloaded_pdfs/metadata.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .config import DEFAULT_OUTPUT_DIR
+from .layout import FLAT_LAYOUT, OutputLayout
+from .metadata import FileMetadata
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_FILENAME = "corpus_index.sqlite3"
+
+# 索引に登録する(ファイルが手元に存在する)ダウンロード状態
+INDEXED_STATUSES: frozenset[str] = frozenset({"success", "skipped"})
+
+
+@dataclass
+class IndexedDocument:
+    """索引に登録された文書"""
+
+    url: str
+    root: str
+    filename: str
+    organization: str
+    category: str
+    year: str
+    file_size: int
+    sha256: str | None
+    download_date: str | None
+    indexed_at: float
+
+    @property
+    def path(self) -> Path:
+        """ファイルのパス"""
+        return Path(self.root) / self.filename
+
+    def to_dict(self) -> dict[str, Any]:
+        """辞書に変換"""
+        return {**asdict(self), "path": str(self.path)}
+
+
+class CorpusIndex:
+    """SQLiteによるコーパス索引"""
+
+    _COLUMNS = "url, root, filename, organization, category, year, file_size, sha256, download_date, indexed_at"
+
+    def __init__(self, db_path: str | Path) -> None:
+        """
+        初期化
+
+        Args:
+            db_path: 索引データベースのパス
+
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    url TEXT PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    organization TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    sha256 TEXT,
+                    download_date TEXT,
+                    indexed_at REAL NOT NULL
+                )
+                """,
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_year_category ON documents (year, category)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_category ON documents (category)")
+            # 団体名は部分一致で検索するため索引を使えない(以前の版が作成した索引は削除する)
+            self._conn.execute("DROP INDEX IF EXISTS idx_documents_organization")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents (sha256)")
+
+    def merge(self, files: Iterable[FileMetadata], root: str | Path, *, layout: OutputLayout | None = None) -> int:
+        """
+        ファイルメタデータを索引に統合(同じURLは新しい内容で更新)
+
+        filename 列には出力ディレクトリからの相対パス(直下に保存した場合はファイル名)を記録します。
+
+        Args:
+            files: ファイルメタデータ
+            root: ファイル名の基準となる出力ディレクトリ
+            layout: 出力ディレクトリの配置(Noneの場合は直下)
+
+        Returns:
+            int: 登録・更新した件数
+
+        """
+        now = time.time()
+        layout = layout or OutputLayout()
+        rows = [
+            (
+                f.original_url,
+                str(root),
+                layout.relative_path(f.filename, year=f.year, category=f.category).as_posix(),
+                f.organization,
+                f.category,
+                f.year,
+                f.file_size,
+                f.sha256,
+                f.download_date,
+                now,
+            )
+            for f in files
+            if f.download_status in INDEXED_STATUSES
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"""
+                INSERT INTO documents ({self._COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    root = excluded.root,
+                    filename = excluded.filename,
+                    organization = excluded.organization,
+                    category = excluded.category,
+                    year = excluded.year,
+                    file_size = excluded.file_size,
+                    sha256 = COALESCE(excluded.sha256, documents.sha256),
+                    download_date = COALESCE(excluded.download_date, documents.download_date),
+                    indexed_at = excluded.indexed_at
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def search(
+        self,
+        *,
+        organization: str | None = None,
+        category: str | None = None,
+        year: str | None = None,
+        limit: int | None = None,
+    ) -> list[IndexedDocument]:
+        """
+        条件に一致する文書を検索
+
+        団体種別と公表年は索引で絞り込み、団体名は絞り込んだ行を走査して部分一致を調べます。
+
+        Args:
+            organization: 団体名(部分一致)
+            category: 団体種別(完全一致)
+            year: 公表年(完全一致)
+            limit: 最大件数
+
+        Returns:
+            list[IndexedDocument]: 一致した文書のリスト
+
+        """
+        conditions: list[str] = []
+        params: list[Any] = []
+        if organization:
+            conditions.append("instr(organization, ?) > 0")
+            params.append(organization)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if year:
+            conditions.append("year = ?")
+            params.append(year)
+
+        query = f"SELECT {self._COLUMNS} FROM documents"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY year, category, organization"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [IndexedDocument(*row) for row in rows]
+
+    def find_by_sha256(self, sha256: str) -> list[IndexedDocument]:
+        """
+        ハッシュ値が一致する文書を検索
+
+        Args:
+            sha256: SHA-256ハッシュ値
+
+        Returns:
+            list[IndexedDocument]: 一致した文書のリスト
+
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM documents WHERE sha256 = ?",
+                (sha256,),
+            ).fetchall()
+        return [IndexedDocument(*row) for row in rows]
+
+    def count(self) -> int:
+        """
+        登録されている文書数を取得
+
+        Returns:
+            int: 文書数
+
+        """
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+        return count
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+
+def import_metadata_file(index: CorpusIndex, metadata_path: str | Path) -> int:
+    """
+    metadata.json の内容を索引に統合
+
+    Args:
+        index: コーパス索引
+        metadata_path: metadata.json のパス
+
+    Returns:
+        int: 登録・更新した件数
+
+    """
+    path = Path(metadata_path)
+    with path.open(encoding="utf-8") as f:
+        document = json.load(f)
+    files = [FileMetadata.from_dict(entry) for entry in document.get("files", [])]
+    layout = OutputLayout(document.get("parameters", {}).get("layout", FLAT_LAYOUT))
+    return index.merge(files, path.parent, layout=layout)
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析する
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        argparse.Namespace: 解析された引数
+
+    """
+    parser = argparse.ArgumentParser(
+        description="ダウンロード済みの政治資金収支報告書の索引を検索します。",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--db",
+        default=str(Path(DEFAULT_OUTPUT_DIR) / DEFAULT_INDEX_FILENAME),
+        help="索引データベースのパス",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = subparsers.add_parser("search", help="文書を検索")
+    search_parser.add_argument("-n", "--name", help="団体名(部分一致)")
+    search_parser.add_argument("-c", "--category", help="団体種別")
+    search_parser.add_argument("-y", "--year", help="公表年(例: R5)")
+    search_parser.add_argument("--limit", type=int, help="最大件数")
+    search_parser.add_argument("--json", action="store_true", help="JSON Lines形式で出力")
+
+    import_parser = subparsers.add_parser("import", help="metadata.json を索引に統合")
+    import_parser.add_argument("metadata", nargs="+", help="metadata.json のパス")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    args = parse_arguments(argv)
+    index = CorpusIndex(args.db)
+    try:
+        if args.command == "import":
+            for metadata_path in args.metadata:
+                merged = import_metadata_file(index, metadata_path)
+                print(f"{metadata_path}: {merged}件を統合しました")
+            print(f"索引の文書数: {index.count()}")
+            return 0
+
+        documents = index.search(
+            organization=args.name,
+            category=args.category,
+            year=args.year,
+            limit=args.limit,
+        )
+        for document in documents:
+            if args.json:
+                print(json.dumps(document.to_dict(), ensure_ascii=False))
+            else:
+                print(f"{document.year}\t{document.category}\t{document.organization}\t{document.path}")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
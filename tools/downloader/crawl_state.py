@@ -0,0 +1,213 @@
+"""
+クロール状態管理モジュール
+
+報告書一覧ページやPDFのURLごとに、最終取得日時・内容のハッシュ値・処理結果を
+SQLiteデータベースに永続化し、差分のみを処理する増分実行を可能にするクラスを提供します。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 報告書一覧ページの処理結果
+PAGE_COMPLETE = "complete"
+PAGE_INCOMPLETE = "incomplete"
+
+# 処理済みとみなすPDFの処理結果
+DONE_PDF_OUTCOMES: frozenset[str] = frozenset({"success", "skipped"})
+
+
+def content_hash(text: str) -> str:
+    """
+    ページ内容のハッシュ値を計算
+
+    Args:
+        text: ページ内容
+
+    Returns:
+        str: SHA-256ハッシュ値(16進数)
+
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CrawlRecord:
+    """URLごとのクロール状態"""
+
+    url: str
+    kind: str
+    last_fetched: float
+    outcome: str
+    content_hash: str | None = None
+    selection: str | None = None
+
+
+class CrawlStateStore:
+    """SQLiteによるクロール状態ストア"""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            db_path: データベースファイルのパス
+            clock: 現在時刻を返す関数(テスト時にモック可能)
+
+        """
+        self.db_path = Path(db_path)
+        self.clock = clock
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # 並行クロール時は複数スレッドから利用されるため、ロックで直列化する
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawl_state (
+                    url TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    last_fetched REAL NOT NULL,
+                    outcome TEXT NOT NULL,
+                    content_hash TEXT,
+                    selection TEXT
+                )
+                """,
+            )
+
+    def get(self, url: str) -> CrawlRecord | None:
+        """
+        URLのクロール状態を取得
+
+        Args:
+            url: URL
+
+        Returns:
+            CrawlRecord | None: クロール状態、記録がない場合はNone
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, kind, last_fetched, outcome, content_hash, selection FROM crawl_state WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return CrawlRecord(*row) if row else None
+
+    def record(
+        self,
+        url: str,
+        *,
+        kind: str,
+        outcome: str,
+        content_hash: str | None = None,
+        selection: str | None = None,
+    ) -> None:
+        """
+        URLのクロール状態を記録
+
+        Args:
+            url: URL
+            kind: 種別(report_list, pdfなど)
+            outcome: 処理結果
+            content_hash: 内容のハッシュ値
+            selection: 対象を絞り込んだ条件の識別子
+
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO crawl_state (url, kind, last_fetched, outcome, content_hash, selection)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    kind = excluded.kind,
+                    last_fetched = excluded.last_fetched,
+                    outcome = excluded.outcome,
+                    content_hash = COALESCE(excluded.content_hash, crawl_state.content_hash),
+                    selection = excluded.selection
+                """,
+                (url, kind, self.clock(), outcome, content_hash, selection),
+            )
+
+    def is_unchanged(self, url: str, content_hash: str, selection: str) -> bool:
+        """
+        報告書一覧ページが前回完了時から変更されていないかどうかを判断
+
+        Args:
+            url: 報告書一覧ページのURL
+            content_hash: 今回取得したページ内容のハッシュ値
+            selection: 今回の絞り込み条件の識別子
+
+        Returns:
+            bool: 内容と条件が前回と同じで、前回の処理が完了している場合はTrue
+
+        """
+        record = self.get(url)
+        return (
+            record is not None
+            and record.outcome == PAGE_COMPLETE
+            and record.content_hash == content_hash
+            and record.selection == selection
+        )
+
+    def is_done(self, url: str) -> bool:
+        """
+        PDFが処理済みかどうかを判断
+
+        Args:
+            url: PDFのURL
+
+        Returns:
+            bool: 処理済みの場合はTrue
+
+        """
+        record = self.get(url)
+        return record is not None and record.outcome in DONE_PDF_OUTCOMES
+
+    def count_failed(self, urls: Iterable[str]) -> int:
+        """
+        処理に失敗したURLの件数を取得
+
+        Args:
+            urls: 対象のURL
+
+        Returns:
+            int: 失敗したURLの件数
+
+        """
+        url_list = list(urls)
+        if not url_list:
+            return 0
+        with self._lock:
+            total = 0
+            # SQLiteの変数上限を超えないよう分割して問い合わせる
+            chunk_size = 500
+            for i in range(0, len(url_list), chunk_size):
+                chunk = url_list[i : i + chunk_size]
+                placeholders = ",".join("?" * len(chunk))
+                (count,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM crawl_state WHERE outcome = 'failed' AND url IN ({placeholders})",
+                    chunk,
+                ).fetchone()
+                total += count
+        return total
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -4,14 +4,28 @@
 総務省のウェブサイトから政治資金収支報告書のPDFファイルを自動的にダウンロードするクラスを提供します。
 """
 
+import json
 import logging
+import sys
 import time
 from argparse import Namespace
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
 
-import requests
-
+from .async_crawler import AsyncCrawlEngine
+from .catalog import Catalog, CatalogEntry
 from .config import FULL_USER_AGENT, MIN_DELAY
-from .metadata import MetadataManager
+from .content_store import DEFAULT_STORE_DIR, ContentStore
+from .corpus_index import CorpusIndex
+from .crawl_state import PAGE_COMPLETE, PAGE_INCOMPLETE, CrawlStateStore, content_hash
+from .http_cache import HttpCache
+from .layout import OutputLayout, read_layout
+from .metadata import METADATA_FILENAME, FileMetadata, MetadataManager, load_recorded_files
+from .metrics import MetricsRecorder, prometheus_path_for
+from .multi_source import MultiSourceCrawler
+from .name_matcher import load_names
 from .page_parser import (
     NameFilter,
     PageParser,
@@ -20,11 +34,32 @@ from .page_parser import (
     YearPageLink,
 )
 from .pdf_downloader import PDFDownloader
-from .robotparser import RobotsChecker
+from .pipeline import PipelineCrawler
+from .priority import DownloadBudget, DownloadQueue, PriorityRule
+from .progress import PDF_OUTCOMES, ProgressReporter, open_progress_stream
+from .render_pool import RenderPool
+from .robotparser import DEFAULT_ROBOTS_CACHE_DIR, RobotsChecker
+from .scheduler import PolitenessScheduler
+from .sources import SourcePageParser, load_sources
+from .transport import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, create_session
+from .work_queue import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_LEASED,
+    JOB_PENDING,
+    WORKER_POLL_INTERVAL,
+    LeaseHeartbeat,
+    WorkQueue,
+    default_worker_id,
+    worker_metadata_filename,
+)
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+# PDFのダウンロードが成功するたびに呼び出す関数
+CompletionHook = Callable[[FileMetadata], None]
+
 
 class SeijishikinDownloader:
     """政治資金収支報告書ダウンロードを管理するクラス"""
@@ -41,28 +76,113 @@ class SeijishikinDownloader:
         self.output_dir: str = args.output_dir
         self.years: list[str] = args.year.split(",") if args.year else []
         self.categories: list[str] = args.category.split(",") if args.category else []
-        self.name_filter: NameFilter | None = NameFilter(args.name, args.exact_match) if args.name else None
+        names = tuple(load_names(args.name_file)) if args.name_file else ()
+        self.name_filter: NameFilter | None = (
+            NameFilter(args.name, args.exact_match, names=names) if args.name or names else None
+        )
         self.delay: int = max(args.delay, MIN_DELAY)  # 最小待機時間を保証
         self.force: bool = args.force
         self.dry_run: bool = args.dry_run
         self.metadata_only: bool = args.metadata_only
+        self.catalog_path: str | None = args.catalog
+        self.catalog: Catalog | None = Catalog() if args.catalog else None
+        # カタログにHEADで取得したサイズと検証子を記録するかどうか(PDFごとにリクエストを送る)
+        self.catalog_validators: bool = args.catalog_validators
+        self.concurrency: int = max(args.concurrency, 1)
+        self.stream_links: bool = args.stream_links
+        self.pipeline: bool = args.pipeline
+        self.queue_size: int = args.queue_size
+        self.corpus_index_path: str | None = args.corpus_index
+        self.crawl_state: CrawlStateStore | None = CrawlStateStore(args.state_db) if args.state_db else None
+        self.content_store: ContentStore | None = (
+            ContentStore(Path(self.output_dir) / DEFAULT_STORE_DIR) if args.content_store else None
+        )
+        # 優先度の規則が指定された場合は、全てのPDFリンクを集めてから優先度順にダウンロードする
+        self.download_queue: DownloadQueue | None = (
+            DownloadQueue([PriorityRule.parse(rule) for rule in args.priority]) if args.priority else None
+        )
+        self.budget = DownloadBudget(max_bytes=args.max_bytes, max_files=args.max_files, max_time=args.max_time)
+        # 予算を使い切ったためにダウンロードしなかったPDFのURL
+        self.budget_skipped: set[str] = set()
+        # 分散ダウンロードキュー(ワーカーとして実行しない場合は、見つけたPDFをキューに登録するのみ)
+        self.work_queue: WorkQueue | None = (
+            WorkQueue(args.work_queue, lease_seconds=args.lease) if args.work_queue else None
+        )
+        self.worker_id: str = args.worker_id or default_worker_id()
+        self.is_worker: bool = args.worker
+        # 未完了のジョブを他のワーカーが処理している間、キューを再確認する間隔(秒)
+        self.worker_poll_interval: float = WORKER_POLL_INTERVAL
+        if self.is_worker and self.work_queue is None:
+            msg = "--worker には --work-queue の指定が必要です"
+            raise ValueError(msg)
+        self.http_cache: HttpCache | None = (
+            HttpCache(args.http_cache, max_age=args.cache_max_age) if args.http_cache else None
+        )
+        sources = load_sources(args.sources) if args.sources else []
+        # 出力ディレクトリの配置(既存の出力ディレクトリと異なる配置では既存のファイルを見つけられない)
+        self.layout = OutputLayout(args.layout)
+        recorded_layout = read_layout(self.output_dir)
+        if recorded_layout is not None and recorded_layout != self.layout.scheme:
+            msg = (
+                f"出力ディレクトリの配置({recorded_layout})が --layout {self.layout.scheme} と異なります。"
+                f"python -m downloader.layout migrate {self.output_dir} "
+                f"--layout {self.layout.scheme} で移行してください"
+            )
+            raise ValueError(msg)
+        # リクエストごとの計測結果(JSON Lines)と、終了時の集計値(Prometheus形式)の出力先
+        self.metrics_path: str | None = args.metrics
+        self.metrics: MetricsRecorder | None = MetricsRecorder(args.metrics) if args.metrics else None
+        # 実行全体の進捗(標準エラー出力への1行表示と、指定した場合はJSON Linesでの出力)
+        stream, close_stream = open_progress_stream(args.progress_jsonl) if args.progress_jsonl else (None, False)
+        self.progress = ProgressReporter(
+            display=None if args.no_progress else sys.stderr,
+            stream=stream,
+            close_stream=close_stream,
+        )
 
-        # セッションの初期化
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": FULL_USER_AGENT})
-
-        # robots.txtチェッカーの初期化
-        self.robots_checker = RobotsChecker(FULL_USER_AGENT)
+        # セッションの初期化(全てのホストと同時実行数分の接続をキープアライブで再利用する)
+        self.session = create_session(
+            pool_connections=max(DEFAULT_POOL_CONNECTIONS, len(sources) + 1),
+            pool_maxsize=max(DEFAULT_POOL_MAXSIZE, self.concurrency + 1),
+            user_agent=FULL_USER_AGENT,
+        )
 
-        # 各コンポーネントの初期化
-        self.page_parser = PageParser(
+        # robots.txtチェッカーの初期化(共有セッションで取得し、ディスクにキャッシュする)
+        self.robots_checker = RobotsChecker(
+            FULL_USER_AGENT,
             session=self.session,
-            name_filter=self.name_filter,
-            years=self.years,
-            delay=self.delay,
-            robots_checker=self.robots_checker,
+            cache_dir=args.robots_cache or Path(self.output_dir) / DEFAULT_ROBOTS_CACHE_DIR,
+            metrics=self.metrics,
         )
 
+        # 待機はすべてスケジューラが一元的に行う(間隔は --delay、robots.txt のクロール遅延、
+        # 応答時間に応じた間隔の最大値。429/503応答時は Retry-After に従ってバックオフする)
+        self.scheduler = PolitenessScheduler(
+            self.delay,
+            crawl_delay=self.robots_checker.get_crawl_delay,
+            global_interval=1 / args.max_rate if args.max_rate else 0.0,
+            on_wait=self.metrics.record_sleep if self.metrics else None,
+        )
+
+        # 各コンポーネントの初期化
+        parser_options: dict[str, Any] = {
+            # カタログは全件の一覧とするため団体名では絞り込まない
+            "name_filter": self.name_filter if self.catalog is None else None,
+            "years": self.years,
+            "delay": self.delay,
+            "robots_checker": self.robots_checker,
+            "pacer": self.scheduler,
+            "http_cache": self.http_cache,
+            "parser_backend": args.html_parser,
+            "metrics": self.metrics,
+        }
+        self.page_parser = PageParser(session=self.session, base_url=args.base_url, **parser_options)
+
+        # 総務省以外の公開元(公開元の名前からパーサーを引けるようにする)
+        self.source_parsers: dict[str, SourcePageParser] = {
+            source.name: SourcePageParser(source, self.session, **parser_options) for source in sources
+        }
+
         self.pdf_downloader = PDFDownloader(
             session=self.session,
             output_dir=self.output_dir,
@@ -71,6 +191,12 @@ class SeijishikinDownloader:
             metadata_only=self.metadata_only,
             delay=self.delay,
             robots_checker=self.robots_checker,
+            pacer=self.scheduler,
+            content_store=self.content_store,
+            metrics=self.metrics,
+            progress=self.progress,
+            probe=not args.no_probe,
+            layout=self.layout,
         )
 
         self.metadata_manager = MetadataManager(
@@ -79,11 +205,34 @@ class SeijishikinDownloader:
             categories=self.categories,
             name_filter=self.name_filter.name if self.name_filter else None,
             exact_match=self.name_filter.exact_match if self.name_filter else False,
+            name_file=args.name_file,
+            # カタログモードではメタデータを記録しないためジャーナルも使用しない
+            journal=args.journal and self.catalog is None,
+            layout=self.layout.scheme,
+            # ワーカーは出力ディレクトリを共有しても上書きし合わないよう、ワーカーごとのファイルに記録する
+            filename=worker_metadata_filename(self.worker_id) if self.is_worker else METADATA_FILENAME,
+        )
+        # 前回の metadata.json の記録(クロール状態ストアでスキップしたPDFの記録を引き継ぐ)
+        self.recorded_files: dict[str, FileMetadata] = load_recorded_files(self.metadata_manager.metadata_path)
+        # 既存のファイルは調べ直さず、前回の metadata.json と中断された実行のジャーナルに記録した構造を引き継ぐ
+        self.pdf_downloader.remember_files(self.recorded_files.values())
+        self.pdf_downloader.remember_files(self.metadata_manager.files)
+
+        # ダウンロードに成功したPDFのメタデータを受け取る関数
+        self.completion_hooks: list[CompletionHook] = []
+        # 指定された場合は、ダウンロードしたPDFから順に描画ワーカーで画像に変換する
+        self.render_pool: RenderPool | None = (
+            RenderPool(self.output_dir, args.render_images, workers=args.render_workers, layout=self.layout)
+            if args.render_images
+            else None
         )
+        if self.render_pool:
+            self.add_completion_hook(self.render_pool.submit)
 
         logger.debug(
             "設定: 出力先=%s, 年度=%s, カテゴリ=%s, 名前フィルタ=%s, "
-            "待機時間=%s秒, 強制上書き=%s, ドライラン=%s, メタデータのみ=%s",
+            "待機時間=%s秒, 強制上書き=%s, ドライラン=%s, メタデータのみ=%s, 同時実行数=%s, "
+            "ストリーミング=%s, パイプライン=%s",
             self.output_dir,
             self.years,
             self.categories,
@@ -92,8 +241,40 @@ class SeijishikinDownloader:
             self.force,
             self.dry_run,
             self.metadata_only,
+            self.concurrency,
+            self.stream_links,
+            self.pipeline,
         )
 
+    def add_completion_hook(self, hook: CompletionHook) -> None:
+        """
+        PDFのダウンロードが成功するたびに呼び出す関数を登録
+
+        フックはダウンロードを行ったスレッド(並行処理時はワーカースレッド)から呼び出されるため、
+        時間のかかる処理は別のスレッドやプロセスに渡してください。
+
+        Args:
+            hook: ダウンロードに成功したPDFのメタデータを受け取る関数
+
+        """
+        self.completion_hooks.append(hook)
+
+    def _notify_completed(self, metadata: FileMetadata) -> None:
+        """
+        ダウンロードに成功したPDFを登録済みのフックに通知
+
+        フックで発生した例外はログに記録し、ダウンロードは継続します。
+
+        Args:
+            metadata: ダウンロードに成功したPDFのメタデータ
+
+        """
+        for hook in self.completion_hooks:
+            try:
+                hook(metadata)
+            except Exception:
+                logger.exception("完了フックの実行中にエラーが発生しました: %s", metadata.filename)
+
     def download_all(self) -> bool:
         """
         指定された条件に基づいて全てのファイルをダウンロード
@@ -103,16 +284,275 @@ class SeijishikinDownloader:
 
         """
         logger.info("ダウンロード処理を開始します")
+        started = time.monotonic()
+        self.budget.start()
+        if self.work_queue is not None:
+            # 登録が終わるまで、キューが空になってもワーカーを終了させない
+            self.work_queue.set_sealed(sealed=False)
+            self.work_queue.set_parameters(self.metadata_manager.parameters)
+
+        if self.source_parsers:
+            # 公開元のホストごとに1つのキューを並行して処理
+            found = MultiSourceCrawler(self).run([self.page_parser, *self.source_parsers.values()])
+            if not found:
+                logger.error("ダウンロード対象の年度URLが見つかりませんでした")
+                return False
+        else:
+            # 年度ごとのURLを取得
+            links = self.page_parser.get_year_and_report_urls()
+            if not links:
+                logger.error("ダウンロード対象の年度URLが見つかりませんでした")
+                return False
+
+            logger.info("%d 件の年度URLを取得しました", len(links))
+            self.crawl_links(links)
+
+        if self.download_queue is not None:
+            self.drain_download_queue(self.download_queue)
+
+        # コーディネーターは登録の完了を記録し、ダウンロードと結果の記録をワーカーに任せる
+        if self.work_queue is not None and self._enqueues_only():
+            self.work_queue.set_sealed(sealed=True)
+            if self.crawl_state:
+                self.crawl_state.close()
+            counts = self.work_queue.counts()
+            logger.info(
+                "分散ダウンロードキューへの登録完了: 未着手=%d, リース中=%d, 完了=%d, 失敗=%d",
+                counts[JOB_PENDING],
+                counts[JOB_LEASED],
+                counts[JOB_DONE],
+                counts[JOB_FAILED],
+            )
+            return True
+
+        # メタデータを保存(カタログモードでは前回の metadata.json を残し、カタログのみを書き出す)
+        if self.catalog is not None and self.catalog_path:
+            self.catalog.save(self.catalog_path)
+        else:
+            self.metadata_manager.save()
+        if self.crawl_state:
+            self.crawl_state.close()
+        if self.corpus_index_path:
+            self.update_corpus_index(self.corpus_index_path)
+
+        # 統計情報を表示
+        stats = self.metadata_manager.get_statistics()
+        logger.info(
+            "ダウンロード完了: 合計=%d, ダウンロード=%d,スキップ=%d, 失敗=%d, 合計サイズ=%d バイト",
+            stats.total_files,
+            stats.downloaded_files,
+            stats.skipped_files,
+            stats.failed_files,
+            stats.total_size,
+        )
+        self.log_wait_summary(time.monotonic() - started)
 
-        # 年度ごとのURLを取得
-        links = self.page_parser.get_year_and_report_urls()
-        if not links:
-            logger.error("ダウンロード対象の年度URLが見つかりませんでした")
+        # 受信が切断され、取得し直しても全てのPDFリンクを得られなかったページがある場合は失敗とする
+        parsers = [self.page_parser, *self.source_parsers.values()]
+        incomplete = [url for parser in parsers for url in sorted(parser.incomplete_pages)]
+        if incomplete:
+            logger.error("PDFリンクを全て取得できなかった報告書一覧ページがあります: %s", ", ".join(incomplete))
             return False
+        return True
+
+    def run_worker(self) -> bool:
+        """
+        分散ダウンロードキューのワーカーとしてPDFをダウンロード
+
+        ジョブを1件ずつリースしてダウンロードし、結果のメタデータをキューに書き戻します。
+        リースは受信が進んでいる間のみハートビートのスレッドで延長します
+        (止まったワーカーのジョブは他のワーカーに引き継がれる)。
+        メタデータはワーカーごとのファイルに保存し、全体の metadata.json は merge で作成します。
+        コーディネーターの登録が終わり、未完了のジョブがなくなった時点で終了します
+        (他のワーカーのリースが期限切れになった場合は引き継ぎます)。
+
+        Returns:
+            bool: 予算を使い切らずに全てのジョブを処理した場合はTrue
+
+        """
+        queue = self.work_queue
+        if queue is None:
+            msg = "分散ダウンロードキューが指定されていません"
+            raise ValueError(msg)
+        parameters = queue.parameters()
+        if parameters is not None and parameters.layout != self.layout.scheme:
+            msg = f"コーディネーターの配置({parameters.layout})と --layout {self.layout.scheme} が異なります"
+            raise ValueError(msg)
+        logger.info("ワーカー %s としてダウンロードを開始します", self.worker_id)
+        started = time.monotonic()
+        self.budget.start()
+        processed = 0
+        exhausted = False
+
+        # 受信したバイト数か処理したPDFの件数が増えている間のみリースを延長する
+        progress = self.progress
+        with LeaseHeartbeat(queue, self.worker_id, progress=lambda: (progress.bytes, progress.pdfs_finished)):
+            while True:
+                jobs = queue.claim(self.worker_id)
+                if not jobs:
+                    if queue.sealed and queue.unfinished() == 0:
+                        break
+                    time.sleep(self.worker_poll_interval)
+                    continue
+
+                [job] = jobs
+                self.progress.pdf_queued()
+                metadata = self.fetch_pdf(job.pdf_link, job.year, expected_size=job.expected_size)
+                if metadata is None and job.url in self.budget_skipped:
+                    # 予算を使い切ったワーカーは終了し、残りのジョブを他のワーカーに任せる
+                    queue.release(job.url, self.worker_id)
+                    exhausted = True
+                    break
+                if metadata is None:
+                    # 前回までに処理済みのPDFは、保存済みのファイルの情報を記録する
+                    metadata = self.pdf_downloader.prepare_download(job.pdf_link, job.year).metadata
+                    metadata.download_status = "skipped"
+                queue.complete(job.url, self.worker_id, metadata)
+                processed += 1
+
+        self.metadata_manager.save()
+        if self.crawl_state:
+            self.crawl_state.close()
+        if self.corpus_index_path:
+            self.update_corpus_index(self.corpus_index_path)
+
+        stats = self.metadata_manager.get_statistics()
+        logger.info(
+            "ワーカー %s の処理完了: ジョブ=%d, ダウンロード=%d, スキップ=%d, 失敗=%d, 合計サイズ=%d バイト",
+            self.worker_id,
+            processed,
+            stats.downloaded_files,
+            stats.skipped_files,
+            stats.failed_files,
+            stats.total_size,
+        )
+        self.log_wait_summary(time.monotonic() - started)
+        return not exhausted
+
+    def crawl_links(self, links: list[YearPageLink | ReportListPageLink]) -> None:
+        """
+        年度ページと報告書一覧ページを処理
+
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
+
+        """
+        self.progress.pages_found(sum(isinstance(link, ReportListPageLink) for link in links))
+        if self.pipeline:
+            # リンク探索とダウンロードを重ねて実行
+            PipelineCrawler(self, self.concurrency, self.queue_size).run(links)
+        elif self.concurrency > 1:
+            # 並行処理
+            AsyncCrawlEngine(self, self.concurrency).run(links)
+        else:
+            self._process_links_sequentially(links)
+
+    def drain_download_queue(self, queue: DownloadQueue) -> None:
+        """
+        集めたPDFリンクを優先度順にダウンロード
+
+        Args:
+            queue: ダウンロードキュー
+
+        """
+        if queue.needs_size:
+            logger.info("%d 件のPDFのサイズを取得しています", len(queue))
+            for job in queue.jobs:
+                job.expected_size = self.pdf_downloader.head_content_length(job.pdf_link.url)
+
+        queue.start_draining()
+        logger.info("%d 件のPDFを優先度順にダウンロードします", len(queue))
+        while (job := queue.pop()) is not None:
+            self.process_pdf_link(job.pdf_link, job.year, expected_size=job.expected_size)
+
+        # 全てのPDFを処理した後で報告書一覧ページの処理結果を記録する
+        for link, pdf_links in queue.pages:
+            self.complete_report_list_page(link, pdf_links)
+
+    def parse_year_page(self, year_link: YearPageLink) -> list[ReportListPageLink]:
+        """
+        年度ページを解析し、報告書一覧ページのリンクを取得
+
+        Args:
+            year_link: 年度ページのリンク
+
+        Returns:
+            list[ReportListPageLink]: 報告書一覧ページのリンクのリスト
+
+        """
+        links = self.page_parser.parse_year_page(year_link)
+        self.progress.pages_found(len(links))
+        return links
+
+    def parser_for(self, link: ReportListPageLink) -> PageParser:
+        """
+        報告書一覧ページの公開元に対応するパーサーを取得
+
+        Args:
+            link: 報告書一覧ページのリンク
+
+        Returns:
+            PageParser: パーサー
+
+        """
+        if link.source:
+            return self.source_parsers[link.source]
+        return self.page_parser
+
+    def log_wait_summary(self, elapsed: float) -> None:
+        """
+        リクエスト間隔の調整のために待機した時間を表示
+
+        Args:
+            elapsed: 実行時間(秒)
+
+        """
+        ratio = self.scheduler.total_wait / elapsed * 100 if elapsed > 0 else 0.0
+        logger.info(
+            "待機時間: 合計=%.1f秒 (実行時間の%.0f%%), 待機回数=%d, バックオフ=%d回",
+            self.scheduler.total_wait,
+            ratio,
+            self.scheduler.wait_count,
+            self.scheduler.backoff_count,
+        )
+
+    def export_metrics(self) -> None:
+        """計測ファイルを閉じ、集計値をPrometheus形式のスナップショットとして書き出す"""
+        if not self.metrics or not self.metrics_path:
+            return
+        self.metrics.close()
+        self.metrics.write_prometheus(prometheus_path_for(self.metrics_path))
+
+    def update_corpus_index(self, db_path: str) -> int:
+        """
+        今回の実行で得たメタデータをコーパス索引に統合
+
+        Args:
+            db_path: 索引データベースのパス
+
+        Returns:
+            int: 登録・更新した件数
+
+        """
+        index = CorpusIndex(db_path)
+        try:
+            merged = index.merge(self.metadata_manager.files, self.output_dir, layout=self.layout)
+            logger.info("コーパス索引を更新しました: %d件 (合計 %d件)", merged, index.count())
+        finally:
+            index.close()
+        return merged
+
+    def _process_links_sequentially(
+        self,
+        links: list[YearPageLink | ReportListPageLink],
+    ) -> None:
+        """
+        年度ページと報告書一覧ページを逐次処理
 
-        logger.info("%d 件の年度URLを取得しました", len(links))
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
 
-        # 各年度のページを処理
+        """
         for link in links:
             if isinstance(link, ReportListPageLink):
                 logger.info(
@@ -132,26 +572,6 @@ class SeijishikinDownloader:
                 error_message = f"想定外のリンクタイプ: {type(link)}"
                 raise TypeError(error_message)
 
-            # 年度ページ処理後にインターバルを設ける
-            if not self.dry_run:
-                time.sleep(self.delay)
-
-        # メタデータを保存
-        self.metadata_manager.save()
-
-        # 統計情報を表示
-        stats = self.metadata_manager.get_statistics()
-        logger.info(
-            "ダウンロード完了: 合計=%d, ダウンロード=%d,スキップ=%d, 失敗=%d, 合計サイズ=%d バイト",
-            stats.total_files,
-            stats.downloaded_files,
-            stats.skipped_files,
-            stats.failed_files,
-            stats.total_size,
-        )
-
-        return True
-
     def process_year_page(self, year_link: YearPageLink) -> None:
         """
         年度ページを処理.
@@ -162,7 +582,7 @@ class SeijishikinDownloader:
 
         """
         # 年度ページを解析
-        links = self.page_parser.parse_year_page(year_link)
+        links = self.parse_year_page(year_link)
 
         # 各リンクを処理
         for link in links:
@@ -180,40 +600,255 @@ class SeijishikinDownloader:
             year: 公表年
 
         """
-        # 報告書一覧ページを解析してリンクを取得
-        pdf_links = self.page_parser.parse_report_list_page(report_list_link)
+        # 報告書一覧ページを解析してリンクを取得(ストリーミング時は受信しながら順次取得)
+        if self.stream_links:
+            link_source: Iterable[PdfLink] = self.iter_report_list_page(report_list_link)
+        else:
+            link_source = self.parse_report_list_page(report_list_link)
 
         # 各リンクを処理
-        for pdf_link in pdf_links:
-            if isinstance(pdf_link, PdfLink) and self.process_pdf_link(
-                pdf_link,
-                report_list_link.year,
-            ):
-                # インターバルを設ける
-                if not self.dry_run:
-                    time.sleep(self.delay)
-            elif not isinstance(pdf_link, PdfLink):
+        pdf_links: list[PdfLink] = []
+        for pdf_link in link_source:
+            pdf_links.append(pdf_link)
+            if not isinstance(pdf_link, PdfLink):
                 msg = f"想定外のリンク: {pdf_link.url}"
                 raise ValueError(msg)
+            # リクエスト間隔はスケジューラがリクエストの直前に保証する
+            self.process_pdf_link(pdf_link, report_list_link.year)
+
+        self.complete_report_list_page(report_list_link, pdf_links)
+
+    def _selection_key(self) -> str:
+        """
+        PDFの絞り込み条件を表す識別子を取得
+
+        Returns:
+            str: 絞り込み条件の識別子
+
+        """
+        selection: dict[str, object] = {
+            "categories": sorted(self.categories),
+            "name": self.name_filter.name if self.name_filter else None,
+            "exact_match": self.name_filter.exact_match if self.name_filter else False,
+        }
+        # 団体名の一覧は件数が多いため、内容のハッシュ値で識別する
+        if self.name_filter and self.name_filter.names:
+            selection["names"] = content_hash("\n".join(sorted(self.name_filter.names)))
+        return json.dumps(selection, ensure_ascii=False, sort_keys=True)
+
+    def _records_state(self) -> bool:
+        """
+        クロール状態を記録するかどうかを判断
+
+        Returns:
+            bool: 実際にダウンロードを行う実行の場合はTrue
+
+        """
+        return (
+            self.crawl_state is not None
+            and not self.dry_run
+            and not self.metadata_only
+            and self.catalog is None
+            and not self._enqueues_only()
+        )
+
+    def _enqueues_only(self) -> bool:
+        """
+        見つけたPDFを分散ダウンロードキューに登録するのみの実行(コーディネーター)かどうかを判断
+
+        Returns:
+            bool: コーディネーターの場合はTrue
+
+        """
+        return self.work_queue is not None and not self.is_worker
+
+    def parse_report_list_page(
+        self,
+        report_list_link: ReportListPageLink,
+    ) -> list[PdfLink]:
+        """
+        報告書一覧ページを解析し、処理が必要なPDFリンクを取得
+
+        クロール状態ストアが有効な場合、前回完了時から内容も絞り込み条件も
+        変わっていない報告書一覧ページは丸ごとスキップします。
+
+        Args:
+            report_list_link: 報告書一覧ページのリンク
+
+        Returns:
+            list[PdfLink]: PDFリンクのリスト
+
+        """
+        parser = self.parser_for(report_list_link)
+        if self.budget.exhausted():
+            self.progress.page_done()
+            return []
+        pdf_links = parser.parse_report_list_page(report_list_link)
+        self.progress.page_done()
+
+        digest = parser.content_hashes.get(report_list_link.url)
+        # カタログモードでは全てのPDFを一覧に含めるため、変更のないページもスキップしない
+        if (
+            self.crawl_state
+            and not self.force
+            and self.catalog is None
+            and digest
+            and self.crawl_state.is_unchanged(report_list_link.url, digest, self._selection_key())
+        ):
+            logger.info("報告書一覧ページは前回から変更されていないためスキップします: %s", report_list_link.url)
+            # 今回のメタデータにも前回までの記録を残す(metadata.json は今回の記録で上書きされる)
+            if not self._enqueues_only():
+                for pdf_link in pdf_links:
+                    self._carry_forward(pdf_link, report_list_link.year)
+            return []
+
+        return pdf_links
+
+    def iter_report_list_page(
+        self,
+        report_list_link: ReportListPageLink,
+    ) -> Iterator[PdfLink]:
+        """
+        報告書一覧ページを受信しながら解析し、PDFリンクを見つけた順に返す
+
+        ページ全体の内容は受信し終えるまで分からないため、変更のない報告書一覧ページを
+        丸ごとスキップする判定は行いません(処理済みのPDFは個別にスキップされます)。
+
+        Args:
+            report_list_link: 報告書一覧ページのリンク
+
+        Yields:
+            PdfLink: PDFリンク
+
+        """
+        if not self.budget.exhausted():
+            yield from self.parser_for(report_list_link).iter_report_list_pdf_links(report_list_link)
+        self.progress.page_done()
+
+    def complete_report_list_page(
+        self,
+        report_list_link: ReportListPageLink,
+        pdf_links: list[PdfLink],
+    ) -> None:
+        """
+        報告書一覧ページの処理結果をクロール状態ストアに記録
+
+        Args:
+            report_list_link: 報告書一覧ページのリンク
+            pdf_links: 処理したPDFリンクのリスト
 
-    def process_pdf_link(self, pdf_link: PdfLink, year: str) -> bool:
+        """
+        # 優先度順にダウンロードする場合は、ページ内のPDFを処理し終えるまで記録を保留する
+        if self.download_queue is not None and not self.download_queue.draining:
+            self.download_queue.defer_page(report_list_link, pdf_links)
+            return
+
+        if not self.crawl_state or not self._records_state():
+            return
+
+        digest = self.parser_for(report_list_link).content_hashes.get(report_list_link.url)
+        if not digest:
+            return
+
+        failed = self.crawl_state.count_failed(link.url for link in pdf_links)
+        # 予算を使い切ったためにダウンロードしなかったPDFがあるページは次回も処理する
+        skipped = any(link.url in self.budget_skipped for link in pdf_links)
+        self.crawl_state.record(
+            report_list_link.url,
+            kind="report_list",
+            outcome=PAGE_INCOMPLETE if failed or skipped else PAGE_COMPLETE,
+            content_hash=digest,
+            selection=self._selection_key(),
+        )
+
+    def process_pdf_link(self, pdf_link: PdfLink, year: str, *, expected_size: int | None = None) -> bool:
         """
         PDFリンクを処理
 
         Args:
             pdf_link: PDFファイルのURL
             year: 公表年
+            expected_size: 想定サイズ(バイト、予算の判定に使用)
+
+        Returns:
+            bool: ダウンロードを行った場合はTrue
 
         """
+        # カタログモードではPDFを取得せずに一覧に登録する(全件の一覧とするため団体種別では絞り込まない)
+        if self.catalog is not None:
+            self.add_to_catalog(pdf_link, year)
+            return False
+
         # カテゴリフィルタリング
         category_name = pdf_link.category_name()
         if self.categories and category_name not in self.categories:
             logger.debug("カテゴリをスキップ: %s", pdf_link.category_name())
             return False
 
+        # コーディネーターはPDFを取得せずに分散ダウンロードキューに登録する
+        if self.work_queue is not None and self._enqueues_only():
+            if self.work_queue.enqueue(pdf_link, year, expected_size=expected_size):
+                self.progress.pdf_queued()
+            return False
+
+        # 優先度順にダウンロードする場合は、全てのPDFリンクを集め終えるまでキューに入れる
+        # (キューから取り出したPDFは、キューに入れた時点で処理対象として数えている)
+        queued = self.download_queue is not None and not self.download_queue.draining
+        if self.download_queue is None or queued:
+            self.progress.pdf_queued()
+        if self.download_queue is not None and queued:
+            self.download_queue.push(pdf_link, year)
+            return False
+
+        metadata = self.fetch_pdf(pdf_link, year, expected_size=expected_size)
+        return metadata is not None and metadata.download_status != "skipped"
+
+    def add_to_catalog(self, pdf_link: PdfLink, year: str) -> None:
+        """
+        PDFをカタログに登録
+
+        コンテンツストアに記録がある場合は内容のハッシュ値を記録します。--catalog-validators が指定された場合は、
+        同じURLのPDFが置き換えられたことを差分で検出できるよう、HEADリクエストで取得したサイズと検証子も記録します。
+
+        Args:
+            pdf_link: PDFリンク
+            year: 公表年
+
+        """
+        if self.catalog is None or pdf_link.url in self.catalog:
+            return
+        remote = self.pdf_downloader.head_pdf(pdf_link.url) if self.catalog_validators else None
+        sha256 = self.content_store.digest_for_url(pdf_link.url) if self.content_store else None
+        self.catalog.add(CatalogEntry.from_pdf_link(pdf_link, year, remote=remote, sha256=sha256))
+
+    def fetch_pdf(self, pdf_link: PdfLink, year: str, *, expected_size: int | None = None) -> FileMetadata | None:
+        """
+        PDFを取得してメタデータに記録
+
+        Args:
+            pdf_link: PDFファイルのURL
+            year: 公表年
+            expected_size: 想定サイズ(バイト、予算の判定に使用)
+
+        Returns:
+            FileMetadata | None: 記録したメタデータ(既存のファイルや処理済みのPDFの場合は download_status が skipped)。
+                予算の範囲外のため記録しなかった場合はNone
+
+        """
         # ダウンロードの準備
         result = self.pdf_downloader.prepare_download(pdf_link, year)
 
+        # 前回までに処理済みのPDFはファイルが残っていれば対象外とする
+        if (
+            self.crawl_state
+            and not self.force
+            and self.crawl_state.is_done(pdf_link.url)
+            and Path(result.save_path).exists()
+        ):
+            logger.debug("処理済みのPDFをスキップ: %s", pdf_link.url)
+            self.progress.pdf_finished("skipped")
+            return self._carry_forward(pdf_link, year)
+
         # 既存ファイルのチェック
         existing_metadata = self.pdf_downloader.check_existing_file(
             result.save_path,
@@ -221,7 +856,16 @@ class SeijishikinDownloader:
         )
         if existing_metadata:
             self.metadata_manager.add_file(existing_metadata)
-            return False
+            self._record_pdf_state(existing_metadata)
+            self.progress.pdf_finished("skipped")
+            return existing_metadata
+
+        # 予算を使い切った場合はダウンロードしない
+        if not self.budget.allows(expected_size):
+            logger.debug("予算の範囲外のためスキップ: %s", pdf_link.url)
+            self.budget_skipped.add(pdf_link.url)
+            self.progress.pdf_finished("skipped")
+            return None
 
         # PDFをダウンロード
         updated_metadata = self.pdf_downloader.download_pdf(
@@ -229,8 +873,58 @@ class SeijishikinDownloader:
             result.save_path,
             result.metadata,
         )
+        if updated_metadata.download_status == "success":
+            self.budget.charge(updated_metadata.file_size)
 
         # メタデータを追加
         self.metadata_manager.add_file(updated_metadata)
+        self._record_pdf_state(updated_metadata)
+        if updated_metadata.download_status == "success":
+            self._notify_completed(updated_metadata)
+        # ドライランなど、ダウンロードしなかった場合はスキップとして数える
+        status = updated_metadata.download_status
+        self.progress.pdf_finished(status if status in PDF_OUTCOMES else "skipped")
 
-        return True
+        return updated_metadata
+
+    def _carry_forward(self, pdf_link: PdfLink, year: str) -> FileMetadata | None:
+        """
+        クロール状態ストアでスキップしたPDFを、前回の記録(ない場合は保存済みのファイルの情報)でメタデータに記録
+
+        metadata.json は実行ごとに書き直すため、記録しないと前回までの記録が失われます。
+
+        Args:
+            pdf_link: PDFリンク
+            year: 公表年
+
+        Returns:
+            FileMetadata | None: 記録したメタデータ(保存済みのファイルがない場合はNone)
+
+        """
+        result = self.pdf_downloader.prepare_download(pdf_link, year)
+        if not Path(result.save_path).exists():
+            return None
+        previous = self.recorded_files.get(result.metadata.filename)
+        if previous is not None and previous.original_url == pdf_link.url:
+            metadata = replace(previous, download_status="skipped")
+        else:
+            metadata = self.pdf_downloader.check_existing_file(result.save_path, result.metadata)
+            if metadata is None:
+                return None
+        self.metadata_manager.add_file(metadata)
+        return metadata
+
+    def _record_pdf_state(self, metadata: FileMetadata) -> None:
+        """
+        PDFの処理結果をクロール状態ストアに記録
+
+        Args:
+            metadata: ファイルメタデータ
+
+        """
+        if self.crawl_state and self._records_state():
+            self.crawl_state.record(
+                metadata.original_url,
+                kind="pdf",
+                outcome=metadata.download_status,
+            )
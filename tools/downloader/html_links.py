@@ -0,0 +1,136 @@
+"""
+リンク抽出モジュール
+
+HTMLのツリーを構築せずに、1回の走査で <a> 要素の href とテキストを抽出するクラスを提供します。
+HTMLを分割して与えることもでき、受信途中の本文から確定したリンクを順次取り出せます。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, cast
+
+# 型チェック用のインポート
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
+
+
+@dataclass
+class Anchor:
+    """<a> 要素"""
+
+    href: str | None
+    text: str
+
+
+class LinkExtractor(HTMLParser):
+    """<a> 要素を1回の走査で抽出するパーサー"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        super().__init__(convert_charrefs=True)
+        self.anchors: list[Anchor] = []
+        self._href: str | None = None
+        self._text: list[str] | None = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """開始タグの処理"""
+        if tag != "a":
+            return
+        # 閉じられていない <a> は次の <a> の開始で閉じる
+        self._close_anchor()
+        self._href = next((value for name, value in attrs if name == "href"), None)
+        self._text = []
+
+    def handle_endtag(self, tag: str) -> None:
+        """終了タグの処理"""
+        if tag == "a":
+            self._close_anchor()
+
+    def handle_data(self, data: str) -> None:
+        """テキストの処理"""
+        if self._text is not None:
+            self._text.append(data)
+
+    def close(self) -> None:
+        """入力の終了"""
+        super().close()
+        self._close_anchor()
+
+    def pop_anchors(self) -> list[Anchor]:
+        """
+        これまでに確定した <a> 要素を取り出す
+
+        Returns:
+            list[Anchor]: 前回取り出してから確定した <a> 要素のリスト
+
+        """
+        anchors = self.anchors
+        self.anchors = []
+        return anchors
+
+    def _close_anchor(self) -> None:
+        """処理中の <a> 要素を確定"""
+        if self._text is None:
+            return
+        self.anchors.append(Anchor(href=self._href, text="".join(self._text)))
+        self._href = None
+        self._text = None
+
+
+def extract_anchors(html: str) -> list[Anchor]:
+    """
+    HTMLから <a> 要素を抽出
+
+    Args:
+        html: HTML文字列
+
+    Returns:
+        list[Anchor]: <a> 要素のリスト(文書内の出現順)
+
+    """
+    extractor = LinkExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.anchors
+
+
+def iter_anchors(chunks: Iterable[str]) -> Iterator[Anchor]:
+    """
+    分割されたHTMLから <a> 要素を確定した順に抽出
+
+    Args:
+        chunks: デコード済みのHTML断片
+
+    Yields:
+        Anchor: <a> 要素(文書内の出現順)
+
+    """
+    extractor = LinkExtractor()
+    for chunk in chunks:
+        extractor.feed(chunk)
+        yield from extractor.pop_anchors()
+    extractor.close()
+    yield from extractor.pop_anchors()
+
+
+def anchors_from_soup(soup: BeautifulSoup) -> list[Anchor]:
+    """
+    BeautifulSoupオブジェクトから <a> 要素を抽出
+
+    Args:
+        soup: BeautifulSoupオブジェクト
+
+    Returns:
+        list[Anchor]: <a> 要素のリスト(文書内の出現順)
+
+    """
+    anchors: list[Anchor] = []
+    for link in soup.find_all("a"):
+        # Tagにキャスト
+        link_tag = cast("Tag", link)
+        href = link_tag.get("href")
+        anchors.append(Anchor(href=str(href) if href else None, text=link_tag.get_text()))
+    return anchors
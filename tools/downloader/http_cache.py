@@ -0,0 +1,210 @@
+"""
+HTTPキャッシュモジュール
+
+取得したHTMLをETag/Last-Modifiedと共にディスクへ保存し、
+条件付きリクエスト(If-None-Match/If-Modified-Since)による再検証を可能にするクラスを提供します。
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """キャッシュエントリ"""
+
+    url: str
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """辞書に変換"""
+        return asdict(self)
+
+    def conditional_headers(self) -> dict[str, str]:
+        """
+        再検証用の条件付きリクエストヘッダを生成
+
+        Returns:
+            dict[str, str]: リクエストヘッダ
+
+        """
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """ディスク上のHTTPキャッシュ"""
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        *,
+        max_age: float = 0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            cache_dir: キャッシュディレクトリ
+            max_age: 再検証せずにキャッシュを使用する期間(秒)。0の場合は常に再検証する
+            clock: 現在時刻を返す関数(テスト時にモック可能)
+
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age
+        self.clock = clock
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        """
+        URLに対応するメタ情報ファイルと本文ファイルのパスを取得
+
+        Args:
+            url: URL
+
+        Returns:
+            tuple[Path, Path]: (メタ情報ファイル, 本文ファイル)
+
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = self.cache_dir / key[:2]
+        return directory / f"{key}.json", directory / f"{key}.html.gz"
+
+    def get(self, url: str) -> CacheEntry | None:
+        """
+        キャッシュエントリを取得
+
+        Args:
+            url: URL
+
+        Returns:
+            CacheEntry | None: キャッシュエントリ、存在しない場合はNone
+
+        """
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            with meta_path.open(encoding="utf-8") as f:
+                return CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            logger.warning("キャッシュのメタ情報を読み込めませんでした: %s", url)
+            return None
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        再検証せずにキャッシュを使用できるかどうかを判断
+
+        Args:
+            entry: キャッシュエントリ
+
+        Returns:
+            bool: 使用できる場合はTrue
+
+        """
+        return self.max_age > 0 and self.clock() - entry.fetched_at < self.max_age
+
+    def load_text(self, url: str) -> str | None:
+        """
+        キャッシュされた本文を取得
+
+        Args:
+            url: URL
+
+        Returns:
+            str | None: デコード済みの本文、読み込めない場合はNone
+
+        """
+        _, body_path = self._paths(url)
+        try:
+            with gzip.open(body_path, "rt", encoding="utf-8") as f:
+                return f.read()
+        except (OSError, EOFError, UnicodeDecodeError):
+            logger.warning("キャッシュの本文を読み込めませんでした: %s", url)
+            return None
+
+    def store(
+        self,
+        url: str,
+        text: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """
+        本文と検証用ヘッダを保存
+
+        本文はデコード済みの文字列をUTF-8でgzip圧縮して保存するため、
+        再検証で304が返った場合は文字コードの変換も不要になります。
+
+        Args:
+            url: URL
+            text: デコード済みの本文
+            etag: ETagヘッダ
+            last_modified: Last-Modifiedヘッダ
+
+        """
+        meta_path, body_path = self._paths(url)
+        entry = CacheEntry(
+            url=url,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=self.clock(),
+        )
+        try:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_body = body_path.with_suffix(".tmp")
+            with gzip.open(tmp_body, "wt", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_body, body_path)
+            self._write_entry(meta_path, entry)
+        except OSError:
+            logger.exception("キャッシュの保存に失敗しました: %s", url)
+
+    def touch(self, entry: CacheEntry) -> None:
+        """
+        再検証済みとして取得時刻を更新
+
+        Args:
+            entry: キャッシュエントリ
+
+        """
+        meta_path, _ = self._paths(entry.url)
+        entry.fetched_at = self.clock()
+        try:
+            self._write_entry(meta_path, entry)
+        except OSError:
+            logger.exception("キャッシュの更新に失敗しました: %s", entry.url)
+
+    def _write_entry(self, meta_path: Path, entry: CacheEntry) -> None:
+        """
+        メタ情報ファイルを書き込み
+
+        Args:
+            meta_path: メタ情報ファイルのパス
+            entry: キャッシュエントリ
+
+        """
+        tmp_meta = meta_path.with_suffix(".tmp")
+        with tmp_meta.open("w", encoding="utf-8") as f:
+            json.dump(entry.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
@@ -0,0 +1,307 @@
+"""
+出力ディレクトリの配置モジュール
+
+ダウンロードしたPDFを出力ディレクトリのどこに保存するか(配置)を決めるクラスと、
+既存の出力ディレクトリを別の配置に移行するCLIを提供します。ファイル数が多い場合は
+公表年・団体種別やファイル名のハッシュ値でサブディレクトリに分け、1つのディレクトリの
+エントリ数を抑えます。配置は metadata.json の parameters.layout に記録されます。
+
+配置:
+    flat                出力ディレクトリの直下(既定)
+    year-category       公表年/団体種別/ファイル名
+    year-category-hash  公表年/団体種別/ハッシュ値の先頭2文字/ファイル名
+    hash                ハッシュ値の先頭2文字/続く2文字/ファイル名
+
+使用方法:
+    python -m downloader.layout migrate downloaded_pdfs --layout year-category-hash [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import DEFAULT_OUTPUT_DIR
+from .metadata import JOURNAL_FILENAME, METADATA_FILENAME, FileMetadata, Parameters
+from .page_parser import Category
+from .pdf_downloader import PART_SUFFIX
+from .utils import sanitize_filename
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+FLAT_LAYOUT = "flat"
+YEAR_CATEGORY_LAYOUT = "year-category"
+YEAR_CATEGORY_HASH_LAYOUT = "year-category-hash"
+HASH_LAYOUT = "hash"
+LAYOUTS: tuple[str, ...] = (FLAT_LAYOUT, YEAR_CATEGORY_LAYOUT, YEAR_CATEGORY_HASH_LAYOUT, HASH_LAYOUT)
+
+# ハッシュ値で分ける場合の1階層あたりの文字数(16進数2文字で256分割)
+HASH_PREFIX_LENGTH = 2
+
+# PDFのファイル名(prepare_download が生成する「[公開元_]公表年_団体種別_[URLのハッシュ値_]団体名.pdf」)
+FILENAME_PATTERN = re.compile(
+    r"^(?:.+?_)??(?P<year>[A-Z]\d+)_(?P<category>"
+    + "|".join(re.escape(category.value) for category in Category)
+    + r")_.+\.pdf$",
+)
+
+
+@dataclass(frozen=True)
+class OutputLayout:
+    """出力ディレクトリの配置"""
+
+    scheme: str = FLAT_LAYOUT
+
+    def __post_init__(self) -> None:
+        """
+        配置の名前を検証
+
+        Raises:
+            ValueError: 未知の配置の場合
+
+        """
+        if self.scheme not in LAYOUTS:
+            msg = f"未知の配置です: {self.scheme}(指定可能: {', '.join(LAYOUTS)})"
+            raise ValueError(msg)
+
+    def relative_path(self, filename: str, *, year: str, category: str) -> Path:
+        """
+        出力ディレクトリからの相対パスを取得
+
+        Args:
+            filename: ファイル名
+            year: 公表年
+            category: 団体種別
+
+        Returns:
+            Path: 出力ディレクトリからの相対パス
+
+        """
+        if self.scheme == FLAT_LAYOUT:
+            return Path(filename)
+        digest = hashlib.sha256(filename.encode("utf-8")).hexdigest()
+        if self.scheme == HASH_LAYOUT:
+            return Path(digest[:HASH_PREFIX_LENGTH], digest[HASH_PREFIX_LENGTH : HASH_PREFIX_LENGTH * 2], filename)
+        directory = Path(sanitize_filename(year), sanitize_filename(category))
+        if self.scheme == YEAR_CATEGORY_HASH_LAYOUT:
+            directory /= digest[:HASH_PREFIX_LENGTH]
+        return directory / filename
+
+    def path_for(self, output_dir: str | Path, metadata: FileMetadata) -> Path:
+        """
+        メタデータのPDFの保存先パスを取得
+
+        Args:
+            output_dir: 出力ディレクトリ
+            metadata: ファイルメタデータ
+
+        Returns:
+            Path: 保存先パス
+
+        """
+        return Path(output_dir) / self.relative_path(metadata.filename, year=metadata.year, category=metadata.category)
+
+
+def read_layout(output_dir: str | Path) -> str | None:
+    """
+    出力ディレクトリの metadata.json に記録された配置を取得
+
+    Args:
+        output_dir: 出力ディレクトリ
+
+    Returns:
+        str | None: 配置(metadata.json がない場合はNone、配置の記録がない場合は flat)
+
+    """
+    path = Path(output_dir) / METADATA_FILENAME
+    if not path.exists():
+        return None
+    try:
+        with path.open(encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        logger.warning("metadata.json を読み込めないため、配置を確認できません: %s", path)
+        return None
+    return document.get("parameters", {}).get("layout", FLAT_LAYOUT)
+
+
+@dataclass
+class MigrationResult:
+    """配置の移行結果"""
+
+    moved: int = 0
+    unchanged: int = 0
+    # 公表年と団体種別が分からないため移動しなかったファイル
+    unknown: int = 0
+
+
+def _iter_pdf_files(output_dir: Path) -> list[Path]:
+    """
+    出力ディレクトリ内のPDFとダウンロード途中のファイルを取得(隠しディレクトリは除く)
+
+    Args:
+        output_dir: 出力ディレクトリ
+
+    Returns:
+        list[Path]: ファイルのパス
+
+    """
+    files: list[Path] = []
+    for root, dirs, names in os.walk(output_dir):
+        # コンテンツストア(.blobs)やrobots.txtのキャッシュ(.robots)は対象外
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        files.extend(Path(root) / name for name in names if name.endswith((".pdf", f".pdf{PART_SUFFIX}")))
+    return files
+
+
+def migrate_layout(output_dir: str | Path, scheme: str, *, dry_run: bool = False) -> MigrationResult:
+    """
+    出力ディレクトリのPDFを指定した配置に移動
+
+    公表年と団体種別は metadata.json の記録から、記録がない場合はファイル名から求めます。
+    移動後は metadata.json に新しい配置を記録します。metadata.json がない場合も、配置のみを記録した
+    metadata.json を作成します(次回の実行が配置の違いを検出できるようにするため)。
+    同じ内容のPDFのハードリンクやクロール状態はファイル名やURLで管理しているため、そのまま使用できます。
+
+    Args:
+        output_dir: 出力ディレクトリ
+        scheme: 移行先の配置
+        dry_run: Trueの場合は移動せずに件数のみを数える
+
+    Returns:
+        MigrationResult: 移行結果
+
+    Raises:
+        ValueError: 中断された実行のジャーナルが残っている場合
+
+    """
+    root = Path(output_dir)
+    layout = OutputLayout(scheme)
+    if (root / JOURNAL_FILENAME).exists():
+        msg = f"中断された実行のジャーナルが残っています。実行を完了してから移行してください: {root / JOURNAL_FILENAME}"
+        raise ValueError(msg)
+
+    metadata_path = root / METADATA_FILENAME
+    document: dict | None = None
+    known: dict[str, FileMetadata] = {}
+    if metadata_path.exists():
+        with metadata_path.open(encoding="utf-8") as f:
+            document = json.load(f)
+        known = {entry["filename"]: FileMetadata.from_dict(entry) for entry in document.get("files", [])}
+
+    result = MigrationResult()
+    for path in _iter_pdf_files(root):
+        filename = path.name.removesuffix(PART_SUFFIX)
+        if filename in known:
+            year, category = known[filename].year, known[filename].category
+        elif match := FILENAME_PATTERN.match(filename):
+            year, category = match.group("year"), match.group("category")
+        else:
+            logger.warning("公表年と団体種別が分からないため移動しません: %s", path)
+            result.unknown += 1
+            continue
+
+        target = root / layout.relative_path(filename, year=year, category=category)
+        target = target.with_name(path.name)
+        if target == path:
+            result.unchanged += 1
+            continue
+        if not dry_run:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+            _remove_empty_parents(path.parent, root)
+        result.moved += 1
+
+    if not dry_run:
+        if document is None:
+            document = {
+                "download_date": None,
+                "parameters": Parameters(years=[], categories=[], layout=scheme).to_dict(),
+                "files": [],
+            }
+        document.setdefault("parameters", {})["layout"] = scheme
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_path = metadata_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, metadata_path)
+    return result
+
+
+def _remove_empty_parents(directory: Path, root: Path) -> None:
+    """
+    移動後に空になったディレクトリを出力ディレクトリまで遡って削除
+
+    Args:
+        directory: 移動したファイルがあったディレクトリ
+        root: 出力ディレクトリ
+
+    """
+    while directory != root and directory.is_relative_to(root):
+        try:
+            directory.rmdir()
+        except OSError:
+            # 空でないディレクトリは残す
+            return
+        directory = directory.parent
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析する
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        argparse.Namespace: 解析された引数
+
+    """
+    parser = argparse.ArgumentParser(
+        description="ダウンロード済みのPDFを別の配置の出力ディレクトリに移行します。",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="PDFを指定した配置に移動")
+    migrate_parser.add_argument("output_dir", nargs="?", default=DEFAULT_OUTPUT_DIR, help="出力ディレクトリ")
+    migrate_parser.add_argument("--layout", choices=LAYOUTS, required=True, help="移行先の配置")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="移動せずに件数のみを表示")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    args = parse_arguments(argv)
+    try:
+        result = migrate_layout(args.output_dir, args.layout, dry_run=args.dry_run)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    action = "移動対象" if args.dry_run else "移動"
+    print(f"{action}: {result.moved}件, 変更なし: {result.unchanged}件, 不明: {result.unknown}件")
+    if result.moved and not args.dry_run:
+        print("コーパス索引を使用している場合は metadata.json を再度取り込んでください")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
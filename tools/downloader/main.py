@@ -16,12 +16,45 @@
                               複数指定可能(カンマ区切り)
     -n, --name NAME           団体名(部分一致で検索)
     -e, --exact-match         団体名の完全一致で検索
+    --name-file FILE          団体名の一覧ファイル(1行1団体名)。一覧のいずれかに一致するPDFを選択
     -d, --delay SECONDS       リクエスト間の待機時間(秒、デフォルト: 5、最小: 3)
     -f, --force               既存ファイルを上書き
     -l, --log-level LEVEL     ログレベル(DEBUG, INFO, WARNING, ERROR、デフォルト: INFO)
     -v, --verbose             詳細な出力を表示(--log-level DEBUGと同等)
     --dry-run                 実際にダウンロードせずに何が行われるかを表示
     --metadata-only           PDFをダウンロードせずメタデータのみ収集
+    --concurrency N           同時に実行するリクエスト数(デフォルト: 1)
+    --http-cache DIR          HTMLページのHTTPキャッシュを保存するディレクトリ
+    --cache-max-age SECONDS   再検証せずにキャッシュを使用する期間(秒、デフォルト: 0)
+    --state-db PATH           増分実行用のクロール状態データベース(SQLite)
+    --content-store           同じ内容のPDFを一度だけ保存(ハッシュ値で重複排除)
+    --journal                 メタデータを1件ごとに metadata.jsonl へ追記(中断時に復元可能)
+    --corpus-index PATH       実行後にメタデータを統合するコーパス索引(SQLite)
+    --html-parser BACKEND     HTMLパーサー(html.parser, lxml, fast、デフォルト: html.parser)
+    --stream-links            報告書一覧ページを受信しながら解析し、見つけたPDFから順にダウンロード
+    --robots-cache DIR        robots.txtのキャッシュを保存するディレクトリ(デフォルト: 出力先/.robots)
+    --pipeline                リンク探索とPDFのダウンロードをキューでつないで並行実行
+    --queue-size N            --pipeline のダウンロードキューの上限(デフォルト: 100)
+    --max-rate R              ホストによらない全体のリクエスト数の上限(毎秒)
+    --catalog PATH            PDFを取得せず、見つかったPDFの一覧を書き出す(.csv.gz または .parquet)
+    --catalog-validators      カタログにHEADで取得したサイズと検証子を記録(PDFごとにリクエストを送る)
+    --sources FILE            総務省に加えてクロールする公開元の設定ファイル(JSON)
+    --priority RULE           PDFを集めてから規則の順にダウンロード(複数指定可、例: category=資金管理団体 year size=asc)
+    --max-bytes SIZE          ダウンロードするバイト数の上限(例: 5G)
+    --max-files N             ダウンロードするファイル数の上限
+    --max-time DURATION       実行時間の上限(例: 2h、90m)
+    --base-url URL            公表年ごとのページへのリンクを含むトップページのURL(ミラーやローカルの再生サーバー用)
+    --metrics PATH            リクエストごとの計測結果(JSON Lines)と集計値(PATH の拡張子を .prom にしたファイル)を出力
+    --progress-jsonl TARGET   実行全体の進捗をJSON Linesで出力(ファイルのパス、- は標準出力、fd:N はファイル記述子)
+    --no-progress             進捗を標準エラー出力に表示しない
+    --render-images DIR       ダウンロードしたPDFから順に、ページごとのPNG画像に変換してDIRに保存
+    --render-workers N        --render-images の描画ワーカープロセスの数(デフォルト: CPU数)
+    --no-probe                保存したPDFの構造(ページ数など)を調べない
+    --layout LAYOUT           出力ディレクトリの配置(flat, year-category, year-category-hash, hash、デフォルト: flat)
+    --work-queue PATH         複数のマシンで分担する分散ダウンロードキュー(SQLite)。見つけたPDFをキューに登録する
+    --worker                  --work-queue のジョブを取得してダウンロードするワーカーとして実行
+    --worker-id ID            ワーカーの識別子(デフォルト: ホスト名-プロセスID)
+    --lease SECONDS           ジョブのリースの期間(秒、デフォルト: 300)
 """
 
 import argparse
@@ -29,18 +62,26 @@ import logging
 import sys
 from argparse import Namespace
 
-from .config import DEFAULT_DELAY, DEFAULT_OUTPUT_DIR, MIN_DELAY
+from .config import BASE_URL, DEFAULT_DELAY, DEFAULT_OUTPUT_DIR, MIN_DELAY
 from .downloader import SeijishikinDownloader
+from .layout import FLAT_LAYOUT, LAYOUTS
+from .page_parser import PARSER_BACKENDS
+from .pipeline import DEFAULT_QUEUE_SIZE
+from .priority import parse_duration, parse_size
 from .utils import setup_logger
+from .work_queue import DEFAULT_LEASE_SECONDS
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
 
-def parse_arguments() -> Namespace:
+def parse_arguments(argv: list[str] | None = None) -> Namespace:
     """
     コマンドライン引数を解析する
 
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
     Returns:
         Namespace: 解析された引数
 
@@ -78,6 +119,13 @@ def parse_arguments() -> Namespace:
         help="団体名の完全一致で検索",
     )
 
+    parser.add_argument(
+        "--name-file",
+        metavar="FILE",
+        help="団体名の一覧ファイル(UTF-8、1行1団体名、#で始まる行は無視)。"
+        "一覧のいずれかに一致するPDFを1回のクロールで選択(-n と併用可、-e で完全一致)",
+    )
+
     parser.add_argument(
         "-d",
         "--delay",
@@ -120,7 +168,221 @@ def parse_arguments() -> Namespace:
         help="PDFをダウンロードせずメタデータのみ収集",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="同時に実行するリクエスト数(2以上で並行処理。ホストごとの待機時間は維持されます)",
+    )
+
+    parser.add_argument(
+        "--http-cache",
+        metavar="DIR",
+        help="HTMLページのHTTPキャッシュを保存するディレクトリ(ETag/Last-Modifiedで再検証)",
+    )
+
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=0,
+        help="再検証せずにキャッシュを使用する期間(秒、0の場合は常に再検証)",
+    )
+
+    parser.add_argument(
+        "--state-db",
+        metavar="PATH",
+        help="増分実行用のクロール状態データベース(SQLite)。変更のない報告書一覧と処理済みのPDFをスキップ",
+    )
+
+    parser.add_argument(
+        "--content-store",
+        action="store_true",
+        help="同じ内容のPDFを出力先の .blobs に一度だけ保存し、各ファイル名はハードリンクで参照",
+    )
+
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help="メタデータを1件ごとに metadata.jsonl へ追記し、中断された実行を次回の実行で復元",
+    )
+
+    parser.add_argument(
+        "--corpus-index",
+        metavar="PATH",
+        help="実行後にメタデータを統合するコーパス索引(SQLite)。python -m downloader.corpus_index で検索可能",
+    )
+
+    parser.add_argument(
+        "--html-parser",
+        choices=PARSER_BACKENDS,
+        default="html.parser",
+        help="HTMLパーサー(lxml は lxml パッケージが必要。fast はツリーを構築せずにリンクのみを1回の走査で抽出)",
+    )
+
+    parser.add_argument(
+        "--stream-links",
+        action="store_true",
+        help="報告書一覧ページを受信しながら解析し、ページの受信完了を待たずにPDFのダウンロードを開始",
+    )
+
+    parser.add_argument(
+        "--robots-cache",
+        metavar="DIR",
+        help="robots.txtのキャッシュを保存するディレクトリ(未指定時は出力先の .robots。有効期間内は再取得しない)",
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="リンク探索とPDFのダウンロードをキューでつなぎ、次の報告書一覧ページの探索とPDFの転送を重ねて実行"
+        "(ダウンロードのワーカー数は --concurrency)",
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="--pipeline のダウンロードキューの上限(探索が先行しすぎないようにする)",
+    )
+
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        help="ホストによらない全体のリクエスト数の上限(毎秒)。ホストごとの待機時間に加えて適用",
+    )
+
+    parser.add_argument(
+        "--catalog",
+        metavar="PATH",
+        help="カタログモード。PDFを取得せず、見つかったPDFの一覧(URL、団体名、団体種別、公表年、報告書一覧ページ)を"
+        "書き出す(拡張子 .csv.gz ならgzip圧縮CSV、.parquet ならParquet。団体種別と団体名の絞り込みは適用しない)",
+    )
+
+    parser.add_argument(
+        "--catalog-validators",
+        action="store_true",
+        help="--catalog で各PDFにHEADリクエストを送り、サイズ・ETag・Last-Modifiedを記録する"
+        "(同じURLで置き換えられたPDFを差分で検出できるが、PDFごとにリクエスト間隔の待機が加わる)",
+    )
+
+    parser.add_argument(
+        "--sources",
+        metavar="FILE",
+        help="総務省に加えてクロールする公開元(都道府県選挙管理委員会のサイトなど)の設定ファイル(JSON)。"
+        "公開元はホストごとに並行してクロールする",
+    )
+
+    parser.add_argument(
+        "--priority",
+        metavar="RULE",
+        action="append",
+        help="優先度の規則。指定した場合はPDFリンクを全て集めてから規則の順にダウンロードする。"
+        "複数指定した場合は指定順に比較(category=種別,... / year / year=R5,... / org=一覧ファイル / size=asc|desc)",
+    )
+
+    parser.add_argument(
+        "--max-bytes",
+        metavar="SIZE",
+        type=parse_size,
+        help="ダウンロードするバイト数の上限(例: 500M, 5G)。想定サイズが分かる場合は上限を超えるPDFをスキップ",
+    )
+
+    parser.add_argument(
+        "--max-files",
+        metavar="N",
+        type=int,
+        help="ダウンロードするファイル数の上限",
+    )
+
+    parser.add_argument(
+        "--max-time",
+        metavar="DURATION",
+        type=parse_duration,
+        help="実行時間の上限(例: 3600, 90m, 2h)。上限に達した後は新たなダウンロードを開始しない",
+    )
+
+    parser.add_argument(
+        "--base-url",
+        metavar="URL",
+        default=BASE_URL,
+        help="公表年ごとのページへのリンクを含むトップページのURL(ミラーやローカルの再生サーバーをクロールする場合に指定)",
+    )
+
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="リクエストごとの計測結果(JSON Lines)の出力先。終了時に集計値を拡張子 .prom のPrometheus形式で出力",
+    )
+
+    parser.add_argument(
+        "--progress-jsonl",
+        metavar="TARGET",
+        help="実行全体の進捗をJSON Lines形式で出力する先(ファイルのパス、- は標準出力、fd:3 はファイル記述子)",
+    )
+
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="実行全体の進捗を標準エラー出力に表示しない",
+    )
+
+    parser.add_argument(
+        "--render-images",
+        metavar="DIR",
+        help="ダウンロードしたPDFから順に、ページごとのPNG画像に変換してDIR(PDFごとのサブディレクトリ)に保存",
+    )
+
+    parser.add_argument(
+        "--render-workers",
+        metavar="N",
+        type=int,
+        help="--render-images の描画ワーカープロセスの数(未指定の場合はCPU数)",
+    )
+
+    parser.add_argument(
+        "--no-probe",
+        action="store_true",
+        help="保存したPDFの構造(ページ数、ページの大きさ、テキストレイヤーと暗号化の有無)を調べない",
+    )
+
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS,
+        default=FLAT_LAYOUT,
+        help="出力ディレクトリの配置(既存の出力ディレクトリの配置は python -m downloader.layout migrate で変更)",
+    )
+
+    parser.add_argument(
+        "--work-queue",
+        metavar="PATH",
+        help="複数のマシンで分担する分散ダウンロードキュー(SQLite、共有ボリューム上に置く)。"
+        "--worker を指定しない場合は、PDFをダウンロードせずにキューに登録する",
+    )
+
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="ページを巡回せず、--work-queue のジョブを取得してダウンロードするワーカーとして実行",
+    )
+
+    parser.add_argument(
+        "--worker-id",
+        metavar="ID",
+        help="ワーカーの識別子(未指定の場合はホスト名-プロセスID)",
+    )
+
+    parser.add_argument(
+        "--lease",
+        metavar="SECONDS",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help="ジョブのリースの期間(秒)。この期間ハートビートがないワーカーのジョブは他のワーカーが引き継ぐ",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.worker and not args.work_queue:
+        parser.error("--worker には --work-queue の指定が必要です")
 
     # verboseフラグが指定された場合はログレベルをDEBUGに設定
     if args.verbose:
@@ -157,8 +419,17 @@ def main() -> int:
     # ダウンローダーを初期化
     downloader = SeijishikinDownloader(args)
 
-    # ダウンロード実行
-    success = downloader.download_all()
+    # ダウンロード実行(中断された場合も最終的な進捗と計測結果を書き出す)
+    completed = False
+    try:
+        success = downloader.run_worker() if downloader.is_worker else downloader.download_all()
+        completed = True
+    finally:
+        downloader.progress.close()
+        downloader.export_metrics()
+        # ダウンロード中に予約したPDFの描画が終わるまで待つ(中断された場合は未着手の描画を取り消す)
+        if downloader.render_pool:
+            downloader.render_pool.close(cancel=not completed)
 
     # 終了コードを設定
     return 0 if success else 1
@@ -9,15 +9,26 @@ from __future__ import annotations
 import datetime
 import json
 import logging
-from dataclasses import asdict, dataclass
+import os
+import threading
+from dataclasses import asdict, dataclass, fields
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
 from .utils import create_directory
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+# メタデータのファイル名
+METADATA_FILENAME = "metadata.json"
+
+# 中断された実行のジャーナルを引き継ぐ条件(Parameters のフィールド)
+JOURNAL_RUN_KEYS: tuple[str, ...] = ("years", "categories", "name_filter", "exact_match", "name_file", "layout")
+
+# ジャーナルモードで使用する追記専用ファイル名
+JOURNAL_FILENAME = "metadata.jsonl"
+
 
 @dataclass
 class FileMetadata:
@@ -32,11 +43,23 @@ class FileMetadata:
     download_status: str = "pending"
     download_date: str | None = None
     error: str | None = None
+    sha256: str | None = None
+    # PDFの構造(描画せずに調べた結果。調べていない場合はNone)
+    page_count: int | None = None
+    page_sizes: list[list[float]] | None = None
+    has_text_layer: bool | None = None
+    encrypted: bool | None = None
 
     def to_dict(self) -> dict[str, Any]:
         """辞書に変換"""
         return asdict(self)
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> FileMetadata:
+        """辞書から生成(未知のキーは無視)"""
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
 
 @dataclass
 class Statistics:
@@ -47,6 +70,8 @@ class Statistics:
     skipped_files: int = 0
     failed_files: int = 0
     total_size: int = 0
+    # ページ数が分かったPDF(ダウンロード済みと既存のファイル)の合計ページ数
+    total_pages: int = 0
 
     def to_dict(self) -> dict[str, Any]:
         """辞書に変換"""
@@ -61,12 +86,39 @@ class Parameters:
     categories: list[str]
     name_filter: str | None = None
     exact_match: bool = False
+    name_file: str | None = None
+    # 出力ディレクトリの配置(downloader.layout を参照)
+    layout: str = "flat"
 
     def to_dict(self) -> dict[str, Any]:
         """辞書に変換"""
         return asdict(self)
 
 
+def load_recorded_files(path: str | Path) -> dict[str, FileMetadata]:
+    """
+    前回の実行で記録したファイルメタデータを読み込む
+
+    Args:
+        path: metadata.json のパス
+
+    Returns:
+        dict[str, FileMetadata]: ファイル名をキーとしたファイルメタデータ(読み込めない場合は空)
+
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with path.open(encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        logger.warning("前回のメタデータを読み込めませんでした: %s", path)
+        return {}
+    files = (FileMetadata.from_dict(entry) for entry in document.get("files", []))
+    return {metadata.filename: metadata for metadata in files}
+
+
 class MetadataManager:
     """メタデータ管理クラス"""
 
@@ -78,6 +130,10 @@ class MetadataManager:
         name_filter: str | None,
         *,
         exact_match: bool,
+        name_file: str | None = None,
+        journal: bool = False,
+        layout: str = "flat",
+        filename: str = METADATA_FILENAME,
     ) -> None:
         """
         初期化
@@ -88,11 +144,16 @@ class MetadataManager:
             categories: 対象カテゴリのリスト
             name_filter: 団体名フィルタ
             exact_match: 完全一致フラグ
+            name_file: 団体名の一覧ファイル
+            journal: ジャーナルモード。追加したメタデータを即座に metadata.jsonl へ追記し、
+                metadata.json は save() でのみ書き出す
+            layout: 出力ディレクトリの配置(metadata.json に記録し、後続の処理がパスを求める際に使用する)
+            filename: メタデータのファイル名(ジャーナルは拡張子を .jsonl にしたファイル)
 
         """
         self.output_dir = output_dir
         # Pathオブジェクトを使用
-        self.metadata_path = Path(output_dir) / "metadata.json"
+        self.metadata_path = Path(output_dir) / filename
 
         # パラメータの初期化
         self.parameters = Parameters(
@@ -100,6 +161,8 @@ class MetadataManager:
             categories=categories,
             name_filter=name_filter,
             exact_match=exact_match,
+            name_file=name_file,
+            layout=layout,
         )
 
         # 統計情報の初期化
@@ -108,6 +171,16 @@ class MetadataManager:
         # ファイルリストの初期化
         self.files: list[FileMetadata] = []
 
+        # 並行ダウンロード時にファイル追加を直列化するためのロック
+        self._lock = threading.Lock()
+
+        # ジャーナルモードの設定
+        self.journal = journal
+        self.journal_path = self.metadata_path.with_suffix(".jsonl")
+        self._journal_file: TextIO | None = None
+        # ファイル名からfilesの位置への索引(ジャーナルの再生時に重複を置き換えるため)
+        self._index: dict[str, int] = {}
+
         # メタデータの初期化
         self.metadata: dict[str, Any] = {
             "download_date": datetime.datetime.now(
@@ -118,31 +191,189 @@ class MetadataManager:
             "statistics": self.statistics.to_dict(),
         }
 
-    def add_file(self, metadata: FileMetadata) -> None:
+        if self.journal:
+            self._open_journal()
+
+    def _update_statistics(self, metadata: FileMetadata, sign: int) -> None:
         """
-        ファイルメタデータを追加
+        統計情報を差分で更新
 
         Args:
             metadata: ファイルメタデータ
+            sign: 追加する場合は1、取り消す場合は-1
 
         """
-        self.files.append(metadata)
-        self.metadata["files"].append(metadata.to_dict())
-
-        # 統計情報を更新
-        self.statistics.total_files += 1
+        self.statistics.total_files += sign
+        if metadata.page_count:
+            self.statistics.total_pages += sign * metadata.page_count
 
         if metadata.download_status == "success":
-            self.statistics.downloaded_files += 1
-            self.statistics.total_size += metadata.file_size
+            self.statistics.downloaded_files += sign
+            self.statistics.total_size += sign * metadata.file_size
         elif metadata.download_status == "skipped":
-            self.statistics.skipped_files += 1
+            self.statistics.skipped_files += sign
         elif metadata.download_status == "failed":
-            self.statistics.failed_files += 1
+            self.statistics.failed_files += sign
+
+    def _add_file_locked(self, metadata: FileMetadata) -> None:
+        """
+        ファイルメタデータを追加(ロック取得済みの状態で呼び出す)
+
+        ジャーナルモードでは同じファイル名の記録を新しいもので置き換えます。
+
+        Args:
+            metadata: ファイルメタデータ
+
+        """
+        index = self._index.get(metadata.filename) if self.journal else None
+        if index is not None:
+            self._update_statistics(self.files[index], -1)
+            self.files[index] = metadata
+            self.metadata["files"][index] = metadata.to_dict()
+        else:
+            if self.journal:
+                self._index[metadata.filename] = len(self.files)
+            self.files.append(metadata)
+            self.metadata["files"].append(metadata.to_dict())
+
+        # 統計情報を更新
+        self._update_statistics(metadata, 1)
 
         # メタデータの統計情報を更新
         self.metadata["statistics"] = self.statistics.to_dict()
 
+    def add_file(self, metadata: FileMetadata) -> None:
+        """
+        ファイルメタデータを追加
+
+        ジャーナルモードでは1件ごとに metadata.jsonl へ追記します。実行中はジャーナルを正とし、
+        metadata.json は save() でのみ書き出します(件数に比例する書き直しを実行中に繰り返さない)。
+
+        Args:
+            metadata: ファイルメタデータ
+
+        """
+        with self._lock:
+            self._add_file_locked(metadata)
+
+            if self._journal_file is not None:
+                self._write_journal_line(self._journal_file, {"type": "file", **metadata.to_dict()})
+
+    def _write_journal_line(self, f: TextIO, record: dict[str, Any]) -> None:
+        """
+        ジャーナルに1行書き込む
+
+        Args:
+            f: ジャーナルファイル
+            record: 書き込むレコード
+
+        """
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+
+    def _open_journal(self) -> None:
+        """
+        ジャーナルを開く
+
+        前回の実行が中断されてジャーナルが残っている場合は、その内容を復元して
+        今回の実行に引き継ぎます。中断された実行と条件(公表年、団体種別、団体名の絞り込み、配置)が
+        異なる場合は復元せず、ジャーナルを metadata.jsonl.stale に退避して新しく始めます。
+        """
+        if not create_directory(self.output_dir):
+            logger.error("出力ディレクトリの作成に失敗しました")
+            return
+
+        if self.journal_path.exists():
+            if self._journal_matches_run():
+                recovered = self._replay_journal()
+                logger.info("中断された実行のメタデータを %d 件復元しました", recovered)
+            else:
+                stale_path = self.journal_path.with_suffix(".jsonl.stale")
+                os.replace(self.journal_path, stale_path)
+                logger.warning(
+                    "中断された実行と条件が異なるため、ジャーナルを復元せずに退避しました: %s",
+                    stale_path,
+                )
+
+        # 復元した内容で書き直し、書きかけの行が残らないようにする
+        tmp_path = self.journal_path.with_suffix(".jsonl.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            header = {
+                "type": "run",
+                "download_date": self.metadata["download_date"],
+                "parameters": self.metadata["parameters"],
+            }
+            self._write_journal_line(f, header)
+            for file_metadata in self.files:
+                self._write_journal_line(f, {"type": "file", **file_metadata.to_dict()})
+        os.replace(tmp_path, self.journal_path)
+
+        self._journal_file = self.journal_path.open("a", encoding="utf-8")
+
+    def _journal_matches_run(self) -> bool:
+        """
+        既存のジャーナルが今回と同じ条件の実行のものかどうかを判断
+
+        ジャーナルの先頭の run レコードに記録した条件と、今回の条件を比較します
+        (公表年と団体種別は順序を問いません)。run レコードを読めない場合は同じ条件とみなします。
+
+        Returns:
+            bool: 同じ条件の場合はTrue
+
+        """
+        with self.journal_path.open(encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                return True
+        if header.get("type") != "run":
+            return True
+        previous = header.get("parameters", {})
+        current = self.parameters.to_dict()
+        for key in JOURNAL_RUN_KEYS:
+            previous_value, current_value = previous.get(key), current.get(key)
+            if isinstance(current_value, list) and isinstance(previous_value, list):
+                previous_value, current_value = sorted(previous_value), sorted(current_value)
+            if previous_value != current_value:
+                logger.warning("中断された実行と %s が異なります: %s -> %s", key, previous_value, current_value)
+                return False
+        return True
+
+    def _replay_journal(self) -> int:
+        """
+        既存のジャーナルを読み込んでメタデータと統計情報を復元
+
+        Returns:
+            int: 復元したファイルメタデータの件数
+
+        """
+        recovered = 0
+        with self.journal_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で中断された最終行
+                    logger.warning("ジャーナルの不完全な行を無視します")
+                    continue
+                if record.get("type") == "file":
+                    self._add_file_locked(FileMetadata.from_dict(record))
+                    recovered += 1
+        return recovered
+
+    def _write_snapshot(self, indent: int | None) -> None:
+        """
+        metadata.json を一時ファイル経由で置き換える
+
+        Args:
+            indent: JSONのインデント
+
+        """
+        tmp_path = self.metadata_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.metadata, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, self.metadata_path)
+
     def save(self) -> bool:
         """
         メタデータをJSONファイルとして保存
@@ -151,6 +382,9 @@ class MetadataManager:
             bool: 保存成功時はTrue、失敗時はFalse
 
         """
+        if self.journal:
+            return self._save_journaled()
+
         try:
             # ディレクトリを作成
             if not create_directory(self.output_dir):
@@ -168,6 +402,31 @@ class MetadataManager:
             logger.exception("JSONのエンコードに失敗しました")
             return False
 
+    def _save_journaled(self) -> bool:
+        """
+        ジャーナルモードの最終保存
+
+        metadata.json を書き出した後、実行が完了したためジャーナルを削除します。
+
+        Returns:
+            bool: 保存成功時はTrue、失敗時はFalse
+
+        """
+        with self._lock:
+            try:
+                if not create_directory(self.output_dir):
+                    logger.error("出力ディレクトリの作成に失敗しました")
+                    return False
+                self._write_snapshot(indent=2)
+                if self._journal_file is not None:
+                    self._journal_file.close()
+                    self._journal_file = None
+                self.journal_path.unlink(missing_ok=True)
+            except OSError:
+                logger.exception("メタデータの保存に失敗しました")
+                return False
+        return True
+
     def get_statistics(self) -> Statistics:
         """
         統計情報を取得
@@ -0,0 +1,483 @@
+"""
+計測モジュール
+
+ページ、robots.txt、PDFの各リクエストについて、名前解決・接続確立・最初のバイトまで(TTFB)・
+本文の転送の時間、受信したバイト数、ステータスコード、再試行の回数を記録し、
+リクエスト間隔の調整のために待機した時間とあわせて出力するクラスを提供します。
+
+記録は1リクエスト1行のJSON Lines形式で逐次書き出し、実行の終了時に
+集計値をPrometheusのテキスト形式のスナップショットとして書き出します。
+名前解決と接続確立の時間は新しい接続を確立した場合のみ記録されます
+(キープアライブで再利用した接続では0になります)。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from http import HTTPStatus
+from pathlib import Path
+from typing import IO
+
+import requests
+
+from .scheduler import PolitenessScheduler
+from .transport import connection_timings, reset_connection_timings
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# Prometheusのメトリクス名の接頭辞
+METRIC_PREFIX = "seijishikin_downloader"
+
+# リクエスト全体の時間のヒストグラムの境界(秒)
+DURATION_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 時間を内訳ごとに集計する項目
+PHASES: tuple[str, ...] = ("dns", "connect", "ttfb", "transfer")
+
+
+def prometheus_path_for(metrics_path: str | Path) -> Path:
+    """
+    計測ファイルに対応するPrometheus形式のスナップショットのパスを取得
+
+    Args:
+        metrics_path: 計測ファイル(JSON Lines)のパス
+
+    Returns:
+        Path: 拡張子を .prom にしたパス
+
+    """
+    return Path(metrics_path).with_suffix(".prom")
+
+
+@dataclass
+class RequestMetric:
+    """1回のリクエストの計測結果"""
+
+    # 取得対象の種類(page, robots, pdf, head)
+    component: str
+    url: str
+    host: str
+    method: str
+    # ステータスコード(通信エラーの場合はNone)
+    status: int | None
+    # 再試行の回数(初回は0)
+    attempt: int
+    # リクエストの開始時刻(UNIX時間)
+    started_at: float
+    # 各段階の時間(秒)
+    dns: float
+    connect: float
+    ttfb: float
+    transfer: float
+    total: float
+    # 受信した本文のバイト数
+    bytes: int
+    error: str | None = None
+
+
+class RequestTimer:
+    """1回のリクエストの計測"""
+
+    def __init__(
+        self,
+        recorder: MetricsRecorder,
+        component: str,
+        url: str,
+        *,
+        method: str = "GET",
+        attempt: int = 0,
+    ) -> None:
+        """
+        初期化(計測を開始)
+
+        Args:
+            recorder: 計測結果の記録先
+            component: 取得対象の種類
+            url: リクエスト先のURL
+            method: HTTPメソッド
+            attempt: 再試行の回数
+
+        """
+        self.recorder = recorder
+        self.component = component
+        self.url = url
+        self.method = method
+        self.attempt = attempt
+        self.status: int | None = None
+        self.dns = 0.0
+        self.connect = 0.0
+        reset_connection_timings()
+        self.started_at = recorder.wall_clock()
+        self.started = recorder.clock()
+        self.headers_at: float | None = None
+
+    def received(self, response: requests.Response) -> None:
+        """
+        応答ヘッダの受信を記録
+
+        Args:
+            response: レスポンス
+
+        """
+        now = self.recorder.clock()
+        # requests が計測した応答ヘッダまでの時間(取得できない場合は現在時刻)
+        elapsed = getattr(response, "elapsed", None)
+        headers_at = self.started + elapsed.total_seconds() if isinstance(elapsed, timedelta) else now
+        self.headers_at = min(max(headers_at, self.started), now)
+        self.status = response.status_code
+        timings = connection_timings()
+        self.dns = timings.dns
+        self.connect = timings.connect
+
+    def finish(self, nbytes: int = 0, *, error: BaseException | None = None) -> RequestMetric:
+        """
+        計測を終了して記録
+
+        Args:
+            nbytes: 受信した本文のバイト数
+            error: 通信エラー
+
+        Returns:
+            RequestMetric: 計測結果
+
+        """
+        now = self.recorder.clock()
+        if self.headers_at is None:
+            # 応答ヘッダを受信する前に失敗した場合
+            timings = connection_timings()
+            self.dns = timings.dns
+            self.connect = timings.connect
+            headers_at = now
+            ttfb = 0.0
+        else:
+            headers_at = self.headers_at
+            ttfb = max(headers_at - self.started - self.dns - self.connect, 0.0)
+        metric = RequestMetric(
+            component=self.component,
+            url=self.url,
+            host=PolitenessScheduler.host_of(self.url),
+            method=self.method,
+            status=self.status,
+            attempt=self.attempt,
+            started_at=self.started_at,
+            dns=self.dns,
+            connect=self.connect,
+            ttfb=ttfb,
+            transfer=max(now - headers_at, 0.0),
+            total=now - self.started,
+            bytes=nbytes,
+            error=f"{type(error).__name__}: {error}" if error else None,
+        )
+        self.recorder.record(metric)
+        return metric
+
+
+class MetricsRecorder:
+    """リクエストの計測結果を記録・集計するクラス"""
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        clock: Callable[[], float] = time.perf_counter,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            path: 計測結果を書き出すJSON Linesファイルのパス(Noneの場合は集計のみ)
+            clock: 経過時間の計測に使用する関数(テスト時にモック可能)
+            wall_clock: 現在時刻(UNIX時間)を返す関数(テスト時にモック可能)
+
+        """
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self._file: IO[str] | None = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("w", encoding="utf-8")
+        self._lock = threading.Lock()
+        # 本文の受信が終わるまで計測を続けるレスポンス
+        self._pending: weakref.WeakKeyDictionary[requests.Response, RequestTimer] = weakref.WeakKeyDictionary()
+
+        # 集計値
+        self.requests: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.errors: defaultdict[str, int] = defaultdict(int)
+        self.retries: defaultdict[str, int] = defaultdict(int)
+        self.bytes: defaultdict[str, int] = defaultdict(int)
+        self.phase_seconds: defaultdict[tuple[str, str], float] = defaultdict(float)
+        self.duration_buckets: defaultdict[str, list[int]] = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.duration_sum: defaultdict[str, float] = defaultdict(float)
+        self.duration_count: defaultdict[str, int] = defaultdict(int)
+        self.sleep_seconds: defaultdict[str, float] = defaultdict(float)
+        self.sleeps: defaultdict[str, int] = defaultdict(int)
+
+    def start(self, component: str, url: str, *, method: str = "GET", attempt: int = 0) -> RequestTimer:
+        """
+        リクエストの計測を開始(リクエストを送信するスレッドで呼び出す)
+
+        Args:
+            component: 取得対象の種類(page, robots, pdf, head)
+            url: リクエスト先のURL
+            method: HTTPメソッド
+            attempt: 再試行の回数
+
+        Returns:
+            RequestTimer: 計測
+
+        """
+        return RequestTimer(self, component, url, method=method, attempt=attempt)
+
+    def send(
+        self,
+        component: str,
+        url: str,
+        request: Callable[[], requests.Response],
+        *,
+        method: str = "GET",
+        attempt: int = 0,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        リクエストを送信して計測
+
+        ストリーミングモードで本文を受信する場合は、受信を終えた後に complete() で計測を終了します。
+        本文を受信しない応答(エラー、304)はその場で記録します。
+
+        Args:
+            component: 取得対象の種類
+            url: リクエスト先のURL
+            request: リクエストを送信する関数
+            method: HTTPメソッド
+            attempt: 再試行の回数
+            stream: ストリーミングモードかどうか
+
+        Returns:
+            requests.Response: レスポンス
+
+        Raises:
+            requests.RequestException: 通信に失敗した場合(記録した上で再送出)
+
+        """
+        timer = self.start(component, url, method=method, attempt=attempt)
+        try:
+            response = request()
+        except requests.RequestException as e:
+            timer.finish(error=e)
+            raise
+        timer.received(response)
+        has_body = response.ok and response.status_code != HTTPStatus.NOT_MODIFIED
+        if stream and has_body:
+            with self._lock:
+                self._pending[response] = timer
+        else:
+            # ストリーミングモードでない場合は本文を受信済み(ストリーミングモードのエラー応答の本文は受信しない)
+            content = b"" if stream else response.content
+            timer.finish(len(content) if isinstance(content, bytes) else 0)
+        return response
+
+    def complete(self, response: requests.Response, nbytes: int, *, error: BaseException | None = None) -> None:
+        """
+        ストリーミングモードのレスポンスの計測を終了
+
+        Args:
+            response: send() で送信したレスポンス
+            nbytes: 受信した本文のバイト数
+            error: 受信中の通信エラー
+
+        """
+        with self._lock:
+            timer = self._pending.pop(response, None)
+        if timer:
+            timer.finish(nbytes, error=error)
+
+    def record(self, metric: RequestMetric) -> None:
+        """
+        計測結果を記録
+
+        Args:
+            metric: 計測結果
+
+        """
+        status = str(metric.status) if metric.status is not None else "error"
+        with self._lock:
+            self.requests[metric.component, status] += 1
+            if metric.error:
+                self.errors[metric.component] += 1
+            if metric.attempt > 0:
+                self.retries[metric.component] += 1
+            self.bytes[metric.component] += metric.bytes
+            for phase in PHASES:
+                self.phase_seconds[metric.component, phase] += getattr(metric, phase)
+            buckets = self.duration_buckets[metric.component]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if metric.total <= bound:
+                    buckets[i] += 1
+            self.duration_sum[metric.component] += metric.total
+            self.duration_count[metric.component] += 1
+            self._write({"type": "request", **asdict(metric)})
+
+    def record_sleep(self, url: str, seconds: float) -> None:
+        """
+        リクエスト間隔の調整のために待機した時間を記録(PolitenessScheduler の on_wait に指定する)
+
+        Args:
+            url: 待機後にリクエストするURL
+            seconds: 待機時間(秒)
+
+        """
+        host = PolitenessScheduler.host_of(url)
+        with self._lock:
+            self.sleep_seconds[host] += seconds
+            self.sleeps[host] += 1
+            self._write(
+                {"type": "sleep", "host": host, "url": url, "started_at": self.wall_clock(), "seconds": seconds}
+            )
+
+    def _write(self, record: dict[str, object]) -> None:
+        """
+        1行を書き出す(ロックを取得した状態で呼び出す)
+
+        Args:
+            record: 書き出す内容
+
+        """
+        if self._file:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def prometheus_text(self) -> str:
+        """
+        集計値をPrometheusのテキスト形式で取得
+
+        Returns:
+            str: Prometheusのテキスト形式のスナップショット
+
+        """
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: list[tuple[str, dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            lines.extend(
+                f"{METRIC_PREFIX}_{name}{suffix}{_labels(labels)} {_value(value)}" for suffix, labels, value in samples
+            )
+
+        with self._lock:
+            family(
+                "requests_total",
+                "counter",
+                "Number of HTTP requests by component and status code.",
+                [("", {"component": c, "status": s}, n) for (c, s), n in sorted(self.requests.items())],
+            )
+            family(
+                "request_errors_total",
+                "counter",
+                "Number of requests that failed with a network error.",
+                [("", {"component": c}, n) for c, n in sorted(self.errors.items())],
+            )
+            family(
+                "request_retries_total",
+                "counter",
+                "Number of requests that retried an earlier attempt.",
+                [("", {"component": c}, n) for c, n in sorted(self.retries.items())],
+            )
+            family(
+                "response_bytes_total",
+                "counter",
+                "Response body bytes received.",
+                [("", {"component": c}, n) for c, n in sorted(self.bytes.items())],
+            )
+            family(
+                "request_phase_seconds_total",
+                "counter",
+                "Time spent in each request phase (dns, connect, ttfb, transfer).",
+                [("", {"component": c, "phase": p}, s) for (c, p), s in sorted(self.phase_seconds.items())],
+            )
+            histogram: list[tuple[str, dict[str, str], float]] = []
+            for c in sorted(self.duration_count):
+                histogram.extend(
+                    ("_bucket", {"component": c, "le": f"{bound:g}"}, count)
+                    for bound, count in zip(DURATION_BUCKETS, self.duration_buckets[c], strict=True)
+                )
+                histogram.append(("_bucket", {"component": c, "le": "+Inf"}, self.duration_count[c]))
+                histogram.append(("_sum", {"component": c}, self.duration_sum[c]))
+                histogram.append(("_count", {"component": c}, self.duration_count[c]))
+            family("request_duration_seconds", "histogram", "Total request duration.", histogram)
+            family(
+                "sleep_seconds_total",
+                "counter",
+                "Time spent waiting between requests to respect per-host intervals.",
+                [("", {"host": h}, s) for h, s in sorted(self.sleep_seconds.items())],
+            )
+            family(
+                "sleeps_total",
+                "counter",
+                "Number of waits between requests.",
+                [("", {"host": h}, n) for h, n in sorted(self.sleeps.items())],
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path) -> None:
+        """
+        集計値をPrometheusのテキスト形式で書き出す(一時ファイルに書いてから置き換える)
+
+        Args:
+            path: 出力先のパス
+
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(self.prometheus_text(), encoding="utf-8")
+        os.replace(tmp_path, path)
+        logger.info("計測結果を書き出しました: %s", path)
+
+    def close(self) -> None:
+        """計測ファイルを閉じる"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def _labels(labels: dict[str, str]) -> str:
+    """
+    Prometheusのラベルを書式化
+
+    Args:
+        labels: ラベル名と値
+
+    Returns:
+        str: 書式化したラベル(例: {component="pdf",status="200"})
+
+    """
+    # ラベル値のバックスラッシュ、ダブルクォート、改行はエスケープする
+    escape = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+    return "{" + ",".join(f'{key}="{value.translate(escape)}"' for key, value in labels.items()) + "}"
+
+
+def _value(value: float) -> str:
+    """
+    Prometheusのサンプル値を書式化
+
+    Args:
+        value: 値
+
+    Returns:
+        str: 整数はそのまま、小数は丸めずに書式化した値
+
+    """
+    return str(value) if isinstance(value, int) else repr(float(value))
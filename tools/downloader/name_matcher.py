@@ -0,0 +1,182 @@
+"""
+団体名照合モジュール
+
+多数の団体名を1回の走査で照合するクラスを提供します。
+部分一致はAho-Corasick法のオートマトンで、団体名の数によらずテキスト長に比例する時間で判定し、
+完全一致は集合の参照で判定します。
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from collections.abc import Iterable
+from pathlib import Path
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasick:
+    """Aho-Corasick法による複数パターンの部分一致検索"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """
+        初期化(オートマトンを構築)
+
+        Args:
+            patterns: 検索するパターン(空文字列は無視)
+
+        """
+        # 状態ごとの遷移、失敗時の遷移先、その状態で一致するパターン
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[str, ...]] = [()]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str) -> None:
+        """
+        パターンをトライ木に追加
+
+        Args:
+            pattern: パターン
+
+        """
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if pattern not in self._output[state]:
+            self._output[state] = (*self._output[state], pattern)
+
+    def _build_failure_links(self) -> None:
+        """幅優先探索で失敗時の遷移先を設定"""
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # 失敗先で一致するパターンも出力に含める
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _step(self, state: int, char: str) -> int:
+        """
+        1文字分の遷移
+
+        Args:
+            state: 現在の状態
+            char: 入力文字
+
+        Returns:
+            int: 遷移後の状態
+
+        """
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+
+    def contains_any(self, text: str) -> bool:
+        """
+        いずれかのパターンを含むかどうかを判断
+
+        Args:
+            text: 検索対象のテキスト
+
+        Returns:
+            bool: 含む場合はTrue
+
+        """
+        state = 0
+        for char in text:
+            state = self._step(state, char)
+            if self._output[state]:
+                return True
+        return False
+
+    def find_all(self, text: str) -> set[str]:
+        """
+        テキストに含まれるパターンを全て取得
+
+        Args:
+            text: 検索対象のテキスト
+
+        Returns:
+            set[str]: 含まれるパターン
+
+        """
+        found: set[str] = set()
+        state = 0
+        for char in text:
+            state = self._step(state, char)
+            found.update(self._output[state])
+        return found
+
+
+class NameMatcher:
+    """団体名の照合(完全一致または部分一致)"""
+
+    def __init__(self, names: Iterable[str], *, exact_match: bool) -> None:
+        """
+        初期化
+
+        Args:
+            names: 団体名
+            exact_match: 完全一致で照合する場合はTrue
+
+        """
+        self.names = frozenset(name for name in names if name)
+        self.exact_match = exact_match
+        self._automaton = None if exact_match else AhoCorasick(self.names)
+
+    def matches(self, text: str) -> bool:
+        """
+        テキストがいずれかの団体名に一致するかどうかを判断
+
+        Args:
+            text: 照合するテキスト(PDFリンクのテキストなど)
+
+        Returns:
+            bool: 一致する場合はTrue
+
+        """
+        if self._automaton is None:
+            return text in self.names
+        return self._automaton.contains_any(text)
+
+
+def load_names(path: str | Path) -> list[str]:
+    """
+    団体名の一覧ファイルを読み込む
+
+    1行に1団体名を記述します。空行と「#」で始まる行は無視します。
+
+    Args:
+        path: 一覧ファイルのパス(UTF-8)
+
+    Returns:
+        list[str]: 団体名のリスト(重複を除き、記述順)
+
+    """
+    names: dict[str, None] = {}
+    with Path(path).open(encoding="utf-8-sig") as f:
+        for line in f:
+            name = line.strip()
+            if name and not name.startswith("#"):
+                names[name] = None
+    logger.info("団体名の一覧を読み込みました: %d件 (%s)", len(names), path)
+    return list(names)
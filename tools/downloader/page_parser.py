@@ -6,23 +6,52 @@
 
 from __future__ import annotations
 
+import codecs
+import hashlib
+import importlib.util
 import logging
+import queue
 import re
+import threading
 import time
-from dataclasses import dataclass
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Callable, Protocol, cast
+from http import HTTPStatus
+from typing import Any, Protocol
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup
 
 from .config import BASE_URL, YEAR_PATTERNS
+from .crawl_state import content_hash
+from .html_links import Anchor, anchors_from_soup, extract_anchors, iter_anchors
+from .http_cache import HttpCache
+from .metrics import MetricsRecorder
+from .name_matcher import NameMatcher
+from .scheduler import THROTTLE_STATUSES
 from .utils import extract_year_from_url
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+# HTMLパーサーのバックエンド
+# html.parser / lxml は BeautifulSoup のツリーを構築し、fast はツリーを構築せずにリンクのみを抽出する
+FAST_PARSER_BACKEND = "fast"
+PARSER_BACKENDS: tuple[str, ...] = ("html.parser", "lxml", FAST_PARSER_BACKEND)
+# 任意の依存パッケージが必要なバックエンドと、インストールされていない場合の代替
+OPTIONAL_PARSER_BACKENDS: dict[str, str] = {"lxml": "html.parser"}
+
+# ストリーミング取得時に一度に読み込むバイト数
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# 報告書ページの文字コード
+PAGE_ENCODING = "shift_jis"
+
+# 429/503応答時に再試行する回数(リクエスト間隔制御がある場合のみ)
+MAX_THROTTLE_RETRIES = 2
+
 
 class RobotsCheckerProtocol(Protocol):
     """robots.txtチェッカープロトコル"""
@@ -32,12 +61,59 @@ class RobotsCheckerProtocol(Protocol):
         ...
 
 
+class PacerProtocol(Protocol):
+    """リクエスト間隔制御プロトコル"""
+
+    def wait(self, url: str) -> None:
+        """リクエスト可能になるまで待機"""
+        ...
+
+    def record_response(
+        self,
+        url: str,
+        status_code: int | None,
+        *,
+        retry_after: str | None = None,
+        latency: float | None = None,
+    ) -> None:
+        """リクエストの結果を記録"""
+        ...
+
+
 @dataclass
 class NameFilter:
     """団体名フィルタ"""
 
-    name: str
+    name: str | None
     exact_match: bool
+    # --name-file などで指定された追加の団体名
+    names: tuple[str, ...] = ()
+    _matcher: NameMatcher | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def patterns(self) -> list[str]:
+        """照合する全ての団体名"""
+        return [self.name, *self.names] if self.name else list(self.names)
+
+    def matches(self, text: str) -> bool:
+        """
+        テキストがいずれかの団体名に一致するかどうかを判断
+
+        団体名が1件の場合は文字列の比較、複数の場合は NameMatcher により
+        団体名の数によらず1回の走査で判断します。
+
+        Args:
+            text: PDFリンクのテキスト
+
+        Returns:
+            bool: 一致する場合はTrue
+
+        """
+        if not self.names and self.name:
+            return self.name == text if self.exact_match else self.name in text
+        if self._matcher is None:
+            self._matcher = NameMatcher(self.patterns, exact_match=self.exact_match)
+        return self._matcher.matches(text)
 
 
 @dataclass
@@ -56,6 +132,8 @@ class ReportListPageLink:
     url: str
     text: str
     year: str
+    # 公開元の名前(総務省の場合は空文字列)
+    source: str = ""
 
 
 @dataclass
@@ -85,6 +163,8 @@ class PdfLink:
     url: str
     text: str
     report_list_url: str
+    # 公開元の名前(総務省の場合は空文字列)
+    source: str = ""
 
     def category_id(self) -> str:
         """PDFリンクURLに含まれるコード値からカテゴリIDを取得する"""
@@ -97,6 +177,10 @@ class PdfLink:
 
     def category(self) -> Category:
         """カテゴリを取得する"""
+        # 総務省以外の公開元ではURLのコード値の体系が異なるため判定しない
+        if self.source:
+            return Category.UNKNOWN
+
         category_id = self.category_id()
 
         if "/SF/" in self.report_list_url and category_id == "000":
@@ -139,18 +223,31 @@ class PageParser:
         robots_checker: RobotsCheckerProtocol | None = None,
         sleep_func: Callable[[int], None] = time.sleep,
         soup_factory: Callable[[str, str], BeautifulSoup] | None = None,
+        pacer: PacerProtocol | None = None,
+        http_cache: HttpCache | None = None,
+        parser_backend: str = "html.parser",
+        base_url: str = BASE_URL,
+        encoding: str = PAGE_ENCODING,
+        metrics: MetricsRecorder | None = None,
     ) -> None:
         """
         初期化
 
         Args:
             session: リクエストセッション
-            name_filter: 団体名フィルタ(name属性と完全一致フラグを持つ)
+            name_filter: 団体名フィルタ(団体名と完全一致フラグを持つ)
             years: 対象年度のリスト
             delay: リクエスト間の待機時間(秒)
             robots_checker: robots.txtチェッカー
             sleep_func: 待機処理を行う関数(テスト時にモック可能)
             soup_factory: BeautifulSoupオブジェクトを生成する関数(テスト時にモック可能)
+            pacer: リクエスト間隔制御。指定した場合はリクエスト前に待機して結果を記録し、
+                取得後の固定待機(sleep_func)は行わない
+            http_cache: HTTPキャッシュ。指定した場合は条件付きリクエストで再検証する
+            parser_backend: HTMLパーサーのバックエンド(html.parser, lxml, fast)
+            base_url: 公表年ごとのページへのリンクを含むトップページのURL
+            encoding: ページの文字コード
+            metrics: リクエストの計測結果の記録先
 
         """
         self.session = session
@@ -159,6 +256,30 @@ class PageParser:
         self.delay = delay
         self.robots_checker = robots_checker
         self.sleep_func = sleep_func
+        self.pacer = pacer
+        self.http_cache = http_cache
+        self.base_url = base_url
+        self.encoding = encoding
+        self.metrics = metrics
+
+        if parser_backend not in PARSER_BACKENDS:
+            msg = f"未対応のHTMLパーサーです: {parser_backend}"
+            raise ValueError(msg)
+        # 実行の途中で BeautifulSoup が FeatureNotFound を送出しないよう、開始時にパッケージの有無を確認する
+        fallback = OPTIONAL_PARSER_BACKENDS.get(parser_backend)
+        if fallback and importlib.util.find_spec(parser_backend) is None:
+            logger.warning(
+                "%s がインストールされていないため、HTMLパーサーに %s を使用します",
+                parser_backend,
+                fallback,
+            )
+            parser_backend = fallback
+        self.parser_backend = parser_backend
+
+        # 報告書一覧ページごとの内容のハッシュ値(増分実行の判定に使用)
+        self.content_hashes: dict[str, str] = {}
+        # 取得し直しても全てのPDFリンクを得られなかった報告書一覧ページのURL
+        self.incomplete_pages: set[str] = set()
 
         # デフォルトのsoup_factoryを設定
         if soup_factory is None:
@@ -185,6 +306,68 @@ class PageParser:
             return url + "/"
         return url
 
+    def _send(self, url: str, attempt: int, **kwargs: Any) -> requests.Response:
+        """
+        GETリクエストを送信(計測結果の記録先がある場合は計測する)
+
+        Args:
+            url: 取得するURL
+            attempt: 再試行の回数
+            **kwargs: requests.Session.get に渡す引数
+
+        Returns:
+            requests.Response: レスポンス
+
+        """
+        if not self.metrics:
+            return self.session.get(url, **kwargs)
+        return self.metrics.send(
+            "page",
+            url,
+            lambda: self.session.get(url, **kwargs),
+            attempt=attempt,
+            stream=kwargs.get("stream", False),
+        )
+
+    def _get(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        リクエスト間隔制御に従ってGETリクエストを送信
+
+        リクエスト間隔制御がある場合は、リクエスト前に待機し、結果(ステータスコード、
+        Retry-After、応答時間)を記録します。429/503応答の場合は、間隔制御が決めた
+        バックオフの後に再試行します。
+
+        Args:
+            url: 取得するURL
+            **kwargs: requests.Session.get に渡す引数
+
+        Returns:
+            requests.Response: レスポンス
+
+        """
+        if not self.pacer:
+            return self._send(url, 0, **kwargs)
+
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            self.pacer.wait(url)
+            started = time.monotonic()
+            try:
+                response = self._send(url, attempt, **kwargs)
+            except requests.RequestException:
+                self.pacer.record_response(url, None)
+                raise
+            self.pacer.record_response(
+                url,
+                response.status_code,
+                retry_after=response.headers.get("Retry-After"),
+                latency=time.monotonic() - started,
+            )
+            if response.status_code not in THROTTLE_STATUSES or attempt == MAX_THROTTLE_RETRIES:
+                break
+            response.close()
+            logger.warning("サーバーが混雑しているため再試行します(%d/%d): %s", attempt + 1, MAX_THROTTLE_RETRIES, url)
+        return response
+
     def _fetch_url(self, url: str) -> str | None:
         """
         URLからHTMLを取得
@@ -202,20 +385,161 @@ class PageParser:
                 logger.warning("robots.txtによりアクセスが禁止されています: %s", url)
                 return None
 
-            # ページを取得
-            response = self.session.get(url)
+            # キャッシュが有効期間内であればリクエストしない
+            cache_entry = self.http_cache.get(url) if self.http_cache else None
+            if self.http_cache and cache_entry and self.http_cache.is_fresh(cache_entry):
+                cached_text = self.http_cache.load_text(url)
+                if cached_text is not None:
+                    logger.debug("キャッシュを使用します: %s", url)
+                    return cached_text
+
+            # ページを取得(キャッシュがある場合は条件付きリクエスト)
+            response = self._get(url, headers=cache_entry.conditional_headers()) if cache_entry else self._get(url)
             response.raise_for_status()
 
+            # 未更新の場合は本文の転送もデコードも行わずキャッシュを返す
+            if self.http_cache and cache_entry and response.status_code == HTTPStatus.NOT_MODIFIED:
+                cached_text = self.http_cache.load_text(url)
+                if cached_text is not None:
+                    logger.debug("ページは更新されていません: %s", url)
+                    self.http_cache.touch(cache_entry)
+                    return cached_text
+                # キャッシュ本文が壊れている場合は通常のリクエストで取り直す
+                response = self._get(url)
+                response.raise_for_status()
+
             # インターバルを設ける
-            self.sleep_func(self.delay)
+            if not self.pacer:
+                self.sleep_func(self.delay)
 
             # 文字コードを設定
-            response.encoding = "shift_jis"
+            response.encoding = self.encoding
+            text = response.text
         except requests.RequestException as e:
             logger.exception("ページの取得に失敗しました: %s", url, exc_info=e)
             return None
 
-        return response.text
+        if self.http_cache:
+            self.http_cache.store(
+                url,
+                text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return text
+
+    def _iter_url_text(self, url: str) -> Iterator[str]:
+        """
+        URLからHTMLを受信しながら、デコード済みの断片を順次返す
+
+        Shift-JISなどのマルチバイト文字がチャンクの境界で分割されても正しくデコードできるよう、
+        インクリメンタルデコーダを使用します。取得に失敗した場合は例外を送出するため、
+        呼び出し側で途中までの結果を扱えます。
+
+        Args:
+            url: 取得するURL
+
+        Yields:
+            str: デコード済みのHTML断片
+
+        Raises:
+            requests.RequestException: 取得に失敗した場合
+
+        """
+        # robots.txtを確認
+        if self.robots_checker and not self.robots_checker.can_fetch(url):
+            logger.warning("robots.txtによりアクセスが禁止されています: %s", url)
+            return
+
+        # キャッシュが有効期間内であればリクエストしない
+        cache_entry = self.http_cache.get(url) if self.http_cache else None
+        if self.http_cache and cache_entry and self.http_cache.is_fresh(cache_entry):
+            cached_text = self.http_cache.load_text(url)
+            if cached_text is not None:
+                logger.debug("キャッシュを使用します: %s", url)
+                yield cached_text
+                return
+
+        headers = cache_entry.conditional_headers() if cache_entry else None
+        with self._get(url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+
+            # 未更新の場合は本文を受信せずキャッシュを返す
+            if self.http_cache and cache_entry and response.status_code == HTTPStatus.NOT_MODIFIED:
+                cached_text = self.http_cache.load_text(url)
+                if cached_text is not None:
+                    logger.debug("ページは更新されていません: %s", url)
+                    self.http_cache.touch(cache_entry)
+                    yield cached_text
+                    return
+                # キャッシュ本文が壊れている場合は通常のリクエストで取り直す
+                yield from self._iter_url_text_uncached(url)
+                return
+
+            yield from self._iter_response_text(url, response)
+
+        # インターバルを設ける
+        if not self.pacer:
+            self.sleep_func(self.delay)
+
+    def _iter_url_text_uncached(self, url: str) -> Iterator[str]:
+        """
+        キャッシュを使用せずにURLからHTMLを受信しながら返す
+
+        Args:
+            url: 取得するURL
+
+        Yields:
+            str: デコード済みのHTML断片
+
+        """
+        with self._get(url, stream=True) as response:
+            response.raise_for_status()
+            yield from self._iter_response_text(url, response)
+
+    def _iter_response_text(self, url: str, response: requests.Response) -> Iterator[str]:
+        """
+        レスポンスの本文を受信しながらデコードして返す(HTTPキャッシュが有効な場合は保存も行う)
+
+        Args:
+            url: 取得したURL
+            response: ストリーミングモードのレスポンス
+
+        Yields:
+            str: デコード済みのHTML断片
+
+        """
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        received: list[str] | None = [] if self.http_cache else None
+        received_bytes = 0
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                received_bytes += len(chunk)
+                text = decoder.decode(chunk)
+                if text:
+                    if received is not None:
+                        received.append(text)
+                    yield text
+        except requests.RequestException as e:
+            if self.metrics:
+                self.metrics.complete(response, received_bytes, error=e)
+            raise
+        if self.metrics:
+            self.metrics.complete(response, received_bytes)
+        text = decoder.decode(b"", final=True)
+        if text:
+            if received is not None:
+                received.append(text)
+            yield text
+
+        # 最後まで受信できた場合のみキャッシュに保存
+        if self.http_cache and received is not None:
+            self.http_cache.store(
+                url,
+                "".join(received),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
 
     def _create_soup(self, html: str) -> BeautifulSoup:
         """
@@ -228,7 +552,24 @@ class PageParser:
             BeautifulSoup: 生成したBeautifulSoupオブジェクト
 
         """
-        return self.soup_factory(html, "html.parser")
+        # fast バックエンドはリンク抽出以外(見出し検索など)では html.parser を使用する
+        parser = "html.parser" if self.parser_backend == FAST_PARSER_BACKEND else self.parser_backend
+        return self.soup_factory(html, parser)
+
+    def _extract_anchors(self, html: str) -> list[Anchor]:
+        """
+        HTMLから <a> 要素を1回の走査で抽出
+
+        Args:
+            html: HTML文字列
+
+        Returns:
+            list[Anchor]: <a> 要素のリスト
+
+        """
+        if self.parser_backend == FAST_PARSER_BACKEND:
+            return extract_anchors(html)
+        return anchors_from_soup(self._create_soup(html))
 
     def _should_include_year(self, year: str) -> bool:
         """
@@ -243,18 +584,18 @@ class PageParser:
         """
         return not self.years or year in self.years
 
-    def _extract_year_urls_from_soup(
+    def _extract_year_urls(
         self,
-        soup: BeautifulSoup,
+        anchors: list[Anchor],
         base_url: str,
         *,
         seasonal_report_only: bool = False,
     ) -> list[YearPageLink | ReportListPageLink]:
         """
-        BeautifulSoupオブジェクトから年度URLを抽出
+        <a> 要素から年度URLを抽出
 
         Args:
-            soup: BeautifulSoupオブジェクト
+            anchors: <a> 要素のリスト
             base_url: ベースURL
             seasonal_report_only: 定期公表のみをチェックするかどうか
 
@@ -265,11 +606,9 @@ class PageParser:
         year_urls: list[YearPageLink | ReportListPageLink] = []
 
         # 「令和X年分」などのパターンを含むリンクを探す
-        for link in soup.find_all("a"):
-            # Tagにキャスト
-            link_tag = cast("Tag", link)
-            href = link_tag.get("href")
-            text = link_tag.get_text()
+        for anchor in anchors:
+            href = anchor.href
+            text = anchor.text
 
             if not href:
                 continue
@@ -318,28 +657,27 @@ class PageParser:
         """
         logger.info("公表年ごとのURLを取得しています")
 
-        html = self._fetch_url(BASE_URL)
+        html = self._fetch_url(self.base_url)
         if not html:
             return []
 
-        soup = self._create_soup(html)
-        return self._extract_year_urls_from_soup(
-            soup,
-            BASE_URL,
+        return self._extract_year_urls(
+            self._extract_anchors(html),
+            self.base_url,
             seasonal_report_only=True,
         )
 
     def _extract_report_list_links(
         self,
-        soup: BeautifulSoup,
+        anchors: list[Anchor],
         base_url: str,
         year: str,
     ) -> list[ReportListPageLink]:
         """
-        BeautifulSoupオブジェクトから報告書一覧リンクを抽出
+        <a> 要素から報告書一覧リンクを抽出
 
         Args:
-            soup: BeautifulSoupオブジェクト
+            anchors: <a> 要素のリスト
             base_url: ベースURL
             year: 年度
 
@@ -354,11 +692,9 @@ class PageParser:
         report_link_regex = re.compile(
             r".*/reports/[A-Z]+[0-9]+/[A-Z]+/[a-zA-Z0-9]+\.html$",
         )
-        for link in soup.find_all("a"):
-            # Tagにキャスト
-            link_tag = cast("Tag", link)
-            href = link_tag.get("href")
-            text = link_tag.get_text().strip()
+        for anchor in anchors:
+            href = anchor.href
+            text = anchor.text.strip()
 
             if not href or not text:
                 continue
@@ -374,15 +710,15 @@ class PageParser:
 
     def _extract_direct_pdf_links(
         self,
-        soup: BeautifulSoup,
+        anchors: list[Anchor],
         report_list_url: str,
     ) -> list[PdfLink]:
         """
-        BeautifulSoupオブジェクトから直接PDFリンクを抽出
+        <a> 要素から直接PDFリンクを抽出
 
         Args:
-            soup: BeautifulSoupオブジェクト
-            base_url: ベースURL
+            anchors: <a> 要素のリスト
+            report_list_url: 報告書一覧ページのURL
 
         Returns:
             list[PdfLink]: PDFリンクのリスト
@@ -392,11 +728,9 @@ class PageParser:
         report_list_url_with_slash = self._ensure_url_ends_with_slash(report_list_url)
         links: list[PdfLink] = []
 
-        for link in soup.find_all("a"):
-            # Tagにキャスト
-            link_tag = cast("Tag", link)
-            href = link_tag.get("href")
-            text = link_tag.get_text().strip()
+        for anchor in anchors:
+            href = anchor.href
+            text = anchor.text.strip()
 
             if not href or not text:
                 continue
@@ -475,9 +809,7 @@ class PageParser:
         if not html:
             return []
 
-        soup = self._create_soup(html)
-
-        report_list_links = self._extract_report_list_links(soup, link.url, link.year)
+        report_list_links = self._extract_report_list_links(self._extract_anchors(html), link.url, link.year)
         if report_list_links:
             logger.info("報告書一覧リンクを見つけました: %d件", len(report_list_links))
             return report_list_links
@@ -485,6 +817,20 @@ class PageParser:
 
         return []
 
+    def extract_pdf_links(self, html: str, report_list_url: str) -> list[PdfLink]:
+        """
+        報告書一覧ページのHTMLからPDFリンクを抽出(団体名では絞り込まない)
+
+        Args:
+            html: 報告書一覧ページのHTML
+            report_list_url: 報告書一覧ページのURL
+
+        Returns:
+            list[PdfLink]: PDFリンクのリスト
+
+        """
+        return self._extract_direct_pdf_links(self._extract_anchors(html), report_list_url)
+
     def parse_report_list_page(
         self,
         report_list_url: ReportListPageLink,
@@ -505,13 +851,126 @@ class PageParser:
         if not html:
             return []
 
-        soup = self._create_soup(html)
+        self.content_hashes[report_list_url.url] = content_hash(html)
+        pdf_links = self.extract_pdf_links(html, report_list_url.url)
+        return [link for link in pdf_links if self._matches_name_filter(link)]
 
-        pdf_links = self._extract_direct_pdf_links(soup, report_list_url.url)
-        if self.name_filter:
-            if self.name_filter.exact_match:
-                pdf_links = [link for link in pdf_links if self.name_filter.name == link.text]
+    def iter_report_list_pdf_links(
+        self,
+        report_list_url: ReportListPageLink,
+    ) -> Iterator[PdfLink]:
+        """
+        報告書一覧ページを受信しながら解析し、PDFリンクを見つけた順に返す
+
+        ページの受信と解析は別のスレッドで行い、見つけたPDFリンクをキューで受け渡します。
+        呼び出し側がリンクごとにダウンロード(と待機)を行っている間もページの本文を読み進めるため、
+        読み残した本文がサーバーのタイムアウトで切断されることはありません。
+        受信が途中で切断された場合はページ全体を取得し直し、まだ返していないリンクを返します。
+        本文を受信する前に失敗した場合(404や5xxなどのエラー応答を含む)は、parse_report_list_page と同様に
+        エラーを記録してリンクを返しません。
+        リンクの抽出にはパーサーのバックエンドによらず LinkExtractor を使用します。
+
+        Args:
+            report_list_url: 報告書一覧ページのURL
+
+        Yields:
+            PdfLink: PDFリンク
+
+        """
+        logger.info("報告書一覧ページを受信しながら解析しています: %s", report_list_url.url)
+
+        found: queue.SimpleQueue[PdfLink | Exception | None] = queue.SimpleQueue()
+        thread = threading.Thread(
+            target=self._receive_report_list_page,
+            args=(report_list_url, found),
+            name="report-list-receiver",
+            daemon=True,
+        )
+        thread.start()
+
+        yielded: set[str] = set()
+        error: requests.RequestException | None = None
+        while (item := found.get()) is not None:
+            if isinstance(item, requests.RequestException):
+                error = item
+                continue
+            if isinstance(item, Exception):
+                raise item
+            yielded.add(item.url)
+            yield item
+        thread.join()
+        if error is None:
+            return
+
+        logger.warning("受信が途中で切断されたため、ページ全体を取得し直します: %s (%s)", report_list_url.url, error)
+        html = self._fetch_url(report_list_url.url)
+        if not html:
+            logger.error("報告書一覧ページの一部のPDFリンクを取得できませんでした: %s", report_list_url.url)
+            self.incomplete_pages.add(report_list_url.url)
+            return
+        self.content_hashes[report_list_url.url] = content_hash(html)
+        for link in self._extract_direct_pdf_links(self._extract_anchors(html), report_list_url.url):
+            if link.url not in yielded and self._matches_name_filter(link):
+                yielded.add(link.url)
+                yield link
+
+    def _receive_report_list_page(
+        self,
+        report_list_url: ReportListPageLink,
+        found: queue.SimpleQueue[PdfLink | Exception | None],
+    ) -> None:
+        """
+        報告書一覧ページを最後まで受信し、団体名フィルタに一致したPDFリンクをキューに入れる(受信スレッドで実行)
+
+        ページの内容のハッシュ値は最後まで受信できた場合のみ記録します。
+        本文の受信中に例外が発生した場合はその例外を、終了時には None をキューに入れます。
+        本文を受信する前の取得の失敗(エラー応答など)は _fetch_url と同様に記録し、キューには入れません。
+
+        Args:
+            report_list_url: 報告書一覧ページのURL
+            found: PDFリンクを受け渡すキュー
+
+        """
+        # content_hash() と同じ値になるよう、デコード済みの断片をUTF-8で逐次ハッシュする
+        digest = hashlib.sha256()
+        received = False
+
+        def chunks() -> Iterator[str]:
+            nonlocal received
+            for text in self._iter_url_text(report_list_url.url):
+                received = True
+                digest.update(text.encode("utf-8"))
+                yield text
+
+        try:
+            for anchor in iter_anchors(chunks()):
+                for link in self._extract_direct_pdf_links([anchor], report_list_url.url):
+                    if self._matches_name_filter(link):
+                        found.put(link)
+            if received:
+                self.content_hashes[report_list_url.url] = digest.hexdigest()
+        except requests.RequestException as e:
+            if received:
+                # 受信途中の切断は、呼び出し側でページ全体を取得し直す
+                found.put(e)
             else:
-                pdf_links = [link for link in pdf_links if self.name_filter.name in link.text]
+                logger.exception("ページの取得に失敗しました: %s", report_list_url.url, exc_info=e)
+        except Exception as e:  # 受信スレッドの例外は呼び出し側のスレッドで扱う
+            found.put(e)
+        finally:
+            found.put(None)
 
-        return pdf_links
+    def _matches_name_filter(self, link: PdfLink) -> bool:
+        """
+        PDFリンクが団体名フィルタに一致するかどうかを判断
+
+        Args:
+            link: PDFリンク
+
+        Returns:
+            bool: 一致する場合(フィルタがない場合を含む)はTrue
+
+        """
+        if not self.name_filter:
+            return True
+        return self.name_filter.matches(link.text)
@@ -6,25 +6,230 @@ PDFダウンロードモジュール
 
 from __future__ import annotations
 
+import hashlib
 import logging
+import os
+import re
 import time
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
+from http import HTTPStatus
 from pathlib import Path
-from typing import TYPE_CHECKING, Protocol
+from typing import TYPE_CHECKING, Any, Protocol
 
 import requests
 from tqdm import tqdm
 
+from .content_store import ContentStore, sha256_file
 from .metadata import FileMetadata
+from .metrics import MetricsRecorder
+from .pdf_probe import probe_pdf
+from .progress import ProgressReporter
+from .transport import COPY_BUFFER_SIZE, iter_into
 from .utils import create_directory, sanitize_filename
 
 # 型チェック用のインポート
 if TYPE_CHECKING:
+    from .layout import OutputLayout
     from .page_parser import PdfLink
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+# 公開元のPDFのファイル名に付けるURLのハッシュ値の桁数
+SOURCE_URL_DIGEST_LENGTH = 10
+
+# ダウンロード途中のファイルに付ける拡張子
+PART_SUFFIX = ".part"
+# ダウンロード途中のファイルを受信したときの検証子(If-Range に使用)を記録するファイルの拡張子
+VALIDATOR_SUFFIX = ".validator"
+
+# PDFのリクエストに付けるヘッダ
+# 圧縮された本文ではContent-LengthやRangeのバイト位置が展開後の内容と一致しないため、圧縮しない本文を求める
+PDF_REQUEST_HEADERS = {"Accept-Encoding": "identity"}
+
+# PDFのヘッダとトレーラを探す範囲(先頭と末尾のバイト数)
+# ヘッダの前やトレーラの後に余分なデータが付いたファイルも、多くのPDFリーダーと同様に許容する
+PDF_SNIFF_SIZE = 1024
+PDF_HEADER = b"%PDF-"
+PDF_TRAILER = b"%%EOF"
+
+# 進捗表示を更新する間隔(秒)
+PROGRESS_INTERVAL = 0.5
+
+
+class IncompleteDownloadError(requests.RequestException):
+    """受信したサイズがContent-Lengthと一致しない場合の例外"""
+
+
+class CorruptPdfError(requests.RequestException):
+    """受信したデータがPDFの形式(ヘッダとトレーラ)を満たさない場合の例外"""
+
+
+class PdfSniffer:
+    """受信中のデータの先頭と末尾を保持し、PDFのヘッダとトレーラを確認するクラス"""
+
+    def __init__(self, data: bytes = b"") -> None:
+        """
+        初期化
+
+        Args:
+            data: 受信済みのデータ(再開時)
+
+        """
+        self.head = b""
+        self.tail = b""
+        self.update(data)
+
+    def update(self, chunk: bytes | memoryview) -> None:
+        """
+        受信したデータを追加
+
+        Args:
+            chunk: 受信したデータ(再利用されるバッファのメモリビューの場合もあるため、保持する部分は複製する)
+
+        """
+        if len(self.head) < PDF_SNIFF_SIZE:
+            self.head += chunk[: PDF_SNIFF_SIZE - len(self.head)]
+        if len(chunk) >= PDF_SNIFF_SIZE:
+            self.tail = bytes(chunk[-PDF_SNIFF_SIZE:])
+        else:
+            self.tail = (self.tail + chunk)[-PDF_SNIFF_SIZE:]
+
+    def verify(self) -> None:
+        """
+        PDFのヘッダとトレーラがあることを確認
+
+        Raises:
+            CorruptPdfError: ヘッダまたはトレーラが見つからない場合
+
+        """
+        if PDF_HEADER not in self.head:
+            msg = "PDFのヘッダ(%PDF-)が見つかりません"
+            raise CorruptPdfError(msg)
+        if PDF_TRAILER not in self.tail:
+            msg = "PDFのトレーラ(%%EOF)が見つかりません"
+            raise CorruptPdfError(msg)
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> PdfSniffer:
+        """
+        ファイルの先頭と末尾を読み込む
+
+        Args:
+            path: ファイルのパス
+
+        Returns:
+            PdfSniffer: ファイルの先頭と末尾を保持したインスタンス
+
+        """
+        sniffer = cls()
+        with Path(path).open("rb") as f:
+            sniffer.head = f.read(PDF_SNIFF_SIZE)
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - PDF_SNIFF_SIZE))
+            sniffer.tail = f.read()
+        return sniffer
+
+
+def part_path_for(save_path: str | Path) -> Path:
+    """
+    ダウンロード途中のファイルのパスを取得
+
+    Args:
+        save_path: 保存先パス
+
+    Returns:
+        Path: ダウンロード途中のファイルのパス
+
+    """
+    return Path(f"{save_path}{PART_SUFFIX}")
+
+
+def validator_path_for(save_path: str | Path) -> Path:
+    """
+    ダウンロード途中のファイルの検証子を記録するファイルのパスを取得
+
+    Args:
+        save_path: 保存先パス
+
+    Returns:
+        Path: 検証子を記録するファイルのパス
+
+    """
+    return Path(f"{save_path}{PART_SUFFIX}{VALIDATOR_SUFFIX}")
+
+
+def range_validator(response: requests.Response) -> str | None:
+    """
+    レスポンスから If-Range に使用できる検証子を取得
+
+    If-Range には強い検証子のみ使用できるため、弱いETag(W/)の場合はLast-Modifiedを使用します。
+    圧縮された本文はバイト位置が展開後の内容と一致せず再開できないため、検証子を返しません。
+
+    Args:
+        response: レスポンス
+
+    Returns:
+        str | None: 検証子(ETagまたはLast-Modified)、再開に使用できない場合はNone
+
+    """
+    if _is_encoded(response):
+        return None
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _is_encoded(response: requests.Response) -> bool:
+    """
+    本文が圧縮されているかどうかを確認
+
+    Args:
+        response: レスポンス
+
+    Returns:
+        bool: Content-Encodingがidentity以外の場合はTrue
+
+    """
+    encoding = response.headers.get("content-encoding", "").strip().lower()
+    return encoding not in ("", "identity")
+
+
+def _parse_content_range_start(content_range: str | None) -> int | None:
+    """
+    Content-Rangeヘッダから開始位置を取得
+
+    Args:
+        content_range: Content-Rangeヘッダ(例: "bytes 100-199/1000")
+
+    Returns:
+        int | None: 開始位置のバイト数、不明な場合はNone
+
+    """
+    if not content_range:
+        return None
+    match = re.match(r"\s*bytes\s+(\d+)-", content_range)
+    return int(match.group(1)) if match else None
+
+
+def _parse_content_range_total(content_range: str | None) -> int | None:
+    """
+    Content-Rangeヘッダから全体のサイズを取得
+
+    Args:
+        content_range: Content-Rangeヘッダ(例: "bytes 100-199/1000")
+
+    Returns:
+        int | None: 全体のサイズ、不明な場合はNone
+
+    """
+    if not content_range:
+        return None
+    match = re.search(r"/(\d+)\s*$", content_range)
+    return int(match.group(1)) if match else None
+
 
 class RobotsChecker(Protocol):
     """robots.txtチェッカーのプロトコル"""
@@ -34,6 +239,25 @@ class RobotsChecker(Protocol):
         ...
 
 
+class Pacer(Protocol):
+    """リクエスト間隔制御のプロトコル"""
+
+    def wait(self, url: str) -> None:
+        """リクエスト可能になるまで待機する"""
+        ...
+
+    def record_response(
+        self,
+        url: str,
+        status_code: int | None,
+        *,
+        retry_after: str | None = None,
+        latency: float | None = None,
+    ) -> None:
+        """リクエストの結果を記録する"""
+        ...
+
+
 @dataclass
 class DownloadPrepareResult:
     """ダウンロード準備結果"""
@@ -42,6 +266,39 @@ class DownloadPrepareResult:
     metadata: FileMetadata
 
 
+@dataclass
+class ReceivedPdf:
+    """受信したPDFの内容のハッシュ値と検証子"""
+
+    sha256: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @classmethod
+    def from_response(cls, digest: str, response: requests.Response) -> ReceivedPdf:
+        """
+        レスポンスのヘッダから作成
+
+        Args:
+            digest: 受信した内容のSHA-256ハッシュ値
+            response: レスポンス
+
+        Returns:
+            ReceivedPdf: 受信したPDF
+
+        """
+        return cls(digest, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+@dataclass
+class RemotePdf:
+    """HEADリクエストで取得したPDFのサイズと検証子"""
+
+    size: int | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+
+
 @dataclass
 class DownloaderConfig:
     """ダウンローダー設定"""
@@ -51,6 +308,13 @@ class DownloaderConfig:
     metadata_only: bool = False
     delay: int = 5
     robots_checker: RobotsChecker | None = None
+    sleep_func: Callable[[float], None] = time.sleep
+    pacer: Pacer | None = None
+    content_store: ContentStore | None = None
+    metrics: MetricsRecorder | None = None
+    progress: ProgressReporter | None = None
+    probe: bool = True
+    layout: OutputLayout | None = None
 
 
 class PDFDownloader:
@@ -67,6 +331,13 @@ class PDFDownloader:
         metadata_only: bool = False,
         delay: int = 5,
         robots_checker: RobotsChecker | None = None,
+        sleep_func: Callable[[float], None] = time.sleep,
+        pacer: Pacer | None = None,
+        content_store: ContentStore | None = None,
+        metrics: MetricsRecorder | None = None,
+        progress: ProgressReporter | None = None,
+        probe: bool = True,
+        layout: OutputLayout | None = None,
     ) -> None:
         """
         初期化
@@ -80,10 +351,20 @@ class PDFDownloader:
             metadata_only: メタデータのみフラグ
             delay: リクエスト間の待機時間(秒)
             robots_checker: robots.txtチェッカー
+            sleep_func: 待機処理を行う関数(テスト時にモック可能)
+            pacer: リクエスト間隔制御。指定した場合はリクエスト前に待機して結果を記録し、
+                ダウンロード後の固定待機は行わない
+            content_store: コンテンツアドレス型ストア。指定した場合は同じ内容のPDFを一度だけ保存する
+            metrics: リクエストの計測結果の記録先
+            progress: 実行全体の進捗表示。指定した場合は受信したバイト数を加算し、PDFごとの進捗バーは表示しない
+            probe: 保存したPDFの構造(ページ数など)を調べてメタデータに記録するかどうか
+            layout: 出力ディレクトリの配置(Noneの場合は出力ディレクトリの直下に保存)
 
         """
         self.session = session
         self.output_dir = output_dir
+        # 本文の転送に使用するバッファの大きさ
+        self.buffer_size = COPY_BUFFER_SIZE
 
         if config is not None:
             self.force = config.force
@@ -91,6 +372,13 @@ class PDFDownloader:
             self.metadata_only = config.metadata_only
             self.delay = config.delay
             self.robots_checker = config.robots_checker
+            self.sleep_func = config.sleep_func
+            self.pacer = config.pacer
+            self.content_store = config.content_store
+            self.metrics = config.metrics
+            self.progress = config.progress
+            self.probe = config.probe
+            self.layout = config.layout
         else:
             # 個別のパラメータを使用
             self.force = force
@@ -98,6 +386,17 @@ class PDFDownloader:
             self.metadata_only = metadata_only
             self.delay = delay
             self.robots_checker = robots_checker
+            self.sleep_func = sleep_func
+            self.pacer = pacer
+            self.content_store = content_store
+            self.metrics = metrics
+            self.progress = progress
+            self.probe = probe
+            self.layout = layout
+
+        # 前回までに記録したファイルメタデータ(既存のファイルの構造を調べ直さずに引き継ぐため)
+        self.recorded_files: dict[str, FileMetadata] = {}
+        self.recorded_digests: dict[str, FileMetadata] = {}
 
     def prepare_download(self, pdf_link: PdfLink, year: str) -> DownloadPrepareResult:
         """
@@ -117,9 +416,13 @@ class PDFDownloader:
         link_name = f"{pdf_link.text}.pdf"
         safe_link_name = sanitize_filename(link_name)
         file_name = f"{year}_{pdf_link.category_name()}_{safe_link_name}"
-
-        # 保存先パスを生成
-        save_path = str(Path(self.output_dir) / file_name)
+        # 総務省以外の公開元のPDFは公開元の名前を先頭に付けて区別する。公開元のページはリンクのテキストが
+        # 重複しやすい(「収支報告書」など)ため、URLから求めた短いハッシュ値も付けて別のファイルにする
+        if pdf_link.source:
+            url_digest = hashlib.sha256(pdf_link.url.encode()).hexdigest()[:SOURCE_URL_DIGEST_LENGTH]
+            file_name = (
+                f"{sanitize_filename(pdf_link.source)}_{year}_{pdf_link.category_name()}_{url_digest}_{safe_link_name}"
+            )
 
         # メタデータを準備
         file_metadata = FileMetadata(
@@ -130,8 +433,61 @@ class PDFDownloader:
             year=year,
         )
 
+        # 保存先パスを生成(配置の指定がある場合は公表年や団体種別などのサブディレクトリに分ける)
+        if self.layout:
+            save_path = str(self.layout.path_for(self.output_dir, file_metadata))
+        else:
+            save_path = str(Path(self.output_dir) / file_name)
+
         return DownloadPrepareResult(save_path=save_path, metadata=file_metadata)
 
+    def remember_files(self, files: Iterable[FileMetadata]) -> None:
+        """
+        前回までに記録したファイルメタデータを登録
+
+        登録した構造(ページ数など)は、既存のファイルやストアからリンクしたファイルに引き継ぎます。
+
+        Args:
+            files: ファイルメタデータ
+
+        """
+        for metadata in files:
+            if metadata.page_count is None and metadata.has_text_layer is None and metadata.encrypted is None:
+                continue
+            self.recorded_files[metadata.filename] = metadata
+            if metadata.sha256:
+                self.recorded_digests[metadata.sha256] = metadata
+
+    def _reuse_structure(self, metadata: FileMetadata) -> bool:
+        """
+        記録済みの構造をメタデータに引き継ぐ
+
+        同じ内容(ハッシュ値、ハッシュ値が分からない場合はファイル名とサイズ)の記録がある場合のみ引き継ぎます。
+
+        Args:
+            metadata: ファイルメタデータ(file_size と、分かる場合は sha256 を設定済み)
+
+        Returns:
+            bool: 引き継いだ場合はTrue
+
+        """
+        recorded = self.recorded_digests.get(metadata.sha256) if metadata.sha256 else None
+        if recorded is None:
+            candidate = self.recorded_files.get(metadata.filename)
+            if (
+                candidate is not None
+                and candidate.file_size == metadata.file_size
+                and (not metadata.sha256 or not candidate.sha256)
+            ):
+                recorded = candidate
+        if recorded is None:
+            return False
+        metadata.page_count = recorded.page_count
+        metadata.page_sizes = recorded.page_sizes
+        metadata.has_text_layer = recorded.has_text_layer
+        metadata.encrypted = recorded.encrypted
+        return True
+
     def check_existing_file(
         self,
         save_path: str,
@@ -140,6 +496,8 @@ class PDFDownloader:
         """
         既存ファイルをチェック
 
+        既存のファイルの構造は調べ直さず、記録済みの構造(remember_files を参照)がある場合のみ引き継ぎます。
+
         Args:
             save_path: 保存先パス
             metadata: ファイルメタデータ
@@ -155,10 +513,36 @@ class PDFDownloader:
             logger.info("ファイルが既に存在するためスキップします: %s", save_path)
             metadata.download_status = "skipped"
             metadata.file_size = path_obj.stat().st_size
+            if self.content_store:
+                metadata.sha256 = self.content_store.digest_for_filename(metadata.filename)
+            self._reuse_structure(metadata)
             return metadata
 
         return None
 
+    def _record_structure(self, save_path: str, metadata: FileMetadata) -> None:
+        """
+        保存したPDFの構造(ページ数、ページの大きさ、テキストレイヤーと暗号化の有無)をメタデータに記録
+
+        ページは描画せずにファイルの構造のみを調べます。調べられない場合は記録せずに続行します。
+
+        Args:
+            save_path: 保存先パス
+            metadata: ファイルメタデータ
+
+        """
+        if not self.probe:
+            return
+        try:
+            structure = probe_pdf(save_path)
+        except (OSError, ValueError) as e:
+            logger.warning("PDFの構造を調べられませんでした: %s: %s", save_path, e)
+            return
+        metadata.page_count = structure.page_count
+        metadata.page_sizes = structure.page_sizes
+        metadata.has_text_layer = structure.has_text_layer
+        metadata.encrypted = structure.encrypted
+
     def _handle_dry_run_metadata_only(
         self,
         save_path: str,
@@ -189,30 +573,371 @@ class PDFDownloader:
 
         return None
 
+    def _send(self, pdf_url: str, attempt: int, **kwargs: Any) -> requests.Response:
+        """
+        ストリーミングモードでGETリクエストを送信(計測結果の記録先がある場合は計測する)
+
+        Args:
+            pdf_url: PDFファイルのURL
+            attempt: 再試行の回数
+            **kwargs: requests.Session.get に渡す引数
+
+        Returns:
+            requests.Response: レスポンス
+
+        """
+        if not self.metrics:
+            return self.session.get(pdf_url, stream=True, **kwargs)
+        return self.metrics.send(
+            "pdf",
+            pdf_url,
+            lambda: self.session.get(pdf_url, stream=True, **kwargs),
+            attempt=attempt,
+            stream=True,
+        )
+
+    def _request_pdf(
+        self,
+        pdf_url: str,
+        resume_from: int,
+        attempt: int = 0,
+        headers: dict[str, str] | None = None,
+    ) -> requests.Response:
+        """
+        PDFをリクエスト(途中まで受信済みの場合はRangeリクエスト)
+
+        Args:
+            pdf_url: PDFファイルのURL
+            resume_from: 受信済みのバイト数
+            attempt: 再試行の回数
+            headers: 追加するリクエストヘッダ(条件付きリクエストなど)
+
+        Returns:
+            requests.Response: レスポンス
+
+        """
+        # 途中まで受信済みの場合のみRangeヘッダを付ける
+        request_headers = {**PDF_REQUEST_HEADERS, **(headers or {})}
+        if resume_from > 0:
+            request_headers["Range"] = f"bytes={resume_from}-"
+        kwargs: dict[str, Any] = {"headers": request_headers}
+        if not self.pacer:
+            return self._send(pdf_url, attempt, **kwargs)
+
+        # リクエスト間隔制御に待機を任せ、結果(429/503やRetry-After、応答時間)を記録する
+        self.pacer.wait(pdf_url)
+        started = time.monotonic()
+        try:
+            response = self._send(pdf_url, attempt, **kwargs)
+        except requests.RequestException:
+            self.pacer.record_response(pdf_url, None)
+            raise
+        self.pacer.record_response(
+            pdf_url,
+            response.status_code,
+            retry_after=response.headers.get("Retry-After"),
+            latency=time.monotonic() - started,
+        )
+        return response
+
+    def _is_unchanged(self, pdf_url: str) -> bool:
+        """
+        ストアに記録した検証子による条件付きリクエストで、PDFが変わっていないことを確認
+
+        Args:
+            pdf_url: PDFファイルのURL
+
+        Returns:
+            bool: 304 Not Modified が返された場合はTrue(検証子の記録がない場合や失敗した場合はFalse)
+
+        """
+        headers = self.content_store.conditional_headers_for_url(pdf_url) if self.content_store else {}
+        if not headers:
+            return False
+        try:
+            response = self._request_pdf(pdf_url, 0, headers=headers)
+        except requests.RequestException:
+            logger.warning("PDFが更新されたかどうかを確認できませんでした: %s", pdf_url)
+            return False
+        # 更新されていた場合の本文は受信せず、通常のダウンロードで取得し直す
+        response.close()
+        if self.metrics:
+            self.metrics.complete(response, 0)
+        if not self.pacer:
+            self.sleep_func(self.delay)
+        return response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def head_content_length(self, pdf_url: str) -> int | None:
+        """
+        HEADリクエストでPDFのサイズを取得
+
+        Args:
+            pdf_url: PDFファイルのURL
+
+        Returns:
+            int | None: Content-Lengthのバイト数、取得できない場合はNone
+
+        """
+        remote = self.head_pdf(pdf_url)
+        return remote.size if remote else None
+
+    def head_pdf(self, pdf_url: str) -> RemotePdf | None:
+        """
+        HEADリクエストでPDFのサイズと検証子(ETag、Last-Modified)を取得
+
+        Args:
+            pdf_url: PDFファイルのURL
+
+        Returns:
+            RemotePdf | None: サイズと検証子、取得できない場合はNone
+
+        """
+        if self.robots_checker and not self.robots_checker.can_fetch(pdf_url):
+            return None
+        if self.pacer:
+            self.pacer.wait(pdf_url)
+        started = time.monotonic()
+        try:
+            if self.metrics:
+                response = self.metrics.send(
+                    "head",
+                    pdf_url,
+                    lambda: self.session.head(pdf_url, allow_redirects=True, headers=PDF_REQUEST_HEADERS),
+                    method="HEAD",
+                )
+            else:
+                response = self.session.head(pdf_url, allow_redirects=True, headers=PDF_REQUEST_HEADERS)
+        except requests.RequestException:
+            if self.pacer:
+                self.pacer.record_response(pdf_url, None)
+            logger.warning("PDFのサイズを取得できませんでした: %s", pdf_url)
+            return None
+        if self.pacer:
+            self.pacer.record_response(
+                pdf_url,
+                response.status_code,
+                retry_after=response.headers.get("Retry-After"),
+                latency=time.monotonic() - started,
+            )
+        else:
+            self.sleep_func(self.delay)
+        if not response.ok:
+            return None
+        # 圧縮された本文のContent-LengthはPDFのサイズではない
+        content_length = None if _is_encoded(response) else response.headers.get("content-length")
+        return RemotePdf(
+            size=int(content_length) if content_length and content_length.isdigit() else None,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
     def _download_with_progress(
         self,
         pdf_url: str,
         save_path: str,
-    ) -> None:
-        """単一のダウンロード試行を実行"""
-        response = self.session.get(pdf_url, stream=True)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get("content-length", 0))
-        progress_bar = tqdm(
-            total=total_size,
-            unit="B",
-            unit_scale=True,
-            desc=Path(save_path).name,
+        attempt: int = 0,
+    ) -> ReceivedPdf:
+        """
+        単一のダウンロード試行を実行
+
+        受信したデータは .part ファイルに書き込み、前回の試行や中断された実行で
+        受信済みのデータがあれば Range リクエストで続きから再開します。
+        再開は受信を始めたときの検証子(ETagまたはLast-Modified)を If-Range に付けて行い、
+        サーバー上のファイルが置き換えられた場合や、続きではない範囲が返された場合は最初から受信し直します
+        (検証子のない .part ファイルは再開しない)。
+        受信したサイズが Content-Length と一致し、PDFのヘッダとトレーラがある場合のみ
+        保存先パスへ名前を変更します。
+
+        Args:
+            pdf_url: PDFファイルのURL
+            save_path: 保存先パス
+            attempt: 再試行の回数
+
+        Returns:
+            ReceivedPdf: 受信したファイルのSHA-256ハッシュ値と検証子(ETag、Last-Modified)
+
+        Raises:
+            IncompleteDownloadError: 受信したサイズが想定と一致しない場合
+            CorruptPdfError: 受信したデータがPDFではない場合(.part ファイルは破棄する)
+
+        """
+        part_path = part_path_for(save_path)
+        validator_path = validator_path_for(save_path)
+        resume_from = part_path.stat().st_size if part_path.exists() else 0
+        validator = validator_path.read_text(encoding="utf-8").strip() if validator_path.exists() else ""
+        if resume_from > 0 and not validator:
+            # 受信を始めたときのファイルと同じことを確認できないため、続きを受信しない
+            logger.info("検証子のない受信途中のファイルは最初から受信し直します: %s", part_path)
+            self._discard_part(save_path)
+            resume_from = 0
+
+        response = self._request_pdf(
+            pdf_url, resume_from, attempt, headers={"If-Range": validator} if resume_from > 0 else None
         )
+        if resume_from > 0 and response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+            total = _parse_content_range_total(response.headers.get("content-range"))
+            if total == resume_from:
+                # 前回の試行で全て受信済み
+                logger.info("受信済みのファイルを使用します: %s", part_path)
+                response.close()
+                self._verify_part(part_path, PdfSniffer.from_file(part_path))
+                digest = sha256_file(part_path)
+                os.replace(part_path, save_path)
+                validator_path.unlink(missing_ok=True)
+                return ReceivedPdf.from_response(digest, response)
+            # サーバー上のファイルが変わっている場合は最初から取り直す
+            logger.warning("途中まで受信したファイルを破棄します: %s", part_path)
+            response = self._restart_download(pdf_url, save_path, response, attempt)
+            resume_from = 0
+        elif resume_from > 0 and response.status_code == HTTPStatus.PARTIAL_CONTENT:
+            start = _parse_content_range_start(response.headers.get("content-range"))
+            received_validator = range_validator(response)
+            if start != resume_from or (received_validator is not None and received_validator != validator):
+                # 受信済みのデータの続きではない(ファイルが置き換えられた)ため、つなぎ合わせずに最初から取り直す
+                logger.warning("受信済みのデータの続きではない応答のため最初から受信し直します: %s", pdf_url)
+                response = self._restart_download(pdf_url, save_path, response, attempt)
+                resume_from = 0
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+
+        # 圧縮された本文の場合、Content-Lengthは展開後に受信したサイズと比較できない
+        content_length = 0 if _is_encoded(response) else int(response.headers.get("content-length", 0))
+        if resume_from > 0 and response.status_code == HTTPStatus.PARTIAL_CONTENT:
+            logger.info("%dバイト目からダウンロードを再開します: %s", resume_from, pdf_url)
+            mode = "ab"
+            received_data = part_path.read_bytes()
+            hasher = hashlib.sha256(received_data)
+            sniffer = PdfSniffer(received_data)
+            expected_size = _parse_content_range_total(response.headers.get("content-range")) or (
+                resume_from + content_length if content_length else 0
+            )
+        else:
+            # Rangeに対応していないサーバーの場合は最初から受信する
+            mode = "wb"
+            hasher = hashlib.sha256()
+            sniffer = PdfSniffer()
+            resume_from = 0
+            expected_size = content_length
+            # 次の試行で続きから再開できるよう、受信する内容の検証子を記録する
+            new_validator = range_validator(response)
+            if new_validator:
+                validator_path.parent.mkdir(parents=True, exist_ok=True)
+                validator_path.write_text(new_validator, encoding="utf-8")
+            else:
+                validator_path.unlink(missing_ok=True)
 
-        with Path(save_path).open("wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
+        # 実行全体の進捗表示がない場合のみ、PDFごとの進捗バーを表示する
+        progress_bar: tqdm | None = None
+        report: Callable[[int], object]
+        if self.progress:
+            report = self.progress.add_bytes
+        else:
+            progress_bar = tqdm(
+                total=expected_size,
+                initial=resume_from,
+                unit="B",
+                unit_scale=True,
+                desc=Path(save_path).name,
+            )
+            report = progress_bar.update
+
+        received = resume_from
+        # 進捗表示の更新は一定間隔ごとにまとめて行う(受信のたびに更新するとオーバーヘッドが大きい)
+        unreported = 0
+        reported_at = time.monotonic()
+        error: Exception | None = None
+        try:
+            with part_path.open(mode) as f:
+                for chunk in iter_into(response, bytearray(self.buffer_size)):
                     f.write(chunk)
-                    progress_bar.update(len(chunk))
+                    hasher.update(chunk)
+                    sniffer.update(chunk)
+                    received += len(chunk)
+                    unreported += len(chunk)
+                    if time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+                        report(unreported)
+                        unreported = 0
+                        reported_at = time.monotonic()
+        except (requests.RequestException, OSError) as e:
+            error = e
+            raise
+        finally:
+            report(unreported)
+            if progress_bar is not None:
+                progress_bar.close()
+            if self.metrics:
+                self.metrics.complete(response, received - resume_from, error=error)
+
+        if expected_size and received != expected_size:
+            msg = f"受信サイズが一致しません: {received}/{expected_size}バイト"
+            raise IncompleteDownloadError(msg)
+
+        self._verify_part(part_path, sniffer)
+        os.replace(part_path, save_path)
+        validator_path.unlink(missing_ok=True)
+        return ReceivedPdf.from_response(hasher.hexdigest(), response)
+
+    def _restart_download(
+        self,
+        pdf_url: str,
+        save_path: str,
+        response: requests.Response,
+        attempt: int,
+    ) -> requests.Response:
+        """
+        受信途中のファイルを破棄し、最初から受信し直すリクエストを送信
+
+        Args:
+            pdf_url: PDFファイルのURL
+            save_path: 保存先パス
+            response: 使用しなかった再開のレスポンス(閉じる)
+            attempt: 再試行の回数
+
+        Returns:
+            requests.Response: 最初から受信するレスポンス
+
+        """
+        response.close()
+        self._discard_part(save_path)
+        return self._request_pdf(pdf_url, 0, attempt)
+
+    @staticmethod
+    def _discard_part(save_path: str | Path) -> None:
+        """
+        受信途中のファイルと検証子を破棄
+
+        Args:
+            save_path: 保存先パス
+
+        """
+        part_path_for(save_path).unlink(missing_ok=True)
+        validator_path_for(save_path).unlink(missing_ok=True)
 
-        progress_bar.close()
+    @staticmethod
+    def _verify_part(part_path: Path, sniffer: PdfSniffer) -> None:
+        """
+        受信したファイルがPDFであることを確認(PDFでない場合は .part ファイルを破棄)
+
+        破棄することで、再試行時にRangeリクエストで壊れたデータの続きを受信せず、最初から取り直します。
+
+        Args:
+            part_path: ダウンロード途中のファイルのパス
+            sniffer: 受信したデータの先頭と末尾
+
+        Raises:
+            CorruptPdfError: PDFではない場合
+
+        """
+        try:
+            sniffer.verify()
+        except CorruptPdfError:
+            logger.warning("受信したファイルがPDFではないため破棄します: %s", part_path)
+            part_path.unlink(missing_ok=True)
+            Path(f"{part_path}{VALIDATOR_SUFFIX}").unlink(missing_ok=True)
+            raise
 
     def download_pdf(
         self,
@@ -257,21 +982,50 @@ class PDFDownloader:
             metadata.error = "robots.txtによりアクセスが禁止されています"
             return metadata
 
+        # 同じURLの内容がストアにあり、条件付きリクエストで変わっていないことを確認できればリンクする
+        # (--force の場合は常に取得し直す)
+        if self.content_store and not self.force and (digest := self.content_store.digest_for_url(pdf_url)):
+            if self._is_unchanged(pdf_url):
+                self.content_store.link(digest, save_path, filename=metadata.filename, url=pdf_url)
+                logger.info("ストア内の同じ内容のPDFをリンクしました: %s", save_path)
+                metadata.download_status = "success"
+                metadata.sha256 = digest
+                metadata.file_size = Path(save_path).stat().st_size
+                metadata.download_date = time.strftime("%Y-%m-%dT%H:%M:%S")
+                if not self._reuse_structure(metadata):
+                    self._record_structure(save_path, metadata)
+                return metadata
+            logger.info("ストアの記録から更新された可能性があるため取得し直します: %s", pdf_url)
+
         max_retries = 3
         success = False
         try:
             for retry_count in range(max_retries):
                 try:
                     logger.info("PDFをダウンロードしています: %s", pdf_url)
-                    self._download_with_progress(pdf_url, save_path)
+                    received = self._download_with_progress(pdf_url, save_path, retry_count)
+
+                    # 内容のハッシュ値を記録し、ストアが有効な場合は重複を排除する
+                    metadata.sha256 = received.sha256
+                    if self.content_store and self.content_store.adopt(
+                        save_path,
+                        metadata.sha256,
+                        filename=metadata.filename,
+                        url=pdf_url,
+                        etag=received.etag,
+                        last_modified=received.last_modified,
+                    ):
+                        logger.info("同じ内容のPDFが既に保存されているためリンクしました: %s", save_path)
 
                     # メタデータを更新
                     metadata.download_status = "success"
                     metadata.file_size = Path(save_path).stat().st_size
                     metadata.download_date = time.strftime("%Y-%m-%dT%H:%M:%S")
+                    self._record_structure(save_path, metadata)
 
                     logger.info("ダウンロード完了: %s", save_path)
-                    time.sleep(self.delay)
+                    if not self.pacer:
+                        self.sleep_func(self.delay)
                     success = True
                     break
                 except requests.RequestException as e:
@@ -286,7 +1040,9 @@ class PDFDownloader:
                     if retry_count >= max_retries - 1:
                         logger.exception("最大リトライ回数に達しました: %s", pdf_url)
                         raise  # 最後のリトライでも失敗した場合は例外を再スロー
-                    time.sleep(self.delay * (2**retry_count))
+                    # リクエスト間隔制御がある場合は、次のリクエスト前にバックオフ込みで待機する
+                    if not self.pacer:
+                        self.sleep_func(self.delay * (2**retry_count))
             if success:
                 return metadata
         except requests.RequestException as e:
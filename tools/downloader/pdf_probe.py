@@ -0,0 +1,233 @@
+"""
+PDF構造調査モジュール
+
+保存したPDFのページ数、ページの大きさ、テキストレイヤーの有無、暗号化の有無を、
+ページを描画せずにファイルの構造(オブジェクトの辞書)から調べる関数を提供します。
+圧縮されたオブジェクトストリームのみを展開し、ページの内容(コンテンツストリーム)は読みません。
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import re
+import zlib
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 間接オブジェクト(例: "12 0 obj ... endobj")
+OBJECT_PATTERN = re.compile(rb"(?<![\d.])\d+\s+\d+\s+obj\b(.*?)\bendobj\b", re.DOTALL)
+STREAM_PATTERN = re.compile(rb"\bstream\r?\n")
+OBJECT_STREAM_PATTERN = re.compile(rb"/Type\s*/ObjStm\b")
+PAGES_PATTERN = re.compile(rb"/Type\s*/Pages\b")
+PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+COUNT_PATTERN = re.compile(rb"/Count\s+(\d+)")
+MEDIA_BOX_PATTERN = re.compile(rb"/MediaBox\s*\[\s*([-+\d.\s]+?)\s*\]")
+FIRST_PATTERN = re.compile(rb"/First\s+(\d+)")
+FONT_PATTERN = re.compile(rb"/Font\b")
+IMAGE_PATTERN = re.compile(rb"/Subtype\s*/Image\b")
+ENCRYPT_PATTERN = re.compile(rb"/Encrypt\s*(?:\d+\s+\d+\s+R|<<)")
+
+# ページの大きさを丸める桁数(ポイント)
+SIZE_PRECISION = 1
+
+
+@dataclass
+class PdfStructure:
+    """PDFの構造の調査結果"""
+
+    # ページ数(ページツリーが見つからない場合はNone)
+    page_count: int | None = None
+    # ページの大きさ([幅, 高さ]、ポイント)。ページ数の多い順に重複なく並べる
+    page_sizes: list[list[float]] = field(default_factory=list)
+    # テキストレイヤーの有無。フォントを参照せず画像のみの場合はFalse、画像を含まずにフォントを参照する場合はTrue。
+    # ページの内容を読まずに判断できない場合(フォントの参照がオブジェクトストリーム内のみ、
+    # フォントと画像の両方を参照、暗号化されたオブジェクトストリーム)はNone
+    has_text_layer: bool | None = False
+    encrypted: bool = False
+
+
+def _iter_object_stream(stream: bytes, dictionary: bytes) -> Iterator[bytes]:
+    """
+    展開したオブジェクトストリームに含まれるオブジェクトを取得
+
+    Args:
+        stream: 展開したストリームの内容
+        dictionary: オブジェクトストリームの辞書
+
+    Yields:
+        bytes: オブジェクトの内容
+
+    """
+    first = FIRST_PATTERN.search(dictionary)
+    if not first:
+        return
+    header = stream[: int(first.group(1))].split()
+    # 先頭はオブジェクト番号とオフセットの組の並び
+    offsets = [int(offset) for offset in header[1::2] if offset.isdigit()]
+    body = stream[int(first.group(1)) :]
+    for start, end in zip(offsets, [*offsets[1:], len(body)], strict=True):
+        yield body[start:end]
+
+
+def _inflate(data: bytes) -> bytes | None:
+    """
+    Flateで圧縮されたストリームを展開
+
+    Args:
+        data: ストリームの内容(endstream までの余分なデータを含んでもよい)
+
+    Returns:
+        bytes | None: 展開した内容(展開できない場合はNone)
+
+    """
+    try:
+        return zlib.decompressobj().decompress(data)
+    except zlib.error:
+        return None
+
+
+def _iter_dictionaries(data: bytes | mmap.mmap, *, encrypted: bool) -> Iterator[tuple[bytes, bool | None]]:
+    """
+    PDFの全てのオブジェクトの辞書部分を取得
+
+    Args:
+        data: PDFの内容
+        encrypted: 暗号化されている場合はTrue(オブジェクトストリームは展開できない)
+
+    Yields:
+        tuple[bytes, bool | None]: オブジェクトの辞書部分(ストリームの内容は含まない)と、
+            オブジェクトストリーム内のオブジェクトかどうか(展開できないオブジェクトストリームの場合は
+            辞書部分が空でNone)
+
+    """
+    for match in OBJECT_PATTERN.finditer(data):
+        body = match.group(1)
+        stream = STREAM_PATTERN.search(body)
+        dictionary = body[: stream.start()] if stream else body
+        yield dictionary, False
+        if not stream or not OBJECT_STREAM_PATTERN.search(dictionary):
+            continue
+        inflated = _inflate(body[stream.end() :]) if not encrypted and b"/FlateDecode" in dictionary else None
+        if inflated:
+            for member in _iter_object_stream(inflated, dictionary):
+                yield member, True
+        else:
+            yield b"", None
+
+
+def _media_box_size(dictionary: bytes) -> tuple[float, float] | None:
+    """
+    辞書のMediaBoxからページの大きさを取得
+
+    Args:
+        dictionary: ページまたはページツリーの辞書
+
+    Returns:
+        tuple[float, float] | None: 幅と高さ(ポイント)、MediaBoxがない場合はNone
+
+    """
+    match = MEDIA_BOX_PATTERN.search(dictionary)
+    if not match:
+        return None
+    try:
+        x1, y1, x2, y2 = (float(value) for value in match.group(1).split())
+    except ValueError:
+        return None
+    return round(abs(x2 - x1), SIZE_PRECISION), round(abs(y2 - y1), SIZE_PRECISION)
+
+
+def _text_layer(*, fonts: bool, compressed_fonts: bool, images: bool, unreadable: bool) -> bool | None:
+    """
+    フォントと画像の参照からテキストレイヤーの有無を判断
+
+    スキャンしたPDFもフォントを宣言している場合があり、ページの内容を読まずには区別できないため、
+    画像を参照するPDFでフォントも参照している場合は不明とします。
+
+    Args:
+        fonts: オブジェクトストリームの外でフォントを参照している場合はTrue
+        compressed_fonts: オブジェクトストリーム内でフォントを参照している場合はTrue
+        images: 画像を参照している場合はTrue
+        unreadable: 展開できないオブジェクトストリームがある場合はTrue
+
+    Returns:
+        bool | None: テキストレイヤーがある場合はTrue、ない場合はFalse、判断できない場合はNone
+
+    """
+    if fonts and not images:
+        return True
+    if fonts or compressed_fonts or unreadable:
+        return None
+    return False
+
+
+def probe_pdf(path: str | Path) -> PdfStructure:
+    """
+    PDFの構造を調べる(ページは描画しない)
+
+    ページ数はページツリーの根の /Count、ページの大きさは各ページ(指定がない場合はページツリー)の
+    /MediaBox から求めます。テキストレイヤーの有無はフォントと画像の参照から判断し、
+    判断できない場合は不明(None)とします(PdfStructure.has_text_layer を参照)。
+    暗号化されたPDFはオブジェクトストリームを展開できないため、ページ数が分からない場合があります。
+
+    Args:
+        path: PDFファイルのパス
+
+    Returns:
+        PdfStructure: 調査結果
+
+    Raises:
+        OSError: ファイルを読み込めない場合
+        ValueError: ファイルが空の場合
+
+    """
+    with Path(path).open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        structure = PdfStructure(encrypted=ENCRYPT_PATTERN.search(data) is not None)
+        max_count: int | None = None
+        page_objects = 0
+        sizes: Counter[tuple[float, float]] = Counter()
+        unsized_pages = 0
+        inherited_size: tuple[float, float] | None = None
+        # フォントの参照(オブジェクトストリームの外/内)、画像の参照、展開できないオブジェクトストリームの有無
+        fonts = compressed_fonts = images = unreadable = False
+
+        for dictionary, compressed in _iter_dictionaries(data, encrypted=structure.encrypted):
+            if compressed is None:
+                unreadable = True
+                continue
+            if PAGES_PATTERN.search(dictionary):
+                count = COUNT_PATTERN.search(dictionary)
+                if count:
+                    max_count = max(max_count or 0, int(count.group(1)))
+                inherited_size = inherited_size or _media_box_size(dictionary)
+            elif PAGE_PATTERN.search(dictionary):
+                page_objects += 1
+                size = _media_box_size(dictionary)
+                if size:
+                    sizes[size] += 1
+                else:
+                    unsized_pages += 1
+            if FONT_PATTERN.search(dictionary):
+                if compressed:
+                    compressed_fonts = True
+                else:
+                    fonts = True
+            images = images or IMAGE_PATTERN.search(dictionary) is not None
+
+    structure.has_text_layer = _text_layer(
+        fonts=fonts,
+        compressed_fonts=compressed_fonts,
+        images=images,
+        unreadable=unreadable,
+    )
+    # ページツリーの根は全てのページを数えるため、/Count の最大値がページ数になる
+    structure.page_count = max_count if max_count is not None else page_objects or None
+    if unsized_pages and inherited_size:
+        sizes[inherited_size] += unsized_pages
+    structure.page_sizes = [list(size) for size, _ in sizes.most_common()]
+    return structure
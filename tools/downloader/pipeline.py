@@ -0,0 +1,273 @@
+"""
+パイプライン処理モジュール
+
+年度ページと報告書一覧ページからのリンク探索(プロデューサー)と、PDFのダウンロード(コンシューマー)を
+上限付きのキューでつなぎ、次の報告書一覧ページの探索とPDFの転送を重ねて実行するクラスを提供します。
+リクエスト間隔は PolitenessScheduler が一元的に保証します。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, TypeVar
+
+from .page_parser import PdfLink, ReportListPageLink, YearPageLink
+
+# 型チェック用のインポート
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .downloader import SeijishikinDownloader
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# ダウンロードキューの既定の上限
+DEFAULT_QUEUE_SIZE = 100
+
+T = TypeVar("T")
+
+
+@dataclass
+class PageProgress:
+    """報告書一覧ページごとの処理状況"""
+
+    link: ReportListPageLink
+    pdf_links: list[PdfLink] = field(default_factory=list)
+    pending: int = 0
+    discovered_all: bool = False
+
+    @property
+    def finished(self) -> bool:
+        """全てのPDFリンクの探索と処理が終わったかどうか"""
+        return self.discovered_all and self.pending == 0
+
+
+@dataclass
+class DownloadTask:
+    """ダウンロードキューの要素"""
+
+    pdf_link: PdfLink
+    page: PageProgress
+
+
+class PipelineCrawler:
+    """リンク探索とPDFのダウンロードを並行して行うパイプライン"""
+
+    def __init__(
+        self,
+        downloader: SeijishikinDownloader,
+        workers: int = 1,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            downloader: 処理を委譲するダウンローダー
+            workers: PDFをダウンロードするワーカー数
+            queue_size: ダウンロードキューの上限(探索がダウンロードより先行しすぎないようにする)
+
+        """
+        self.downloader = downloader
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self._executor: ThreadPoolExecutor | None = None
+        self._queue: asyncio.Queue[DownloadTask | None] | None = None
+        # いずれかの処理が失敗した場合に、探索(受信スレッドを含む)を止める
+        self._stop = threading.Event()
+
+    def run(self, links: list[YearPageLink | ReportListPageLink]) -> None:
+        """
+        リンクをパイプラインで処理(同期的に呼び出し可能なエントリポイント)
+
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
+
+        """
+        asyncio.run(self.crawl(links))
+
+    async def crawl(self, links: list[YearPageLink | ReportListPageLink]) -> None:
+        """
+        リンクをパイプラインで処理
+
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
+
+        """
+        queue: asyncio.Queue[DownloadTask | None] = asyncio.Queue(maxsize=self.queue_size)
+        self._queue = queue
+        self._stop.clear()
+        # プロデューサー用に1スレッドを追加で確保する
+        executor = ThreadPoolExecutor(max_workers=self.workers + 1, thread_name_prefix="pipeline")
+        self._executor = executor
+        tasks = [
+            asyncio.ensure_future(self._produce(links)),
+            *(asyncio.ensure_future(self._consume()) for _ in range(self.workers)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 失敗した処理以外のプロデューサーとコンシューマーを止める
+            self._stop.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self._stop.set()
+            # 探索のスレッドが満杯のキューへの投入を待っている場合に備えてキューを空にし、
+            # スレッドの終了はイベントループを止めずに待つ(探索のスレッドからの投入を処理できるようにする)
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+            self._executor = None
+            self._queue = None
+
+    async def _run_blocking(self, func: Callable[..., T], *args: object) -> T:
+        """
+        ブロッキング処理をスレッドプール上で実行
+
+        Args:
+            func: 実行する関数
+            *args: 関数の引数
+
+        Returns:
+            T: 関数の戻り値
+
+        """
+        if self._executor is None:
+            msg = "クロールが開始されていません"
+            raise RuntimeError(msg)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _require_queue(self) -> asyncio.Queue[DownloadTask | None]:
+        """
+        ダウンロードキューを取得
+
+        Returns:
+            asyncio.Queue[DownloadTask | None]: ダウンロードキュー
+
+        """
+        if self._queue is None:
+            msg = "クロールが開始されていません"
+            raise RuntimeError(msg)
+        return self._queue
+
+    async def _produce(self, links: list[YearPageLink | ReportListPageLink]) -> None:
+        """
+        年度ページと報告書一覧ページを順に探索し、PDFリンクをキューに投入
+
+        Args:
+            links: 年度ページまたは報告書一覧ページのリンク
+
+        """
+        queue = self._require_queue()
+        try:
+            for link in links:
+                if isinstance(link, ReportListPageLink):
+                    logger.info("報告書一覧 %s の処理を開始します: %s", link.year, link.url)
+                    await self._produce_report_list_page(link)
+                elif isinstance(link, YearPageLink):
+                    logger.info("年度 %s の処理を開始します: %s", link.year, link.url)
+                    report_list_links = await self._run_blocking(self.downloader.parse_year_page, link)
+                    for report_list_link in report_list_links:
+                        await self._produce_report_list_page(report_list_link)
+                else:
+                    error_message = f"想定外のリンクタイプ: {type(link)}"
+                    raise TypeError(error_message)
+        finally:
+            # 全てのワーカーに終了を通知(処理を止める場合はコンシューマーも止まるため通知しない)
+            if not self._stop.is_set():
+                for _ in range(self.workers):
+                    await queue.put(None)
+
+    async def _produce_report_list_page(self, report_list_link: ReportListPageLink) -> None:
+        """
+        報告書一覧ページを探索し、PDFリンクをキューに投入
+
+        キューが上限に達している場合は空きができるまで探索を止めます。
+
+        Args:
+            report_list_link: 報告書一覧ページのリンク
+
+        """
+        queue = self._require_queue()
+        page = PageProgress(link=report_list_link)
+
+        if self.downloader.stream_links:
+            loop = asyncio.get_running_loop()
+
+            def discover() -> None:
+                pdf_links = self.downloader.iter_report_list_page(report_list_link)
+                try:
+                    for pdf_link in pdf_links:
+                        if self._stop.is_set():
+                            break
+                        # 解析したリンクをイベントループのキューに投入し、満杯の間は解析を待たせる
+                        # (ページの受信スレッドは上限のないキューに書き込むため、受信は待たない)
+                        asyncio.run_coroutine_threadsafe(self._enqueue(queue, pdf_link, page), loop).result()
+                finally:
+                    close = getattr(pdf_links, "close", None)
+                    if close is not None:
+                        close()
+
+            await self._run_blocking(discover)
+        else:
+            pdf_links = await self._run_blocking(self.downloader.parse_report_list_page, report_list_link)
+            for pdf_link in pdf_links:
+                await self._enqueue(queue, pdf_link, page)
+
+        page.discovered_all = True
+        if page.finished:
+            await self._complete(page)
+
+    async def _enqueue(
+        self,
+        queue: asyncio.Queue[DownloadTask | None],
+        pdf_link: PdfLink,
+        page: PageProgress,
+    ) -> None:
+        """
+        PDFリンクをキューに投入
+
+        Args:
+            queue: ダウンロードキュー
+            pdf_link: PDFリンク
+            page: PDFリンクを含む報告書一覧ページの処理状況
+
+        """
+        if not isinstance(pdf_link, PdfLink):
+            msg = f"想定外のリンク: {pdf_link.url}"
+            raise ValueError(msg)
+        page.pdf_links.append(pdf_link)
+        if self._stop.is_set():
+            return
+        page.pending += 1
+        await queue.put(DownloadTask(pdf_link=pdf_link, page=page))
+
+    async def _consume(self) -> None:
+        """キューからPDFリンクを取り出してダウンロード"""
+        queue = self._require_queue()
+        while (task := await queue.get()) is not None:
+            try:
+                await self._run_blocking(self.downloader.process_pdf_link, task.pdf_link, task.page.link.year)
+            finally:
+                task.page.pending -= 1
+            if task.page.finished:
+                await self._complete(task.page)
+
+    async def _complete(self, page: PageProgress) -> None:
+        """
+        報告書一覧ページの処理結果を記録
+
+        Args:
+            page: 報告書一覧ページの処理状況
+
+        """
+        await self._run_blocking(self.downloader.complete_report_list_page, page.link, page.pdf_links)
@@ -0,0 +1,348 @@
+"""
+優先度付きダウンロードモジュール
+
+PDFのダウンロードを設定可能な規則(団体種別、公表年、団体名の一覧、想定サイズ)の順に並べる
+優先度付きキューと、ダウンロードするバイト数・ファイル数・実行時間の上限(予算)を管理するクラスを提供します。
+実行時間が限られている場合でも、重要な報告書から先に保存されます。
+
+優先度の規則の例(指定順に比較):
+    category=資金管理団体,国会議員関係政治団体   列挙した団体種別を先に(列挙順)
+    year                                         新しい公表年を先に
+    year=R5,R4                                   列挙した公表年を先に(列挙順)
+    org=names.txt                                一覧ファイルの団体名を含むPDFを先に
+    size=asc                                     想定サイズ(HEADリクエストのContent-Length)の小さい順
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .name_matcher import NameMatcher, load_names
+
+# 型チェック用のインポート
+if TYPE_CHECKING:
+    from .page_parser import PdfLink, ReportListPageLink
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 優先度の規則で指定できる項目
+PRIORITY_FIELDS: tuple[str, ...] = ("category", "year", "org", "size")
+
+# サイズと時間の単位
+SIZE_UNITS: dict[str, int] = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+DURATION_UNITS: dict[str, int] = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_size(value: str) -> int:
+    """
+    サイズの指定をバイト数に変換
+
+    Args:
+        value: サイズ(例: 1048576, 500M, 5G)
+
+    Returns:
+        int: バイト数
+
+    Raises:
+        ValueError: 解釈できない場合
+
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", value, re.IGNORECASE)
+    if not match:
+        msg = f"サイズを解釈できません: {value}"
+        raise ValueError(msg)
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_duration(value: str) -> float:
+    """
+    時間の指定を秒数に変換
+
+    Args:
+        value: 時間(例: 3600, 90m, 2h)
+
+    Returns:
+        float: 秒数
+
+    Raises:
+        ValueError: 解釈できない場合
+
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", value, re.IGNORECASE)
+    if not match:
+        msg = f"時間を解釈できません: {value}"
+        raise ValueError(msg)
+    return float(match.group(1)) * DURATION_UNITS[match.group(2).lower()]
+
+
+@dataclass
+class DownloadJob:
+    """ダウンロードキューの要素"""
+
+    pdf_link: PdfLink
+    year: str
+    # HEADリクエストで取得した想定サイズ(バイト)
+    expected_size: int | None = None
+
+
+@dataclass(frozen=True)
+class PriorityRule:
+    """優先度の規則"""
+
+    field: str
+    values: tuple[str, ...] = ()
+    # org 規則で照合する団体名
+    matcher: NameMatcher | None = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def parse(cls, spec: str) -> PriorityRule:
+        """
+        規則の指定を解析
+
+        Args:
+            spec: 規則(例: category=資金管理団体,国会議員関係政治団体 / year / org=names.txt / size=asc)
+
+        Returns:
+            PriorityRule: 優先度の規則
+
+        Raises:
+            ValueError: 解釈できない場合
+
+        """
+        name, _, argument = spec.partition("=")
+        name = name.strip()
+        values = tuple(value.strip() for value in argument.split(",") if value.strip())
+        if name not in PRIORITY_FIELDS:
+            msg = f"未対応の優先度の規則です: {spec} (指定可能: {', '.join(PRIORITY_FIELDS)})"
+            raise ValueError(msg)
+        if name == "category" and not values:
+            msg = f"団体種別を指定してください: {spec}"
+            raise ValueError(msg)
+        if name == "size" and values not in (("asc",), ("desc",)):
+            msg = f"size には asc または desc を指定してください: {spec}"
+            raise ValueError(msg)
+        if name == "org":
+            if len(values) != 1:
+                msg = f"org には団体名の一覧ファイルを1つ指定してください: {spec}"
+                raise ValueError(msg)
+            return cls(name, values, NameMatcher(load_names(values[0]), exact_match=False))
+        return cls(name, values)
+
+    def key(self, job: DownloadJob) -> float:
+        """
+        ジョブの順位を取得(小さいほど先に処理する)
+
+        Args:
+            job: ダウンロードジョブ
+
+        Returns:
+            float: 順位
+
+        """
+        if self.field == "category":
+            return self._rank(job.pdf_link.category_name())
+        if self.field == "year":
+            if self.values:
+                return self._rank(job.year)
+            # 新しい公表年を先にする(解釈できない公表年は最後)
+            match = re.fullmatch(r"R(\d+)", job.year)
+            return -int(match.group(1)) if match else float("inf")
+        if self.field == "org":
+            return 0 if self.matcher and self.matcher.matches(job.pdf_link.text) else 1
+        # size: 想定サイズが分からないPDFは最後
+        if job.expected_size is None:
+            return float("inf")
+        return job.expected_size if self.values == ("asc",) else -job.expected_size
+
+    def _rank(self, value: str) -> int:
+        """
+        列挙した値の中での順位を取得
+
+        Args:
+            value: 値
+
+        Returns:
+            int: 列挙順の順位(列挙されていない場合は最後)
+
+        """
+        try:
+            return self.values.index(value)
+        except ValueError:
+            return len(self.values)
+
+
+class DownloadQueue:
+    """優先度付きのダウンロードキュー"""
+
+    def __init__(self, rules: list[PriorityRule]) -> None:
+        """
+        初期化
+
+        Args:
+            rules: 優先度の規則(指定順に比較し、同順位の場合は投入順)
+
+        """
+        self.rules = rules
+        self.draining = False
+        self._jobs: list[DownloadJob] = []
+        self._heap: list[tuple[tuple[float, ...], int, DownloadJob]] = []
+        self._sequence = itertools.count()
+        # 全てのPDFの処理が終わるまで記録を保留する報告書一覧ページ
+        self.pages: list[tuple[ReportListPageLink, list[PdfLink]]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """キュー内のジョブ数"""
+        return len(self._jobs) + len(self._heap)
+
+    @property
+    def needs_size(self) -> bool:
+        """想定サイズの取得が必要かどうか"""
+        return any(rule.field == "size" for rule in self.rules)
+
+    @property
+    def jobs(self) -> list[DownloadJob]:
+        """並べ替え前のジョブ(想定サイズの設定に使用)"""
+        return self._jobs
+
+    def push(self, pdf_link: PdfLink, year: str) -> None:
+        """
+        ジョブを投入
+
+        Args:
+            pdf_link: PDFリンク
+            year: 公表年
+
+        """
+        with self._lock:
+            self._jobs.append(DownloadJob(pdf_link=pdf_link, year=year))
+
+    def defer_page(self, link: ReportListPageLink, pdf_links: list[PdfLink]) -> None:
+        """
+        報告書一覧ページの処理結果の記録を保留
+
+        Args:
+            link: 報告書一覧ページのリンク
+            pdf_links: ページ内のPDFリンク
+
+        """
+        with self._lock:
+            self.pages.append((link, pdf_links))
+
+    def start_draining(self) -> None:
+        """投入を締め切り、優先度順に並べる"""
+        with self._lock:
+            self.draining = True
+            for job in self._jobs:
+                key = tuple(rule.key(job) for rule in self.rules)
+                heapq.heappush(self._heap, (key, next(self._sequence), job))
+            self._jobs = []
+
+    def pop(self) -> DownloadJob | None:
+        """
+        最も優先度の高いジョブを取り出す
+
+        Returns:
+            DownloadJob | None: ジョブ、空の場合はNone
+
+        """
+        with self._lock:
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+
+class DownloadBudget:
+    """ダウンロードの予算(バイト数、ファイル数、実行時間の上限)"""
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        max_files: int | None = None,
+        max_time: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            max_bytes: ダウンロードするバイト数の上限
+            max_files: ダウンロードするファイル数の上限
+            max_time: 実行時間の上限(秒、start() からの経過時間)
+            clock: 現在時刻を返す関数(テスト時にモック可能)
+
+        """
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_time = max_time
+        self.clock = clock
+        self.started = clock()
+        self.bytes = 0
+        self.files = 0
+        self._reported = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """実行時間の計測を開始"""
+        self.started = self.clock()
+
+    def exhausted(self) -> str | None:
+        """
+        予算を使い切ったかどうかを判断
+
+        Returns:
+            str | None: 使い切った予算の説明、残っている場合はNone
+
+        """
+        with self._lock:
+            reason = None
+            if self.max_bytes is not None and self.bytes >= self.max_bytes:
+                reason = f"バイト数の上限({self.max_bytes}バイト)"
+            elif self.max_files is not None and self.files >= self.max_files:
+                reason = f"ファイル数の上限({self.max_files}件)"
+            elif self.max_time is not None and self.clock() - self.started >= self.max_time:
+                reason = f"実行時間の上限({self.max_time:.0f}秒)"
+            if reason and not self._reported:
+                self._reported = True
+                logger.warning("%sに達したため、以降のダウンロードを行いません", reason)
+            return reason
+
+    def allows(self, expected_size: int | None) -> bool:
+        """
+        想定サイズのファイルをダウンロードできるかどうかを判断
+
+        Args:
+            expected_size: 想定サイズ(バイト、不明な場合はNone)
+
+        Returns:
+            bool: 予算の範囲内の場合はTrue
+
+        """
+        if self.exhausted():
+            return False
+        if expected_size is not None and self.max_bytes is not None:
+            with self._lock:
+                return self.bytes + expected_size <= self.max_bytes
+        return True
+
+    def charge(self, size: int) -> None:
+        """
+        ダウンロードしたファイルを予算に計上
+
+        Args:
+            size: ファイルサイズ(バイト)
+
+        """
+        with self._lock:
+            self.bytes += size
+            self.files += 1
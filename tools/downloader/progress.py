@@ -0,0 +1,375 @@
+"""
+進捗表示モジュール
+
+実行全体の進捗(見つけた報告書一覧ページ、処理対象のPDF、完了・失敗・スキップの件数、
+受信したバイト数と直近の転送速度、残り時間の見込み)を集計し、一定間隔ごとに1行で表示します。
+同じ内容をJSON Lines形式でファイルやファイル記述子に出力し、外部のジョブ管理から参照できます。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import IO, Any
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 端末への表示を更新する間隔(秒)
+DISPLAY_INTERVAL = 1.0
+
+# 端末以外(ログファイルなど)へ表示する場合の間隔(秒)。行を上書きできないため間隔を広げる
+NON_TTY_DISPLAY_INTERVAL = 30.0
+
+# 直近の転送速度と完了件数の速度を求める期間(秒)
+RATE_WINDOW = 30.0
+
+# ファイル記述子を出力先に指定する場合の接頭辞(例: fd:3)
+FD_PREFIX = "fd:"
+
+# PDFの処理結果
+PDF_OUTCOMES: tuple[str, ...] = ("success", "failed", "skipped")
+
+
+def open_progress_stream(target: str) -> tuple[IO[str], bool]:
+    """
+    進捗の出力先を開く
+
+    Args:
+        target: 出力先("-" は標準出力、"fd:N" はファイル記述子N、それ以外はファイルのパス)
+
+    Returns:
+        tuple[IO[str], bool]: 出力先と、終了時に閉じる必要があるかどうか
+
+    Raises:
+        ValueError: ファイル記述子の指定が不正な場合
+
+    """
+    if target == "-":
+        return sys.stdout, False
+    if target.startswith(FD_PREFIX):
+        fd = target.removeprefix(FD_PREFIX)
+        if not fd.isdigit():
+            msg = f"ファイル記述子の指定が不正です: {target}"
+            raise ValueError(msg)
+        # ファイル記述子自体は呼び出し元のものなので閉じない
+        return os.fdopen(int(fd), "w", encoding="utf-8", buffering=1, closefd=False), True
+    path = Path(target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path.open("w", encoding="utf-8", buffering=1), True
+
+
+def format_bytes(size: float) -> str:
+    """
+    バイト数を読みやすい単位に変換
+
+    Args:
+        size: バイト数
+
+    Returns:
+        str: 単位付きの文字列(例: 1.5MB)
+
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def format_duration(seconds: float | None) -> str:
+    """
+    秒数を時:分:秒の形式に変換
+
+    Args:
+        seconds: 秒数(不明な場合はNone)
+
+    Returns:
+        str: 時:分:秒の文字列(不明な場合は "--:--:--")
+
+    """
+    if seconds is None:
+        return "--:--:--"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+class ProgressReporter:
+    """
+    実行全体の進捗を集計して表示するクラス
+
+    複数のスレッドから更新されるため、集計値はロックで保護します。表示と出力は更新した
+    スレッドが一定間隔ごとに行い、表示用のスレッドは使用しません。
+    """
+
+    def __init__(
+        self,
+        *,
+        display: IO[str] | None = None,
+        stream: IO[str] | None = None,
+        close_stream: bool = False,
+        interval: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            display: 進捗を1行で表示する出力先(Noneの場合は表示しない)
+            stream: 進捗をJSON Lines形式で出力する先(Noneの場合は出力しない)
+            close_stream: 終了時に stream を閉じるかどうか
+            interval: 表示と出力の間隔(秒、Noneの場合は表示先が端末かどうかで決める)
+            clock: 経過時間の計測に使用する関数(テスト時に差し替え可能)
+            wall_clock: 出力に記録する時刻の取得に使用する関数(テスト時に差し替え可能)
+
+        """
+        self.display = display
+        self.stream = stream
+        self.close_stream = close_stream
+        # 端末の場合は行を上書きして表示する
+        self.tty = bool(display is not None and display.isatty())
+        if interval is None:
+            interval = DISPLAY_INTERVAL if self.tty or display is None else NON_TTY_DISPLAY_INTERVAL
+        self.interval = interval
+        self.clock = clock
+        self.wall_clock = wall_clock
+
+        self.pages_discovered = 0
+        self.pages_done = 0
+        self.pdfs_queued = 0
+        self.pdfs: dict[str, int] = dict.fromkeys(PDF_OUTCOMES, 0)
+        self.bytes = 0
+
+        self._lock = threading.Lock()
+        self._started = clock()
+        self._reported_at = self._started
+        # 直近の受信バイト数と完了件数の履歴(時刻, 累計)
+        self._byte_samples: deque[tuple[float, int]] = deque([(self._started, 0)])
+        self._done_samples: deque[tuple[float, int]] = deque([(self._started, 0)])
+        self._closed = False
+
+    @property
+    def pdfs_finished(self) -> int:
+        """処理を終えたPDFの件数(成功、失敗、スキップの合計)"""
+        return sum(self.pdfs.values())
+
+    def pages_found(self, count: int = 1) -> None:
+        """
+        報告書一覧ページを見つけたことを記録
+
+        Args:
+            count: 見つけたページ数
+
+        """
+        with self._lock:
+            self.pages_discovered += count
+            self._maybe_report()
+
+    def page_done(self) -> None:
+        """報告書一覧ページの解析を終えたことを記録"""
+        with self._lock:
+            self.pages_done += 1
+            self._maybe_report()
+
+    def pdf_queued(self) -> None:
+        """PDFを処理対象に加えたことを記録"""
+        with self._lock:
+            self.pdfs_queued += 1
+            self._maybe_report()
+
+    def pdf_finished(self, outcome: str) -> None:
+        """
+        PDFの処理を終えたことを記録
+
+        Args:
+            outcome: 処理結果(success, failed, skipped)
+
+        Raises:
+            ValueError: 処理結果が不正な場合
+
+        """
+        if outcome not in self.pdfs:
+            msg = f"PDFの処理結果が不正です: {outcome}"
+            raise ValueError(msg)
+        with self._lock:
+            self.pdfs[outcome] += 1
+            self._record(self._done_samples, self.pdfs_finished)
+            self._maybe_report()
+
+    def add_bytes(self, nbytes: int) -> None:
+        """
+        受信したバイト数を加算
+
+        Args:
+            nbytes: 受信したバイト数
+
+        """
+        if nbytes <= 0:
+            return
+        with self._lock:
+            self.bytes += nbytes
+            self._record(self._byte_samples, self.bytes)
+            self._maybe_report()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        現在の進捗を取得
+
+        Returns:
+            dict[str, Any]: 進捗(JSON Linesの1行分)
+
+        """
+        with self._lock:
+            return self._snapshot(self.clock())
+
+    def close(self) -> None:
+        """最終的な進捗を表示・出力し、出力先を閉じる"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._report(self.clock(), event="finished")
+            if self.display is not None and self.tty:
+                self.display.write("\n")
+                self.display.flush()
+            if self.stream is not None and self.close_stream:
+                self.stream.close()
+
+    def _maybe_report(self) -> None:
+        """前回の表示から一定時間が経過していれば表示・出力する(ロックを保持した状態で呼び出す)"""
+        if self._closed or (self.display is None and self.stream is None):
+            return
+        now = self.clock()
+        if now - self._reported_at >= self.interval:
+            self._report(now, event="progress")
+
+    def _report(self, now: float, *, event: str) -> None:
+        """
+        進捗を表示・出力する(ロックを保持した状態で呼び出す)
+
+        Args:
+            now: 現在の時刻
+            event: 出力する行の種類(progress, finished)
+
+        """
+        self._reported_at = now
+        snapshot = self._snapshot(now)
+        if self.display is not None:
+            line = self._format(snapshot)
+            # 端末では同じ行を上書きし、それ以外では1行ずつ出力する
+            self.display.write(f"\r{line}\x1b[K" if self.tty else f"{line}\n")
+            self.display.flush()
+        if self.stream is not None:
+            record = {"type": event, "time": self.wall_clock(), **snapshot}
+            try:
+                self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError:
+                # 出力先を読む側が終了した場合も、ダウンロードは継続する
+                logger.warning("進捗の出力に失敗したため、以降は出力しません")
+                self.stream = None
+
+    def _snapshot(self, now: float) -> dict[str, Any]:
+        """
+        現在の進捗を集計(ロックを保持した状態で呼び出す)
+
+        Args:
+            now: 現在の時刻
+
+        Returns:
+            dict[str, Any]: 進捗
+
+        """
+        throughput = self._rate(self._byte_samples, now)
+        pdf_rate = self._rate(self._done_samples, now)
+        remaining = max(self.pdfs_queued - self.pdfs_finished, 0)
+        # 残り時間は直近の完了件数の速度から見込む(まだ見つけていないPDFは含まない)
+        eta = remaining / pdf_rate if pdf_rate > 0 else (0.0 if remaining == 0 else None)
+        return {
+            "elapsed": round(now - self._started, 3),
+            "pages_discovered": self.pages_discovered,
+            "pages_done": self.pages_done,
+            "pdfs_queued": self.pdfs_queued,
+            "pdfs_done": self.pdfs["success"],
+            "pdfs_failed": self.pdfs["failed"],
+            "pdfs_skipped": self.pdfs["skipped"],
+            "bytes": self.bytes,
+            "throughput": round(throughput, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+    def _record(self, samples: deque[tuple[float, int]], value: int) -> None:
+        """
+        累計値の履歴を追加し、期間外の履歴を破棄する(ロックを保持した状態で呼び出す)
+
+        表示も出力もしない場合は _snapshot が呼ばれないため、ここでも履歴を破棄して増え続けないようにします。
+
+        Args:
+            samples: 時刻と累計値の履歴
+            value: 現在の累計値
+
+        """
+        now = self.clock()
+        samples.append((now, value))
+        self._prune(samples, now)
+
+    @staticmethod
+    def _prune(samples: deque[tuple[float, int]], now: float) -> None:
+        """
+        速度の計算に使わない期間外の履歴を破棄する
+
+        Args:
+            samples: 時刻と累計値の履歴
+            now: 現在の時刻
+
+        """
+        # 期間の起点として、期間より前の最後の履歴を1件残す
+        while len(samples) > 1 and samples[1][0] <= now - RATE_WINDOW:
+            samples.popleft()
+
+    @classmethod
+    def _rate(cls, samples: deque[tuple[float, int]], now: float) -> float:
+        """
+        直近の期間の増加速度を計算し、期間外の履歴を破棄する
+
+        Args:
+            samples: 時刻と累計値の履歴
+            now: 現在の時刻
+
+        Returns:
+            float: 1秒あたりの増加量
+
+        """
+        cls._prune(samples, now)
+        start_time, start_value = samples[0]
+        elapsed = now - start_time
+        if elapsed <= 0:
+            return 0.0
+        return (samples[-1][1] - start_value) / elapsed
+
+    def _format(self, snapshot: dict[str, Any]) -> str:
+        """
+        進捗を1行の文字列に変換
+
+        Args:
+            snapshot: 進捗
+
+        Returns:
+            str: 表示する文字列
+
+        """
+        return (
+            f"報告書一覧 {snapshot['pages_done']}/{snapshot['pages_discovered']} | "
+            f"PDF {self.pdfs_finished}/{snapshot['pdfs_queued']} "
+            f"(成功 {snapshot['pdfs_done']}, 失敗 {snapshot['pdfs_failed']}, スキップ {snapshot['pdfs_skipped']}) | "
+            f"{format_bytes(snapshot['bytes'])} {format_bytes(snapshot['throughput'])}/s | "
+            f"経過 {format_duration(snapshot['elapsed'])} 残り {format_duration(snapshot['eta'])}"
+        )
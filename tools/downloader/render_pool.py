@@ -0,0 +1,195 @@
+"""
+PDF描画ワーカーモジュール
+
+ダウンロードを終えたPDFを順次ワーカープロセスに渡し、pdf_to_images.pdf_to_png でページごとのPNG画像に変換します。
+クロールの完了を待たずに描画を始めることで、ネットワーク待ちの時間とCPUを使う描画を重ねて実行します。
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+
+from .layout import OutputLayout
+from .metadata import FileMetadata
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# PDFを描画する関数(PDFのパス, 画像の出力先ディレクトリ)
+RenderFunc = Callable[[str, str], None]
+
+
+def render_pdf(pdf_path: str, output_dir: str) -> None:
+    """
+    PDFの各ページをPNG画像に変換(ワーカープロセスで実行)
+
+    Args:
+        pdf_path: PDFファイルのパス
+        output_dir: 画像の出力先ディレクトリ
+
+    """
+    # pdf2image(poppler)は描画にのみ必要なため、ワーカー内で読み込む
+    from pdf_to_images import pdf_to_png
+
+    _convert_checked(pdf_to_png, pdf_path, output_dir)
+
+
+def _convert_checked(convert: RenderFunc, pdf_path: str, output_dir: str) -> None:
+    """
+    PDFを画像に変換し、画像が書き出されたことを確認
+
+    pdf_to_png は失敗しても例外を送出せずに表示のみ行うため、画像が書き出されたかどうかで成否を判断します。
+
+    Args:
+        convert: PDFを画像に変換する関数(PDFのパス, 画像の出力先ディレクトリ)
+        pdf_path: PDFファイルのパス
+        output_dir: 画像の出力先ディレクトリ
+
+    Raises:
+        FileNotFoundError: PDFファイルが存在しない場合
+        RuntimeError: 画像が1枚も書き出されなかった場合(popplerがない場合など)
+
+    """
+    if not Path(pdf_path).exists():
+        msg = f"PDFファイルが見つかりません: {pdf_path}"
+        raise FileNotFoundError(msg)
+    before = _written_images(output_dir)
+    convert(pdf_path, output_dir)
+    # 前回の描画で書き出した画像もあるため、新しく書き出された(更新された)画像があるかで判断する
+    if not any(before.get(path) != modified for path, modified in _written_images(output_dir).items()):
+        msg = f"画像を書き出せませんでした: {pdf_path}"
+        raise RuntimeError(msg)
+
+
+def _written_images(output_dir: str) -> dict[Path, int]:
+    """
+    出力先ディレクトリのPNG画像と更新日時を取得
+
+    Args:
+        output_dir: 画像の出力先ディレクトリ
+
+    Returns:
+        dict[Path, int]: 画像のパスと更新日時(ナノ秒)
+
+    """
+    return {path: path.stat().st_mtime_ns for path in Path(output_dir).glob("*.png")}
+
+
+class RenderPool:
+    """ダウンロードしたPDFを描画ワーカーのプールに渡すクラス"""
+
+    def __init__(
+        self,
+        pdf_dir: str,
+        image_dir: str,
+        *,
+        workers: int | None = None,
+        executor: Executor | None = None,
+        render_func: RenderFunc = render_pdf,
+        layout: OutputLayout | None = None,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            pdf_dir: PDFの保存先ディレクトリ
+            image_dir: 画像の出力先ディレクトリ(PDFごとにサブディレクトリを作成)
+            workers: ワーカープロセスの数(Noneの場合はCPU数)
+            executor: 描画を実行するエグゼキュータ(Noneの場合はプロセスプールを作成)
+            render_func: PDFを描画する関数(プロセスプールで実行するためモジュールの関数であること)
+            layout: PDFの保存先ディレクトリの配置(Noneの場合は直下)
+
+        """
+        self.pdf_dir = Path(pdf_dir)
+        self.image_dir = Path(image_dir)
+        self.workers = workers or os.cpu_count() or 1
+        # クローラーのスレッドが動作中にプロセスを作成するため、fork ではなく spawn を使用する
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.render_func = render_func
+        self.layout = layout or OutputLayout()
+        self.submitted = 0
+        self.rendered = 0
+        self.failed = 0
+        # 内容が同じPDFとして描画を省略した件数
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        self._futures: set[Future[None]] = set()
+        # 描画を予約したPDFのハッシュ値と画像の出力先
+        self._rendered_digests: dict[str, Path] = {}
+
+    def submit(self, metadata: FileMetadata) -> None:
+        """
+        ダウンロードを終えたPDFの描画を予約(SeijishikinDownloader の完了フックとして使用)
+
+        コンテンツストアのリンクなど、描画を予約済みのPDFとハッシュ値が同じPDFは描画しません。
+
+        Args:
+            metadata: ダウンロードを終えたPDFのメタデータ
+
+        """
+        pdf_path = self.layout.path_for(self.pdf_dir, metadata)
+        output_dir = self.image_dir / Path(metadata.filename).stem
+        with self._lock:
+            if metadata.sha256:
+                rendered_dir = self._rendered_digests.setdefault(metadata.sha256, output_dir)
+                if rendered_dir != output_dir:
+                    self.deduplicated += 1
+                    logger.debug("同じ内容のPDFは描画済みです: %s -> %s", pdf_path, rendered_dir)
+                    return
+            future = self.executor.submit(self.render_func, str(pdf_path), str(output_dir))
+            self.submitted += 1
+            self._futures.add(future)
+        future.add_done_callback(lambda done: self._on_done(done, pdf_path))
+
+    def _on_done(self, future: Future[None], pdf_path: Path) -> None:
+        """
+        描画の完了を記録
+
+        Args:
+            future: 描画の結果
+            pdf_path: 描画したPDFのパス
+
+        """
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._futures.discard(future)
+            if future.cancelled() or error is not None:
+                self.failed += 1
+            else:
+                self.rendered += 1
+        if error is not None:
+            logger.error("PDFの描画に失敗しました: %s: %s", pdf_path, error)
+
+    @property
+    def pending(self) -> int:
+        """描画が終わっていないPDFの件数"""
+        with self._lock:
+            return len(self._futures)
+
+    def close(self, *, cancel: bool = False) -> None:
+        """
+        描画ワーカーを終了(実行中の描画が終わり、ワーカープロセスが終了するまで待つ)
+
+        Args:
+            cancel: 未着手の描画を取り消すかどうか(Falseの場合は予約済みの描画が全て終わるまで待つ)
+
+        """
+        if self.pending and not cancel:
+            logger.info("残り %d 件のPDFの描画を待っています", self.pending)
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
+        logger.info(
+            "PDFの描画: 予約=%d, 完了=%d, 失敗=%d, 同じ内容のため省略=%d",
+            self.submitted,
+            self.rendered,
+            self.failed,
+            self.deduplicated,
+        )
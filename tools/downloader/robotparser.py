@@ -2,71 +2,168 @@
 robots.txtパーサーモジュール
 
 Webサイトのrobots.txtファイルを解析し、アクセス可能かどうかを判断するクラスを提供します。
+robots.txtは共有のrequestsセッションで取得し、有効期間内はディスク上のキャッシュを再利用します。
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import os
+import re
+import threading
 import time
 import urllib.robotparser
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from http import HTTPStatus
+from pathlib import Path
 from urllib.parse import urlparse
 
+import requests
+
+from .metrics import MetricsRecorder
+
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+DEFAULT_ROBOTS_CACHE_DIR = ".robots"
+
+# robots.txtを再取得するまでの最大期間(秒)
+ROBOTS_TTL = 86400  # 1日
+
+# robots.txtを再取得するまでの最小期間(秒)。max-age=0 や no-cache でもリクエストのたびに取得しない
+MIN_ROBOTS_TTL = 300  # 5分
+
+# 取得できなかった(5xx・通信エラー)robots.txtを再試行するまでの期間(秒)
+ROBOTS_RETRY_TTL = 300  # 5分
+
+# robots.txt取得時のタイムアウト(秒)
+ROBOTS_TIMEOUT = 30
+
+
+@dataclass
+class RobotsCacheEntry:
+    """robots.txtのキャッシュエントリ"""
+
+    domain: str
+    status: int
+    body: str
+    fetched_at: float
+    expires_at: float
+
+
+def _max_age(cache_control: str | None) -> int | None:
+    """
+    Cache-Controlヘッダからmax-ageを取得
+
+    Args:
+        cache_control: Cache-Controlヘッダの値
+
+    Returns:
+        int | None: max-age(秒、no-cache / no-store の場合は0)、指定されていない場合はNone
+
+    """
+    if not cache_control:
+        return None
+    if re.search(r"\bno-(cache|store)\b", cache_control):
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
 
 class RobotsChecker:
     """robots.txtチェッカークラス"""
 
-    def __init__(self, user_agent: str) -> None:
+    def __init__(
+        self,
+        user_agent: str,
+        *,
+        session: requests.Session | None = None,
+        cache_dir: str | Path | None = None,
+        check_interval: float = ROBOTS_TTL,
+        clock: Callable[[], float] = time.time,
+        metrics: MetricsRecorder | None = None,
+    ) -> None:
         """
         初期化
 
         Args:
             user_agent: ユーザーエージェント
+            session: robots.txtの取得に使用するセッション(Noneの場合は新規作成)
+            cache_dir: robots.txtのキャッシュを保存するディレクトリ(Noneの場合はメモリ上のみ)
+            check_interval: robots.txtを再取得するまでの最大期間(秒)。
+                Cache-Controlのmax-ageがこれより短い場合はそちらを優先する
+            clock: 現在時刻を返す関数(テスト時にモック可能)
+            metrics: リクエストの計測結果の記録先
 
         """
         self.user_agent = user_agent
+        self.session = session or requests.Session()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.check_interval = check_interval
+        self.clock = clock
+        self.metrics = metrics
         self.parsers: dict[str, urllib.robotparser.RobotFileParser] = {}
-        self.last_checked: dict[str, float] = {}
-        self.check_interval = 86400  # 1日(秒)
+        self.expires_at: dict[str, float] = {}
+        # 並行クロール時に同じドメインのrobots.txtを重複して取得しないようにする
+        self._lock = threading.Lock()
 
-    def can_fetch(self, url: str) -> bool:
+    @staticmethod
+    def _domain_of(url: str) -> str:
         """
-        URLにアクセス可能かどうかを確認
+        URLからドメイン部分を抽出
 
         Args:
-            url: 確認するURL
+            url: URL
 
         Returns:
-            bool: アクセス可能な場合はTrue、そうでない場合はFalse
+            str: スキームとホスト名(例: https://example.com)
 
         """
-        # URLからドメイン部分を抽出
         parsed_url = urlparse(url)
-        domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
 
-        # ドメインごとにRobotFileParserを管理
-        if domain not in self.parsers or self._should_refresh(domain):
-            self._init_parser(domain)
+    def _parser_for(self, url: str) -> urllib.robotparser.RobotFileParser:
+        """
+        URLのドメインに対応するパーサーを取得(必要に応じてrobots.txtを取得)
 
-        # アクセス可能かどうかを確認
-        try:
-            can_fetch = self.parsers[domain].can_fetch(self.user_agent, url)
-            if not can_fetch:
-                logger.warning("robots.txtによりアクセスが禁止されています: %s", url)
-        except OSError:
-            logger.exception(
-                "robots.txtの確認中にエラーが発生しました: %s",
-                url,
-            )
+        Args:
+            url: URL
 
-        return True
+        Returns:
+            urllib.robotparser.RobotFileParser: パーサー
+
+        """
+        domain = self._domain_of(url)
+        with self._lock:
+            if domain not in self.parsers or self._should_refresh(domain):
+                self._init_parser(domain)
+            return self.parsers[domain]
+
+    def can_fetch(self, url: str) -> bool:
+        """
+        URLにアクセス可能かどうかを確認
+
+        Args:
+            url: 確認するURL
+
+        Returns:
+            bool: アクセス可能な場合はTrue、そうでない場合はFalse
+
+        """
+        can_fetch = self._parser_for(url).can_fetch(self.user_agent, url)
+        if not can_fetch:
+            logger.debug("robots.txtにより禁止されています: %s", url)
+        return can_fetch
 
     def get_crawl_delay(self, url: str) -> float | None:
         """
         クロール遅延を取得
 
+        Crawl-delay と Request-rate の両方が指定されている場合は、より長い間隔を返します。
+
         Args:
             url: 確認するURL
 
@@ -74,51 +171,195 @@ class RobotsChecker:
             float | None: クロール遅延(秒)、設定されていない場合はNone
 
         """
-        # URLからドメイン部分を抽出
-        parsed_url = urlparse(url)
-        domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
-
-        # ドメインごとにRobotFileParserを管理
-        if domain not in self.parsers or self._should_refresh(domain):
-            self._init_parser(domain)
+        parser = self._parser_for(url)
 
-        # クロール遅延を取得
-        delay = None
+        delays: list[float] = []
         try:
-            crawl_delay = self.parsers[domain].crawl_delay(self.user_agent)
+            crawl_delay = parser.crawl_delay(self.user_agent)
             if crawl_delay is not None:
                 # 文字列の場合はfloatに変換
-                delay = float(crawl_delay)
-                logger.debug("robots.txtで指定されたクロール遅延: %s秒", delay)
-        except (OSError, ValueError, TypeError):
+                delays.append(float(crawl_delay))
+            request_rate = parser.request_rate(self.user_agent)
+            if request_rate is not None and request_rate.requests > 0:
+                delays.append(request_rate.seconds / request_rate.requests)
+        except (ValueError, TypeError):
             logger.exception(
                 "クロール遅延の取得中にエラーが発生しました: %s",
                 url,
             )
+
+        if not delays:
+            return None
+        delay = max(delays)
+        logger.debug("robots.txtで指定されたクロール遅延: %s秒", delay)
         return delay
 
     def _init_parser(self, domain: str) -> None:
         """
-        パーサーを初期化
+        パーサーを初期化(有効なディスクキャッシュがあればそれを使用)
 
         Args:
             domain: ドメイン
 
         """
-        try:
+        cached = self._load_cache(domain)
+        entry = cached
+        if entry is None or entry.expires_at <= self.clock():
+            entry = self._fetch(domain)
+            if entry is None:
+                self._init_unreachable(domain, cached)
+                return
+            self._save_cache(entry)
+
+        self.parsers[domain] = self._build_parser(entry)
+        self.expires_at[domain] = entry.expires_at
+
+    def _init_unreachable(self, domain: str, cached: RobotsCacheEntry | None) -> None:
+        """
+        robots.txtを取得できなかった(5xx・通信エラー)場合のパーサーを初期化
+
+        RFC 9309 に従い、サイト全体を禁止として扱います。以前に取得したrobots.txtが
+        キャッシュにあれば期限切れでもそれを使用します。いずれの場合も短い間隔で再試行します。
+
+        Args:
+            domain: ドメイン
+            cached: 期限切れのキャッシュエントリ
+
+        """
+        if cached is not None:
+            logger.warning("以前に取得したrobots.txtを使用します: %s", domain)
+            parser = self._build_parser(cached)
+        elif domain in self.parsers:
+            logger.warning("以前に取得したrobots.txtを使用します: %s", domain)
+            parser = self.parsers[domain]
+        else:
+            logger.warning("robots.txtを取得できるまでアクセスを控えます: %s", domain)
             parser = urllib.robotparser.RobotFileParser()
-            robots_url = f"{domain}/robots.txt"
-            parser.set_url(robots_url)
-            logger.info("robots.txtを取得しています: %s", robots_url)
-            parser.read()
-            self.parsers[domain] = parser
-            self.last_checked[domain] = time.time()
-            logger.debug("robots.txtを解析しました: %s", robots_url)
-        except OSError:
+            parser.disallow_all = True
+        self.parsers[domain] = parser
+        self.expires_at[domain] = self.clock() + ROBOTS_RETRY_TTL
+
+    def _fetch(self, domain: str) -> RobotsCacheEntry | None:
+        """
+        robots.txtを取得
+
+        Args:
+            domain: ドメイン
+
+        Returns:
+            RobotsCacheEntry | None: 取得結果、通信に失敗した場合はNone
+
+        """
+        robots_url = f"{domain}/robots.txt"
+        logger.info("robots.txtを取得しています: %s", robots_url)
+        try:
+            if self.metrics:
+                response = self.metrics.send(
+                    "robots",
+                    robots_url,
+                    lambda: self.session.get(robots_url, timeout=ROBOTS_TIMEOUT),
+                )
+            else:
+                response = self.session.get(robots_url, timeout=ROBOTS_TIMEOUT)
+        except requests.RequestException:
             logger.exception("robots.txtの取得に失敗しました: %s", domain)
-            # エラーの場合は空のパーサーを設定
-            self.parsers[domain] = urllib.robotparser.RobotFileParser()
-            self.last_checked[domain] = time.time()
+            return None
+
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            logger.warning("robots.txtの取得に失敗しました(%d): %s", response.status_code, domain)
+            return None
+
+        now = self.clock()
+        ttl: float = self.check_interval
+        max_age = _max_age(response.headers.get("Cache-Control"))
+        if max_age is not None:
+            ttl = min(ttl, max(max_age, MIN_ROBOTS_TTL))
+        return RobotsCacheEntry(
+            domain=domain,
+            status=response.status_code,
+            body=response.text if response.status_code == HTTPStatus.OK else "",
+            fetched_at=now,
+            expires_at=now + ttl,
+        )
+
+    @staticmethod
+    def _build_parser(entry: RobotsCacheEntry) -> urllib.robotparser.RobotFileParser:
+        """
+        取得結果からパーサーを生成(ステータスコードの扱いは urllib.robotparser に準拠)
+
+        Args:
+            entry: robots.txtの取得結果
+
+        Returns:
+            urllib.robotparser.RobotFileParser: パーサー
+
+        """
+        parser = urllib.robotparser.RobotFileParser(f"{entry.domain}/robots.txt")
+        if entry.status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+            parser.disallow_all = True
+        elif entry.status >= HTTPStatus.BAD_REQUEST:
+            parser.allow_all = True
+        else:
+            parser.parse(entry.body.splitlines())
+        parser.modified()
+        return parser
+
+    def _cache_path(self, domain: str) -> Path | None:
+        """
+        ドメインに対応するキャッシュファイルのパスを取得
+
+        Args:
+            domain: ドメイン
+
+        Returns:
+            Path | None: キャッシュファイルのパス、キャッシュを使用しない場合はNone
+
+        """
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(domain.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def _load_cache(self, domain: str) -> RobotsCacheEntry | None:
+        """
+        ディスク上のキャッシュを読み込む
+
+        Args:
+            domain: ドメイン
+
+        Returns:
+            RobotsCacheEntry | None: キャッシュエントリ、存在しない場合はNone
+
+        """
+        path = self._cache_path(domain)
+        if path is None or not path.exists():
+            return None
+        try:
+            with path.open(encoding="utf-8") as f:
+                return RobotsCacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            logger.warning("robots.txtのキャッシュを読み込めませんでした: %s", domain)
+            return None
+
+    def _save_cache(self, entry: RobotsCacheEntry) -> None:
+        """
+        キャッシュをディスクに保存
+
+        Args:
+            entry: キャッシュエントリ
+
+        """
+        path = self._cache_path(entry.domain)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("robots.txtのキャッシュの保存に失敗しました: %s", entry.domain)
 
     def _should_refresh(self, domain: str) -> bool:
         """
@@ -131,8 +372,7 @@ class RobotsChecker:
             bool: 更新すべき場合はTrue、そうでない場合はFalse
 
         """
-        if domain not in self.last_checked:
+        if domain not in self.expires_at:
             return True
 
-        current_time = time.time()
-        return (current_time - self.last_checked[domain]) > self.check_interval
+        return self.clock() >= self.expires_at[domain]
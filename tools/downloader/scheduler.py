@@ -0,0 +1,272 @@
+"""
+リクエストスケジューラモジュール
+
+ホストごとのリクエスト間隔を一元的に管理し、複数のリクエストを並行して実行する場合でも
+サーバーへの負荷が一定以下になるようにするクラスを提供します。
+robots.txtでクロール遅延が指定されている場合は、そのホストの間隔をクロール遅延まで広げます。
+また、429/503応答ではRetry-Afterに従って待機し、応答時間が長いホストでは間隔を自動的に広げます。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+from .config import MIN_DELAY
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# サーバーが負荷を理由に拒否したことを示すステータスコード
+THROTTLE_STATUSES: frozenset[int] = frozenset({HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE})
+
+# Retry-Afterがない場合のバックオフの上限(秒)
+MAX_BACKOFF = 300.0
+
+# 応答時間に応じて広げるリクエスト間隔の上限(秒)
+MAX_ADAPTIVE_INTERVAL = 60.0
+
+# 応答時間の指数移動平均の重み
+LATENCY_SMOOTHING = 0.3
+
+
+def parse_retry_after(value: str | None, *, now: float | None = None) -> float | None:
+    """
+    Retry-Afterヘッダを待機時間に変換
+
+    Args:
+        value: Retry-Afterヘッダの値(秒数またはHTTP日付)
+        now: 現在時刻(UNIX時刻、Noneの場合は time.time())
+
+    Returns:
+        float | None: 待機時間(秒)、解釈できない場合はNone
+
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    current = time.time() if now is None else now
+    return max(0.0, retry_at.timestamp() - current)
+
+
+class PolitenessScheduler:
+    """ホストごとのリクエスト間隔を保証するスケジューラ"""
+
+    def __init__(
+        self,
+        min_interval: float = MIN_DELAY,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep_func: Callable[[float], None] = time.sleep,
+        crawl_delay: Callable[[str], float | None] | None = None,
+        latency_factor: float = 1.0,
+        max_backoff: float = MAX_BACKOFF,
+        global_interval: float = 0.0,
+        on_wait: Callable[[str, float], None] | None = None,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            min_interval: 同一ホストへのリクエスト開始間隔の最小値(秒)
+            clock: 現在時刻を返す関数(テスト時にモック可能)
+            sleep_func: 待機処理を行う関数(テスト時にモック可能)
+            crawl_delay: URLに対するクロール遅延(秒)を返す関数(RobotsChecker.get_crawl_delay など)
+            latency_factor: 応答時間の平均に掛けてリクエスト間隔とする係数(0の場合は応答時間に適応しない)
+            max_backoff: Retry-Afterがない場合のバックオフの上限(秒)
+            global_interval: ホストによらない全リクエストの開始間隔の最小値(秒、0の場合は制限なし)
+            on_wait: 待機するたびにURLと待機時間(秒)を受け取る関数(MetricsRecorder.record_sleep など)
+
+        """
+        self.min_interval = min_interval
+        self.clock = clock
+        self.sleep_func = sleep_func
+        self.crawl_delay = crawl_delay
+        self.latency_factor = latency_factor
+        self.max_backoff = max_backoff
+        self.global_interval = global_interval
+        self.on_wait = on_wait
+        self._next_global_slot = 0.0
+        self._next_slot: dict[str, float] = {}
+        self._crawl_delays: dict[str, float] = {}
+        self._latencies: dict[str, float] = {}
+        self._backoff_levels: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # 待機時間の集計
+        self.total_wait = 0.0
+        self.wait_count = 0
+        self.backoff_count = 0
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """
+        URLからホスト名を取得
+
+        Args:
+            url: URL
+
+        Returns:
+            str: ホスト名(ポート番号を含む)
+
+        """
+        return urlparse(url).netloc
+
+    def interval_for(self, host: str) -> float:
+        """
+        ホストに適用するリクエスト間隔を取得
+
+        Args:
+            host: ホスト名
+
+        Returns:
+            float: リクエスト間隔(秒)。最小間隔、クロール遅延、応答時間に応じた間隔の最大値
+
+        """
+        adaptive = min(self._latencies.get(host, 0.0) * self.latency_factor, MAX_ADAPTIVE_INTERVAL)
+        return max(self.min_interval, self._crawl_delays.get(host, 0.0), adaptive)
+
+    def _update_crawl_delay(self, url: str) -> None:
+        """
+        URLのホストのクロール遅延を更新
+
+        Args:
+            url: リクエスト先のURL
+
+        """
+        if self.crawl_delay is None:
+            return
+        # robots.txtの取得を伴う場合があるため、ロックの外で問い合わせる
+        delay = self.crawl_delay(url)
+        host = self.host_of(url)
+        with self._lock:
+            if delay is None:
+                self._crawl_delays.pop(host, None)
+            else:
+                if delay > self.min_interval and self._crawl_delays.get(host) != delay:
+                    logger.info("robots.txtのクロール遅延 %s秒 を適用します: %s", delay, host)
+                self._crawl_delays[host] = delay
+
+    def reserve(self, url: str) -> float:
+        """
+        URLのホストに対する次のリクエスト枠を予約
+
+        予約はスレッドセーフに行われ、同じホストへの予約同士は必ず
+        リクエスト間隔以上離れた時刻に割り当てられます。
+        全体の間隔が指定されている場合は、ホストによらず全ての予約がその間隔以上離れます。
+
+        Args:
+            url: リクエスト先のURL
+
+        Returns:
+            float: 予約した枠までの待機時間(秒)
+
+        """
+        self._update_crawl_delay(url)
+        host = self.host_of(url)
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next_slot.get(host, now), self._next_global_slot)
+            self._next_slot[host] = slot + self.interval_for(host)
+            if self.global_interval > 0:
+                self._next_global_slot = slot + self.global_interval
+        return slot - now
+
+    def record_response(
+        self,
+        url: str,
+        status_code: int | None,
+        *,
+        retry_after: str | None = None,
+        latency: float | None = None,
+    ) -> None:
+        """
+        リクエストの結果を記録し、以降のリクエスト間隔に反映
+
+        429/503応答や通信エラーの場合は、Retry-After(指定がなければ指数的に伸ばした間隔)だけ
+        そのホストへの次のリクエストを遅らせます。成功した場合はバックオフを解除し、
+        応答時間の平均を更新します。
+
+        Args:
+            url: リクエスト先のURL
+            status_code: ステータスコード(通信エラーの場合はNone)
+            retry_after: Retry-Afterヘッダの値
+            latency: リクエストから応答ヘッダの受信までの時間(秒)
+
+        """
+        host = self.host_of(url)
+        with self._lock:
+            if latency is not None and status_code is not None:
+                previous = self._latencies.get(host)
+                self._latencies[host] = (
+                    latency if previous is None else previous + LATENCY_SMOOTHING * (latency - previous)
+                )
+
+            if status_code is not None and status_code not in THROTTLE_STATUSES:
+                self._backoff_levels.pop(host, None)
+                return
+
+            level = self._backoff_levels.get(host, 0) + 1
+            self._backoff_levels[host] = level
+            backoff = parse_retry_after(retry_after)
+            if backoff is None:
+                backoff = min(self.interval_for(host) * 2**level, self.max_backoff)
+            now = self.clock()
+            self._next_slot[host] = max(self._next_slot.get(host, now), now + backoff)
+            self.backoff_count += 1
+        logger.warning("%sのため %.1f秒 後まで待機します: %s", status_code or "通信エラー", backoff, host)
+
+    def _account_wait(self, url: str, delay: float) -> None:
+        """
+        待機時間を集計
+
+        Args:
+            url: 待機後にリクエストするURL
+            delay: 待機時間(秒)
+
+        """
+        with self._lock:
+            self.total_wait += delay
+            self.wait_count += 1
+        if self.on_wait:
+            self.on_wait(url, delay)
+
+    def wait(self, url: str) -> None:
+        """
+        リクエスト可能になるまで待機(同期版)
+
+        Args:
+            url: リクエスト先のURL
+
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            logger.debug("%.2f秒待機します: %s", delay, url)
+            self._account_wait(url, delay)
+            self.sleep_func(delay)
+
+    async def wait_async(self, url: str) -> None:
+        """
+        リクエスト可能になるまで待機(非同期版)
+
+        Args:
+            url: リクエスト先のURL
+
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            logger.debug("%.2f秒待機します: %s", delay, url)
+            self._account_wait(url, delay)
+            await asyncio.sleep(delay)
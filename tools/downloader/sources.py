@@ -0,0 +1,207 @@
+"""
+公開元アダプタモジュール
+
+総務省以外の公開元(都道府県選挙管理委員会のサイトなど)から政治資金収支報告書のリンクを取得する
+アダプタを提供します。アダプタは PageParser を継承し、取得・キャッシュ・リクエスト間隔制御を共有したまま、
+リンクの抽出方法だけを公開元ごとの設定で切り替えます。
+
+公開元の設定ファイル(JSON)の例:
+    [
+        {
+            "name": "example-pref",
+            "base_url": "https://www.pref.example.lg.jp/senkyo/seijishikin/",
+            "report_list_pattern": "/seijishikin/r\\\\d+/",
+            "encoding": "utf-8"
+        }
+    ]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urljoin, urlparse
+
+from .page_parser import PageParser, PdfLink, ReportListPageLink, YearPageLink
+from .utils import extract_year_from_url
+
+# 型チェック用のインポート
+if TYPE_CHECKING:
+    import requests
+
+    from .html_links import Anchor
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SourceConfig:
+    """公開元の設定"""
+
+    # 公開元の名前(ファイル名の接頭辞やログに使用)
+    name: str
+    # 報告書一覧ページへのリンクを含むトップページのURL
+    base_url: str
+    # トップページ上の報告書一覧ページへのリンクのhrefに一致する正規表現
+    # (Noneの場合はトップページ自体を報告書一覧ページとして扱う)
+    report_list_pattern: str | None = None
+    # 報告書一覧ページ上のPDFへのリンクのhrefに一致する正規表現
+    pdf_pattern: str = r"\.pdf$"
+    # リンクのテキストから公表年を抽出できない場合の公表年
+    year: str | None = None
+    # ページの文字コード
+    encoding: str = "utf-8"
+
+    @property
+    def host(self) -> str:
+        """公開元のホスト名"""
+        return urlparse(self.base_url).netloc
+
+
+def load_sources(path: str | Path) -> list[SourceConfig]:
+    """
+    公開元の設定ファイルを読み込む
+
+    Args:
+        path: 設定ファイルのパス(公開元の設定のJSON配列)
+
+    Returns:
+        list[SourceConfig]: 公開元の設定のリスト
+
+    Raises:
+        ValueError: 設定ファイルの形式が正しくない場合
+
+    """
+    with Path(path).open(encoding="utf-8") as f:
+        items = json.load(f)
+    if not isinstance(items, list):
+        msg = f"公開元の設定はJSON配列で記述してください: {path}"
+        raise ValueError(msg)
+
+    sources: list[SourceConfig] = []
+    names: set[str] = set()
+    for item in items:
+        try:
+            source = SourceConfig(**item)
+        except TypeError as e:
+            msg = f"公開元の設定が正しくありません: {item}"
+            raise ValueError(msg) from e
+        if not source.name or not source.base_url:
+            msg = f"公開元の設定には name と base_url が必要です: {item}"
+            raise ValueError(msg)
+        if source.name in names:
+            msg = f"公開元の名前が重複しています: {source.name}"
+            raise ValueError(msg)
+        names.add(source.name)
+        sources.append(source)
+
+    logger.info("公開元の設定を読み込みました: %d件 (%s)", len(sources), path)
+    return sources
+
+
+class SourcePageParser(PageParser):
+    """設定に基づいて総務省以外の公開元のページを解析するアダプタ"""
+
+    def __init__(self, source: SourceConfig, session: requests.Session, **kwargs: Any) -> None:
+        """
+        初期化
+
+        Args:
+            source: 公開元の設定
+            session: リクエストセッション
+            **kwargs: PageParser に渡す引数(base_url と encoding は公開元の設定を使用)
+
+        """
+        super().__init__(session, base_url=source.base_url, encoding=source.encoding, **kwargs)
+        self.source = source
+        self._report_list_regex = re.compile(source.report_list_pattern) if source.report_list_pattern else None
+        self._pdf_regex = re.compile(source.pdf_pattern, re.IGNORECASE)
+
+    def get_year_and_report_urls(self) -> list[YearPageLink | ReportListPageLink]:
+        """
+        公開元の報告書一覧ページのURLを取得
+
+        Returns:
+            list[YearPageLink | ReportListPageLink]: 報告書一覧ページのリンクのリスト
+
+        """
+        logger.info("%s の報告書一覧ページを取得しています", self.source.name)
+
+        # トップページ自体にPDFへのリンクが並んでいる場合
+        if self._report_list_regex is None:
+            year = self.source.year or ""
+            if year and not self._should_include_year(year):
+                return []
+            return [ReportListPageLink(url=self.base_url, text=self.source.name, year=year, source=self.source.name)]
+
+        html = self._fetch_url(self.base_url)
+        if not html:
+            return []
+
+        return list(self._extract_source_report_list_links(self._extract_anchors(html)))
+
+    def _extract_source_report_list_links(self, anchors: list[Anchor]) -> list[ReportListPageLink]:
+        """
+        <a> 要素から報告書一覧ページへのリンクを抽出
+
+        Args:
+            anchors: <a> 要素のリスト
+
+        Returns:
+            list[ReportListPageLink]: 報告書一覧ページのリンクのリスト(重複を除く)
+
+        """
+        links: dict[str, ReportListPageLink] = {}
+        for anchor in anchors:
+            href = anchor.href
+            text = anchor.text.strip()
+            if not href or not text or not self._report_list_regex or not self._report_list_regex.search(href):
+                continue
+
+            url = urljoin(self.base_url, href)
+            year = extract_year_from_url(text) or self.source.year
+            if not year:
+                logger.debug("公表年が分からないリンクをスキップします: %s", url)
+                continue
+            if self._should_include_year(year) and url not in links:
+                links[url] = ReportListPageLink(url=url, text=text, year=year, source=self.source.name)
+                logger.debug("報告書一覧URLを追加: %s (%s)", url, year)
+
+        return list(links.values())
+
+    def _extract_direct_pdf_links(
+        self,
+        anchors: list[Anchor],
+        report_list_url: str,
+    ) -> list[PdfLink]:
+        """
+        <a> 要素から公開元のPDFリンクを抽出
+
+        Args:
+            anchors: <a> 要素のリスト
+            report_list_url: 報告書一覧ページのURL
+
+        Returns:
+            list[PdfLink]: PDFリンクのリスト
+
+        """
+        links: list[PdfLink] = []
+        for anchor in anchors:
+            href = anchor.href
+            text = anchor.text.strip()
+            if not href or not text or not self._pdf_regex.search(href):
+                continue
+            links.append(
+                PdfLink(
+                    url=urljoin(report_list_url, href),
+                    text=text,
+                    report_list_url=report_list_url,
+                    source=self.source.name,
+                ),
+            )
+        return links
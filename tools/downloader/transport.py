@@ -0,0 +1,304 @@
+"""
+通信モジュール
+
+接続プールの大きさとキープアライブを明示的に設定したセッションと、
+大きな再利用バッファへ読み込んでレスポンスの本文を転送する関数を提供します。
+
+HTTP/2 には対応していません(requests / urllib3 が HTTP/1.1 のみに対応しているため)。
+同じホストへの接続をキープアライブで再利用することで、接続確立の負担を抑えます。
+新しい接続を確立した場合は、名前解決と接続確立(TLSハンドシェイクを含む)の時間を
+スレッドごとに記録し、リクエストの計測(metrics モジュール)で参照できるようにします。
+
+名前解決の計測は urllib3 の接続クラスの非公開の実装(_new_conn と _dns_host)に依存するため、
+対応を確認した urllib3 のメジャーバージョン(pyproject.toml で固定)でのみ有効にし、
+それ以外のバージョンでは計測せずに urllib3 の既定の接続プールを使用します。
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    DecodeError,
+    NameResolutionError,
+    NewConnectionError,
+    ProtocolError,
+    ReadTimeoutError,
+    SSLError,
+)
+from urllib3.util.connection import allowed_gai_family
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 接続プールの既定の大きさ(ホスト数、ホストごとの接続数)
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+# リクエストのタイムアウト(接続, 受信の間隔)(秒)。応答のないサーバーでワーカーが止まり続けないようにする
+DEFAULT_TIMEOUT: tuple[float, float] = (10.0, 60.0)
+
+# 本文の転送に使用するバッファの大きさ(バイト)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 接続確立の計測に対応した urllib3 のメジャーバージョン
+TIMED_URLLIB3_MAJOR = 2
+
+# スレッドごとの接続確立の計測結果
+_local = threading.local()
+
+
+@dataclass
+class ConnectionTimings:
+    """接続確立にかかった時間(秒)"""
+
+    # 名前解決
+    dns: float = 0.0
+    # TCP接続とTLSハンドシェイク(名前解決を除く)
+    connect: float = 0.0
+
+
+def supports_connection_timing(version: str = urllib3.__version__) -> bool:
+    """
+    接続確立の計測に対応した urllib3 かどうかを判断
+
+    Args:
+        version: urllib3 のバージョン
+
+    Returns:
+        bool: 計測に対応したメジャーバージョンの場合はTrue
+
+    """
+    major = version.split(".", 1)[0]
+    return major.isdigit() and int(major) == TIMED_URLLIB3_MAJOR
+
+
+def connection_timings() -> ConnectionTimings:
+    """
+    現在のスレッドで確立した接続の計測結果を取得
+
+    Returns:
+        ConnectionTimings: reset_connection_timings() 以降に確立した接続の合計時間
+
+    """
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        timings = _local.timings = ConnectionTimings()
+    return timings
+
+
+def reset_connection_timings() -> None:
+    """現在のスレッドの接続確立の計測結果を破棄(リクエストの送信前に呼び出す)"""
+    _local.timings = ConnectionTimings()
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """名前解決と接続確立の時間を計測するHTTP接続"""
+
+    def connect(self) -> None:
+        """接続を確立し、名前解決を除いた時間を記録"""
+        started = time.perf_counter()
+        dns_before = connection_timings().dns
+        super().connect()
+        timings = connection_timings()
+        timings.connect += time.perf_counter() - started - (timings.dns - dns_before)
+
+    def _new_conn(self) -> socket.socket:
+        """
+        名前解決の時間を計測してからソケットを接続
+
+        解決したアドレスを順に試し、最初に接続できたソケットを返します(urllib3 と同じ動作)。
+        urllib3 2.x の HTTPConnection._new_conn が _dns_host に接続することに依存します
+        (supports_connection_timing を参照)。
+
+        Returns:
+            socket.socket: 接続したソケット
+
+        Raises:
+            NameResolutionError: 名前解決に失敗した場合
+            NewConnectionError: いずれのアドレスにも接続できなかった場合
+            ConnectTimeoutError: 接続がタイムアウトした場合
+
+        """
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        finally:
+            connection_timings().dns += time.perf_counter() - started
+
+        dns_host = self._dns_host
+        error: Exception | None = None
+        try:
+            for *_, address in addresses:
+                # 解決済みのアドレスに直接接続する(TLSのサーバー名には元のホスト名が使われる)
+                self._dns_host = address[0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+        finally:
+            self._dns_host = dns_host
+        if error is None:
+            msg = "getaddrinfo returns an empty list"
+            raise NewConnectionError(self, msg)
+        raise error
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """名前解決と接続確立(TLSハンドシェイクを含む)の時間を計測するHTTPS接続"""
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """計測付きのHTTP接続プール"""
+
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """計測付きのHTTPS接続プール"""
+
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """計測付きの接続プールを使用し、既定のタイムアウトを設定するアダプタ"""
+
+    def __init__(
+        self, *args: Any, timeout: tuple[float, float] | float | None = DEFAULT_TIMEOUT, **kwargs: Any
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            *args: HTTPAdapter に渡す引数
+            timeout: タイムアウトを指定しないリクエストに使用するタイムアウト(秒)
+            **kwargs: HTTPAdapter に渡す引数
+
+        """
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        """
+        リクエストを送信(タイムアウトの指定がない場合は既定のタイムアウトを使用)
+
+        Args:
+            request: リクエスト
+            **kwargs: HTTPAdapter.send に渡す引数
+
+        Returns:
+            requests.Response: レスポンス
+
+        """
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        """接続プールの管理を初期化し、対応した urllib3 の場合は計測付きの接続プールを使用するよう設定"""
+        super().init_poolmanager(*args, **kwargs)
+        if not supports_connection_timing():
+            logger.debug("urllib3 %s では接続確立の時間を計測しません", urllib3.__version__)
+            return
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def create_session(
+    *,
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    user_agent: str | None = None,
+    timeout: tuple[float, float] | float | None = DEFAULT_TIMEOUT,
+) -> requests.Session:
+    """
+    接続プールを設定したセッションを作成
+
+    Args:
+        pool_connections: 接続プールを保持するホストの数
+        pool_maxsize: ホストごとに保持する接続の数(同時実行数以上にする)
+        user_agent: ユーザーエージェント
+        timeout: タイムアウトを指定しないリクエストのタイムアウト(秒、(接続, 受信の間隔)の組も可)
+
+    Returns:
+        requests.Session: セッション
+
+    """
+    session = requests.Session()
+    # 再試行は呼び出し側(リクエスト間隔制御と再試行の処理)が行うため、アダプタでは再試行しない
+    adapter = TimedHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+        pool_block=False,
+        timeout=timeout,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    logger.debug("接続プールを設定しました: ホスト数=%d, 接続数=%d", pool_connections, pool_maxsize)
+    return session
+
+
+def iter_into(response: requests.Response, buffer: bytearray) -> Iterator[memoryview | bytes]:
+    """
+    レスポンスの本文を再利用するバッファへ読み込みながら順次返す
+
+    urllib3 のレスポンスからは readinto でバッファの大きさずつ読み込みます。urllib3 2.x の readinto は
+    内部で read した結果をバッファへコピーするため、コピーを省くものではありません。
+    転送速度の向上は1回の読み込みを大きくしたことによるもので、同じ大きさの iter_content とほぼ同じです
+    (benchmarks.bench_transfer を参照)。バッファを再利用するため、チャンクごとにバイト列を確保しない点のみが異なります。
+    返すメモリビューは次の読み込みで上書きされるため、呼び出し側は次の要素を受け取る前に使い終える必要があります。
+    readinto に対応していないレスポンスの場合は iter_content で同じ大きさずつ返します。
+
+    Args:
+        response: ストリーミングモードのレスポンス
+        buffer: 読み込みに使用するバッファ
+
+    Yields:
+        memoryview | bytes: 受信したデータ
+
+    Raises:
+        requests.RequestException: 受信に失敗した場合(iter_content と同じ例外に変換)
+
+    """
+    raw = getattr(response, "raw", None)
+    if not isinstance(raw, io.IOBase):
+        for chunk in response.iter_content(chunk_size=len(buffer)):
+            if chunk:
+                yield chunk
+        return
+
+    # Content-Encoding が指定されている場合は iter_content と同様に展開する
+    raw.decode_content = True
+    view = memoryview(buffer)
+    try:
+        while size := raw.readinto(view):
+            yield view[:size]
+    except ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e) from e
+    except DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e) from e
+    except ReadTimeoutError as e:
+        raise requests.exceptions.ConnectionError(e) from e
+    except SSLError as e:
+        raise requests.exceptions.SSLError(e) from e
@@ -0,0 +1,590 @@
+"""
+分散ダウンロードキューモジュール
+
+複数のマシン(異なる送信元IP)で1つのミラーを分担して取得するため、PDFのダウンロードを
+共有ストレージ上のSQLiteデータベースのジョブとして管理するクラスとCLIを提供します。
+
+コーディネーター(--work-queue を指定した通常の実行)はページを巡回して見つけたPDFを
+ジョブとして登録し、ワーカー(--work-queue と --worker を指定した実行)は期限付きのリースで
+ジョブを取得してダウンロードし、結果のメタデータをキューに書き戻します。リースは
+ハートビートで延長され、停止したワーカーのジョブはリースの期限切れ後に他のワーカーが取得します。
+
+使用方法:
+    python -m downloader.work_queue status /shared/queue.sqlite3
+    python -m downloader.work_queue merge /shared/queue.sqlite3 merged/
+    python -m downloader.work_queue retry /shared/queue.sqlite3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+
+from .metadata import FileMetadata, MetadataManager, Parameters
+from .page_parser import PdfLink
+from .utils import sanitize_filename
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# ジョブの状態
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_STATES: tuple[str, ...] = (JOB_PENDING, JOB_LEASED, JOB_DONE, JOB_FAILED)
+
+# リースの期間(秒)。ハートビートはこの3分の1の間隔で送る
+DEFAULT_LEASE_SECONDS = 300.0
+
+# リースが期限切れになった回数がこの値に達したジョブは失敗とする(特定のPDFでワーカーが停止し続けるのを防ぐ)
+DEFAULT_MAX_ATTEMPTS = 3
+
+# 取得できるジョブがない間、キューを再確認する間隔(秒)
+WORKER_POLL_INTERVAL = 5.0
+
+# 他のマシンとの書き込みの競合時に待機する時間(秒)
+BUSY_TIMEOUT = 60.0
+
+# 失敗とみなすダウンロード状態
+FAILED_STATUSES: frozenset[str] = frozenset({"failed"})
+
+
+def default_worker_id() -> str:
+    """
+    ワーカーの識別子の既定値を取得
+
+    Returns:
+        str: ホスト名とプロセスID(例: host-a-1234)
+
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def worker_metadata_filename(worker_id: str) -> str:
+    """
+    ワーカーが結果を記録するメタデータのファイル名を取得
+
+    出力ディレクトリを共有するワーカーが互いの metadata.json を上書きしないよう、
+    ワーカーごとに別のファイルに記録します(全体の metadata.json は merge で作成する)。
+
+    Args:
+        worker_id: ワーカーの識別子
+
+    Returns:
+        str: ファイル名(例: metadata.host-a-1234.json)
+
+    """
+    return f"metadata.{sanitize_filename(worker_id)}.json"
+
+
+@dataclass
+class Job:
+    """ダウンロードジョブ"""
+
+    url: str
+    pdf_link: PdfLink
+    year: str
+    expected_size: int | None
+    attempts: int
+
+
+class WorkQueue:
+    """SQLiteによる期限付きリースのダウンロードキュー"""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        *,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            db_path: データベースファイルのパス(複数のマシンから参照する場合は共有ボリューム上に置く)
+            lease_seconds: リースの期間(秒)
+            max_attempts: リースの期限切れで失敗とするまでの取得回数
+            clock: 現在時刻を返す関数(テスト時にモック可能。複数のマシンで使用する場合は時刻を同期しておく)
+
+        """
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(max_attempts, 1)
+        self.clock = clock
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # トランザクションを明示的に開始するため自動コミットで接続し、
+        # ハートビートのスレッドからも利用するためロックで直列化する
+        self._conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            # 共有ボリューム(NFSなど)ではWALの共有メモリを使用できないため、既定のジャーナルを使用する
+            self._conn.execute("PRAGMA journal_mode=DELETE")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    text TEXT NOT NULL,
+                    report_list_url TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    expected_size INTEGER,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    enqueued_at REAL NOT NULL,
+                    finished_at REAL,
+                    result TEXT
+                )
+                """,
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, lease_expires)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS queue_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def enqueue(self, pdf_link: PdfLink, year: str, *, expected_size: int | None = None) -> bool:
+        """
+        ジョブを登録(同じURLのジョブが既にある場合は登録しない)
+
+        Args:
+            pdf_link: PDFリンク
+            year: 公表年
+            expected_size: 想定サイズ(バイト)
+
+        Returns:
+            bool: 新たに登録した場合はTrue
+
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO jobs (url, text, report_list_url, source, year, expected_size, state, enqueued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO NOTHING
+                """,
+                (
+                    pdf_link.url,
+                    pdf_link.text,
+                    pdf_link.report_list_url,
+                    pdf_link.source,
+                    year,
+                    expected_size,
+                    JOB_PENDING,
+                    self.clock(),
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def set_sealed(self, *, sealed: bool) -> None:
+        """
+        ジョブの登録が終わったかどうかを記録
+
+        ワーカーは登録が終わり、未完了のジョブがなくなった時点で終了します。
+
+        Args:
+            sealed: 登録が終わった場合はTrue
+
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO queue_info (key, value) VALUES ('sealed', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                ("1" if sealed else "0",),
+            )
+
+    def set_parameters(self, parameters: Parameters) -> None:
+        """
+        コーディネーターの実行条件(絞り込み条件と出力ディレクトリの配置)を記録
+
+        Args:
+            parameters: 実行条件
+
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO queue_info (key, value) VALUES ('parameters', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (json.dumps(parameters.to_dict(), ensure_ascii=False),),
+            )
+
+    def parameters(self) -> Parameters | None:
+        """
+        コーディネーターの実行条件を取得
+
+        Returns:
+            Parameters | None: 実行条件(記録がない場合はNone)
+
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM queue_info WHERE key = 'parameters'").fetchone()
+        return Parameters(**json.loads(row[0])) if row else None
+
+    @property
+    def sealed(self) -> bool:
+        """ジョブの登録が終わっている場合はTrue"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM queue_info WHERE key = 'sealed'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def claim(self, worker_id: str, limit: int = 1) -> list[Job]:
+        """
+        未着手のジョブ、またはリースが期限切れになったジョブを取得してリースする
+
+        Args:
+            worker_id: ワーカーの識別子
+            limit: 取得する最大件数
+
+        Returns:
+            list[Job]: リースしたジョブ(登録順)
+
+        """
+        now = self.clock()
+        with self._lock:
+            # 他のマシンと同じジョブを取得しないよう、書き込みロックを取得してから選ぶ
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._conn.execute(
+                    "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, finished_at = ? "
+                    "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                    (JOB_FAILED, now, JOB_LEASED, now, self.max_attempts),
+                ).rowcount
+                rows = self._conn.execute(
+                    """
+                    SELECT id, url, text, report_list_url, source, year, expected_size, attempts FROM jobs
+                    WHERE state = ? OR (state = ? AND lease_expires < ?)
+                    ORDER BY id LIMIT ?
+                    """,
+                    (JOB_PENDING, JOB_LEASED, now, max(limit, 1)),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(JOB_LEASED, worker_id, now + self.lease_seconds, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if expired:
+            logger.warning("リースの期限切れが %d 回に達したジョブを %d 件失敗にしました", self.max_attempts, expired)
+        return [
+            Job(
+                url=url,
+                pdf_link=PdfLink(url=url, text=text, report_list_url=report_list_url, source=source),
+                year=year,
+                expected_size=expected_size,
+                attempts=attempts + 1,
+            )
+            for _, url, text, report_list_url, source, year, expected_size, attempts in rows
+        ]
+
+    def heartbeat(self, worker_id: str) -> int:
+        """
+        ワーカーが保持している全てのリースを延長
+
+        Args:
+            worker_id: ワーカーの識別子
+
+        Returns:
+            int: 延長したリースの件数
+
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE state = ? AND worker = ?",
+                (self.clock() + self.lease_seconds, JOB_LEASED, worker_id),
+            )
+        return cursor.rowcount
+
+    def complete(self, url: str, worker_id: str, metadata: FileMetadata) -> bool:
+        """
+        ジョブの結果を記録
+
+        Args:
+            url: ジョブのURL
+            worker_id: ワーカーの識別子
+            metadata: ダウンロード結果のメタデータ
+
+        Returns:
+            bool: 記録した場合はTrue(リースが期限切れになり他のワーカーに移っていた場合はFalse)
+
+        """
+        state = JOB_FAILED if metadata.download_status in FAILED_STATUSES else JOB_DONE
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, lease_expires = NULL, finished_at = ?, result = ? "
+                "WHERE url = ? AND state = ? AND worker = ?",
+                (
+                    state,
+                    self.clock(),
+                    json.dumps(metadata.to_dict(), ensure_ascii=False),
+                    url,
+                    JOB_LEASED,
+                    worker_id,
+                ),
+            )
+        if cursor.rowcount == 0:
+            logger.warning("リースが失効していたため結果を記録しませんでした: %s", url)
+        return cursor.rowcount == 1
+
+    def release(self, url: str, worker_id: str) -> None:
+        """
+        ジョブを未着手に戻す(予算を使い切った場合など、処理せずに終了する場合)
+
+        Args:
+            url: ジョブのURL
+            worker_id: ワーカーの識別子
+
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, attempts = attempts - 1 "
+                "WHERE url = ? AND state = ? AND worker = ?",
+                (JOB_PENDING, url, JOB_LEASED, worker_id),
+            )
+
+    def retry_failed(self) -> int:
+        """
+        失敗したジョブを未着手に戻す
+
+        Returns:
+            int: 戻したジョブの件数
+
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, attempts = 0, finished_at = NULL, result = NULL "
+                "WHERE state = ?",
+                (JOB_PENDING, JOB_FAILED),
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        """
+        状態ごとのジョブの件数を取得
+
+        Returns:
+            dict[str, int]: 状態ごとの件数
+
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {**dict.fromkeys(JOB_STATES, 0), **dict(rows)}
+
+    def worker_counts(self) -> dict[str, int]:
+        """
+        ワーカーごとの完了したジョブの件数を取得
+
+        Returns:
+            dict[str, int]: ワーカーの識別子ごとの件数
+
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worker, COUNT(*) FROM jobs WHERE state = ? AND worker IS NOT NULL "
+                "GROUP BY worker ORDER BY worker",
+                (JOB_DONE,),
+            ).fetchall()
+        return dict(rows)
+
+    def unfinished(self) -> int:
+        """
+        未完了(未着手またはリース中)のジョブの件数を取得
+
+        Returns:
+            int: 未完了のジョブの件数
+
+        """
+        counts = self.counts()
+        return counts[JOB_PENDING] + counts[JOB_LEASED]
+
+    def results(self) -> Iterator[FileMetadata]:
+        """
+        ワーカーが記録した結果のメタデータを登録順に取得
+
+        Yields:
+            FileMetadata: ダウンロード結果のメタデータ
+
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT result FROM jobs WHERE result IS NOT NULL ORDER BY id").fetchall()
+        for (result,) in rows:
+            yield FileMetadata.from_dict(json.loads(result))
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseHeartbeat:
+    """ワーカーの処理が進んでいる間、リースを一定間隔で延長するスレッド"""
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        worker_id: str,
+        interval: float | None = None,
+        *,
+        progress: Callable[[], object] | None = None,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            queue: ダウンロードキュー
+            worker_id: ワーカーの識別子
+            interval: 延長する間隔(秒、Noneの場合はリースの期間の3分の1)
+            progress: 処理の進み具合を表す値を返す関数(受信したバイト数など)。
+                前回から値が変わっていない場合はリースを延長せず、止まったワーカーのジョブを他のワーカーに引き継がせる
+
+        """
+        self.queue = queue
+        self.worker_id = worker_id
+        self.interval = interval if interval is not None else queue.lease_seconds / 3
+        self.progress = progress
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{worker_id}", daemon=True)
+
+    def __enter__(self) -> LeaseHeartbeat:
+        """ハートビートを開始"""
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """ハートビートを停止"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        """処理が進んでいればリースを延長する"""
+        last = self.progress() if self.progress else None
+        while not self._stop.wait(self.interval):
+            if self.progress:
+                current = self.progress()
+                if current == last:
+                    logger.warning("処理が進んでいないため、リースを延長しません: %s", self.worker_id)
+                    continue
+                last = current
+            try:
+                self.queue.heartbeat(self.worker_id)
+            except sqlite3.Error:
+                # 一時的に共有ストレージにアクセスできない場合も、次の間隔で再試行する
+                logger.exception("リースの延長に失敗しました")
+
+
+def merge_results(queue: WorkQueue, output_dir: str | Path) -> int:
+    """
+    キューに記録された結果を1つの metadata.json にまとめる
+
+    metadata.json の parameters には、コーディネーターが記録した絞り込み条件と
+    出力ディレクトリの配置を書き込みます(後続の処理が配置からPDFのパスを求めるため)。
+
+    Args:
+        queue: ダウンロードキュー
+        output_dir: metadata.json の出力先ディレクトリ
+
+    Returns:
+        int: まとめたメタデータの件数
+
+    """
+    parameters = queue.parameters() or Parameters(years=[], categories=[])
+    manager = MetadataManager(
+        str(output_dir),
+        parameters.years,
+        parameters.categories,
+        parameters.name_filter,
+        exact_match=parameters.exact_match,
+        name_file=parameters.name_file,
+        layout=parameters.layout,
+    )
+    for metadata in queue.results():
+        manager.add_file(metadata)
+    manager.save()
+    return len(manager.files)
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析する
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        argparse.Namespace: 解析された引数
+
+    """
+    parser = argparse.ArgumentParser(
+        description="分散ダウンロードキューの状態の確認と結果の集約を行います。",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = subparsers.add_parser("status", help="状態ごと・ワーカーごとのジョブの件数を表示")
+    status_parser.add_argument("queue", help="キューのデータベースのパス")
+
+    merge_parser = subparsers.add_parser("merge", help="ワーカーの結果を1つの metadata.json にまとめる")
+    merge_parser.add_argument("queue", help="キューのデータベースのパス")
+    merge_parser.add_argument("output_dir", help="metadata.json の出力先ディレクトリ")
+
+    retry_parser = subparsers.add_parser("retry", help="失敗したジョブを未着手に戻す")
+    retry_parser.add_argument("queue", help="キューのデータベースのパス")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    メイン関数
+
+    Args:
+        argv: 引数リスト(Noneの場合はsys.argv)
+
+    Returns:
+        int: 終了コード
+
+    """
+    args = parse_arguments(argv)
+    queue = WorkQueue(args.queue)
+    try:
+        if args.command == "merge":
+            merged = merge_results(queue, args.output_dir)
+            print(f"{merged}件のメタデータを {Path(args.output_dir) / 'metadata.json'} にまとめました")
+        elif args.command == "retry":
+            print(f"{queue.retry_failed()}件のジョブを未着手に戻しました")
+        else:
+            counts = queue.counts()
+            print(" ".join(f"{state}={counts[state]}" for state in JOB_STATES), f"sealed={queue.sealed}")
+            for worker_id, done in queue.worker_counts().items():
+                print(f"{worker_id}\t{done}")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,14 @@
 """pytestの設定ファイル"""
 
-from typing import Callable
+from argparse import Namespace
+from typing import Any, Callable
 from unittest.mock import Mock
 
 import pytest
 import requests
 from bs4 import BeautifulSoup
 
+from downloader.config import BASE_URL
 from downloader.page_parser import PageParser
 
 
@@ -59,3 +61,58 @@ def soup_factory() -> Callable[[str, str], BeautifulSoup]:
         return BeautifulSoup(text, parser)
 
     return factory
+
+
+@pytest.fixture
+def make_args(tmp_path) -> Callable[..., Namespace]:
+    """SeijishikinDownloaderに渡すコマンドライン引数を生成する関数を提供するフィクスチャ"""
+
+    def factory(**overrides: Any) -> Namespace:
+        defaults: dict[str, Any] = {
+            "output_dir": str(tmp_path / "downloaded_pdfs"),
+            "year": None,
+            "category": None,
+            "name": None,
+            "exact_match": False,
+            "name_file": None,
+            "delay": 3,
+            "force": False,
+            "dry_run": False,
+            "metadata_only": False,
+            "concurrency": 1,
+            "http_cache": None,
+            "cache_max_age": 0,
+            "state_db": None,
+            "content_store": False,
+            "journal": False,
+            "corpus_index": None,
+            "html_parser": "html.parser",
+            "stream_links": False,
+            "robots_cache": None,
+            "pipeline": False,
+            "queue_size": 100,
+            "max_rate": None,
+            "catalog": None,
+            "catalog_validators": False,
+            "sources": None,
+            "priority": None,
+            "max_bytes": None,
+            "max_files": None,
+            "max_time": None,
+            "metrics": None,
+            "progress_jsonl": None,
+            "no_progress": False,
+            "render_images": None,
+            "render_workers": None,
+            "no_probe": False,
+            "layout": "flat",
+            "work_queue": None,
+            "worker": False,
+            "worker_id": None,
+            "lease": 300.0,
+            "base_url": BASE_URL,
+        }
+        defaults.update(overrides)
+        return Namespace(**defaults)
+
+    return factory
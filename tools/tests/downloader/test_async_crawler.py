@@ -0,0 +1,70 @@
+# ruff: noqa
+"""AsyncCrawlEngineクラスのテスト"""
+
+import threading
+import time
+from unittest.mock import Mock
+
+from downloader.async_crawler import AsyncCrawlEngine
+from downloader.page_parser import PdfLink, ReportListPageLink, YearPageLink
+
+
+def _make_downloader() -> Mock:
+    """ページ構造を模したダウンローダーのモックを作成"""
+    downloader = Mock()
+    downloader.stream_links = False
+
+    def parse_year_page(link: YearPageLink) -> list[ReportListPageLink]:
+        return [ReportListPageLink(url=f"{link.url}list{i}.html", text=f"一覧{i}", year=link.year) for i in range(2)]
+
+    def parse_report_list_page(link: ReportListPageLink) -> list[PdfLink]:
+        return [PdfLink(url=f"{link.url}/{i}.pdf", text=f"団体{i}", report_list_url=link.url) for i in range(3)]
+
+    downloader.parse_year_page.side_effect = parse_year_page
+    downloader.parse_report_list_page.side_effect = parse_report_list_page
+    return downloader
+
+
+def test_crawl_processes_all_links() -> None:
+    """全てのリンクが処理されることのテスト"""
+    downloader = _make_downloader()
+    engine = AsyncCrawlEngine(downloader, concurrency=4)
+
+    engine.run(
+        [
+            YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5"),
+            ReportListPageLink(url="https://example.com/SF/a.html", text="追加分", year="R4"),
+        ],
+    )
+
+    assert downloader.parse_year_page.call_count == 1
+    # 年度ページ配下の2件と直接指定の1件
+    assert downloader.parse_report_list_page.call_count == 3
+    assert downloader.complete_report_list_page.call_count == 3
+    assert downloader.process_pdf_link.call_count == 9
+    years = {call.args[1] for call in downloader.process_pdf_link.call_args_list}
+    assert years == {"R5", "R4"}
+
+
+def test_crawl_respects_concurrency_limit() -> None:
+    """同時実行数が上限を超えないことのテスト"""
+    downloader = _make_downloader()
+    lock = threading.Lock()
+    state = {"running": 0, "max": 0}
+
+    def process_pdf_link(pdf_link: PdfLink, year: str) -> bool:
+        with lock:
+            state["running"] += 1
+            state["max"] = max(state["max"], state["running"])
+        time.sleep(0.01)
+        with lock:
+            state["running"] -= 1
+        return True
+
+    downloader.process_pdf_link.side_effect = process_pdf_link
+    engine = AsyncCrawlEngine(downloader, concurrency=2)
+
+    engine.run([YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5")])
+
+    assert downloader.process_pdf_link.call_count == 6
+    assert 1 < state["max"] <= 2
@@ -0,0 +1,201 @@
+# ruff: noqa
+"""カタログのテスト"""
+
+import json
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from downloader.catalog import Catalog, CatalogEntry, diff_catalogs, load_catalog, main
+from downloader.downloader import SeijishikinDownloader
+from downloader.page_parser import PdfLink
+from downloader.pdf_downloader import RemotePdf
+
+LIST_URL = "https://example.com/reports/SS20241129/SL/index.html"
+
+
+def _entry(url: str, organization: str, year: str = "R5") -> CatalogEntry:
+    return CatalogEntry(
+        url=url,
+        organization=organization,
+        category="政党支部",
+        year=year,
+        report_list_url=LIST_URL,
+    )
+
+
+def _catalog(*entries: CatalogEntry) -> pd.DataFrame:
+    catalog = Catalog()
+    for entry in entries:
+        catalog.add(entry)
+    return catalog.to_frame()
+
+
+def test_from_pdf_link() -> None:
+    """PDFリンクからカタログの行を生成できることのテスト"""
+    pdf_link = PdfLink(url="https://example.com/001_0001.pdf", text="国民民主党第1総支部", report_list_url=LIST_URL)
+
+    entry = CatalogEntry.from_pdf_link(pdf_link, "R5")
+
+    assert entry == _entry("https://example.com/001_0001.pdf", "国民民主党第1総支部")
+
+
+def test_duplicate_urls_are_recorded_once() -> None:
+    """同じURLは最初の1件のみ記録されることのテスト"""
+    catalog = Catalog()
+    catalog.add(_entry("https://example.com/a.pdf", "団体A"))
+    catalog.add(_entry("https://example.com/a.pdf", "団体A(別ページ)"))
+
+    assert len(catalog) == 1
+    assert catalog.to_frame()["organization"].tolist() == ["団体A"]
+
+
+def test_save_and_load_csv_gz(tmp_path: Path) -> None:
+    """gzip圧縮CSVで書き出して読み込めることのテスト"""
+    catalog = Catalog()
+    catalog.add(_entry("https://example.com/b.pdf", "団体B"))
+    catalog.add(_entry("https://example.com/a.pdf", "団体A"))
+
+    path = catalog.save(tmp_path / "catalog" / "R5.csv.gz")
+
+    assert path.read_bytes()[:2] == b"\x1f\x8b"
+    loaded = load_catalog(path)
+    assert loaded["url"].tolist() == ["https://example.com/a.pdf", "https://example.com/b.pdf"]
+    assert loaded["organization"].tolist() == ["団体A", "団体B"]
+
+
+def test_diff_catalogs() -> None:
+    """追加・削除・変更を求められることのテスト"""
+    previous = _catalog(
+        _entry("https://example.com/a.pdf", "団体A"),
+        _entry("https://example.com/b.pdf", "団体B"),
+        _entry("https://example.com/c.pdf", "団体C"),
+    )
+    current = _catalog(
+        _entry("https://example.com/a.pdf", "団体A"),
+        _entry("https://example.com/b.pdf", "団体B(名称変更)"),
+        _entry("https://example.com/d.pdf", "団体D"),
+    )
+
+    diff = diff_catalogs(previous, current)
+
+    assert diff.summary() == {"added": 1, "removed": 1, "changed": 1}
+    assert diff.added["url"].tolist() == ["https://example.com/d.pdf"]
+    assert diff.removed["organization"].tolist() == ["団体C"]
+    assert diff.changed["organization"].tolist() == ["団体B(名称変更)"]
+    assert diff.changed["organization_previous"].tolist() == ["団体B"]
+
+
+def test_diff_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """diffサブコマンドのテスト"""
+    previous = Catalog()
+    previous.add(_entry("https://example.com/a.pdf", "団体A"))
+    previous.save(tmp_path / "previous.csv.gz")
+    current = Catalog()
+    current.add(_entry("https://example.com/a.pdf", "団体A"))
+    current.add(_entry("https://example.com/b.pdf", "団体B"))
+    current.save(tmp_path / "current.csv.gz")
+
+    exit_code = main(
+        [
+            "diff",
+            str(tmp_path / "previous.csv.gz"),
+            str(tmp_path / "current.csv.gz"),
+            "-o",
+            str(tmp_path / "diff"),
+            "--json",
+        ],
+    )
+
+    assert exit_code == 0
+    assert json.loads(capsys.readouterr().out) == {"added": 1, "removed": 0, "changed": 0}
+    assert load_catalog(tmp_path / "diff" / "added.csv.gz")["url"].tolist() == ["https://example.com/b.pdf"]
+    assert load_catalog(tmp_path / "diff" / "removed.csv.gz").empty
+
+
+def test_diff_detects_replaced_pdf() -> None:
+    """同じURLで置き換えられたPDFをサイズや検証子の違いで検出することのテスト"""
+    previous = _catalog(
+        replace(_entry("https://example.com/a.pdf", "団体A"), size=100, etag='"v1"'),
+        replace(_entry("https://example.com/b.pdf", "団体B"), size=200, last_modified="Mon, 01 Jan 2024 00:00:00 GMT"),
+        replace(_entry("https://example.com/c.pdf", "団体C"), size=300, sha256="aa"),
+        # 検証子を取得できなかった行
+        _entry("https://example.com/d.pdf", "団体D"),
+    )
+    current = _catalog(
+        replace(_entry("https://example.com/a.pdf", "団体A"), size=100, etag='"v2"'),
+        replace(_entry("https://example.com/b.pdf", "団体B"), size=200, last_modified="Mon, 01 Jan 2024 00:00:00 GMT"),
+        replace(_entry("https://example.com/c.pdf", "団体C"), size=301),
+        replace(_entry("https://example.com/d.pdf", "団体D"), size=400, etag='"v1"'),
+    )
+
+    diff = diff_catalogs(previous, current)
+
+    assert diff.changed["url"].tolist() == ["https://example.com/a.pdf", "https://example.com/c.pdf"]
+    assert diff.changed["etag_previous"].tolist()[0] == '"v1"'
+    assert diff.changed["size"].tolist() == ["100", "301"]
+
+
+def test_load_catalog_without_content_columns(tmp_path: Path) -> None:
+    """内容の列がない以前のカタログも読み込めることのテスト"""
+    path = tmp_path / "old.csv"
+    path.write_text(
+        "url,organization,category,year,report_list_url\nhttps://example.com/a.pdf,団体A,政党支部,R5,x\n",
+        encoding="utf-8",
+    )
+
+    loaded = load_catalog(path)
+
+    assert loaded.columns.tolist()[-4:] == ["size", "etag", "last_modified", "sha256"]
+    assert loaded["etag"].tolist() == [""]
+    current = _catalog(replace(_entry("https://example.com/a.pdf", "団体A"), size=100, etag='"v1"'))
+    current["report_list_url"] = "x"
+    assert diff_catalogs(loaded, current).summary() == {"added": 0, "removed": 0, "changed": 0}
+
+
+def test_catalog_mode_records_validators(make_args, tmp_path: Path) -> None:
+    """--catalog-validators を指定した場合、PDFを取得せず、団体種別で絞り込まない一覧にHEADの結果を記録することのテスト"""
+    catalog_path = tmp_path / "catalog.csv.gz"
+    downloader = SeijishikinDownloader(
+        make_args(catalog=str(catalog_path), catalog_validators=True, category="政党支部")
+    )
+    downloader.pdf_downloader = Mock()
+    downloader.pdf_downloader.head_pdf.return_value = RemotePdf(
+        size=1024, etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT"
+    )
+    downloader.metadata_manager = Mock()
+    first = PdfLink(url="https://example.com/SL/001_0001.pdf", text="団体A", report_list_url=LIST_URL)
+
+    downloader.process_pdf_link(first, "R5")
+    downloader.process_pdf_link(
+        PdfLink(url="https://example.com/SF/006_0001.pdf", text="団体B", report_list_url="https://example.com/SF/"),
+        "R5",
+    )
+    # 複数のページからリンクされたPDFはHEADリクエストを繰り返さない
+    downloader.process_pdf_link(first, "R5")
+
+    downloader.pdf_downloader.download_pdf.assert_not_called()
+    assert downloader.pdf_downloader.head_pdf.call_count == 2
+    downloader.catalog.save(catalog_path)
+    loaded = load_catalog(catalog_path)
+    assert loaded["organization"].tolist() == ["団体B", "団体A"]
+    assert loaded["size"].tolist() == ["1024", "1024"]
+    assert loaded["etag"].tolist() == ['"abc"', '"abc"']
+
+
+def test_catalog_mode_sends_no_pdf_requests_by_default(make_args, tmp_path: Path) -> None:
+    """既定のカタログモードではPDFにリクエストを送らないことのテスト"""
+    downloader = SeijishikinDownloader(make_args(catalog=str(tmp_path / "catalog.csv.gz")))
+    downloader.pdf_downloader = Mock()
+    downloader.metadata_manager = Mock()
+
+    downloader.process_pdf_link(
+        PdfLink(url="https://example.com/SL/001_0001.pdf", text="団体A", report_list_url=LIST_URL), "R5"
+    )
+
+    downloader.pdf_downloader.head_pdf.assert_not_called()
+    downloader.pdf_downloader.download_pdf.assert_not_called()
+    assert downloader.catalog.to_frame()["size"].isna().all()
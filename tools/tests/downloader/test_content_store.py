@@ -0,0 +1,170 @@
+# ruff: noqa
+"""ContentStoreクラスとPDFDownloaderの重複排除のテスト"""
+
+import hashlib
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.content_store import ContentStore, sha256_file
+from downloader.metadata import FileMetadata
+from downloader.pdf_downloader import PDFDownloader
+
+BODY = b"%PDF-1.4 same body %%EOF"
+DIGEST = hashlib.sha256(BODY).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ContentStore:
+    return ContentStore(tmp_path / ".blobs")
+
+
+def _write(path: Path, data: bytes = BODY) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def test_sha256_file(tmp_path: Path) -> None:
+    """ファイルのハッシュ値計算のテスト"""
+    assert sha256_file(_write(tmp_path / "a.pdf")) == DIGEST
+
+
+def test_adopt_first_file_moves_into_store(store: ContentStore, tmp_path: Path) -> None:
+    """最初のファイルが実体として取り込まれることのテスト"""
+    path = _write(tmp_path / "R5_政党支部_A.pdf")
+
+    duplicate = store.adopt(path, DIGEST, filename=path.name, url="https://example.com/a.pdf")
+
+    assert duplicate is False
+    assert store.contains(DIGEST)
+    assert path.read_bytes() == BODY
+    assert store.digest_for_filename(path.name) == DIGEST
+
+
+def test_adopt_duplicate_shares_blob(store: ContentStore, tmp_path: Path) -> None:
+    """同じ内容のファイルが実体を共有することのテスト"""
+    first = _write(tmp_path / "R4_政党支部_A.pdf")
+    second = _write(tmp_path / "R5_政党支部_A.pdf")
+
+    store.adopt(first, DIGEST, filename=first.name)
+    duplicate = store.adopt(second, DIGEST, filename=second.name)
+
+    assert duplicate is True
+    assert second.read_bytes() == BODY
+    assert second.stat().st_ino == store.blob_path(DIGEST).stat().st_ino
+    assert len(list(store.root.rglob("*.pdf"))) == 1
+
+
+def test_manifest_is_reloaded(store: ContentStore, tmp_path: Path) -> None:
+    """マニフェストが再読み込みされることのテスト"""
+    path = _write(tmp_path / "a.pdf")
+    store.adopt(path, DIGEST, filename="a.pdf", url="https://example.com/a.pdf")
+
+    reloaded = ContentStore(store.root)
+
+    assert reloaded.digest_for_filename("a.pdf") == DIGEST
+    assert reloaded.digest_for_url("https://example.com/a.pdf") == DIGEST
+    assert reloaded.digest_for_url("https://example.com/other.pdf") is None
+
+
+def _metadata(filename: str) -> FileMetadata:
+    return FileMetadata(
+        filename=filename,
+        original_url="https://example.com/a.pdf",
+        organization="A",
+        category="政党支部",
+        year="R5",
+    )
+
+
+def _response(status_code: int, body: bytes = b"", headers: dict | None = None) -> Mock:
+    response = Mock()
+    response.status_code = status_code
+    response.headers = {"content-length": str(len(body)), **(headers or {})}
+    response.iter_content.return_value = [body]
+    return response
+
+
+def test_downloader_links_known_url_after_revalidation(store: ContentStore, tmp_path: Path) -> None:
+    """ストアにあるURLは条件付きリクエストで変わっていないことを確認してからリンクされることのテスト"""
+    store.adopt(
+        _write(tmp_path / "first.pdf"),
+        DIGEST,
+        filename="first.pdf",
+        url="https://example.com/a.pdf",
+        etag='"v1"',
+        last_modified="Mon, 01 Jan 2024 00:00:00 GMT",
+    )
+    session = Mock(spec=requests.Session)
+    session.get.return_value = _response(304)
+    downloader = PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, content_store=store)
+
+    result = downloader.download_pdf("https://example.com/a.pdf", str(tmp_path / "second.pdf"), _metadata("second.pdf"))
+
+    headers = {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert session.get.call_args.kwargs["headers"] == {"Accept-Encoding": "identity", **headers}
+    assert session.get.call_count == 1
+    assert result.download_status == "success"
+    assert result.sha256 == DIGEST
+    assert (tmp_path / "second.pdf").read_bytes() == BODY
+    # リンクしたエントリにも検証子を引き継ぐ
+    assert ContentStore(store.root).conditional_headers_for_url("https://example.com/a.pdf") == headers
+
+
+def test_downloader_refetches_updated_url(store: ContentStore, tmp_path: Path) -> None:
+    """同じURLに差し替えられたPDFは取得し直すことのテスト"""
+    store.adopt(
+        _write(tmp_path / "first.pdf"), DIGEST, filename="first.pdf", url="https://example.com/a.pdf", etag='"v1"'
+    )
+    corrected = b"%PDF-1.4 corrected body %%EOF"
+    session = Mock(spec=requests.Session)
+    session.get.side_effect = [_response(200), _response(200, corrected, {"ETag": '"v2"'})]
+    downloader = PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, content_store=store)
+
+    result = downloader.download_pdf("https://example.com/a.pdf", str(tmp_path / "second.pdf"), _metadata("second.pdf"))
+
+    assert result.sha256 == hashlib.sha256(corrected).hexdigest()
+    assert (tmp_path / "second.pdf").read_bytes() == corrected
+    assert store.conditional_headers_for_url("https://example.com/a.pdf") == {"If-None-Match": '"v2"'}
+
+
+def test_downloader_without_validators_or_with_force_downloads(store: ContentStore, tmp_path: Path) -> None:
+    """検証子の記録がない場合や --force の場合はストアを使わずに取得することのテスト"""
+    store.adopt(_write(tmp_path / "first.pdf"), DIGEST, filename="first.pdf", url="https://example.com/a.pdf")
+    session = Mock(spec=requests.Session)
+    session.get.side_effect = lambda *args, **kwargs: _response(200, BODY, {"ETag": '"v1"'})
+
+    plain = PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, content_store=store)
+    plain.download_pdf("https://example.com/a.pdf", str(tmp_path / "second.pdf"), _metadata("second.pdf"))
+    assert session.get.call_count == 1
+    assert session.get.call_args.kwargs["headers"] == {"Accept-Encoding": "identity"}
+
+    forced = PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, content_store=store, force=True)
+    forced.download_pdf("https://example.com/a.pdf", str(tmp_path / "third.pdf"), _metadata("third.pdf"))
+    assert session.get.call_count == 2
+    assert session.get.call_args.kwargs["headers"] == {"Accept-Encoding": "identity"}
+
+
+def test_downloader_records_digest(store: ContentStore, tmp_path: Path) -> None:
+    """ダウンロードしたファイルのハッシュ値が記録されることのテスト"""
+    session = Mock(spec=requests.Session)
+    response = Mock()
+    response.status_code = 200
+    response.headers = {"content-length": str(len(BODY))}
+    response.iter_content.return_value = [BODY]
+    session.get.return_value = response
+    downloader = PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, content_store=store)
+    metadata = FileMetadata(
+        filename="a.pdf",
+        original_url="https://example.com/a.pdf",
+        organization="A",
+        category="政党支部",
+        year="R5",
+    )
+
+    result = downloader.download_pdf("https://example.com/a.pdf", str(tmp_path / "a.pdf"), metadata)
+
+    assert result.sha256 == DIGEST
+    assert store.contains(DIGEST)
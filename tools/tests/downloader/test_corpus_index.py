@@ -0,0 +1,115 @@
+# ruff: noqa
+"""CorpusIndexクラスのテスト"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from downloader.corpus_index import CorpusIndex, main
+from downloader.metadata import FileMetadata
+
+
+def _file(organization: str, category: str = "政党支部", year: str = "R5", status: str = "success") -> FileMetadata:
+    return FileMetadata(
+        filename=f"{year}_{category}_{organization}.pdf",
+        original_url=f"https://example.com/{year}/{organization}.pdf",
+        organization=organization,
+        category=category,
+        year=year,
+        file_size=100,
+        download_status=status,
+        sha256=f"hash-{organization}",
+    )
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> CorpusIndex:
+    index = CorpusIndex(tmp_path / "index.sqlite3")
+    yield index
+    index.close()
+
+
+def test_merge_and_search(index: CorpusIndex, tmp_path: Path) -> None:
+    """統合した文書を条件で検索できることのテスト"""
+    index.merge(
+        [
+            _file("国民民主党東京都第1総支部"),
+            _file("立憲民主党大阪府第2総支部", year="R4"),
+            _file("自由民主党本部", category="政党本部"),
+        ],
+        tmp_path,
+    )
+
+    assert index.count() == 3
+    assert [d.organization for d in index.search(organization="民主党", year="R5")] == [
+        "国民民主党東京都第1総支部",
+        "自由民主党本部",
+    ]
+    assert [d.organization for d in index.search(category="政党本部")] == ["自由民主党本部"]
+    assert index.search(organization="存在しない") == []
+    document = index.search(organization="本部")[0]
+    assert document.path == tmp_path / "R5_政党本部_自由民主党本部.pdf"
+    assert index.find_by_sha256("hash-自由民主党本部")[0].url == document.url
+
+
+def test_drops_unused_organization_index(tmp_path: Path) -> None:
+    """部分一致の検索で使えない団体名の索引を以前の索引からも削除することのテスト"""
+    path = tmp_path / "index.sqlite3"
+    CorpusIndex(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE INDEX idx_documents_organization ON documents (organization)")
+    conn.commit()
+    conn.close()
+
+    index = CorpusIndex(path)
+    names = [row[0] for row in index._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    plan = index._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT url FROM documents WHERE category = ? AND year = ?", ("政党支部", "R5")
+    ).fetchall()
+    index.close()
+
+    assert "idx_documents_organization" not in names
+    assert "idx_documents_year_category" in str(plan)
+
+
+def test_merge_skips_unavailable_files(index: CorpusIndex, tmp_path: Path) -> None:
+    """手元にないファイルは索引に登録されないことのテスト"""
+    merged = index.merge([_file("A", status="failed"), _file("B", status="dry_run"), _file("C")], tmp_path)
+
+    assert merged == 1
+    assert [d.organization for d in index.search()] == ["C"]
+
+
+def test_merge_updates_existing_url(index: CorpusIndex, tmp_path: Path) -> None:
+    """同じURLの文書は上書きされ、他の文書は保持されることのテスト"""
+    index.merge([_file("A"), _file("B")], tmp_path)
+    skipped = _file("A", status="skipped")
+    skipped.sha256 = None
+    skipped.file_size = 200
+    index.merge([skipped], tmp_path)
+
+    assert index.count() == 2
+    document = index.search(organization="A")[0]
+    assert document.file_size == 200
+    # ハッシュ値が不明な更新では以前の値を保持する
+    assert document.sha256 == "hash-A"
+
+
+def test_import_metadata_file_and_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """metadata.json の取り込みと検索CLIのテスト"""
+    metadata_path = tmp_path / "metadata.json"
+    metadata_path.write_text(
+        json.dumps({"files": [_file("国民民主党").to_dict()]}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    db = str(tmp_path / "index.sqlite3")
+
+    assert main(["--db", db, "import", str(metadata_path)]) == 0
+    capsys.readouterr()
+    assert main(["--db", db, "search", "-n", "民主", "--json"]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["organization"] == "国民民主党"
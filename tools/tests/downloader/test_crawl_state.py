@@ -0,0 +1,141 @@
+# ruff: noqa
+"""CrawlStateStoreクラスと増分実行のテスト"""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from downloader.crawl_state import PAGE_COMPLETE, CrawlStateStore, content_hash
+from downloader.downloader import SeijishikinDownloader
+from downloader.metadata import FileMetadata
+from downloader.page_parser import PdfLink, ReportListPageLink
+
+LIST_URL = "https://example.com/reports/SS20241129/SL/a.html"
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> CrawlStateStore:
+    """CrawlStateStoreのフィクスチャ"""
+    store = CrawlStateStore(tmp_path / "state.sqlite3", clock=lambda: 1000.0)
+    yield store
+    store.close()
+
+
+def test_record_and_get(store: CrawlStateStore) -> None:
+    """記録した状態を取得できることのテスト"""
+    store.record(LIST_URL, kind="report_list", outcome=PAGE_COMPLETE, content_hash="abc", selection="{}")
+
+    record = store.get(LIST_URL)
+    assert record is not None
+    assert record.kind == "report_list"
+    assert record.outcome == PAGE_COMPLETE
+    assert record.content_hash == "abc"
+    assert record.last_fetched == 1000.0
+    assert store.get("https://example.com/other") is None
+
+
+def test_record_keeps_previous_hash(store: CrawlStateStore) -> None:
+    """ハッシュ値なしで更新した場合は以前の値が残ることのテスト"""
+    store.record(LIST_URL, kind="report_list", outcome=PAGE_COMPLETE, content_hash="abc")
+    store.record(LIST_URL, kind="report_list", outcome="incomplete")
+
+    record = store.get(LIST_URL)
+    assert record is not None
+    assert record.outcome == "incomplete"
+    assert record.content_hash == "abc"
+
+
+def test_is_unchanged(store: CrawlStateStore) -> None:
+    """報告書一覧ページの変更判定のテスト"""
+    store.record(LIST_URL, kind="report_list", outcome=PAGE_COMPLETE, content_hash="abc", selection="s")
+
+    assert store.is_unchanged(LIST_URL, "abc", "s")
+    assert not store.is_unchanged(LIST_URL, "def", "s")
+    assert not store.is_unchanged(LIST_URL, "abc", "other")
+
+    store.record(LIST_URL, kind="report_list", outcome="incomplete", content_hash="abc", selection="s")
+    assert not store.is_unchanged(LIST_URL, "abc", "s")
+
+
+def test_is_done_and_count_failed(store: CrawlStateStore) -> None:
+    """PDFの処理済み判定と失敗件数のテスト"""
+    store.record("https://example.com/1.pdf", kind="pdf", outcome="success")
+    store.record("https://example.com/2.pdf", kind="pdf", outcome="failed")
+
+    assert store.is_done("https://example.com/1.pdf")
+    assert not store.is_done("https://example.com/2.pdf")
+    assert not store.is_done("https://example.com/3.pdf")
+    assert store.count_failed(["https://example.com/1.pdf", "https://example.com/2.pdf"]) == 1
+    assert store.count_failed([]) == 0
+
+
+def test_store_persists_across_instances(tmp_path: Path) -> None:
+    """状態がプロセスをまたいで保持されることのテスト"""
+    first = CrawlStateStore(tmp_path / "state.sqlite3")
+    first.record(LIST_URL, kind="report_list", outcome=PAGE_COMPLETE)
+    first.close()
+
+    second = CrawlStateStore(tmp_path / "state.sqlite3")
+    assert second.get(LIST_URL) is not None
+    second.close()
+
+
+def _make_downloader(make_args, tmp_path: Path, pdf_links: list[PdfLink], html: str) -> SeijishikinDownloader:
+    """ページ解析とダウンロードをモックしたダウンローダーを作成"""
+    downloader = SeijishikinDownloader(make_args(state_db=str(tmp_path / "state.sqlite3")))
+    downloader.page_parser = Mock()
+    downloader.page_parser.parse_report_list_page.return_value = pdf_links
+    downloader.page_parser.content_hashes = {LIST_URL: content_hash(html)}
+
+    def download_pdf(pdf_url: str, save_path: str, metadata: FileMetadata) -> FileMetadata:
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(save_path).write_bytes(b"%PDF-1.4")
+        metadata.download_status = "success"
+        return metadata
+
+    downloader.pdf_downloader.download_pdf = Mock(side_effect=download_pdf)
+    downloader.delay = 0
+    return downloader
+
+
+def test_incremental_run_skips_unchanged_page(make_args, tmp_path: Path) -> None:
+    """2回目の実行で変更のない報告書一覧ページがスキップされることのテスト"""
+    link = ReportListPageLink(url=LIST_URL, text="政党支部", year="R5")
+    pdf_links = [
+        PdfLink(url=f"https://example.com/{i}.pdf", text=f"団体{i}", report_list_url=LIST_URL) for i in range(2)
+    ]
+
+    first = _make_downloader(make_args, tmp_path, pdf_links, "<html>v1</html>")
+    first.process_report_list_page(link)
+    assert first.pdf_downloader.download_pdf.call_count == 2
+    first.metadata_manager.save()
+    first.crawl_state.close()
+
+    second = _make_downloader(make_args, tmp_path, pdf_links, "<html>v1</html>")
+    second.process_report_list_page(link)
+    second.pdf_downloader.download_pdf.assert_not_called()
+    # 前回までの記録は metadata.json から失われないよう、スキップとして引き継ぐ
+    assert second.metadata_manager.statistics.total_files == 2
+    assert second.metadata_manager.statistics.skipped_files == 2
+    assert [f.original_url for f in second.metadata_manager.files] == [link.url for link in pdf_links]
+    second.crawl_state.close()
+
+
+def test_incremental_run_downloads_only_new_pdfs(make_args, tmp_path: Path) -> None:
+    """報告書一覧ページが更新された場合は新しいPDFのみダウンロードされることのテスト"""
+    link = ReportListPageLink(url=LIST_URL, text="政党支部", year="R5")
+    old_links = [PdfLink(url="https://example.com/1.pdf", text="団体1", report_list_url=LIST_URL)]
+    new_links = [*old_links, PdfLink(url="https://example.com/2.pdf", text="団体2", report_list_url=LIST_URL)]
+
+    first = _make_downloader(make_args, tmp_path, old_links, "<html>v1</html>")
+    first.process_report_list_page(link)
+    first.crawl_state.close()
+
+    second = _make_downloader(make_args, tmp_path, new_links, "<html>v2</html>")
+    second.process_report_list_page(link)
+    downloaded = [call.args[0] for call in second.pdf_downloader.download_pdf.call_args_list]
+    assert downloaded == ["https://example.com/2.pdf"]
+    statuses = {f.original_url: f.download_status for f in second.metadata_manager.files}
+    assert statuses == {"https://example.com/1.pdf": "skipped", "https://example.com/2.pdf": "success"}
+    second.crawl_state.close()
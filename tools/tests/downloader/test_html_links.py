@@ -0,0 +1,127 @@
+# ruff: noqa
+"""リンク抽出とHTMLパーサーのバックエンドのテスト"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from bs4 import BeautifulSoup
+
+from downloader.html_links import Anchor, anchors_from_soup, extract_anchors, iter_anchors
+from downloader.page_parser import PageParser, ReportListPageLink
+
+REPORT_LIST_URL = "https://example.com/reports/SS20241129/SL/index.html"
+
+HTML = """
+<html><body>
+<h2>政党支部</h2>
+<ul>
+  <li><a href="001_0001.pdf">国民民主党<span>第1総支部</span></a></li>
+  <li><a href="001_0002.PDF"> 立憲民主党&amp;支部 </a></li>
+  <li><a name="anchor">アンカーのみ</a></li>
+  <li><a href="/other.html">その他</a></li>
+  <li><a href="002_0002.pdf">次のリンク</a></li>
+</ul>
+</body></html>
+"""
+
+UNCLOSED_HTML = '<ul><li><a href="002_0001.pdf">閉じられていないリンク<li><a href="002_0002.pdf">次のリンク</a></ul>'
+
+
+def test_extract_anchors() -> None:
+    """ツリーを構築せずに <a> 要素が抽出されることのテスト"""
+    anchors = extract_anchors(HTML)
+
+    assert anchors[0] == Anchor(href="001_0001.pdf", text="国民民主党第1総支部")
+    assert anchors[1] == Anchor(href="001_0002.PDF", text=" 立憲民主党&支部 ")
+    assert anchors[2] == Anchor(href=None, text="アンカーのみ")
+    assert anchors[-1] == Anchor(href="002_0002.pdf", text="次のリンク")
+
+
+def test_extract_anchors_unclosed() -> None:
+    """閉じられていない <a> が次の <a> の開始で閉じられることのテスト"""
+    anchors = extract_anchors(UNCLOSED_HTML)
+
+    assert anchors == [
+        Anchor(href="002_0001.pdf", text="閉じられていないリンク"),
+        Anchor(href="002_0002.pdf", text="次のリンク"),
+    ]
+
+
+def test_extract_anchors_matches_beautifulsoup() -> None:
+    """BeautifulSoupと同じhrefとテキストが得られることのテスト"""
+    fast = extract_anchors(HTML)
+    soup = anchors_from_soup(BeautifulSoup(HTML, "html.parser"))
+
+    assert [a.href for a in fast] == [a.href for a in soup]
+    assert [a.text.strip() for a in fast] == [a.text.strip() for a in soup]
+
+
+@pytest.mark.parametrize("backend", ["html.parser", "fast"])
+def test_parse_report_list_page_with_backend(backend: str, mock_sleep: Mock) -> None:
+    """各バックエンドで同じPDFリンクが得られることのテスト"""
+    session = Mock()
+    session.get.return_value.text = HTML
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep, parser_backend=backend)
+
+    links = parser.parse_report_list_page(ReportListPageLink(url=REPORT_LIST_URL, text="政党支部", year="R5"))
+
+    assert [link.text for link in links] == [
+        "国民民主党第1総支部",
+        "立憲民主党&支部",
+        "次のリンク",
+    ]
+    assert links[0].url == "https://example.com/reports/SS20241129/SL/index.html/001_0001.pdf"
+
+
+def test_unknown_backend() -> None:
+    """未対応のバックエンドを指定した場合のテスト"""
+    with pytest.raises(ValueError):
+        PageParser(session=Mock(), parser_backend="unknown")
+
+
+def test_soup_factory_receives_backend(mock_sleep: Mock) -> None:
+    """soup_factoryにバックエンド名が渡されることのテスト"""
+    factory = Mock(return_value=BeautifulSoup("<html></html>", "html.parser"))
+    with patch("downloader.page_parser.importlib.util.find_spec", return_value=Mock()):
+        parser = PageParser(session=Mock(), delay=0, sleep_func=mock_sleep, soup_factory=factory, parser_backend="lxml")
+
+    parser._create_soup("<html></html>")
+
+    factory.assert_called_once_with("<html></html>", "lxml")
+
+
+def test_missing_lxml_falls_back_to_html_parser(mock_sleep: Mock, caplog: pytest.LogCaptureFixture) -> None:
+    """lxml がインストールされていない場合は開始時に警告して html.parser を使用することのテスト"""
+    session = Mock()
+    session.get.return_value.text = HTML
+    with patch("downloader.page_parser.importlib.util.find_spec", return_value=None):
+        parser = PageParser(session=session, delay=0, sleep_func=mock_sleep, parser_backend="lxml")
+
+    assert parser.parser_backend == "html.parser"
+    assert "lxml" in caplog.text
+    links = parser.parse_report_list_page(ReportListPageLink(url=REPORT_LIST_URL, text="政党支部", year="R5"))
+    assert len(links) == 3
+
+
+def test_iter_anchors_across_chunks() -> None:
+    """タグやテキストがチャンクの境界で分割されても抽出できることのテスト"""
+    chunks = [HTML[i : i + 7] for i in range(0, len(HTML), 7)]
+
+    assert list(iter_anchors(chunks)) == extract_anchors(HTML)
+
+
+def test_iter_anchors_yields_before_end() -> None:
+    """入力の終了を待たずに確定した <a> 要素が返されることのテスト"""
+    received: list[str] = []
+
+    def chunks():
+        received.append("first")
+        yield '<a href="1.pdf">一</a><a href="2.pdf">'
+        received.append("second")
+        yield "二</a>"
+
+    anchors = iter_anchors(chunks())
+
+    assert next(anchors) == Anchor(href="1.pdf", text="一")
+    assert received == ["first"]
+    assert next(anchors) == Anchor(href="2.pdf", text="二")
@@ -0,0 +1,135 @@
+# ruff: noqa
+"""HttpCacheクラスとPageParserのキャッシュ連携のテスト"""
+
+import gzip
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.http_cache import CacheEntry, HttpCache
+from downloader.page_parser import PageParser
+
+URL = "https://example.com/reports/SS20241129/"
+
+
+def _response(status_code: int, text: str = "", headers: dict[str, str] | None = None) -> Mock:
+    """モックレスポンスを作成"""
+    response = Mock()
+    response.status_code = status_code
+    response.text = text
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> HttpCache:
+    """HttpCacheのフィクスチャ"""
+    return HttpCache(tmp_path / "cache", clock=lambda: 1000.0)
+
+
+def test_store_and_load(cache: HttpCache) -> None:
+    """保存した本文と検証用ヘッダを読み出せることのテスト"""
+    cache.store(URL, "<html>令和5年分</html>", etag='"abc"', last_modified="Wed, 01 May 2024 00:00:00 GMT")
+
+    entry = cache.get(URL)
+    assert entry is not None
+    assert entry.etag == '"abc"'
+    assert entry.fetched_at == 1000.0
+    assert cache.load_text(URL) == "<html>令和5年分</html>"
+
+
+def test_body_is_stored_compressed(cache: HttpCache) -> None:
+    """本文がgzip圧縮されて保存されることのテスト"""
+    cache.store(URL, "<html></html>")
+
+    body_files = list(cache.cache_dir.rglob("*.html.gz"))
+    assert len(body_files) == 1
+    assert gzip.decompress(body_files[0].read_bytes()).decode("utf-8") == "<html></html>"
+
+
+def test_get_missing_returns_none(cache: HttpCache) -> None:
+    """キャッシュがない場合のテスト"""
+    assert cache.get(URL) is None
+
+
+def test_conditional_headers() -> None:
+    """条件付きリクエストヘッダのテスト"""
+    entry = CacheEntry(url=URL, etag='"abc"', last_modified="Wed, 01 May 2024 00:00:00 GMT")
+
+    assert entry.conditional_headers() == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 01 May 2024 00:00:00 GMT",
+    }
+    assert CacheEntry(url=URL).conditional_headers() == {}
+
+
+def test_is_fresh(tmp_path: Path) -> None:
+    """有効期間の判定のテスト"""
+    now = {"value": 1000.0}
+    cache = HttpCache(tmp_path, max_age=60, clock=lambda: now["value"])
+    entry = CacheEntry(url=URL, fetched_at=1000.0)
+
+    assert cache.is_fresh(entry)
+    now["value"] = 1061.0
+    assert not cache.is_fresh(entry)
+    assert not HttpCache(tmp_path).is_fresh(entry)
+
+
+def test_fetch_url_stores_response(cache: HttpCache, mock_sleep: Mock) -> None:
+    """初回取得時にレスポンスがキャッシュされることのテスト"""
+    session = Mock(spec=requests.Session)
+    session.get.return_value = _response(200, "<html>本文</html>", {"ETag": '"v1"'})
+    parser = PageParser(session=session, delay=3, sleep_func=mock_sleep, http_cache=cache)
+
+    assert parser._fetch_url(URL) == "<html>本文</html>"
+
+    session.get.assert_called_once_with(URL)
+    mock_sleep.assert_called_once_with(3)
+    entry = cache.get(URL)
+    assert entry is not None
+    assert entry.etag == '"v1"'
+
+
+def test_fetch_url_not_modified(cache: HttpCache, mock_sleep: Mock) -> None:
+    """304応答の場合はキャッシュを返し待機しないことのテスト"""
+    cache.store(URL, "<html>本文</html>", etag='"v1"')
+    session = Mock(spec=requests.Session)
+    not_modified = _response(304)
+    type(not_modified).text = property(lambda self: pytest.fail("本文をデコードしてはいけない"))
+    session.get.return_value = not_modified
+    parser = PageParser(session=session, delay=3, sleep_func=mock_sleep, http_cache=cache)
+
+    assert parser._fetch_url(URL) == "<html>本文</html>"
+
+    session.get.assert_called_once_with(URL, headers={"If-None-Match": '"v1"'})
+    mock_sleep.assert_not_called()
+
+
+def test_fetch_url_modified(cache: HttpCache, mock_sleep: Mock) -> None:
+    """更新されていた場合はキャッシュが置き換えられることのテスト"""
+    cache.store(URL, "<html>古い</html>", etag='"v1"')
+    session = Mock(spec=requests.Session)
+    session.get.return_value = _response(200, "<html>新しい</html>", {"ETag": '"v2"'})
+    parser = PageParser(session=session, delay=3, sleep_func=mock_sleep, http_cache=cache)
+
+    assert parser._fetch_url(URL) == "<html>新しい</html>"
+
+    assert cache.load_text(URL) == "<html>新しい</html>"
+    entry = cache.get(URL)
+    assert entry is not None
+    assert entry.etag == '"v2"'
+
+
+def test_fetch_url_fresh_cache_skips_request(tmp_path: Path, mock_sleep: Mock) -> None:
+    """有効期間内のキャッシュはリクエストせずに返すことのテスト"""
+    cache = HttpCache(tmp_path, max_age=3600)
+    cache.store(URL, "<html>本文</html>")
+    session = Mock(spec=requests.Session)
+    parser = PageParser(session=session, delay=3, sleep_func=mock_sleep, http_cache=cache)
+
+    assert parser._fetch_url(URL) == "<html>本文</html>"
+
+    session.get.assert_not_called()
+    mock_sleep.assert_not_called()
@@ -0,0 +1,180 @@
+# ruff: noqa
+"""出力ディレクトリの配置のテスト"""
+
+import json
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from benchmarks.replay_server import ReplayServer, SiteSpec, SyntheticSite
+from downloader.corpus_index import CorpusIndex, import_metadata_file
+from downloader.downloader import SeijishikinDownloader
+from downloader.layout import OutputLayout, main, migrate_layout, read_layout
+from downloader.metadata import FileMetadata
+from downloader.page_parser import PdfLink
+from downloader.pdf_downloader import PDFDownloader
+
+FILENAME = "R5_政党支部_テスト団体.pdf"
+
+
+def test_relative_paths() -> None:
+    """配置ごとの相対パスのテスト"""
+    kwargs = {"year": "R5", "category": "政党支部"}
+
+    assert OutputLayout().relative_path(FILENAME, **kwargs) == Path(FILENAME)
+    assert OutputLayout("year-category").relative_path(FILENAME, **kwargs) == Path("R5", "政党支部", FILENAME)
+    sharded = OutputLayout("year-category-hash").relative_path(FILENAME, **kwargs)
+    assert sharded.parts[:2] == ("R5", "政党支部")
+    assert len(sharded.parts[2]) == 2
+    hashed = OutputLayout("hash").relative_path(FILENAME, **kwargs)
+    assert [len(part) for part in hashed.parts[:2]] == [2, 2]
+    assert hashed.parts[0] == sharded.parts[2]
+    with pytest.raises(ValueError):
+        OutputLayout("nested")
+
+
+def test_prepare_download_uses_layout(tmp_path: Path) -> None:
+    """保存先パスと既存ファイルの確認が配置に従うことのテスト"""
+    layout = OutputLayout("year-category-hash")
+    downloader = PDFDownloader(session=Mock(), output_dir=str(tmp_path), sleep_func=Mock(), layout=layout)
+    pdf_link = PdfLink(url="https://example.com/SL/1.pdf", text="テスト団体", report_list_url="https://example.com/SL/")
+
+    result = downloader.prepare_download(pdf_link, "R5")
+
+    assert result.metadata.filename == FILENAME
+    assert Path(result.save_path) == layout.path_for(tmp_path, result.metadata)
+    assert downloader.check_existing_file(result.save_path, result.metadata) is None
+    Path(result.save_path).parent.mkdir(parents=True)
+    Path(result.save_path).write_bytes(b"%PDF-1.4\n%%EOF\n")
+    assert downloader.check_existing_file(result.save_path, result.metadata).download_status == "skipped"
+
+
+def _crawl(make_args, server: ReplayServer, **overrides) -> SeijishikinDownloader:
+    downloader = SeijishikinDownloader(make_args(base_url=server.base_url, no_progress=True, **overrides))
+    downloader.scheduler.min_interval = 0
+    downloader.scheduler.latency_factor = 0
+    assert downloader.download_all()
+    return downloader
+
+
+def test_crawl_with_sharded_layout(make_args, tmp_path: Path) -> None:
+    """配置に従って保存し、配置を metadata.json に記録し、異なる配置での再実行を拒否することのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=2, pdfs=2, pdf_size=1024))
+    index_path = tmp_path / "index.sqlite3"
+
+    with ReplayServer(site) as server:
+        downloader = _crawl(make_args, server, layout="year-category-hash", corpus_index=str(index_path))
+        output_dir = Path(downloader.output_dir)
+        assert list(output_dir.glob("*.pdf")) == []
+        for metadata in downloader.metadata_manager.files:
+            assert downloader.layout.path_for(output_dir, metadata).exists()
+        assert read_layout(output_dir) == "year-category-hash"
+
+        # 同じ配置での再実行では既存のファイルをスキップする
+        rerun = _crawl(make_args, server, layout="year-category-hash")
+        assert {metadata.download_status for metadata in rerun.metadata_manager.files} == {"skipped"}
+
+        with pytest.raises(ValueError, match="migrate"):
+            SeijishikinDownloader(make_args(base_url=server.base_url, no_progress=True))
+
+    # コーパス索引のパスも配置に従う
+    index = CorpusIndex(index_path)
+    try:
+        documents = index.search()
+        assert len(documents) == 4
+        assert all(document.path.exists() for document in documents)
+    finally:
+        index.close()
+
+
+def _write_metadata(output_dir: Path, files: list[dict]) -> None:
+    document = {"parameters": {"years": [], "categories": []}, "files": files}
+    (output_dir / "metadata.json").write_text(json.dumps(document, ensure_ascii=False), encoding="utf-8")
+
+
+def test_migrate_flat_directory(tmp_path: Path, capsys) -> None:
+    """平坦な出力ディレクトリを移行し、元の配置に戻せることのテスト"""
+    output_dir = tmp_path / "pdfs"
+    (output_dir / ".blobs").mkdir(parents=True)
+    (output_dir / ".blobs" / "ignored.pdf").write_bytes(b"blob")
+    known = "source_名前_R4_政党本部_本部.pdf"
+    names = [known, FILENAME, "R3_資金管理団体_団体.pdf.part", "memo.pdf"]
+    for name in names:
+        (output_dir / name).write_bytes(name.encode())
+    _write_metadata(
+        output_dir,
+        [{"filename": known, "original_url": "", "organization": "", "category": "政党本部", "year": "R4"}],
+    )
+
+    assert main(["migrate", str(output_dir), "--layout", "year-category", "--dry-run"]) == 0
+    assert "移動対象: 3件" in capsys.readouterr().out
+    assert read_layout(output_dir) == "flat"
+
+    result = migrate_layout(output_dir, "year-category")
+
+    assert (result.moved, result.unchanged, result.unknown) == (3, 0, 1)
+    assert (output_dir / "R4" / "政党本部" / known).read_bytes() == known.encode()
+    assert (output_dir / "R5" / "政党支部" / FILENAME).exists()
+    assert (output_dir / "R3" / "資金管理団体" / "R3_資金管理団体_団体.pdf.part").exists()
+    assert (output_dir / "memo.pdf").exists()
+    assert (output_dir / ".blobs" / "ignored.pdf").exists()
+    assert read_layout(output_dir) == "year-category"
+
+    result = migrate_layout(output_dir, "flat")
+    assert result.moved == 3
+    assert (output_dir / FILENAME).exists()
+    assert not (output_dir / "R5").exists()
+
+
+def test_migrate_without_metadata_records_layout(make_args, tmp_path: Path) -> None:
+    """metadata.json のない出力ディレクトリを移行した場合も配置を記録し、次回の実行が検出できることのテスト"""
+    output_dir = tmp_path / "pdfs"
+    output_dir.mkdir()
+    (output_dir / FILENAME).write_bytes(b"pdf")
+    assert read_layout(output_dir) is None
+
+    migrate_layout(output_dir, "year-category", dry_run=True)
+    assert read_layout(output_dir) is None
+
+    result = migrate_layout(output_dir, "year-category")
+
+    assert result.moved == 1
+    assert read_layout(output_dir) == "year-category"
+    assert json.loads((output_dir / "metadata.json").read_text(encoding="utf-8"))["files"] == []
+    with pytest.raises(ValueError, match="配置"):
+        SeijishikinDownloader(make_args(output_dir=str(output_dir)))
+    SeijishikinDownloader(make_args(output_dir=str(output_dir), layout="year-category"))
+
+
+def test_migrate_refuses_interrupted_run(tmp_path: Path) -> None:
+    """中断された実行のジャーナルが残っている場合は移行しないことのテスト"""
+    (tmp_path / "metadata.jsonl").write_text("", encoding="utf-8")
+    (tmp_path / FILENAME).write_bytes(b"pdf")
+
+    with pytest.raises(ValueError):
+        migrate_layout(tmp_path, "hash")
+    assert main(["migrate", str(tmp_path), "--layout", "hash"]) == 1
+    assert (tmp_path / FILENAME).exists()
+
+
+def test_corpus_import_resolves_layout(tmp_path: Path) -> None:
+    """metadata.json を取り込む際に記録された配置でパスを求めることのテスト"""
+    entry = {
+        "filename": FILENAME,
+        "original_url": "https://example.com/1.pdf",
+        "organization": "テスト団体",
+        "category": "政党支部",
+        "year": "R5",
+        "download_status": "success",
+    }
+    document = {"parameters": {"layout": "hash"}, "files": [entry]}
+    (tmp_path / "metadata.json").write_text(json.dumps(document, ensure_ascii=False), encoding="utf-8")
+    index = CorpusIndex(tmp_path / "index.sqlite3")
+    try:
+        import_metadata_file(index, tmp_path / "metadata.json")
+        [indexed] = index.search()
+    finally:
+        index.close()
+
+    assert indexed.path == OutputLayout("hash").path_for(tmp_path, FileMetadata.from_dict(entry))
@@ -1,6 +1,7 @@
 # ruff: noqa
 """MetadataManagerクラスのテスト"""
 
+import json
 from pathlib import Path
 from unittest.mock import mock_open, patch
 
@@ -247,3 +248,130 @@ def test_get_statistics(metadata_manager: MetadataManager) -> None:
     assert stats.skipped_files == 3
     assert stats.failed_files == 2
     assert stats.total_size == 5000
+
+
+def _journal_manager(output_dir: Path, **kwargs) -> MetadataManager:
+    """ジャーナルモードのMetadataManagerを作成"""
+    return MetadataManager(
+        output_dir=str(output_dir),
+        years=["R5"],
+        categories=[],
+        name_filter=None,
+        exact_match=False,
+        journal=True,
+        **kwargs,
+    )
+
+
+def _file(name: str, status: str = "success", size: int = 100) -> FileMetadata:
+    return FileMetadata(
+        filename=name,
+        original_url=f"https://example.com/{name}",
+        organization="テスト団体",
+        category="政党支部",
+        year="R5",
+        file_size=size,
+        download_status=status,
+    )
+
+
+def test_journal_appends_each_file(tmp_path: Path) -> None:
+    """ジャーナルモードでは追加ごとに1行追記されることのテスト"""
+    manager = _journal_manager(tmp_path)
+
+    manager.add_file(_file("a.pdf"))
+    manager.add_file(_file("b.pdf"))
+
+    lines = manager.journal_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3  # ヘッダと2件
+    assert '"type": "run"' in lines[0]
+    assert '"a.pdf"' in lines[1]
+
+
+def test_journal_writes_snapshot_only_on_save(tmp_path: Path) -> None:
+    """実行中はジャーナルのみに追記し、スナップショットは保存時にのみ書き出すことのテスト"""
+    manager = _journal_manager(tmp_path)
+
+    for number in range(250):
+        manager.add_file(_file(f"{number}.pdf"))
+    assert not manager.metadata_path.exists()
+
+    assert manager.save() is True
+    snapshot = json.loads(manager.metadata_path.read_text(encoding="utf-8"))
+    assert len(snapshot["files"]) == 250
+    assert snapshot["statistics"]["total_files"] == 250
+
+
+def test_journal_recovers_killed_run(tmp_path: Path) -> None:
+    """中断された実行のメタデータが次回の実行で復元されることのテスト"""
+    crashed = _journal_manager(tmp_path)
+    crashed.add_file(_file("a.pdf", size=100))
+    crashed.add_file(_file("b.pdf", status="failed"))
+    # 書き込み途中で中断された行
+    with crashed.journal_path.open("a", encoding="utf-8") as f:
+        f.write('{"type": "file", "filename": "c.p')
+
+    resumed = _journal_manager(tmp_path)
+
+    assert [f.filename for f in resumed.files] == ["a.pdf", "b.pdf"]
+    assert resumed.statistics.downloaded_files == 1
+    assert resumed.statistics.failed_files == 1
+    assert resumed.statistics.total_size == 100
+
+    # 失敗したファイルを再試行すると記録が置き換えられる
+    resumed.add_file(_file("b.pdf", size=50))
+    assert resumed.statistics.total_files == 2
+    assert resumed.statistics.failed_files == 0
+    assert resumed.statistics.downloaded_files == 2
+    assert resumed.statistics.total_size == 150
+
+
+def test_journal_save_writes_snapshot_and_removes_journal(tmp_path: Path) -> None:
+    """最終保存でスナップショットが書かれジャーナルが削除されることのテスト"""
+    manager = _journal_manager(tmp_path)
+    manager.add_file(_file("a.pdf"))
+
+    assert manager.save() is True
+
+    assert not manager.journal_path.exists()
+    snapshot = json.loads(manager.metadata_path.read_text(encoding="utf-8"))
+    assert snapshot["files"][0]["filename"] == "a.pdf"
+    assert snapshot["statistics"]["downloaded_files"] == 1
+
+
+def test_file_metadata_from_dict_ignores_unknown_keys() -> None:
+    """from_dictが未知のキーを無視することのテスト"""
+    metadata = FileMetadata.from_dict({**_file("a.pdf").to_dict(), "type": "file"})
+
+    assert metadata == _file("a.pdf")
+
+
+def test_journal_is_not_replayed_for_different_run(tmp_path: Path) -> None:
+    """中断された実行と条件が異なる場合はジャーナルを復元せずに退避することのテスト"""
+
+    def manager(years: list[str], layout: str) -> MetadataManager:
+        return MetadataManager(
+            output_dir=str(tmp_path),
+            years=years,
+            categories=[],
+            name_filter=None,
+            exact_match=False,
+            journal=True,
+            layout=layout,
+        )
+
+    manager(["R5", "R4"], "hash").add_file(_file("a.pdf"))
+
+    # 公表年の順序のみが異なる場合は同じ条件とみなす
+    assert [f.filename for f in manager(["R4", "R5"], "hash").files] == ["a.pdf"]
+
+    other = manager(["R4", "R5"], "flat")
+
+    assert other.files == []
+    assert other.statistics.total_files == 0
+    assert '"a.pdf"' in (tmp_path / "metadata.jsonl.stale").read_text(encoding="utf-8")
+    header = json.loads(other.journal_path.read_text(encoding="utf-8").splitlines()[0])
+    assert header["parameters"]["layout"] == "flat"
+
+    other.add_file(_file("b.pdf"))
+    assert manager(["R5"], "flat").files == []
@@ -0,0 +1,222 @@
+# ruff: noqa
+"""計測モジュールのテスト"""
+
+import json
+import threading
+from collections.abc import Iterator
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.metadata import FileMetadata
+from downloader.metrics import MetricsRecorder, prometheus_path_for
+from downloader.page_parser import PageParser
+from downloader.pdf_downloader import PDFDownloader
+from downloader.robotparser import RobotsChecker
+from downloader.scheduler import PolitenessScheduler
+from downloader.transport import create_session
+
+BODY = b"%PDF-1.7\n" + b"x" * 10000 + b"\n%%EOF\n"
+
+
+class Handler(BaseHTTPRequestHandler):
+    """テスト用のPDFとrobots.txtを返すハンドラ"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = b"User-agent: *\nAllow: /\n" if self.path == "/robots.txt" else BODY
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[str]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://localhost:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _response(status_code: int, content: bytes = b"", elapsed: float = 0.0) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response._content_consumed = True
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+def _read_lines(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_send_records_timing(tmp_path: Path) -> None:
+    """応答ヘッダまでの時間と本文の転送時間が記録されることのテスト"""
+    times = iter([10.0, 10.4, 10.5])
+    recorder = MetricsRecorder(tmp_path / "metrics.jsonl", clock=lambda: next(times), wall_clock=lambda: 1000.0)
+
+    recorder.send("page", "https://example.com/a.html", lambda: _response(200, b"<html>", elapsed=0.2))
+    recorder.close()
+
+    [line] = _read_lines(tmp_path / "metrics.jsonl")
+    assert line["type"] == "request"
+    assert line["component"] == "page"
+    assert line["host"] == "example.com"
+    assert line["status"] == 200
+    assert line["bytes"] == 6
+    assert line["started_at"] == 1000.0
+    assert line["ttfb"] == pytest.approx(0.2)
+    assert line["transfer"] == pytest.approx(0.3)
+    assert line["total"] == pytest.approx(0.5)
+
+
+def test_send_records_network_error() -> None:
+    """通信エラーも記録され、例外は再送出されることのテスト"""
+    recorder = MetricsRecorder()
+
+    def fail() -> requests.Response:
+        raise requests.ConnectionError("refused")
+
+    with pytest.raises(requests.ConnectionError):
+        recorder.send("pdf", "https://example.com/a.pdf", fail, stream=True)
+
+    assert recorder.requests == {("pdf", "error"): 1}
+    assert recorder.errors == {"pdf": 1}
+
+
+def test_throttle_retries_are_counted() -> None:
+    """429/503応答後の再試行が再試行として記録されることのテスト"""
+    recorder = MetricsRecorder()
+    session = Mock()
+    session.get.side_effect = [_response(503), _response(200, b"<html></html>")]
+    pacer = Mock()
+    parser = PageParser(session=session, delay=0, pacer=pacer, metrics=recorder)
+
+    assert parser._fetch_url("https://example.com/") == "<html></html>"
+
+    assert recorder.requests == {("page", "503"): 1, ("page", "200"): 1}
+    assert recorder.retries == {"page": 1}
+    assert recorder.bytes == {"page": 13}
+
+
+def test_streamed_page_is_completed_after_body() -> None:
+    """受信しながら解析するページは本文を受信し終えた時点で記録されることのテスト"""
+    recorder = MetricsRecorder()
+    response = _response(200, b"<html>" * 100)
+    session = Mock()
+    session.get.return_value = response
+    parser = PageParser(session=session, delay=0, sleep_func=Mock(), metrics=recorder)
+
+    chunks = parser._iter_url_text("https://example.com/")
+    next(chunks)
+    assert recorder.requests == {}
+
+    list(chunks)
+    assert recorder.requests == {("page", "200"): 1}
+    assert recorder.bytes == {"page": 600}
+
+
+def test_scheduler_reports_sleep(tmp_path: Path) -> None:
+    """リクエスト間隔の調整のための待機時間がホストごとに記録されることのテスト"""
+    recorder = MetricsRecorder(tmp_path / "metrics.jsonl")
+    now = [0.0]
+    scheduler = PolitenessScheduler(5, clock=lambda: now[0], sleep_func=Mock(), on_wait=recorder.record_sleep)
+
+    scheduler.wait("https://example.com/a")
+    scheduler.wait("https://example.com/b")
+    recorder.close()
+
+    assert recorder.sleep_seconds == {"example.com": 5}
+    assert recorder.sleeps == {"example.com": 1}
+    [line] = _read_lines(tmp_path / "metrics.jsonl")
+    assert line["type"] == "sleep"
+    assert line["seconds"] == 5
+
+
+def test_prometheus_snapshot(tmp_path: Path) -> None:
+    """集計値がPrometheusのテキスト形式で書き出されることのテスト"""
+    times = iter([0.0, 0.1, 0.3, 1.0, 1.1, 3.0])
+    recorder = MetricsRecorder(clock=lambda: next(times))
+    recorder.send("pdf", "https://example.com/a.pdf", lambda: _response(200, b"x" * 5_000_000))
+    recorder.send("pdf", "https://example.com/b.pdf", lambda: _response(404, b"missing"), attempt=1)
+    recorder.record_sleep("https://example.com/c.pdf", 1.5)
+
+    path = prometheus_path_for(tmp_path / "metrics.jsonl")
+    recorder.write_prometheus(path)
+
+    assert path.name == "metrics.prom"
+    text = path.read_text(encoding="utf-8")
+    assert "# TYPE seijishikin_downloader_requests_total counter" in text
+    assert 'seijishikin_downloader_requests_total{component="pdf",status="200"} 1' in text
+    assert 'seijishikin_downloader_requests_total{component="pdf",status="404"} 1' in text
+    assert 'seijishikin_downloader_request_retries_total{component="pdf"} 1' in text
+    assert 'seijishikin_downloader_response_bytes_total{component="pdf"} 5000007' in text
+    assert 'seijishikin_downloader_request_duration_seconds_bucket{component="pdf",le="0.5"} 1' in text
+    assert 'seijishikin_downloader_request_duration_seconds_bucket{component="pdf",le="2.5"} 2' in text
+    assert 'seijishikin_downloader_request_duration_seconds_count{component="pdf"} 2' in text
+    assert 'seijishikin_downloader_sleep_seconds_total{host="example.com"} 1.5' in text
+
+
+def test_end_to_end_with_local_server(server: str, tmp_path: Path) -> None:
+    """robots.txt、HEAD、PDFの各リクエストの接続確立と転送が記録されることのテスト"""
+    recorder = MetricsRecorder(tmp_path / "metrics.jsonl")
+    session = create_session()
+    robots_checker = RobotsChecker("test-agent", session=session, metrics=recorder)
+    downloader = PDFDownloader(
+        session=session, output_dir=str(tmp_path), sleep_func=Mock(), robots_checker=robots_checker, metrics=recorder
+    )
+    save_path = tmp_path / "test.pdf"
+
+    assert downloader.head_content_length(f"{server}/test.pdf") == len(BODY)
+    metadata = FileMetadata(
+        filename="test.pdf", original_url=f"{server}/test.pdf", organization="テスト団体", category="不明", year="R5"
+    )
+    result = downloader.download_pdf(f"{server}/test.pdf", str(save_path), metadata)
+    recorder.close()
+
+    assert result.download_status == "success"
+    lines = {line["component"]: line for line in _read_lines(tmp_path / "metrics.jsonl")}
+    assert set(lines) == {"robots", "head", "pdf"}
+    assert lines["head"]["method"] == "HEAD"
+    assert lines["pdf"]["bytes"] == len(BODY)
+    assert lines["pdf"]["status"] == 200
+    # 最初のリクエストで接続を確立し(名前解決を含む)、以降はキープアライブで再利用する
+    assert lines["robots"]["dns"] > 0
+    assert lines["robots"]["connect"] > 0
+    assert lines["pdf"]["connect"] == 0
+
+
+def test_downloader_exports_metrics(make_args, tmp_path: Path) -> None:
+    """--metrics を指定した場合に計測結果と集計値が書き出されることのテスト"""
+    from downloader.downloader import SeijishikinDownloader
+
+    metrics_path = tmp_path / "metrics" / "run.jsonl"
+    downloader = SeijishikinDownloader(make_args(metrics=str(metrics_path)))
+
+    assert downloader.page_parser.metrics is downloader.metrics
+    assert downloader.pdf_downloader.metrics is downloader.metrics
+    assert downloader.robots_checker.metrics is downloader.metrics
+    downloader.scheduler.on_wait("https://www.soumu.go.jp/", 2.0)
+    downloader.export_metrics()
+
+    assert metrics_path.exists()
+    assert 'sleep_seconds_total{host="www.soumu.go.jp"} 2.0' in (tmp_path / "metrics" / "run.prom").read_text()
@@ -0,0 +1,103 @@
+# ruff: noqa
+"""団体名照合のテスト"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from downloader.name_matcher import AhoCorasick, NameMatcher, load_names
+from downloader.page_parser import NameFilter
+
+
+def test_aho_corasick_find_all() -> None:
+    """重なり合うパターンを含めて全て検出できることのテスト"""
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+
+    assert automaton.find_all("ushers") == {"she", "he", "hers"}
+    assert automaton.find_all("ahishers") == {"his", "she", "he", "hers"}
+    assert automaton.find_all("xyz") == set()
+
+
+def test_aho_corasick_japanese() -> None:
+    """日本語の団体名を部分一致で検出できることのテスト"""
+    automaton = AhoCorasick(["民主党", "自由民主党", "党東京都"])
+
+    assert automaton.contains_any("自由民主党東京都支部連合会")
+    assert automaton.find_all("自由民主党東京都支部連合会") == {"民主党", "自由民主党", "党東京都"}
+    assert not automaton.contains_any("公明党")
+
+
+def test_aho_corasick_matches_naive_search() -> None:
+    """素朴な部分文字列検索と同じ結果になることのテスト"""
+    rng = random.Random(0)
+    alphabet = "あいうえお党"
+    patterns = {"".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(50)}
+    automaton = AhoCorasick(patterns)
+
+    for _ in range(200):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 12)))
+        assert automaton.find_all(text) == {p for p in patterns if p in text}
+
+
+def test_aho_corasick_ignores_empty_pattern() -> None:
+    """空のパターンは無視されることのテスト"""
+    assert not AhoCorasick([""]).contains_any("任意のテキスト")
+
+
+@pytest.mark.parametrize(
+    ("exact_match", "text", "expected"),
+    [
+        (False, "国民民主党第1総支部", True),
+        (False, "公明党", False),
+        (True, "国民民主党", True),
+        (True, "国民民主党第1総支部", False),
+    ],
+)
+def test_name_matcher(exact_match: bool, text: str, expected: bool) -> None:
+    """完全一致と部分一致の照合のテスト"""
+    matcher = NameMatcher(["国民民主党", "日本共産党"], exact_match=exact_match)
+
+    assert matcher.matches(text) is expected
+
+
+def test_load_names(tmp_path: Path) -> None:
+    """一覧ファイルの読み込みのテスト(BOM、空行、コメント、重複)"""
+    path = tmp_path / "names.txt"
+    path.write_text("﻿# 監視対象\n国民民主党\n\n  日本共産党  \n国民民主党\n", encoding="utf-8")
+
+    assert load_names(path) == ["国民民主党", "日本共産党"]
+
+
+def test_name_filter_with_names() -> None:
+    """NameFilterが単一の団体名と一覧の両方で照合することのテスト"""
+    name_filter = NameFilter("公明党", False, names=("国民民主党", "日本共産党"))
+
+    assert name_filter.patterns == ["公明党", "国民民主党", "日本共産党"]
+    assert name_filter.matches("公明党東京都本部")
+    assert name_filter.matches("国民民主党第1総支部")
+    assert not name_filter.matches("社会民主党")
+
+
+def test_name_filter_names_only_exact() -> None:
+    """一覧のみを完全一致で照合することのテスト"""
+    name_filter = NameFilter(None, True, names=("国民民主党",))
+
+    assert name_filter.matches("国民民主党")
+    assert not name_filter.matches("国民民主党第1総支部")
+
+
+def test_downloader_reads_name_file(make_args, tmp_path: Path) -> None:
+    """--name-file の団体名が絞り込みとメタデータに反映されることのテスト"""
+    from downloader.downloader import SeijishikinDownloader
+
+    path = tmp_path / "names.txt"
+    path.write_text("国民民主党\n日本共産党\n", encoding="utf-8")
+
+    downloader = SeijishikinDownloader(make_args(name_file=str(path)))
+
+    assert downloader.name_filter is not None
+    assert downloader.name_filter.patterns == ["国民民主党", "日本共産党"]
+    assert downloader.page_parser.name_filter is downloader.name_filter
+    assert downloader.metadata_manager.parameters.name_file == str(path)
+    assert '"names"' in downloader._selection_key()
@@ -0,0 +1,105 @@
+# ruff: noqa
+"""PolitenessSchedulerによるリクエスト間隔制御の統合テスト"""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import requests
+
+from downloader.metadata import FileMetadata
+from downloader.page_parser import PageParser
+from downloader.pdf_downloader import PDFDownloader
+from downloader.scheduler import PolitenessScheduler
+
+PAGE_URL = "https://example.com/index.html"
+PDF_URL = "https://example.com/test.pdf"
+BODY = b"%PDF-1.4 0123456789 %%EOF"
+
+
+class FakeClock:
+    """sleepで進む時計"""
+
+    def __init__(self) -> None:
+        self.now = 100.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _response(status_code: int, *, text: str = "", headers: dict[str, str] | None = None) -> Mock:
+    """レスポンスのモックを作成"""
+    response = Mock()
+    response.status_code = status_code
+    response.text = text
+    response.headers = headers or {}
+    response.iter_content.return_value = [BODY]
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+    return response
+
+
+def test_page_fetch_honors_retry_after() -> None:
+    """429応答の場合はRetry-Afterだけ待って再試行し、固定の待機は行わないことのテスト"""
+    clock = FakeClock()
+    scheduler = PolitenessScheduler(3, clock=clock, sleep_func=clock.sleep)
+    session = Mock()
+    session.get.side_effect = [
+        _response(429, headers={"Retry-After": "20"}),
+        _response(200, text="<html>ok</html>"),
+    ]
+    sleep_func = Mock()
+    parser = PageParser(session=session, delay=3, sleep_func=sleep_func, pacer=scheduler)
+
+    assert parser._fetch_url(PAGE_URL) == "<html>ok</html>"
+    assert session.get.call_count == 2
+    assert clock.sleeps == [20]
+    sleep_func.assert_not_called()
+    assert scheduler.total_wait == 20
+
+
+def test_sequential_requests_are_paced_once() -> None:
+    """ページとPDFが連続しても待機は1回分(二重に待機しない)であることのテスト"""
+    clock = FakeClock()
+    scheduler = PolitenessScheduler(3, clock=clock, sleep_func=clock.sleep)
+    session = Mock()
+    session.get.side_effect = [_response(200, text="<html></html>"), _response(200, headers={"content-length": "25"})]
+    sleep_func = Mock()
+    parser = PageParser(session=session, delay=3, sleep_func=sleep_func, pacer=scheduler)
+    downloader = PDFDownloader(session=session, output_dir="unused", delay=3, sleep_func=sleep_func, pacer=scheduler)
+
+    parser._fetch_url(PAGE_URL)
+    downloader._request_pdf(PDF_URL, 0)
+
+    assert clock.sleeps == [3]
+    sleep_func.assert_not_called()
+
+
+def test_pdf_retry_backs_off_through_scheduler(tmp_path: Path) -> None:
+    """PDFの503応答時はスケジューラのバックオフで待機し、固定の待機は行わないことのテスト"""
+    clock = FakeClock()
+    scheduler = PolitenessScheduler(3, clock=clock, sleep_func=clock.sleep)
+    session = Mock(spec=requests.Session)
+    session.get.side_effect = [
+        _response(503),
+        _response(200, headers={"content-length": str(len(BODY))}),
+    ]
+    sleep_func = Mock()
+    downloader = PDFDownloader(
+        session=session, output_dir=str(tmp_path), delay=3, sleep_func=sleep_func, pacer=scheduler
+    )
+    metadata = FileMetadata(
+        filename="test.pdf", original_url=PDF_URL, organization="団体", category="政党支部", year="R5"
+    )
+
+    result = downloader.download_pdf(PDF_URL, str(tmp_path / "test.pdf"), metadata)
+
+    assert result.download_status == "success"
+    # 503のバックオフ(3秒×2)のみ待機する
+    assert clock.sleeps == [6]
+    sleep_func.assert_not_called()
+    assert scheduler.backoff_count == 1
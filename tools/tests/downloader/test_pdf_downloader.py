@@ -216,15 +216,17 @@ def test_download_pdf_success(pdf_downloader: PDFDownloader) -> None:
         patch("downloader.utils.create_directory") as mock_create_directory,
         patch("pathlib.Path.open", new_callable=mock_open()) as mock_file,
         patch("pathlib.Path.stat") as mock_stat,
-        patch("pathlib.Path.exists") as mock_exists,
+        patch("pathlib.Path.exists", autospec=True) as mock_exists,
         patch("pathlib.Path.is_dir") as mock_is_dir,
+        patch("downloader.pdf_downloader.os.replace") as mock_replace,
         patch("time.strftime") as mock_strftime,
         patch("time.sleep"),  # 使用しないが必要なモック
         patch("tqdm.tqdm") as mock_tqdm,
     ):
         # モックの設定
         mock_create_directory.return_value = True
-        mock_exists.return_value = True
+        # ダウンロード途中の .part ファイルは存在しないものとする
+        mock_exists.side_effect = lambda path: not str(path).endswith(".part")
         mock_is_dir.return_value = True
         # st_modeを追加して、ディレクトリチェックが正常に動作するようにする
         mock_stat.return_value.st_size = 1000
@@ -233,7 +235,9 @@ def test_download_pdf_success(pdf_downloader: PDFDownloader) -> None:
 
         # レスポンスの設定
         # mock_responseはpdf_downloader.session.get.return_valueとして既に設定済み
-        pdf_downloader.session.get.return_value.iter_content.return_value = [b"test data"]
+        pdf_downloader.session.get.return_value.status_code = 200
+        pdf_downloader.session.get.return_value.headers = {"content-length": "24"}
+        pdf_downloader.session.get.return_value.iter_content.return_value = [b"%PDF-1.4 test data %%EOF"]
 
         # tqdmのモック設定
         mock_progress = Mock()
@@ -262,6 +266,9 @@ def test_download_pdf_success(pdf_downloader: PDFDownloader) -> None:
         pdf_downloader.session.get.assert_called_once_with(
             "https://example.com/test.pdf",
             stream=True,
+            headers={"Accept-Encoding": "identity"},
         )
         # Pathオブジェクトのopenメソッドが呼ばれることを確認
         assert mock_file.called
+        # .part ファイルから保存先パスへ名前が変更されることを確認
+        mock_replace.assert_called_once_with(Path("test_output/test.pdf.part"), "test_output/test.pdf")
@@ -0,0 +1,139 @@
+# ruff: noqa
+"""PDFDownloaderの受信データの検証のテスト"""
+
+import hashlib
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.metadata import FileMetadata
+from downloader.pdf_downloader import (
+    PDF_SNIFF_SIZE,
+    CorruptPdfError,
+    PDFDownloader,
+    PdfSniffer,
+    part_path_for,
+    validator_path_for,
+)
+
+URL = "https://example.com/test.pdf"
+BODY = b"%PDF-1.7\n" + b"0" * 5000 + b"\n%%EOF\n"
+HTML = b"<html><body>Service Unavailable</body></html>"
+
+
+def _response(chunks: list[bytes], headers: dict[str, str] | None = None, status_code: int = 200) -> Mock:
+    """ストリーミングレスポンスのモックを作成"""
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.iter_content.return_value = chunks
+    return response
+
+
+def _metadata() -> FileMetadata:
+    return FileMetadata(
+        filename="test.pdf",
+        original_url=URL,
+        organization="テスト団体",
+        category="政党支部",
+        year="R5",
+    )
+
+
+@pytest.fixture
+def session() -> Mock:
+    return Mock(spec=requests.Session)
+
+
+@pytest.fixture
+def downloader(session: Mock, tmp_path: Path) -> PDFDownloader:
+    return PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, sleep_func=Mock())
+
+
+def _chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8192])
+def test_sniffer_accepts_pdf_split_across_chunks(chunk_size: int) -> None:
+    """ヘッダとトレーラがチャンクの境界で分割されていても認識できることのテスト"""
+    sniffer = PdfSniffer()
+    for chunk in _chunks(BODY, chunk_size):
+        sniffer.update(chunk)
+
+    sniffer.verify()
+    assert len(sniffer.head) == PDF_SNIFF_SIZE
+    assert len(sniffer.tail) == PDF_SNIFF_SIZE
+
+
+@pytest.mark.parametrize(
+    ("data", "message"),
+    [
+        (HTML, "ヘッダ"),
+        (b"", "ヘッダ"),
+        (BODY[:-10], "トレーラ"),
+        (b"x" * (PDF_SNIFF_SIZE + 1) + BODY, "ヘッダ"),
+    ],
+)
+def test_sniffer_rejects_non_pdf(data: bytes, message: str) -> None:
+    """PDFのヘッダまたはトレーラがないデータを拒否することのテスト"""
+    with pytest.raises(CorruptPdfError, match=message):
+        PdfSniffer(data).verify()
+
+
+def test_sniffer_from_file(tmp_path: Path) -> None:
+    """ファイルの先頭と末尾から検証できることのテスト"""
+    path = tmp_path / "test.pdf"
+    path.write_bytes(BODY)
+
+    PdfSniffer.from_file(path).verify()
+
+
+def test_non_pdf_response_is_retried_immediately(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """PDFではない応答は保存せずに再試行することのテスト"""
+    save_path = tmp_path / "test.pdf"
+    session.get.side_effect = [
+        _response([HTML], {"content-length": str(len(HTML))}),
+        _response(_chunks(BODY, 1000), {"content-length": str(len(BODY))}),
+    ]
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert result.sha256 == hashlib.sha256(BODY).hexdigest()
+    assert save_path.read_bytes() == BODY
+    assert not part_path_for(save_path).exists()
+    # 2回目のリクエストは壊れたデータの続きではなく最初から取得する
+    assert "Range" not in session.get.call_args_list[1].kwargs["headers"]
+
+
+def test_truncated_pdf_is_not_committed(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """トレーラがないPDFは保存されず、失敗として記録されることのテスト"""
+    save_path = tmp_path / "test.pdf"
+    session.get.side_effect = lambda *args, **kwargs: _response([BODY[:-10]])
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "failed"
+    assert "トレーラ" in result.error
+    assert session.get.call_count == 3
+    assert not save_path.exists()
+    assert not part_path_for(save_path).exists()
+
+
+def test_corrupt_part_file_is_discarded_on_resume(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """受信済みと判断された .part ファイルがPDFでない場合は破棄して取り直すことのテスト"""
+    save_path = tmp_path / "test.pdf"
+    part_path_for(save_path).write_bytes(HTML)
+    validator_path_for(save_path).write_text('"v1"', encoding="utf-8")
+    session.get.side_effect = [
+        _response([], {"content-range": f"bytes */{len(HTML)}"}, status_code=416),
+        _response([BODY], {"content-length": str(len(BODY))}),
+    ]
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert save_path.read_bytes() == BODY
@@ -0,0 +1,198 @@
+# ruff: noqa
+"""PDF構造調査モジュールのテスト"""
+
+import json
+import zlib
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from downloader.metadata import FileMetadata, MetadataManager, load_recorded_files
+from downloader.pdf_downloader import PDFDownloader
+from downloader.pdf_probe import probe_pdf
+
+
+def _pdf(*objects: bytes, trailer: bytes = b"<< /Root 1 0 R >>") -> bytes:
+    """オブジェクトを並べたPDFを作成(相互参照表は構造の調査に使用しないため省略)"""
+    body = b"".join(b"%d 0 obj\n%s\nendobj\n" % (number, obj) for number, obj in enumerate(objects, start=1))
+    return b"%PDF-1.7\n" + body + b"trailer\n" + trailer + b"\n%%EOF\n"
+
+
+def _stream(dictionary: bytes, data: bytes) -> bytes:
+    return dictionary + b"\nstream\n" + data + b"\nendstream"
+
+
+TEXT_PDF = _pdf(
+    b"<< /Type /Catalog /Pages 2 0 R >>",
+    b"<< /Type /Pages /Kids [3 0 R 4 0 R 5 0 R] /Count 3 /MediaBox [0 0 595.28 841.89] >>",
+    b"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 6 0 R >> >> /Contents 7 0 R >>",
+    b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] >>",
+    b"<< /Type /Page /Parent 2 0 R >>",
+    b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    # コンテンツストリームの内容は調査の対象外
+    _stream(b"<< /Length 29 >>", b"BT /F1 12 Tf (endobj) Tj ET"),
+)
+
+
+def test_probe_uncompressed_pdf(tmp_path: Path) -> None:
+    """ページ数、継承したページの大きさ、テキストレイヤーの有無を調べることのテスト"""
+    path = tmp_path / "text.pdf"
+    path.write_bytes(TEXT_PDF)
+
+    structure = probe_pdf(path)
+
+    assert structure.page_count == 3
+    assert structure.page_sizes == [[595.3, 841.9], [842.0, 595.0]]
+    assert structure.has_text_layer
+    assert not structure.encrypted
+
+
+def test_probe_object_streams(tmp_path: Path) -> None:
+    """圧縮されたオブジェクトストリーム内のページツリーを調べることのテスト"""
+    members = [
+        b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 2 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /XObject << /Im1 5 0 R >> >> >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>",
+    ]
+    offsets, body = [], b""
+    for member in members:
+        offsets.append(len(body))
+        body += member + b" "
+    header = b" ".join(b"%d %d" % (number, offset) for number, offset in zip((2, 3, 4), offsets))
+    content = zlib.compress(header + b"\n" + body)
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(
+        _pdf(
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            _stream(b"<< /Type /ObjStm /N 3 /First %d /Filter /FlateDecode >>" % (len(header) + 1), content),
+        )
+    )
+
+    structure = probe_pdf(path)
+
+    assert structure.page_count == 2
+    assert structure.page_sizes == [[612.0, 792.0]]
+    assert not structure.has_text_layer
+
+
+def test_probe_encrypted_pdf(tmp_path: Path) -> None:
+    """暗号化の有無を調べ、ページツリーがない場合はページ数が不明になることのテスト"""
+    path = tmp_path / "encrypted.pdf"
+    path.write_bytes(_pdf(b"<< /Filter /Standard /V 2 >>", trailer=b"<< /Root 2 0 R /Encrypt 1 0 R >>"))
+
+    structure = probe_pdf(path)
+
+    assert structure.encrypted
+    assert structure.page_count is None
+    assert structure.page_sizes == []
+
+
+def _objstm_pdf(members: list[bytes]) -> bytes:
+    """オブジェクトをオブジェクトストリームにまとめたPDFを作成"""
+    offsets, body = [], b""
+    for member in members:
+        offsets.append(len(body))
+        body += member + b" "
+    header = b" ".join(b"%d %d" % (number, offset) for number, offset in zip(range(2, 2 + len(members)), offsets))
+    content = zlib.compress(header + b"\n" + body)
+    return _pdf(
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        _stream(b"<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode >>" % (len(members), len(header) + 1), content),
+    )
+
+
+def test_probe_text_layer_is_unknown_when_undecidable(tmp_path: Path) -> None:
+    """フォントの参照だけではテキストレイヤーの有無を判断できない場合は不明とすることのテスト"""
+    # フォントの参照がオブジェクトストリーム内のみ
+    compressed = tmp_path / "compressed.pdf"
+    compressed.write_bytes(
+        _objstm_pdf(
+            [
+                b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+                b"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 4 0 R >> >> >>",
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+            ]
+        )
+    )
+    # フォントを宣言したスキャン画像のPDF
+    scanned = tmp_path / "scanned.pdf"
+    scanned.write_bytes(
+        _pdf(
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 4 0 R >> /XObject << /Im1 5 0 R >> >> >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+            _stream(b"<< /Type /XObject /Subtype /Image /Length 4 >>", b"\x00\x00\x00\x00"),
+        )
+    )
+
+    assert probe_pdf(compressed).page_count == 1
+    assert probe_pdf(compressed).has_text_layer is None
+    assert probe_pdf(scanned).has_text_layer is None
+
+
+def _metadata(path: Path) -> FileMetadata:
+    return FileMetadata(
+        filename=path.name,
+        original_url="https://example.com/a.pdf",
+        organization="団体",
+        category="不明",
+        year="R5",
+    )
+
+
+def test_structure_is_recorded_in_metadata(tmp_path: Path) -> None:
+    """ダウンロードしたPDFの構造がメタデータと統計情報に記録されることのテスト"""
+    save_path = tmp_path / "R5_政党本部_団体.pdf"
+    response = Mock(status_code=200, headers={"content-length": str(len(TEXT_PDF))})
+    response.iter_content.return_value = [TEXT_PDF]
+    session = Mock()
+    session.get.return_value = response
+    downloader = PDFDownloader(session=session, output_dir=str(tmp_path), sleep_func=Mock())
+    manager = MetadataManager(str(tmp_path), [], [], None, exact_match=False)
+
+    result = downloader.download_pdf("https://example.com/a.pdf", str(save_path), _metadata(save_path))
+    assert result.download_status == "success"
+    manager.add_file(result)
+    manager.save()
+
+    [data] = json.loads((tmp_path / "metadata.json").read_text(encoding="utf-8"))["files"]
+    saved = FileMetadata.from_dict(data)
+    assert (saved.page_count, saved.has_text_layer, saved.encrypted) == (3, True, False)
+    assert saved.page_sizes == [[595.3, 841.9], [842.0, 595.0]]
+    assert manager.statistics.total_pages == 3
+
+
+def test_existing_files_reuse_recorded_structure(tmp_path: Path) -> None:
+    """既存のファイルは調べ直さず、同じ内容の記録がある場合のみ構造を引き継ぐことのテスト"""
+    save_path = tmp_path / "R5_政党本部_団体.pdf"
+    save_path.write_bytes(TEXT_PDF)
+    recorded = _metadata(save_path)
+    recorded.file_size = len(TEXT_PDF)
+    recorded.page_count = 3
+    recorded.page_sizes = [[595.3, 841.9]]
+    recorded.has_text_layer = True
+    recorded.encrypted = False
+    previous = MetadataManager(str(tmp_path), [], [], None, exact_match=False)
+    previous.add_file(recorded)
+    previous.save()
+
+    downloader = PDFDownloader(session=Mock(), output_dir=str(tmp_path), sleep_func=Mock())
+    with patch("downloader.pdf_downloader.probe_pdf") as probe:
+        # 記録がない場合は不明のまま
+        unknown = downloader.check_existing_file(str(save_path), _metadata(save_path))
+        assert unknown is not None
+        assert unknown.page_count is None
+
+        # 前回の metadata.json に記録した構造を引き継ぐ
+        downloader.remember_files(load_recorded_files(tmp_path / "metadata.json").values())
+        reused = downloader.check_existing_file(str(save_path), _metadata(save_path))
+        assert reused is not None
+        assert (reused.page_count, reused.page_sizes, reused.has_text_layer) == (3, [[595.3, 841.9]], True)
+
+        # 大きさが異なる(置き換えられた)ファイルには引き継がない
+        save_path.write_bytes(TEXT_PDF + b"\n")
+        changed = downloader.check_existing_file(str(save_path), _metadata(save_path))
+        assert changed is not None
+        assert changed.page_count is None
+
+    probe.assert_not_called()
@@ -0,0 +1,139 @@
+# ruff: noqa
+"""PipelineCrawlerクラスのテスト"""
+
+import threading
+from unittest.mock import Mock
+
+from downloader.page_parser import PdfLink, ReportListPageLink, YearPageLink
+from downloader.pipeline import PipelineCrawler
+
+
+def _make_downloader(*, stream_links: bool = False) -> Mock:
+    """ページ構造を模したダウンローダーのモックを作成"""
+    downloader = Mock()
+    downloader.stream_links = stream_links
+
+    def parse_year_page(link: YearPageLink) -> list[ReportListPageLink]:
+        return [ReportListPageLink(url=f"{link.url}list{i}.html", text=f"一覧{i}", year=link.year) for i in range(3)]
+
+    def pdf_links(link: ReportListPageLink) -> list[PdfLink]:
+        return [PdfLink(url=f"{link.url}/{i}.pdf", text=f"団体{i}", report_list_url=link.url) for i in range(4)]
+
+    downloader.parse_year_page.side_effect = parse_year_page
+    downloader.parse_report_list_page.side_effect = pdf_links
+    downloader.iter_report_list_page.side_effect = lambda link: iter(pdf_links(link))
+    return downloader
+
+
+def test_pipeline_processes_all_links() -> None:
+    """全てのPDFが処理され、報告書一覧ページごとに完了が記録されることのテスト"""
+    downloader = _make_downloader()
+
+    PipelineCrawler(downloader, workers=2, queue_size=2).run(
+        [
+            YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5"),
+            ReportListPageLink(url="https://example.com/SF/a.html", text="追加分", year="R4"),
+        ],
+    )
+
+    assert downloader.process_pdf_link.call_count == 16
+    assert downloader.complete_report_list_page.call_count == 4
+    for call in downloader.complete_report_list_page.call_args_list:
+        report_list_link, pdf_links = call.args
+        assert len(pdf_links) == 4
+        assert all(link.report_list_url == report_list_link.url for link in pdf_links)
+    years = {call.args[1] for call in downloader.process_pdf_link.call_args_list}
+    assert years == {"R5", "R4"}
+
+
+def test_pipeline_with_streaming() -> None:
+    """ストリーミング時は受信しながらキューに投入されることのテスト"""
+    downloader = _make_downloader(stream_links=True)
+
+    PipelineCrawler(downloader, workers=1, queue_size=1).run(
+        [YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5")],
+    )
+
+    assert downloader.process_pdf_link.call_count == 12
+    downloader.parse_report_list_page.assert_not_called()
+    assert downloader.complete_report_list_page.call_count == 3
+
+
+def test_discovery_overlaps_with_downloads() -> None:
+    """PDFのダウンロード中に次の報告書一覧ページの探索が進むことのテスト"""
+    downloader = _make_downloader()
+    second_page_parsed = threading.Event()
+    overlapped: list[bool] = []
+
+    def parse_report_list_page(link: ReportListPageLink) -> list[PdfLink]:
+        if link.url.endswith("list1.html"):
+            second_page_parsed.set()
+        return [PdfLink(url=f"{link.url}/0.pdf", text="団体0", report_list_url=link.url)]
+
+    def process_pdf_link(pdf_link: PdfLink, year: str) -> bool:
+        if pdf_link.report_list_url.endswith("list0.html"):
+            # 最初のPDFの転送中に次のページが探索されるのを待つ
+            overlapped.append(second_page_parsed.wait(timeout=5))
+        return True
+
+    downloader.parse_report_list_page.side_effect = parse_report_list_page
+    downloader.process_pdf_link.side_effect = process_pdf_link
+
+    PipelineCrawler(downloader, workers=1, queue_size=4).run(
+        [YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5")],
+    )
+
+    assert overlapped == [True]
+    assert downloader.process_pdf_link.call_count == 3
+
+
+def test_queue_bounds_discovery() -> None:
+    """キューが満杯の間は探索が先行しないことのテスト"""
+    downloader = _make_downloader()
+    lock = threading.Lock()
+    state = {"discovered": 0, "processed": 0, "max_ahead": 0}
+
+    def parse_report_list_page(link: ReportListPageLink) -> list[PdfLink]:
+        with lock:
+            state["discovered"] += 1
+        return [PdfLink(url=f"{link.url}/{i}.pdf", text=f"団体{i}", report_list_url=link.url) for i in range(4)]
+
+    def process_pdf_link(pdf_link: PdfLink, year: str) -> bool:
+        with lock:
+            state["processed"] += 1
+            state["max_ahead"] = max(state["max_ahead"], state["discovered"] * 4 - state["processed"])
+        return True
+
+    downloader.parse_report_list_page.side_effect = parse_report_list_page
+    downloader.process_pdf_link.side_effect = process_pdf_link
+
+    PipelineCrawler(downloader, workers=1, queue_size=2).run(
+        [YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5")],
+    )
+
+    assert state["processed"] == 12
+    # 未処理のPDFはキューの上限と1ページ分の探索結果を超えない
+    assert state["max_ahead"] <= 2 + 4
+
+
+def test_failing_consumer_stops_streaming_discovery() -> None:
+    """ストリーミング時にコンシューマーが失敗しても、満杯のキューを待つ探索で止まらずに例外となることのテスト"""
+    downloader = _make_downloader(stream_links=True)
+    downloader.process_pdf_link.side_effect = RuntimeError("broken")
+    errors: list[BaseException] = []
+
+    def run() -> None:
+        try:
+            PipelineCrawler(downloader, workers=1, queue_size=1).run(
+                [YearPageLink(url="https://example.com/SS1/", text="令和5年分", year="R5")],
+            )
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert [str(e) for e in errors] == ["broken"]
+    assert downloader.process_pdf_link.call_count == 1
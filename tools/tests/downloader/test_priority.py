@@ -0,0 +1,156 @@
+# ruff: noqa
+"""優先度付きダウンロードキューと予算のテスト"""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from downloader.crawl_state import PAGE_INCOMPLETE, content_hash
+from downloader.downloader import SeijishikinDownloader
+from downloader.metadata import FileMetadata
+from downloader.page_parser import PdfLink, ReportListPageLink
+from downloader.priority import DownloadBudget, DownloadQueue, PriorityRule, parse_duration, parse_size
+
+BASE = "https://example.com/reports/SS20241129"
+
+
+def _pdf(list_code: str, name: str) -> PdfLink:
+    return PdfLink(url=f"{BASE}/{list_code}/{name}.pdf", text=name, report_list_url=f"{BASE}/{list_code}/index.html")
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("1024", 1024), ("500M", 500 * 1024**2), ("5G", 5 * 1024**3), ("1.5k", 1536), ("2GiB", 2 * 1024**3)],
+)
+def test_parse_size(value: str, expected: int) -> None:
+    """サイズの指定をバイト数に変換できることのテスト"""
+    assert parse_size(value) == expected
+
+
+@pytest.mark.parametrize(("value", "expected"), [("3600", 3600), ("90m", 5400), ("2h", 7200), ("1.5H", 5400)])
+def test_parse_duration(value: str, expected: float) -> None:
+    """時間の指定を秒数に変換できることのテスト"""
+    assert parse_duration(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "5X", "-1", "abc"])
+def test_parse_invalid(value: str) -> None:
+    """解釈できない指定はエラーになることのテスト"""
+    with pytest.raises(ValueError):
+        parse_size(value)
+    with pytest.raises(ValueError):
+        parse_duration(value)
+
+
+@pytest.mark.parametrize("spec", ["color=red", "category", "size", "size=big", "org"])
+def test_invalid_rules(spec: str) -> None:
+    """解釈できない優先度の規則はエラーになることのテスト"""
+    with pytest.raises(ValueError):
+        PriorityRule.parse(spec)
+
+
+def _drain(queue: DownloadQueue) -> list[str]:
+    queue.start_draining()
+    names = []
+    while (job := queue.pop()) is not None:
+        names.append(f"{job.year}/{job.pdf_link.text}")
+    return names
+
+
+def test_queue_orders_by_category_then_year() -> None:
+    """団体種別、公表年の順に並べ、同順位は投入順になることのテスト"""
+    queue = DownloadQueue(
+        [PriorityRule.parse("category=資金管理団体,国会議員関係政治団体"), PriorityRule.parse("year")]
+    )
+    queue.push(_pdf("SL", "支部A"), "R5")
+    queue.push(_pdf("SC", "議員B"), "R4")
+    queue.push(_pdf("SS", "管理C"), "R4")
+    queue.push(_pdf("SC", "議員D"), "R5")
+    queue.push(_pdf("SS", "管理E"), "R5")
+    queue.push(_pdf("SS", "管理F"), "R5")
+
+    assert _drain(queue) == ["R5/管理E", "R5/管理F", "R4/管理C", "R5/議員D", "R4/議員B", "R5/支部A"]
+
+
+def test_queue_orders_by_organization_list(tmp_path: Path) -> None:
+    """一覧ファイルの団体名を含むPDFが先になることのテスト"""
+    names = tmp_path / "names.txt"
+    names.write_text("重要\n", encoding="utf-8")
+    queue = DownloadQueue([PriorityRule.parse(f"org={names}")])
+    queue.push(_pdf("SL", "団体A"), "R5")
+    queue.push(_pdf("SL", "重要な団体B"), "R5")
+
+    assert _drain(queue) == ["R5/重要な団体B", "R5/団体A"]
+
+
+def test_queue_orders_by_expected_size() -> None:
+    """想定サイズの小さい順に並べ、サイズが不明なPDFは最後になることのテスト"""
+    queue = DownloadQueue([PriorityRule.parse("size=asc")])
+    for name, size in [("大", 3000), ("不明", None), ("小", 10), ("中", 500)]:
+        queue.push(_pdf("SL", name), "R5")
+        queue.jobs[-1].expected_size = size
+
+    assert queue.needs_size
+    assert _drain(queue) == ["R5/小", "R5/中", "R5/大", "R5/不明"]
+
+
+def test_budget_limits() -> None:
+    """バイト数、ファイル数、実行時間の上限のテスト"""
+    budget = DownloadBudget(max_bytes=100, max_files=3)
+    assert budget.allows(60)
+    budget.charge(60)
+    # 想定サイズが残りの予算を超える場合はスキップし、サイズが不明な場合はダウンロードする
+    assert not budget.allows(50)
+    assert budget.allows(None)
+    budget.charge(50)
+    assert budget.exhausted() is not None
+    assert not budget.allows(1)
+
+    files = DownloadBudget(max_files=1)
+    files.charge(10)
+    assert files.exhausted() is not None
+
+    now = [0.0]
+    timed = DownloadBudget(max_time=60, clock=lambda: now[0])
+    timed.start()
+    now[0] = 59
+    assert timed.exhausted() is None
+    now[0] = 60
+    assert timed.exhausted() is not None
+
+
+def test_downloader_downloads_by_priority_within_budget(make_args, tmp_path: Path) -> None:
+    """PDFリンクを集めてから優先度順にダウンロードし、予算で打ち切ることのテスト"""
+    list_link = ReportListPageLink(url=f"{BASE}/SL/index.html", text="一覧", year="R5")
+    downloader = SeijishikinDownloader(
+        make_args(priority=["category=資金管理団体"], max_files=2, state_db=str(tmp_path / "state.sqlite3"))
+    )
+    downloader.page_parser = Mock()
+    downloader.page_parser.content_hashes = {list_link.url: content_hash("<html></html>")}
+    order: list[str] = []
+
+    def download_pdf(pdf_url: str, save_path: str, metadata: FileMetadata) -> FileMetadata:
+        order.append(metadata.organization)
+        metadata.download_status = "success"
+        metadata.file_size = 10
+        return metadata
+
+    downloader.pdf_downloader.download_pdf = Mock(side_effect=download_pdf)
+
+    pdf_links = [_pdf("SL", "支部A"), _pdf("SS", "管理B"), _pdf("SL", "支部C")]
+    for pdf_link in pdf_links:
+        assert downloader.process_pdf_link(pdf_link, "R5") is False
+    downloader.complete_report_list_page(list_link, pdf_links)
+
+    # 集めている間はダウンロードもページの記録も行わない
+    downloader.pdf_downloader.download_pdf.assert_not_called()
+    assert downloader.crawl_state.get(list_link.url) is None
+
+    downloader.drain_download_queue(downloader.download_queue)
+
+    assert order == ["管理B", "支部A"]
+    assert downloader.budget_skipped == {pdf_links[2].url}
+    # 予算のためにダウンロードしなかったPDFがあるページは次回も処理する
+    assert downloader.crawl_state.get(list_link.url).outcome == PAGE_INCOMPLETE
+    downloader.crawl_state.close()
@@ -0,0 +1,187 @@
+# ruff: noqa
+"""進捗表示モジュールのテスト"""
+
+import io
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from benchmarks.replay_server import ReplayServer, SiteSpec, SyntheticSite
+from downloader.downloader import SeijishikinDownloader
+from downloader.progress import RATE_WINDOW, ProgressReporter, format_bytes, format_duration, open_progress_stream
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TtyStringIO(io.StringIO):
+    """端末として振る舞う出力先"""
+
+    def isatty(self) -> bool:
+        return True
+
+
+def _records(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_stream_is_throttled() -> None:
+    """進捗は一定間隔ごとにのみ出力され、終了時に最終的な進捗が出力されることのテスト"""
+    clock = FakeClock()
+    stream = io.StringIO()
+    progress = ProgressReporter(stream=stream, interval=1.0, clock=clock, wall_clock=lambda: 1000.0)
+
+    progress.pages_found(3)
+    progress.pdf_queued()
+    clock.now = 0.5
+    progress.pdf_queued()
+    assert stream.getvalue() == ""
+
+    clock.now = 1.0
+    progress.pdf_finished("success")
+    clock.now = 1.5
+    progress.pdf_finished("failed")
+    progress.close()
+    progress.close()
+
+    first, last = _records(stream)
+    assert first["type"] == "progress"
+    assert first["time"] == 1000.0
+    assert (first["pages_discovered"], first["pdfs_queued"], first["pdfs_done"]) == (3, 2, 1)
+    assert last["type"] == "finished"
+    assert (last["pdfs_done"], last["pdfs_failed"], last["pdfs_skipped"]) == (1, 1, 0)
+
+
+def test_throughput_and_eta() -> None:
+    """直近の転送速度と完了件数の速度から残り時間を見込むことのテスト"""
+    clock = FakeClock()
+    progress = ProgressReporter(clock=clock)
+    for _ in range(10):
+        progress.pdf_queued()
+
+    for second in range(1, 5):
+        clock.now = float(second)
+        progress.add_bytes(1_000_000)
+        progress.pdf_finished("success")
+
+    snapshot = progress.snapshot()
+    assert snapshot["bytes"] == 4_000_000
+    assert snapshot["throughput"] == pytest.approx(1_000_000)
+    # 1件/秒で残り6件
+    assert snapshot["eta"] == pytest.approx(6.0)
+
+    # 期間より前の転送は速度に含めない
+    clock.now = 100.0
+    progress.add_bytes(500_000)
+    assert progress.snapshot()["throughput"] == pytest.approx(500_000 / 96, abs=0.1)
+
+
+def test_samples_are_pruned_without_output() -> None:
+    """表示も出力もしない場合でも、速度の計算に使わない履歴が破棄されることのテスト"""
+    clock = FakeClock()
+    progress = ProgressReporter(clock=clock)
+
+    for second in range(1, 1001):
+        clock.now = float(second)
+        progress.add_bytes(1)
+        progress.pdf_finished("success")
+
+    assert len(progress._byte_samples) <= RATE_WINDOW + 2
+    assert len(progress._done_samples) <= RATE_WINDOW + 2
+    assert progress.snapshot()["throughput"] == pytest.approx(1.0)
+
+
+def test_eta_is_unknown_before_first_completion() -> None:
+    """完了したPDFがない場合は残り時間が不明になることのテスト"""
+    progress = ProgressReporter(clock=FakeClock())
+    assert progress.snapshot()["eta"] == 0.0
+    progress.pdf_queued()
+    assert progress.snapshot()["eta"] is None
+    with pytest.raises(ValueError):
+        progress.pdf_finished("unknown")
+
+
+def test_display_overwrites_line_on_tty() -> None:
+    """端末では同じ行を上書きし、それ以外では1行ずつ表示することのテスト"""
+    clock = FakeClock()
+    tty = TtyStringIO()
+    log = io.StringIO()
+    for display in (tty, log):
+        progress = ProgressReporter(display=display, clock=clock)
+        progress.pages_found(2)
+        progress.page_done()
+        progress.pdf_queued()
+        progress.add_bytes(1536)
+        progress.close()
+
+    assert tty.getvalue().startswith("\r報告書一覧 1/2 | PDF 0/1 ")
+    assert tty.getvalue().endswith("\n")
+    assert "1.5KB" in tty.getvalue()
+    assert log.getvalue().count("\n") == 1
+    assert "\r" not in log.getvalue()
+    # 端末以外への表示は間隔を広げる
+    assert ProgressReporter(display=log).interval > ProgressReporter(display=tty).interval
+
+
+def test_format_helpers() -> None:
+    """バイト数と時間の表示形式のテスト"""
+    assert format_bytes(512) == "512B"
+    assert format_bytes(5 * 1024 * 1024) == "5.0MB"
+    assert format_duration(3725) == "01:02:05"
+    assert format_duration(None) == "--:--:--"
+
+
+def test_open_progress_stream_fd() -> None:
+    """ファイル記述子に出力でき、閉じても呼び出し元の記述子は閉じないことのテスト"""
+    read_fd, write_fd = os.pipe()
+    try:
+        stream, close_stream = open_progress_stream(f"fd:{write_fd}")
+        progress = ProgressReporter(stream=stream, close_stream=close_stream, clock=FakeClock())
+        progress.close()
+
+        record = json.loads(os.read(read_fd, 65536).decode("utf-8"))
+        assert record["type"] == "finished"
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+    with pytest.raises(ValueError):
+        open_progress_stream("fd:stdout")
+
+
+@pytest.mark.parametrize("priority", [None, ["year"]])
+def test_crawl_reports_progress(make_args, tmp_path: Path, priority) -> None:
+    """クロール全体の件数とバイト数が進捗に反映され、PDFごとの進捗バーは表示しないことのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=2, pdfs=3, pdf_size=2048))
+    progress_path = tmp_path / "progress.jsonl"
+
+    with ReplayServer(site) as server:
+        downloader = SeijishikinDownloader(
+            make_args(
+                base_url=server.base_url,
+                progress_jsonl=str(progress_path),
+                no_progress=True,
+                priority=priority,
+            )
+        )
+        downloader.scheduler.min_interval = 0
+        downloader.scheduler.latency_factor = 0
+        assert downloader.download_all()
+        downloader.progress.close()
+
+    assert downloader.pdf_downloader.progress is downloader.progress
+    last = json.loads(progress_path.read_text(encoding="utf-8").splitlines()[-1])
+    assert last["type"] == "finished"
+    assert last["pages_discovered"] == last["pages_done"] == 2
+    assert last["pdfs_queued"] == last["pdfs_done"] == 6
+    assert last["bytes"] == sum(metadata.file_size for metadata in downloader.metadata_manager.files)
+    assert last["eta"] == 0.0
@@ -0,0 +1,146 @@
+# ruff: noqa
+"""完了フックとPDF描画ワーカーのテスト"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from benchmarks.replay_server import ReplayServer, SiteSpec, SyntheticSite
+from downloader.downloader import SeijishikinDownloader
+from downloader.metadata import FileMetadata
+from downloader.render_pool import RenderPool, _convert_checked
+
+
+def write_marker(pdf_path: str, output_dir: str) -> None:
+    """描画の代わりにPDFのパスを書き出す(プロセスプールから呼び出すためモジュールの関数とする)"""
+    Path(output_dir).mkdir(parents=True)
+    (Path(output_dir) / "source.txt").write_text(pdf_path, encoding="utf-8")
+
+
+def _metadata(filename: str) -> FileMetadata:
+    return FileMetadata(
+        filename=filename,
+        original_url=f"https://example.com/{filename}",
+        organization="団体",
+        category="不明",
+        year="R5",
+    )
+
+
+def test_hooks_receive_successful_downloads(make_args) -> None:
+    """成功したPDFのみがフックに通知され、フックの例外でダウンロードが止まらないことのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=2, pdfs=3, pdf_size=1024))
+    received: list[FileMetadata] = []
+
+    def broken_hook(metadata: FileMetadata) -> None:
+        raise RuntimeError("broken")
+
+    with ReplayServer(site) as server:
+        downloader = SeijishikinDownloader(make_args(base_url=server.base_url, no_progress=True))
+        downloader.scheduler.min_interval = 0
+        downloader.scheduler.latency_factor = 0
+        downloader.add_completion_hook(broken_hook)
+        downloader.add_completion_hook(received.append)
+        assert downloader.download_all()
+
+        # 2回目の実行では既存のファイルがスキップされ、フックは呼び出されない
+        rerun = SeijishikinDownloader(make_args(base_url=server.base_url, no_progress=True))
+        rerun.scheduler.min_interval = 0
+        rerun.scheduler.latency_factor = 0
+        rerun_received: list[FileMetadata] = []
+        rerun.add_completion_hook(rerun_received.append)
+        assert rerun.download_all()
+
+    assert len(received) == 6
+    assert all(metadata.download_status == "success" for metadata in received)
+    assert all((Path(downloader.output_dir) / metadata.filename).exists() for metadata in received)
+    assert rerun_received == []
+
+
+def test_render_pool_counts_results(tmp_path: Path) -> None:
+    """描画先のパスと、成功・失敗の件数が記録されることのテスト"""
+    calls: list[tuple[str, str]] = []
+
+    def render(pdf_path: str, output_dir: str) -> None:
+        calls.append((pdf_path, output_dir))
+        if pdf_path.endswith("broken.pdf"):
+            raise ValueError("broken")
+
+    pool = RenderPool(
+        str(tmp_path / "pdfs"), str(tmp_path / "images"), executor=ThreadPoolExecutor(2), render_func=render
+    )
+    pool.submit(_metadata("R5_政党本部_団体.pdf"))
+    pool.submit(_metadata("broken.pdf"))
+    pool.close()
+
+    assert sorted(calls) == sorted(
+        [
+            (str(tmp_path / "pdfs" / "R5_政党本部_団体.pdf"), str(tmp_path / "images" / "R5_政党本部_団体")),
+            (str(tmp_path / "pdfs" / "broken.pdf"), str(tmp_path / "images" / "broken")),
+        ]
+    )
+    assert (pool.submitted, pool.rendered, pool.failed, pool.pending) == (2, 1, 1, 0)
+
+
+def test_render_pool_skips_same_content(tmp_path: Path) -> None:
+    """ハッシュ値が同じPDF(コンテンツストアのリンク)は1回のみ描画することのテスト"""
+    calls: list[str] = []
+    pool = RenderPool(
+        str(tmp_path / "pdfs"),
+        str(tmp_path / "images"),
+        executor=ThreadPoolExecutor(1),
+        render_func=lambda pdf_path, output_dir: calls.append(pdf_path),
+    )
+    pool.submit(replace(_metadata("a.pdf"), sha256="aa"))
+    pool.submit(replace(_metadata("b.pdf"), sha256="aa"))
+    pool.submit(replace(_metadata("c.pdf"), sha256="cc"))
+    pool.submit(_metadata("d.pdf"))
+    pool.close()
+
+    assert sorted(Path(path).name for path in calls) == ["a.pdf", "c.pdf", "d.pdf"]
+    assert (pool.submitted, pool.rendered, pool.deduplicated) == (3, 3, 1)
+
+
+def test_downloader_renders_in_worker_processes(make_args, tmp_path: Path) -> None:
+    """--render-images を指定した場合にダウンロードしたPDFがワーカープロセスに渡されることのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=1, pdfs=2, pdf_size=1024))
+    image_dir = tmp_path / "images"
+
+    with ReplayServer(site) as server:
+        downloader = SeijishikinDownloader(
+            make_args(base_url=server.base_url, no_progress=True, render_images=str(image_dir), render_workers=2)
+        )
+        assert downloader.render_pool is not None
+        downloader.render_pool.render_func = write_marker
+        downloader.scheduler.min_interval = 0
+        downloader.scheduler.latency_factor = 0
+        assert downloader.download_all()
+    downloader.render_pool.close()
+
+    assert downloader.render_pool.rendered == 2
+    for metadata in downloader.metadata_manager.files:
+        marker = image_dir / Path(metadata.filename).stem / "source.txt"
+        assert marker.read_text(encoding="utf-8") == str(Path(downloader.output_dir) / metadata.filename)
+
+
+def test_conversion_without_images_is_a_failure(tmp_path: Path) -> None:
+    """変換で画像が書き出されなかった場合やPDFがない場合は失敗とすることのテスト"""
+    pdf_path = tmp_path / "a.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 %%EOF")
+    output_dir = tmp_path / "images"
+
+    def convert(pdf: str, output: str) -> None:
+        Path(output).mkdir(exist_ok=True)
+        (Path(output) / "a_page_1.png").write_bytes(b"png")
+
+    def broken(pdf: str, output: str) -> None:
+        # pdf_to_png と同様に、失敗しても例外を送出しない
+        print("An error occurred during conversion")
+
+    _convert_checked(convert, str(pdf_path), str(output_dir))
+    with pytest.raises(RuntimeError, match="画像"):
+        _convert_checked(broken, str(pdf_path), str(output_dir))
+    with pytest.raises(FileNotFoundError):
+        _convert_checked(convert, str(tmp_path / "missing.pdf"), str(output_dir))
@@ -0,0 +1,69 @@
+# ruff: noqa
+"""ローカルの再生サーバーに対するクロールのテスト"""
+
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+import requests
+
+from benchmarks.replay_server import FaultSpec, RecordedSite, ReplayServer, SiteSpec, SyntheticSite
+from downloader.downloader import SeijishikinDownloader
+
+
+def _crawl(make_args, server: ReplayServer, **overrides) -> SeijishikinDownloader:
+    downloader = SeijishikinDownloader(make_args(base_url=server.base_url, **overrides))
+    # ローカルのサーバーに対してはリクエスト間隔を空けない
+    downloader.scheduler.min_interval = 0
+    downloader.scheduler.latency_factor = 0
+    assert downloader.download_all()
+    return downloader
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_crawl_synthetic_site(make_args, tmp_path: Path, concurrency: int) -> None:
+    """合成サイトの全てのPDFをダウンロードできることのテスト"""
+    site = SyntheticSite(SiteSpec(years=2, report_lists=2, pdfs=3, pdf_size=4096))
+
+    with ReplayServer(site) as server:
+        downloader = _crawl(make_args, server, concurrency=concurrency)
+
+    files = downloader.metadata_manager.files
+    assert len(files) == site.pdf_count == 12
+    assert all(metadata.download_status == "success" for metadata in files)
+    assert {metadata.year for metadata in files} == {"R5", "R4"}
+    assert len(list(Path(downloader.output_dir).glob("*.pdf"))) == 12
+
+
+def test_crawl_recovers_from_throttling(make_args) -> None:
+    """429応答を受けても再試行して全てのPDFをダウンロードできることのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=2, pdfs=5, pdf_size=1024))
+
+    with ReplayServer(site, FaultSpec(throttle_rate=0.2, seed=1)) as server:
+        downloader = _crawl(make_args, server, year="R5")
+        throttled = server.statuses[HTTPStatus.TOO_MANY_REQUESTS]
+
+    assert throttled > 0
+    assert downloader.scheduler.backoff_count > 0
+    files = downloader.metadata_manager.files
+    assert len(files) == 10
+    assert all(metadata.download_status == "success" for metadata in files)
+
+
+def test_recorded_site(tmp_path: Path) -> None:
+    """保存したサイトのコピーを返し、ディレクトリの外のファイルは返さないことのテスト"""
+    root = tmp_path / "www.soumu.go.jp"
+    page_dir = root / "senkyo" / "seiji_s" / "seijishikin"
+    page_dir.mkdir(parents=True)
+    (page_dir / "index.html").write_bytes("<html>トップ</html>".encode("shift_jis"))
+    (tmp_path / "secret.txt").write_text("secret")
+
+    with ReplayServer(RecordedSite(root)) as server:
+        top = requests.get(server.base_url, timeout=5)
+        outside = requests.get(server.base_url.split("/senkyo/")[0] + "/../secret.txt", timeout=5)
+        robots = requests.get(server.base_url.split("/senkyo/")[0] + "/robots.txt", timeout=5)
+
+    assert top.status_code == 200
+    assert top.content.decode("shift_jis") == "<html>トップ</html>"
+    assert outside.status_code == 404
+    assert robots.status_code == 200
@@ -0,0 +1,239 @@
+# ruff: noqa
+"""PDFDownloaderの再開可能なダウンロードのテスト"""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.metadata import FileMetadata
+from downloader.pdf_downloader import IncompleteDownloadError, PDFDownloader, part_path_for, validator_path_for
+
+URL = "https://example.com/test.pdf"
+BODY = b"%PDF-1.4 0123456789 %%EOF"
+ETAG = '"v1"'
+
+
+def _response(status_code: int, chunks: list[bytes], headers: dict[str, str]) -> Mock:
+    """ストリーミングレスポンスのモックを作成"""
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers
+    response.iter_content.return_value = chunks
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+    return response
+
+
+def _metadata() -> FileMetadata:
+    return FileMetadata(
+        filename="test.pdf",
+        original_url=URL,
+        organization="テスト団体",
+        category="政党支部",
+        year="R5",
+    )
+
+
+@pytest.fixture
+def session() -> Mock:
+    return Mock(spec=requests.Session)
+
+
+@pytest.fixture
+def downloader(session: Mock, tmp_path: Path) -> PDFDownloader:
+    return PDFDownloader(session=session, output_dir=str(tmp_path), delay=0, sleep_func=Mock())
+
+
+def test_download_writes_part_then_renames(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """ダウンロード完了後に .part ファイルが保存先に名前変更されることのテスト"""
+    save_path = tmp_path / "test.pdf"
+    session.get.return_value = _response(200, [BODY], {"content-length": str(len(BODY))})
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert save_path.read_bytes() == BODY
+    assert not part_path_for(save_path).exists()
+
+
+def test_resume_from_part_file(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """既存の .part ファイルから Range リクエストで再開することのテスト"""
+    save_path = tmp_path / "test.pdf"
+    part_path_for(save_path).write_bytes(BODY[:10])
+    validator_path_for(save_path).write_text(ETAG, encoding="utf-8")
+    session.get.return_value = _response(
+        206,
+        [BODY[10:]],
+        {
+            "content-length": str(len(BODY) - 10),
+            "content-range": f"bytes 10-{len(BODY) - 1}/{len(BODY)}",
+            "ETag": ETAG,
+        },
+    )
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    session.get.assert_called_once_with(
+        URL, stream=True, headers={"Accept-Encoding": "identity", "If-Range": ETAG, "Range": "bytes=10-"}
+    )
+    assert save_path.read_bytes() == BODY
+    assert not validator_path_for(save_path).exists()
+
+
+def test_part_without_validator_is_refetched(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """検証子のない .part ファイルは同じファイルか確認できないため最初から取得することのテスト"""
+    save_path = tmp_path / "test.pdf"
+    part_path_for(save_path).write_bytes(BODY[:10])
+    session.get.return_value = _response(200, [BODY], {"content-length": str(len(BODY))})
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    session.get.assert_called_once_with(URL, stream=True, headers={"Accept-Encoding": "identity"})
+    assert save_path.read_bytes() == BODY
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        # 続きではない範囲
+        {"content-range": f"bytes 0-{len(BODY) - 1}/{len(BODY)}", "ETag": ETAG},
+        # If-Range を無視して、置き換えられたファイルの範囲を返すサーバー
+        {"content-range": f"bytes 10-{len(BODY) - 1}/{len(BODY)}", "ETag": '"v2"'},
+    ],
+)
+def test_mismatched_partial_content_is_not_spliced(
+    downloader: PDFDownloader,
+    session: Mock,
+    tmp_path: Path,
+    headers: dict[str, str],
+) -> None:
+    """受信済みのデータの続きではない206応答はつなぎ合わせず、最初から取得し直すことのテスト"""
+    save_path = tmp_path / "test.pdf"
+    replaced = b"%PDF-1.4 replacedXXX %%EOF"
+    part_path_for(save_path).write_bytes(BODY[:10])
+    validator_path_for(save_path).write_text(ETAG, encoding="utf-8")
+    partial = _response(206, [replaced[10:]], headers)
+    session.get.side_effect = [
+        partial,
+        _response(200, [replaced], {"content-length": str(len(replaced)), "ETag": '"v2"'}),
+    ]
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert save_path.read_bytes() == replaced
+    partial.close.assert_called_once()
+    assert session.get.call_args_list[1].kwargs["headers"] == {"Accept-Encoding": "identity"}
+
+
+def test_encoded_response_is_not_compared_with_content_length(
+    downloader: PDFDownloader,
+    session: Mock,
+    tmp_path: Path,
+) -> None:
+    """圧縮された応答は展開後のサイズをContent-Lengthと比較せず、再開用の検証子も記録しないことのテスト"""
+    save_path = tmp_path / "test.pdf"
+    session.get.return_value = _response(
+        200, [BODY], {"content-length": "10", "content-encoding": "gzip", "ETag": ETAG}
+    )
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert save_path.read_bytes() == BODY
+    assert not validator_path_for(save_path).exists()
+
+
+def test_error_response_is_closed(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """エラー応答は閉じてから再試行することのテスト"""
+    responses = [_response(500, [], {}) for _ in range(3)]
+    session.get.side_effect = responses
+
+    result = downloader.download_pdf(URL, str(tmp_path / "test.pdf"), _metadata())
+
+    assert result.download_status == "failed"
+    assert all(response.close.called for response in responses)
+
+
+def test_resume_ignored_by_server(downloader: PDFDownloader, session: Mock, tmp_path: Path) -> None:
+    """サーバーがRangeに対応していない場合は最初から書き直すことのテスト"""
+    save_path = tmp_path / "test.pdf"
+    part_path_for(save_path).write_bytes(b"garbage")
+    session.get.return_value = _response(200, [BODY], {"content-length": str(len(BODY))})
+
+    downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert save_path.read_bytes() == BODY
+
+
+def test_truncated_transfer_is_retried_without_refetching(
+    downloader: PDFDownloader,
+    session: Mock,
+    tmp_path: Path,
+) -> None:
+    """途中で切れた転送は受信済みの続きから再試行されることのテスト"""
+    save_path = tmp_path / "test.pdf"
+    session.get.side_effect = [
+        _response(200, [BODY[:10]], {"content-length": str(len(BODY)), "ETag": ETAG}),
+        _response(
+            206,
+            [BODY[10:]],
+            {
+                "content-length": str(len(BODY) - 10),
+                "content-range": f"bytes 10-{len(BODY) - 1}/{len(BODY)}",
+                "ETag": ETAG,
+            },
+        ),
+    ]
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert session.get.call_args_list[1].kwargs["headers"] == {
+        "Accept-Encoding": "identity",
+        "If-Range": ETAG,
+        "Range": "bytes=10-",
+    }
+    assert save_path.read_bytes() == BODY
+
+
+def test_incomplete_download_never_reaches_save_path(
+    downloader: PDFDownloader,
+    session: Mock,
+    tmp_path: Path,
+) -> None:
+    """最後まで受信できなかった場合は保存先にファイルが作られないことのテスト"""
+    save_path = tmp_path / "test.pdf"
+    session.get.side_effect = lambda *args, **kwargs: _response(200, [BODY[:5]], {"content-length": str(len(BODY))})
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "failed"
+    assert not save_path.exists()
+    assert part_path_for(save_path).exists()
+
+
+def test_range_not_satisfiable_with_complete_part(
+    downloader: PDFDownloader,
+    session: Mock,
+    tmp_path: Path,
+) -> None:
+    """.part ファイルが既に全て受信済みの場合のテスト"""
+    save_path = tmp_path / "test.pdf"
+    part_path_for(save_path).write_bytes(BODY)
+    validator_path_for(save_path).write_text(ETAG, encoding="utf-8")
+    session.get.return_value = _response(416, [], {"content-range": f"bytes */{len(BODY)}"})
+
+    result = downloader.download_pdf(URL, str(save_path), _metadata())
+
+    assert result.download_status == "success"
+    assert save_path.read_bytes() == BODY
+
+
+def test_incomplete_download_error_is_request_exception() -> None:
+    """IncompleteDownloadErrorがリトライ対象の例外であることのテスト"""
+    assert issubclass(IncompleteDownloadError, requests.RequestException)
@@ -0,0 +1,164 @@
+# ruff: noqa
+"""RobotsCheckerクラスのテスト"""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.robotparser import RobotsChecker
+
+ROBOTS_TXT = """
+User-agent: *
+Disallow: /private/
+Crawl-delay: 7
+
+User-agent: OtherBot
+Disallow: /
+"""
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _make_session(status_code: int = 200, text: str = ROBOTS_TXT, headers: dict[str, str] | None = None) -> Mock:
+    """robots.txtを返すセッションのモックを作成"""
+    response = Mock()
+    response.status_code = status_code
+    response.text = text
+    response.headers = headers or {}
+    session = Mock(spec=requests.Session)
+    session.get.return_value = response
+    return session
+
+
+def test_can_fetch_is_enforced(tmp_path: Path) -> None:
+    """robots.txtで禁止されたURLに対してFalseを返すことのテスト"""
+    session = _make_session()
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path)
+
+    assert checker.can_fetch("https://example.com/public/a.html")
+    assert not checker.can_fetch("https://example.com/private/a.pdf")
+    assert checker.get_crawl_delay("https://example.com/") == 7
+    # 共有セッションで1回だけ取得する
+    session.get.assert_called_once()
+    assert session.get.call_args.args[0] == "https://example.com/robots.txt"
+
+
+def test_disk_cache_is_reused(tmp_path: Path) -> None:
+    """有効期間内はディスク上のキャッシュを使い再取得しないことのテスト"""
+    clock = FakeClock()
+    RobotsChecker("TestBot", session=_make_session(), cache_dir=tmp_path, clock=clock).can_fetch("https://example.com/")
+
+    session = _make_session(text="User-agent: *\nDisallow: /\n")
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path, clock=clock)
+
+    assert not checker.can_fetch("https://example.com/private/a.pdf")
+    assert checker.can_fetch("https://example.com/public/a.html")
+    session.get.assert_not_called()
+
+
+def test_expired_cache_is_refetched(tmp_path: Path) -> None:
+    """max-ageを過ぎたキャッシュは再取得することのテスト"""
+    clock = FakeClock()
+    first = RobotsChecker(
+        "TestBot",
+        session=_make_session(headers={"Cache-Control": "public, max-age=60"}),
+        cache_dir=tmp_path,
+        clock=clock,
+    )
+    first.can_fetch("https://example.com/")
+
+    clock.now += 301
+    session = _make_session(text="User-agent: *\nDisallow: /\n")
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path, clock=clock)
+
+    assert not checker.can_fetch("https://example.com/public/a.html")
+    session.get.assert_called_once()
+
+
+@pytest.mark.parametrize("cache_control", ["max-age=0", "no-cache", "max-age=60"])
+def test_short_max_age_is_raised_to_minimum_ttl(tmp_path: Path, cache_control: str) -> None:
+    """max-age=0 や no-cache でもリクエストのたびに取得し直さないことのテスト"""
+    clock = FakeClock()
+    session = _make_session(headers={"Cache-Control": cache_control})
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path, clock=clock)
+
+    for _ in range(3):
+        checker.can_fetch("https://example.com/a.html")
+        checker.get_crawl_delay("https://example.com/")
+    clock.now += 299
+    checker.can_fetch("https://example.com/a.html")
+    assert session.get.call_count == 1
+
+    clock.now += 2
+    checker.can_fetch("https://example.com/a.html")
+    assert session.get.call_count == 2
+
+
+@pytest.mark.parametrize(
+    ("status_code", "expected"),
+    [(404, True), (403, False), (401, False)],
+)
+def test_status_codes(tmp_path: Path, status_code: int, expected: bool) -> None:
+    """robots.txtのステータスコードに応じた扱いのテスト"""
+    checker = RobotsChecker("TestBot", session=_make_session(status_code=status_code, text=""), cache_dir=tmp_path)
+
+    assert checker.can_fetch("https://example.com/a.html") is expected
+    assert checker.get_crawl_delay("https://example.com/") is None
+
+
+@pytest.mark.parametrize("status_code", [500, 503])
+def test_server_error_disallows_and_retries(tmp_path: Path, status_code: int) -> None:
+    """5xxの場合はサイト全体を禁止として扱い、キャッシュに保存せずに短い間隔で再試行することのテスト"""
+    clock = FakeClock()
+    session = _make_session(status_code=status_code)
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path, clock=clock)
+
+    assert not checker.can_fetch("https://example.com/public/a.html")
+    assert list(tmp_path.iterdir()) == []
+
+    session.get.return_value = _make_session().get.return_value
+    checker.can_fetch("https://example.com/public/a.html")
+    assert session.get.call_count == 1
+    clock.now += 301
+    assert checker.can_fetch("https://example.com/public/a.html")
+    assert session.get.call_count == 2
+
+
+def test_connection_error(tmp_path: Path) -> None:
+    """通信エラーの場合はサイト全体を禁止として扱うことのテスト"""
+    session = Mock(spec=requests.Session)
+    session.get.side_effect = requests.ConnectionError("接続できません")
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path)
+
+    assert not checker.can_fetch("https://example.com/a.html")
+    assert checker.get_crawl_delay("https://example.com/") is None
+
+
+def test_server_error_uses_stale_cache(tmp_path: Path) -> None:
+    """取得できない場合は期限切れのキャッシュを使用することのテスト"""
+    clock = FakeClock()
+    RobotsChecker("TestBot", session=_make_session(), cache_dir=tmp_path, clock=clock).can_fetch("https://example.com/")
+
+    clock.now += 86401
+    checker = RobotsChecker("TestBot", session=_make_session(status_code=503), cache_dir=tmp_path, clock=clock)
+
+    assert checker.can_fetch("https://example.com/public/a.html")
+    assert not checker.can_fetch("https://example.com/private/a.pdf")
+
+
+def test_request_rate(tmp_path: Path) -> None:
+    """Request-rateがクロール遅延に反映されることのテスト"""
+    session = _make_session(text="User-agent: *\nRequest-rate: 1/20\nCrawl-delay: 5\n")
+    checker = RobotsChecker("TestBot", session=session, cache_dir=tmp_path)
+
+    assert checker.get_crawl_delay("https://example.com/") == 20
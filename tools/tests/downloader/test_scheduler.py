@@ -0,0 +1,175 @@
+# ruff: noqa
+"""PolitenessSchedulerクラスのテスト"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from downloader.scheduler import PolitenessScheduler
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """テスト用の時計のフィクスチャ"""
+    return FakeClock()
+
+
+def test_first_request_does_not_wait(clock: FakeClock) -> None:
+    """最初のリクエストは待機しないことのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock)
+
+    assert scheduler.reserve("https://example.com/a") == 0
+
+
+def test_reserve_spaces_requests_per_host(clock: FakeClock) -> None:
+    """同一ホストへの予約が間隔を空けて割り当てられることのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock)
+
+    assert scheduler.reserve("https://example.com/a") == 0
+    assert scheduler.reserve("https://example.com/b") == 3
+    assert scheduler.reserve("https://example.com/c") == 6
+
+    # 時間が経過すると待機時間は短くなる
+    clock.now += 7
+    assert scheduler.reserve("https://example.com/d") == 2
+
+
+def test_reserve_hosts_are_independent(clock: FakeClock) -> None:
+    """異なるホストへの予約は互いに影響しないことのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock)
+
+    assert scheduler.reserve("https://example.com/a") == 0
+    assert scheduler.reserve("https://example.org/a") == 0
+    assert scheduler.reserve("https://example.com/b") == 3
+
+
+def test_wait_calls_sleep_func(clock: FakeClock) -> None:
+    """waitメソッドが必要な時だけsleep_funcを呼ぶことのテスト"""
+    sleep = Mock()
+    scheduler = PolitenessScheduler(5, clock=clock, sleep_func=sleep)
+
+    scheduler.wait("https://example.com/a")
+    sleep.assert_not_called()
+
+    scheduler.wait("https://example.com/b")
+    sleep.assert_called_once_with(5)
+
+
+def test_wait_async(clock: FakeClock) -> None:
+    """wait_asyncメソッドのテスト"""
+    scheduler = PolitenessScheduler(0.01, clock=clock)
+
+    asyncio.run(scheduler.wait_async("https://example.com/a"))
+    asyncio.run(scheduler.wait_async("https://example.com/b"))
+
+    assert scheduler.reserve("https://example.com/c") == pytest.approx(0.02)
+
+
+def test_crawl_delay_widens_interval(clock: FakeClock) -> None:
+    """robots.txtのクロール遅延が最小間隔より長い場合はそちらを適用することのテスト"""
+    delays = {"slow.example.com": 10.0, "fast.example.com": 1.0}
+    scheduler = PolitenessScheduler(
+        3,
+        clock=clock,
+        crawl_delay=lambda url: delays.get(PolitenessScheduler.host_of(url)),
+    )
+
+    assert scheduler.reserve("https://slow.example.com/a") == 0
+    assert scheduler.reserve("https://slow.example.com/b") == 10
+    # 最小間隔より短いクロール遅延は無視される
+    assert scheduler.reserve("https://fast.example.com/a") == 0
+    assert scheduler.reserve("https://fast.example.com/b") == 3
+    assert scheduler.reserve("https://other.example.com/a") == 0
+    assert scheduler.reserve("https://other.example.com/b") == 3
+
+
+def test_retry_after_seconds(clock: FakeClock) -> None:
+    """Retry-After(秒数)の間は次のリクエストを遅らせることのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock)
+
+    assert scheduler.reserve("https://example.com/a") == 0
+    scheduler.record_response("https://example.com/a", 429, retry_after="30")
+
+    assert scheduler.reserve("https://example.com/b") == 30
+    assert scheduler.backoff_count == 1
+
+
+def test_parse_retry_after_http_date() -> None:
+    """Retry-After(HTTP日付)を待機時間に変換できることのテスト"""
+    from downloader.scheduler import parse_retry_after
+
+    now = 1_700_000_000.0
+    assert parse_retry_after("Tue, 14 Nov 2023 22:15:20 GMT", now=now) == 120
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("不正な値") is None
+    assert parse_retry_after(None) is None
+
+
+def test_exponential_backoff_and_reset(clock: FakeClock) -> None:
+    """Retry-Afterがない場合は指数的にバックオフし、成功で解除されることのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock, max_backoff=20)
+
+    scheduler.record_response("https://example.com/a", 503)
+    assert scheduler.reserve("https://example.com/a") == 6
+    clock.now += 9
+    scheduler.record_response("https://example.com/a", 503)
+    assert scheduler.reserve("https://example.com/a") == 12
+    clock.now += 15
+    scheduler.record_response("https://example.com/a", None)
+    # 上限で打ち切られる
+    assert scheduler.reserve("https://example.com/a") == 20
+
+    clock.now += 23
+    scheduler.record_response("https://example.com/a", 200)
+    clock.now += 3
+    scheduler.record_response("https://example.com/a", 503)
+    assert scheduler.reserve("https://example.com/a") == 6
+
+
+def test_latency_widens_interval(clock: FakeClock) -> None:
+    """応答時間が最小間隔より長いホストでは間隔を広げることのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock)
+
+    scheduler.record_response("https://slow.example.com/a", 200, latency=8.0)
+    scheduler.record_response("https://fast.example.com/a", 200, latency=0.2)
+
+    assert scheduler.interval_for("slow.example.com") == 8.0
+    assert scheduler.interval_for("fast.example.com") == 3
+    # 指数移動平均で平滑化される
+    scheduler.record_response("https://slow.example.com/b", 200, latency=4.0)
+    assert scheduler.interval_for("slow.example.com") == pytest.approx(6.8)
+
+
+def test_wait_is_accounted(clock: FakeClock) -> None:
+    """待機時間が集計されることのテスト"""
+    sleep = Mock()
+    scheduler = PolitenessScheduler(3, clock=clock, sleep_func=sleep)
+
+    scheduler.wait("https://example.com/a")
+    scheduler.wait("https://example.com/b")
+    scheduler.wait("https://example.com/c")
+
+    assert scheduler.total_wait == 9
+    assert scheduler.wait_count == 2
+
+
+def test_global_interval_spans_hosts(clock: FakeClock) -> None:
+    """全体の間隔がホストによらず適用されることのテスト"""
+    scheduler = PolitenessScheduler(3, clock=clock, global_interval=2)
+
+    assert scheduler.reserve("https://a.example.com/1") == 0
+    assert scheduler.reserve("https://b.example.com/1") == 2
+    assert scheduler.reserve("https://c.example.com/1") == 4
+    # 同一ホストの間隔(3秒)は全体の間隔とは別に保証される
+    assert scheduler.reserve("https://a.example.com/2") == 6
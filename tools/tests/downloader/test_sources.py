@@ -0,0 +1,232 @@
+# ruff: noqa
+"""公開元アダプタと複数公開元クロールのテスト"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from downloader.downloader import SeijishikinDownloader
+from downloader.multi_source import MultiSourceCrawler
+from downloader.page_parser import Category, PageParser, PdfLink, ReportListPageLink
+from downloader.pdf_downloader import PDFDownloader
+from downloader.sources import SourceConfig, SourcePageParser, load_sources
+
+FIXTURES = Path(__file__).parent / "fixtures" / "sources"
+BASE_URL = "https://www.pref.example.lg.jp/senkyo/seijishikin/"
+
+
+class FixtureSession:
+    """保存したHTMLを返すセッション"""
+
+    def __init__(self, pages: dict[str, str]) -> None:
+        self.pages = pages
+        self.requested: list[str] = []
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        self.requested.append(url)
+        response = requests.Response()
+        response.url = url
+        if url in self.pages:
+            response.status_code = 200
+            response._content = (FIXTURES / self.pages[url]).read_bytes()
+        else:
+            response.status_code = 404
+            response._content = b""
+        response._content_consumed = True
+        return response
+
+
+def _source(**overrides) -> SourceConfig:
+    options = {"name": "example-pref", "base_url": BASE_URL, "report_list_pattern": r"/?r\d+/index\.html$"}
+    options.update(overrides)
+    return SourceConfig(**options)
+
+
+def _parser(session: FixtureSession, source: SourceConfig | None = None, **kwargs) -> SourcePageParser:
+    return SourcePageParser(source or _source(), session, delay=0, sleep_func=Mock(), **kwargs)
+
+
+def test_load_sources(tmp_path: Path) -> None:
+    """公開元の設定ファイルを読み込めることのテスト"""
+    path = tmp_path / "sources.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"name": "a", "base_url": "https://a.example.jp/"},
+                {"name": "b", "base_url": "https://b.example.jp/", "encoding": "shift_jis"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    sources = load_sources(path)
+
+    assert [source.name for source in sources] == ["a", "b"]
+    assert sources[1].encoding == "shift_jis"
+    assert sources[0].host == "a.example.jp"
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        {"name": "a", "base_url": "https://a.example.jp/"},
+        [{"name": "a", "base_url": "https://a.example.jp/", "unknown": 1}],
+        [{"name": "", "base_url": "https://a.example.jp/"}],
+        [{"name": "a", "base_url": "https://a.example.jp/"}, {"name": "a", "base_url": "https://b.example.jp/"}],
+    ],
+)
+def test_load_sources_invalid(tmp_path: Path, items) -> None:
+    """形式が正しくない設定ファイルはエラーになることのテスト"""
+    path = tmp_path / "sources.json"
+    path.write_text(json.dumps(items), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_sources(path)
+
+
+def test_get_report_list_urls_from_fixture() -> None:
+    """トップページから報告書一覧ページのリンクを抽出できることのテスト"""
+    session = FixtureSession({BASE_URL: "index.html"})
+    parser = _parser(session, years=["R5"])
+
+    links = parser.get_year_and_report_urls()
+
+    assert links == [
+        ReportListPageLink(
+            url=f"{BASE_URL}r5/index.html",
+            text="令和5年分 政治資金収支報告書（令和6年11月公表）",
+            year="R5",
+            source="example-pref",
+        ),
+    ]
+
+
+def test_parse_report_list_page_from_fixture() -> None:
+    """報告書一覧ページからPDFリンクを抽出できることのテスト"""
+    report_list_url = f"{BASE_URL}r5/index.html"
+    session = FixtureSession({report_list_url: "r5.html"})
+    parser = _parser(session)
+    link = ReportListPageLink(url=report_list_url, text="令和5年分", year="R5", source="example-pref")
+
+    pdf_links = parser.parse_report_list_page(link)
+
+    assert [(pdf_link.url, pdf_link.text) for pdf_link in pdf_links] == [
+        (f"{BASE_URL}r5/files/r5_0001.pdf", "例示党例示県支部連合会"),
+        (f"{BASE_URL}r5/files/r5_0002.PDF", "例示党例示市支部"),
+        (f"{BASE_URL}r5/files/r5_0101.pdf", "例示後援会"),
+    ]
+    assert all(pdf_link.source == "example-pref" for pdf_link in pdf_links)
+    assert all(pdf_link.category() == Category.UNKNOWN for pdf_link in pdf_links)
+    assert report_list_url in parser.content_hashes
+
+    # 受信しながら解析した場合も同じリンクが得られる
+    assert list(parser.iter_report_list_pdf_links(link)) == pdf_links
+
+
+def test_top_page_as_report_list() -> None:
+    """報告書一覧ページのパターンがない場合はトップページを報告書一覧ページとして扱うことのテスト"""
+    session = FixtureSession({})
+    parser = _parser(session, _source(report_list_pattern=None, year="R5"), years=["R5"])
+
+    links = parser.get_year_and_report_urls()
+
+    assert links == [ReportListPageLink(url=BASE_URL, text="example-pref", year="R5", source="example-pref")]
+    assert session.requested == []
+    assert _parser(session, _source(report_list_pattern=None, year="R4"), years=["R5"]).get_year_and_report_urls() == []
+
+
+def test_prepare_download_prefixes_source_name() -> None:
+    """総務省以外の公開元のPDFはファイル名の先頭に公開元の名前が付くことのテスト"""
+    downloader = PDFDownloader(session=Mock(), output_dir="out")
+    pdf_link = PdfLink(
+        url=f"{BASE_URL}r5/files/r5_0001.pdf", text="例示後援会", report_list_url=BASE_URL, source="example-pref"
+    )
+
+    result = downloader.prepare_download(pdf_link, "R5")
+
+    digest = hashlib.sha256(pdf_link.url.encode()).hexdigest()[:10]
+    assert result.metadata.filename == f"example-pref_R5_不明_{digest}_例示後援会.pdf"
+
+
+def test_prepare_download_distinguishes_repeated_link_text() -> None:
+    """公開元のページで同じテキストのリンクが複数あっても別のファイル名になることのテスト"""
+    downloader = PDFDownloader(session=Mock(), output_dir="out")
+    links = [
+        PdfLink(
+            url=f"{BASE_URL}r5/files/{number}.pdf", text="収支報告書", report_list_url=BASE_URL, source="example-pref"
+        )
+        for number in range(3)
+    ]
+
+    filenames = {downloader.prepare_download(link, "R5").metadata.filename for link in links}
+
+    assert len(filenames) == 3
+    # 同じURLは実行ごとに同じファイル名になる
+    assert downloader.prepare_download(links[0], "R5").metadata.filename in filenames
+
+
+def test_group_by_host() -> None:
+    """公開元がホストごとにまとめられることのテスト"""
+    session = Mock()
+    soumu = PageParser(session=session)
+    pref_a = _parser(session, _source(name="a", base_url="https://a.example.jp/"))
+    pref_a2 = _parser(session, _source(name="a2", base_url="https://a.example.jp/other/"))
+    pref_b = _parser(session, _source(name="b", base_url="https://b.example.jp/"))
+
+    groups = MultiSourceCrawler.group_by_host([soumu, pref_a, pref_b, pref_a2])
+
+    assert groups == {"www.soumu.go.jp": [soumu], "a.example.jp": [pref_a, pref_a2], "b.example.jp": [pref_b]}
+
+
+def test_hosts_are_crawled_concurrently() -> None:
+    """異なるホストの公開元は同時に、同じホストの公開元は順に処理されることのテスト"""
+    barrier = threading.Barrier(2, timeout=5)
+    active: dict[str, int] = {}
+    max_active: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def make_parser(name: str, host: str) -> Mock:
+        parser = Mock()
+        parser.base_url = f"https://{host}/"
+        parser.get_year_and_report_urls.return_value = [
+            ReportListPageLink(url=f"https://{host}/{name}.html", text=name, year="R5", source=name),
+        ]
+        return parser
+
+    def crawl_links(links: list[ReportListPageLink]) -> None:
+        host = links[0].url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            max_active[host] = max(max_active.get(host, 0), active[host])
+        if links[0].source in ("a1", "b"):
+            # 2つのホストの処理が同時に進んでいなければタイムアウトする
+            barrier.wait()
+        with lock:
+            active[host] -= 1
+
+    downloader = Mock()
+    downloader.crawl_links.side_effect = crawl_links
+    parsers = [make_parser("a1", "a.example.jp"), make_parser("a2", "a.example.jp"), make_parser("b", "b.example.jp")]
+
+    found = MultiSourceCrawler(downloader).run(parsers)
+
+    assert found == 3
+    assert downloader.crawl_links.call_count == 3
+    assert max_active == {"a.example.jp": 1, "b.example.jp": 1}
+
+
+def test_downloader_routes_links_to_source_parser(make_args, tmp_path: Path) -> None:
+    """報告書一覧ページが公開元のパーサーで解析されることのテスト"""
+    path = tmp_path / "sources.json"
+    path.write_text(json.dumps([{"name": "example-pref", "base_url": BASE_URL}]), encoding="utf-8")
+
+    downloader = SeijishikinDownloader(make_args(sources=str(path)))
+
+    link = ReportListPageLink(url=f"{BASE_URL}r5/index.html", text="令和5年分", year="R5", source="example-pref")
+    assert downloader.parser_for(link) is downloader.source_parsers["example-pref"]
+    assert downloader.parser_for(ReportListPageLink(url="x", text="x", year="R5")) is downloader.page_parser
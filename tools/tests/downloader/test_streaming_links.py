@@ -0,0 +1,198 @@
+# ruff: noqa
+"""報告書一覧ページのストリーミング解析のテスト"""
+
+import threading
+from unittest.mock import MagicMock, Mock
+
+import requests
+
+from downloader.async_crawler import AsyncCrawlEngine
+from downloader.crawl_state import content_hash
+from downloader.page_parser import NameFilter, PageParser, PdfLink, ReportListPageLink
+
+REPORT_LIST = ReportListPageLink(
+    url="https://example.com/reports/SS20241129/SL/index.html",
+    text="政党支部",
+    year="R5",
+)
+
+HTML = (
+    "<html><body><ul>"
+    + "".join(f'<li><a href="001_{i:04d}.pdf">民主党第{i}支部</a></li>' for i in range(3))
+    + '<li><a href="001_0100.pdf">自由党支部</a></li>'
+    + "</ul></body></html>"
+)
+
+
+def _make_response(chunks: list[bytes]) -> MagicMock:
+    """ストリーミングモードのレスポンスのモックを作成"""
+    response = MagicMock(spec=requests.Response)
+    response.__enter__.return_value = response
+    response.status_code = 200
+    response.headers = {}
+    response.iter_content.return_value = iter(chunks)
+    return response
+
+
+def _split(data: bytes, size: int) -> list[bytes]:
+    """バイト列を固定長に分割(マルチバイト文字の途中でも分割される)"""
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_iter_report_list_pdf_links(mock_sleep: Mock) -> None:
+    """Shift-JISの文字がチャンクの境界で分割されてもリンクを抽出できることのテスト"""
+    session = Mock()
+    session.get.return_value = _make_response(_split(HTML.encode("shift_jis"), 5))
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep, name_filter=NameFilter("民主党", False))
+
+    links = list(parser.iter_report_list_pdf_links(REPORT_LIST))
+
+    assert [link.text for link in links] == ["民主党第0支部", "民主党第1支部", "民主党第2支部"]
+    assert links[0].url == "https://example.com/reports/SS20241129/SL/index.html/001_0000.pdf"
+    assert session.get.call_args.kwargs["stream"] is True
+    # 一括取得時と同じハッシュ値が記録される
+    assert parser.content_hashes[REPORT_LIST.url] == content_hash(HTML)
+    mock_sleep.assert_called_once_with(0)
+
+
+def test_iter_report_list_pdf_links_yields_while_receiving(mock_sleep: Mock) -> None:
+    """ページの受信完了を待たずにPDFリンクが返されることのテスト"""
+    data = HTML.encode("shift_jis")
+    resume = threading.Event()
+    delivered: list[int] = []
+
+    def iter_content(chunk_size: int):
+        for chunk in _split(data, 64):
+            delivered.append(len(chunk))
+            yield chunk
+            # 最初のリンクが返されるまで残りの受信を止める
+            assert resume.wait(timeout=5)
+
+    response = _make_response([])
+    response.iter_content.side_effect = iter_content
+    session = Mock()
+    session.get.return_value = response
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep)
+    links = parser.iter_report_list_pdf_links(REPORT_LIST)
+
+    first = next(links)
+    assert first.text == "民主党第0支部"
+    assert sum(delivered) < len(data)
+    resume.set()
+    assert len([first, *links]) == 4
+
+
+def test_iter_report_list_pdf_links_reads_body_while_consumer_waits(mock_sleep: Mock) -> None:
+    """呼び出し側がリンクを処理している間もページの本文を最後まで受信することのテスト"""
+    data = HTML.encode("shift_jis")
+    finished = threading.Event()
+
+    def iter_content(chunk_size: int):
+        yield from _split(data, 16)
+        finished.set()
+
+    response = _make_response([])
+    response.iter_content.side_effect = iter_content
+    session = Mock()
+    session.get.return_value = response
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep)
+    links = parser.iter_report_list_pdf_links(REPORT_LIST)
+
+    next(links)
+    # 最初のリンクのダウンロード中(次のリンクを要求する前)に本文の受信が終わる
+    assert finished.wait(timeout=5)
+    assert len(list(links)) == 3
+
+
+def test_iter_report_list_pdf_links_interrupted(mock_sleep: Mock) -> None:
+    """受信途中で切断された場合はページ全体を取得し直し、リンクを失わず重複もさせないことのテスト"""
+    data = HTML.encode("shift_jis")
+
+    def iter_content(chunk_size: int):
+        yield data[: len(data) // 2]
+        raise requests.ConnectionError("切断")
+
+    interrupted = _make_response([])
+    interrupted.iter_content.side_effect = iter_content
+    full = MagicMock(spec=requests.Response)
+    full.status_code = 200
+    full.headers = {}
+    full.text = HTML
+    session = Mock()
+    session.get.side_effect = [interrupted, full]
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep)
+
+    links = list(parser.iter_report_list_pdf_links(REPORT_LIST))
+
+    assert [link.text for link in links] == [f"民主党第{i}支部" for i in range(3)] + ["自由党支部"]
+    assert session.get.call_count == 2
+    assert parser.content_hashes[REPORT_LIST.url] == content_hash(HTML)
+    assert parser.incomplete_pages == set()
+
+
+def test_iter_report_list_pdf_links_refetch_fails(mock_sleep: Mock) -> None:
+    """取得し直しても失敗した場合はページを不完全として記録し、ハッシュ値を記録しないことのテスト"""
+
+    def iter_content(chunk_size: int):
+        yield HTML.encode("shift_jis")[:40]
+        raise requests.ConnectionError("切断")
+
+    interrupted = _make_response([])
+    interrupted.iter_content.side_effect = iter_content
+    session = Mock()
+    session.get.side_effect = [interrupted, requests.ConnectionError("接続できません")]
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep)
+
+    list(parser.iter_report_list_pdf_links(REPORT_LIST))
+
+    assert parser.incomplete_pages == {REPORT_LIST.url}
+    assert REPORT_LIST.url not in parser.content_hashes
+
+
+def test_iter_report_list_pdf_links_error_status(mock_sleep: Mock) -> None:
+    """エラー応答は受信途中の切断として扱わず、取得し直さずにリンクなしとすることのテスト"""
+    not_found = _make_response([])
+    not_found.status_code = 404
+    not_found.raise_for_status.side_effect = requests.HTTPError("404 Client Error")
+    session = Mock()
+    session.get.return_value = not_found
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep)
+
+    assert list(parser.iter_report_list_pdf_links(REPORT_LIST)) == []
+    assert session.get.call_count == 1
+    assert parser.incomplete_pages == set()
+    assert REPORT_LIST.url not in parser.content_hashes
+
+
+def test_iter_report_list_pdf_links_disallowed(mock_sleep: Mock, mock_robots_checker: Mock) -> None:
+    """robots.txtで禁止されている場合はリクエストしないことのテスト"""
+    mock_robots_checker.can_fetch.return_value = False
+    session = Mock()
+    parser = PageParser(session=session, delay=0, sleep_func=mock_sleep, robots_checker=mock_robots_checker)
+
+    assert list(parser.iter_report_list_pdf_links(REPORT_LIST)) == []
+    session.get.assert_not_called()
+    assert REPORT_LIST.url not in parser.content_hashes
+
+
+def test_async_crawl_starts_downloads_while_streaming() -> None:
+    """並行処理時にページの受信中にPDFの処理が始まることのテスト"""
+    first_pdf_started = threading.Event()
+    downloader = Mock()
+    downloader.stream_links = True
+
+    def iter_report_list_page(link: ReportListPageLink):
+        yield PdfLink(url=f"{link.url}/0.pdf", text="団体0", report_list_url=link.url)
+        # 最初のPDFの処理が始まるまで残りの受信を止める
+        assert first_pdf_started.wait(timeout=5)
+        yield PdfLink(url=f"{link.url}/1.pdf", text="団体1", report_list_url=link.url)
+
+    downloader.iter_report_list_page.side_effect = iter_report_list_page
+    downloader.process_pdf_link.side_effect = lambda pdf_link, year: first_pdf_started.set()
+
+    AsyncCrawlEngine(downloader, concurrency=2).run([REPORT_LIST])
+
+    assert downloader.process_pdf_link.call_count == 2
+    downloader.parse_report_list_page.assert_not_called()
+    completed_links = downloader.complete_report_list_page.call_args.args[1]
+    assert [link.text for link in completed_links] == ["団体0", "団体1"]
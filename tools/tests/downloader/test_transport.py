@@ -0,0 +1,181 @@
+# ruff: noqa
+"""通信モジュールのテスト(ローカルのHTTPサーバーを使用)"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from downloader.metadata import FileMetadata
+from downloader.pdf_downloader import PDFDownloader
+from downloader.transport import (
+    TimedHTTPConnectionPool,
+    connection_timings,
+    create_session,
+    iter_into,
+    reset_connection_timings,
+    supports_connection_timing,
+)
+
+BODY = b"%PDF-1.7\n" + bytes(range(256)) * 4096 + b"\n%%EOF\n"
+
+
+class Handler(BaseHTTPRequestHandler):
+    """テスト用のPDFを返すハンドラ"""
+
+    def do_GET(self) -> None:
+        if self.path == "/gzip.pdf":
+            body = gzip.compress(BODY)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        elif self.path == "/stalled.pdf":
+            # ヘッダのみを送って本文を送らない
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.flush()
+            time.sleep(1)
+            return
+        elif self.path == "/truncated.pdf":
+            # Content-Lengthより短いデータを送って切断する
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY[:1000])
+            self.close_connection = True
+            return
+        else:
+            body = BODY
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[str]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_create_session_configures_pool() -> None:
+    """接続プールの大きさとキープアライブが設定されることのテスト"""
+    session = create_session(pool_connections=3, pool_maxsize=7, user_agent="test-agent")
+
+    adapter = session.get_adapter("https://example.com/")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+    assert adapter.max_retries.total == 0
+    assert session.headers["User-Agent"] == "test-agent"
+    assert session.headers["Connection"] == "keep-alive"
+
+
+def test_connection_timings_with_installed_urllib3(server: str) -> None:
+    """固定した urllib3 で名前解決と接続確立の時間が記録されることのテスト"""
+    assert supports_connection_timing()
+    session = create_session()
+    url = server.replace("127.0.0.1", "localhost")
+
+    reset_connection_timings()
+    assert session.get(f"{url}/test.pdf").content == BODY
+    timings = connection_timings()
+    assert timings.dns > 0
+    assert timings.connect > 0
+    pool = session.get_adapter(url).poolmanager.connection_from_url(url)
+    assert isinstance(pool, TimedHTTPConnectionPool)
+
+
+def test_unsupported_urllib3_uses_default_pools(server: str) -> None:
+    """対応していない urllib3 では計測せずに既定の接続プールを使用することのテスト"""
+    assert not supports_connection_timing("3.0.0")
+    assert not supports_connection_timing("1.26.18")
+
+    with patch("downloader.transport.supports_connection_timing", return_value=False):
+        session = create_session()
+    pool = session.get_adapter(server).poolmanager.connection_from_url(server)
+    assert not isinstance(pool, TimedHTTPConnectionPool)
+    assert session.get(f"{server}/test.pdf").content == BODY
+
+
+def test_session_applies_default_timeout(server: str) -> None:
+    """タイムアウトを指定しないリクエストにも既定のタイムアウトが適用されることのテスト"""
+    session = create_session(timeout=(1.0, 0.2))
+
+    started = time.monotonic()
+    with pytest.raises(requests.RequestException):
+        response = session.get(f"{server}/stalled.pdf", stream=True)
+        b"".join(response.iter_content(1024))
+    assert time.monotonic() - started < 0.9
+
+
+@pytest.mark.parametrize("path", ["/test.pdf", "/gzip.pdf"])
+def test_iter_into_reads_whole_body(server: str, path: str) -> None:
+    """再利用バッファへの読み込みで本文全体を受信できる(gzipは展開される)ことのテスト"""
+    session = create_session()
+    buffer = bytearray(64 * 1024)
+    received = bytearray()
+    sizes = []
+
+    with session.get(f"{server}{path}", stream=True) as response:
+        for chunk in iter_into(response, buffer):
+            assert isinstance(chunk, memoryview)
+            received += chunk
+            sizes.append(len(chunk))
+
+    assert bytes(received) == BODY
+    assert max(sizes) <= len(buffer)
+
+
+def test_iter_into_raises_requests_exception_on_truncation(server: str) -> None:
+    """途中で切断された場合は requests の例外になることのテスト"""
+    session = create_session()
+
+    with pytest.raises(requests.RequestException):
+        with session.get(f"{server}/truncated.pdf", stream=True) as response:
+            for _ in iter_into(response, bytearray(4096)):
+                pass
+
+
+def test_iter_into_falls_back_to_iter_content() -> None:
+    """readinto に対応していないレスポンスでは iter_content を使用することのテスト"""
+    response = Mock(spec=requests.Response)
+    response.iter_content.return_value = [b"abc", b"", b"def"]
+
+    assert list(iter_into(response, bytearray(16))) == [b"abc", b"def"]
+    response.iter_content.assert_called_once_with(chunk_size=16)
+
+
+def test_download_pdf_from_local_server(server: str, tmp_path: Path) -> None:
+    """ローカルのHTTPサーバーからPDFをダウンロードできることのテスト"""
+    downloader = PDFDownloader(session=create_session(), output_dir=str(tmp_path), delay=0, sleep_func=Mock())
+    downloader.buffer_size = 100 * 1024
+    save_path = tmp_path / "test.pdf"
+    metadata = FileMetadata(
+        filename="test.pdf",
+        original_url=f"{server}/test.pdf",
+        organization="テスト団体",
+        category="政党支部",
+        year="R5",
+    )
+
+    result = downloader.download_pdf(f"{server}/test.pdf", str(save_path), metadata)
+
+    assert result.download_status == "success"
+    assert result.sha256 == hashlib.sha256(BODY).hexdigest()
+    assert save_path.read_bytes() == BODY
@@ -0,0 +1,254 @@
+# ruff: noqa
+"""分散ダウンロードキューのテスト"""
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks.replay_server import ReplayServer, SiteSpec, SyntheticSite
+from downloader.downloader import SeijishikinDownloader
+from downloader.layout import OutputLayout, read_layout
+from downloader.metadata import FileMetadata
+from downloader.page_parser import PdfLink
+from downloader.work_queue import LeaseHeartbeat, WorkQueue, main
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _link(number: int) -> PdfLink:
+    return PdfLink(
+        url=f"https://example.com/{number}.pdf", text=f"団体{number}", report_list_url="https://example.com/"
+    )
+
+
+def _metadata(link: PdfLink, status: str = "success") -> FileMetadata:
+    return FileMetadata(
+        filename=f"{link.text}.pdf",
+        original_url=link.url,
+        organization=link.text,
+        category="不明",
+        year="R5",
+        download_status=status,
+    )
+
+
+def test_expired_leases_are_reclaimed(tmp_path: Path) -> None:
+    """ハートビートが途絶えたワーカーのジョブを他のワーカーが引き継ぐことのテスト"""
+    clock = FakeClock()
+    queue = WorkQueue(tmp_path / "queue.sqlite3", lease_seconds=60, max_attempts=2, clock=clock)
+    assert queue.enqueue(_link(1), "R5", expected_size=100)
+    assert not queue.enqueue(_link(1), "R5")
+    assert queue.enqueue(_link(2), "R5")
+
+    [job] = queue.claim("a")
+    assert (job.url, job.year, job.expected_size, job.attempts) == (_link(1).url, "R5", 100, 1)
+    assert [job.url for job in queue.claim("b", limit=5)] == [_link(2).url]
+    assert queue.claim("c") == []
+
+    # a のみハートビートを送り、b のリースは期限切れになる
+    clock.now += 45
+    assert queue.heartbeat("a") == 1
+    clock.now += 30
+    [reclaimed] = queue.claim("c")
+    assert (reclaimed.url, reclaimed.attempts) == (_link(2).url, 2)
+
+    # リースを失ったワーカーの結果は記録しない
+    assert not queue.complete(_link(2).url, "b", _metadata(_link(2)))
+    assert queue.complete(_link(1).url, "a", _metadata(_link(1)))
+    assert queue.counts() == {"pending": 0, "leased": 1, "done": 1, "failed": 0}
+
+    # 取得回数の上限に達したジョブは失敗にする
+    clock.now += 61
+    assert queue.claim("d") == []
+    assert queue.counts()["failed"] == 1
+    assert queue.unfinished() == 0
+    assert queue.retry_failed() == 1
+    [retried] = queue.claim("d")
+    assert retried.attempts == 1
+    queue.release(retried.url, "d")
+    assert queue.claim("d")[0].attempts == 1
+    queue.close()
+
+
+def test_concurrent_claims_do_not_overlap(tmp_path: Path) -> None:
+    """別々の接続から同時に取得しても同じジョブを重複して取得しないことのテスト"""
+    path = tmp_path / "queue.sqlite3"
+    setup = WorkQueue(path)
+    for number in range(60):
+        setup.enqueue(_link(number), "R5")
+    setup.close()
+
+    claimed: dict[str, list[str]] = {}
+
+    def work(worker_id: str) -> None:
+        queue = WorkQueue(path)
+        urls = claimed.setdefault(worker_id, [])
+        while jobs := queue.claim(worker_id, limit=3):
+            urls.extend(job.url for job in jobs)
+        queue.close()
+
+    threads = [threading.Thread(target=work, args=(f"w{number}",)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    urls = [url for worker_urls in claimed.values() for url in worker_urls]
+    assert len(urls) == 60
+    assert len(set(urls)) == 60
+
+
+def test_heartbeat_thread_extends_leases(tmp_path: Path) -> None:
+    """ハートビートのスレッドがリースを延長することのテスト"""
+    clock = FakeClock()
+    queue = WorkQueue(tmp_path / "queue.sqlite3", lease_seconds=60, clock=clock)
+    queue.enqueue(_link(1), "R5")
+    queue.claim("a")
+    clock.now += 50
+
+    with LeaseHeartbeat(queue, "a", interval=0.01):
+        threading.Event().wait(0.1)
+
+    clock.now += 50
+    assert queue.claim("b") == []
+    queue.close()
+
+
+def test_heartbeat_stops_when_worker_makes_no_progress(tmp_path: Path) -> None:
+    """処理が進んでいないワーカーのリースは延長せず、他のワーカーに引き継がれることのテスト"""
+    clock = FakeClock()
+    queue = WorkQueue(tmp_path / "queue.sqlite3", lease_seconds=60, clock=clock)
+    queue.enqueue(_link(1), "R5")
+    queue.claim("a")
+    received = [0]
+    beats = threading.Event()
+    original = queue.heartbeat
+
+    def heartbeat(worker_id: str) -> int:
+        beats.set()
+        return original(worker_id)
+
+    queue.heartbeat = heartbeat
+    with LeaseHeartbeat(queue, "a", interval=0.01, progress=lambda: received[0]):
+        # 受信が進んでいる間は延長する
+        received[0] = 1024
+        assert beats.wait(timeout=5)
+        clock.now += 50
+        received[0] = 2048
+        beats.clear()
+        assert beats.wait(timeout=5)
+        # 受信が止まった後は延長しない
+        clock.now += 30
+        beats.clear()
+        assert not beats.wait(timeout=0.1)
+
+    assert queue.claim("b") == []
+    clock.now += 31
+    assert [job.url for job in queue.claim("b")] == [_link(1).url]
+    queue.close()
+
+
+def _downloader(make_args, server: ReplayServer, **overrides) -> SeijishikinDownloader:
+    downloader = SeijishikinDownloader(make_args(base_url=server.base_url, no_progress=True, **overrides))
+    downloader.scheduler.min_interval = 0
+    downloader.scheduler.latency_factor = 0
+    downloader.worker_poll_interval = 0.01
+    return downloader
+
+
+def test_coordinator_and_workers(make_args, tmp_path: Path, capsys) -> None:
+    """コーディネーターが登録したジョブを複数のワーカーで分担し、結果を1つにまとめることのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=2, pdfs=3, pdf_size=1024))
+    queue_path = tmp_path / "shared" / "queue.sqlite3"
+
+    shared = tmp_path / "pdfs"
+
+    with ReplayServer(site) as server:
+        coordinator = _downloader(
+            make_args,
+            server,
+            work_queue=str(queue_path),
+            output_dir=str(tmp_path / "coord"),
+            layout="year-category",
+            year="R5",
+        )
+        assert coordinator.download_all()
+        assert coordinator.metadata_manager.files == []
+        assert not (tmp_path / "coord" / "metadata.json").exists()
+
+        # 出力ディレクトリを共有するワーカー
+        workers = [
+            _downloader(
+                make_args,
+                server,
+                work_queue=str(queue_path),
+                worker=True,
+                worker_id=f"host-{number}",
+                output_dir=str(shared),
+                layout="year-category",
+            )
+            for number in range(2)
+        ]
+        threads = [threading.Thread(target=worker.run_worker) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(list(shared.rglob("*.pdf"))) == 6
+    # ワーカーは互いの結果を上書きしないよう、ワーカーごとのファイルに記録する
+    assert not (shared / "metadata.json").exists()
+    per_worker = [
+        json.loads((shared / f"metadata.host-{number}.json").read_text(encoding="utf-8"))["files"]
+        for number in range(2)
+    ]
+    assert sum(len(files) for files in per_worker) == 6
+
+    assert main(["status", str(queue_path)]) == 0
+    assert "done=6" in capsys.readouterr().out
+    assert main(["merge", str(queue_path), str(shared)]) == 0
+    document = json.loads((shared / "metadata.json").read_text(encoding="utf-8"))
+    assert len(document["files"]) == 6
+    assert {entry["download_status"] for entry in document["files"]} == {"success"}
+    # 配置と絞り込み条件はコーディネーターの実行条件を記録する
+    assert document["parameters"]["layout"] == "year-category"
+    assert document["parameters"]["years"] == ["R5"]
+    assert read_layout(shared) == "year-category"
+    for entry in document["files"]:
+        assert OutputLayout("year-category").path_for(shared, FileMetadata.from_dict(entry)).exists()
+
+
+def test_worker_rejects_different_layout(make_args, tmp_path: Path) -> None:
+    """コーディネーターと異なる配置のワーカーは開始しないことのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=1, pdfs=1, pdf_size=1024))
+    queue_path = tmp_path / "queue.sqlite3"
+
+    with ReplayServer(site) as server:
+        assert _downloader(make_args, server, work_queue=str(queue_path), layout="hash").download_all()
+        worker = _downloader(make_args, server, work_queue=str(queue_path), worker=True)
+        with pytest.raises(ValueError, match="配置"):
+            worker.run_worker()
+
+
+def test_worker_stops_when_budget_is_exhausted(make_args, tmp_path: Path) -> None:
+    """予算を使い切ったワーカーが残りのジョブを未着手に戻して終了することのテスト"""
+    site = SyntheticSite(SiteSpec(years=1, report_lists=1, pdfs=3, pdf_size=1024))
+    queue_path = tmp_path / "queue.sqlite3"
+
+    with ReplayServer(site) as server:
+        assert _downloader(make_args, server, work_queue=str(queue_path)).download_all()
+        worker = _downloader(make_args, server, work_queue=str(queue_path), worker=True, max_files=1)
+        assert not worker.run_worker()
+
+    queue = WorkQueue(queue_path)
+    counts = queue.counts()
+    queue.close()
+    assert (counts["done"], counts["pending"], counts["leased"]) == (1, 2, 0)